@@ -0,0 +1,579 @@
+# utilities for reading MODFLOW 6 binary output files
+#
+# The files are scanned once to build a compact index of the record headers
+# and the record data are returned as numpy views of a memory-mapped file,
+# so data are only read from disk when they are used.
+
+import numpy as np
+
+budget_header1 = [
+    ("kstp", np.int32),
+    ("kper", np.int32),
+    ("text", "S16"),
+    ("ndim1", np.int32),
+    ("ndim2", np.int32),
+    ("ndim3", np.int32),
+]
+
+budget_header2 = [
+    ("imeth", np.int32),
+    ("delt", np.float64),
+    ("pertim", np.float64),
+    ("totim", np.float64),
+]
+
+budget_index_dtype = np.dtype(
+    [
+        ("kstp", np.int32),
+        ("kper", np.int32),
+        ("text", "S16"),
+        ("imeth", np.int32),
+        ("ndim1", np.int32),
+        ("ndim2", np.int32),
+        ("ndim3", np.int32),
+        ("delt", np.float64),
+        ("pertim", np.float64),
+        ("totim", np.float64),
+        ("modelnam", "S16"),
+        ("paknam", "S16"),
+        ("modelnam2", "S16"),
+        ("paknam2", "S16"),
+        ("naux", np.int32),
+        ("nlist", np.int64),
+        ("offset", np.int64),
+    ]
+)
+
+
+def get_float_type(precision):
+    if precision == "single":
+        return np.dtype(np.float32)
+    elif precision == "double":
+        return np.dtype(np.float64)
+    else:
+        raise ValueError("precision must be 'single' or 'double'")
+
+
+def _read(f, dtype, count=1):
+    dtype = np.dtype(dtype)
+    b = f.read(dtype.itemsize * count)
+    if len(b) < dtype.itemsize * count:
+        raise EOFError("unexpected end of file")
+    return np.frombuffer(b, dtype=dtype, count=count)
+
+
+class BudgetFile(object):
+    """
+    Indexed reader for MODFLOW 6 binary budget files
+
+    Parameters
+    ----------
+    fpth : str
+        path to the binary budget file
+    precision : str
+        precision of the floating point data ("single" or "double").
+        (default is "double")
+
+    Attributes
+    ----------
+    index : numpy.recarray
+        record index with kstp, kper, text, imeth, ndim1, ndim2, ndim3,
+        delt, pertim, totim, modelnam, paknam, modelnam2, paknam2, naux,
+        nlist, and the offset to the data for each record.
+    auxnames : list
+        list of auxiliary variable names for each record
+
+    """
+
+    def __init__(self, fpth, precision="double"):
+        self.fpth = fpth
+        self.realtype = get_float_type(precision)
+        self.auxnames = []
+        self.index = self._build_index()
+        self._mm = None
+
+    def __len__(self):
+        return self.index.shape[0]
+
+    def _build_index(self):
+        h1 = np.dtype(budget_header1)
+        h2 = np.dtype(
+            [
+                (name, self.realtype if dt == np.float64 else dt)
+                for name, dt in budget_header2
+            ]
+        )
+        realsize = self.realtype.itemsize
+        records = []
+        with open(self.fpth, "rb") as f:
+            f.seek(0, 2)
+            fsize = f.tell()
+            f.seek(0)
+            while f.tell() < fsize:
+                hdr = _read(f, h1)[0]
+                ndim1 = int(hdr["ndim1"])
+                ndim2 = int(hdr["ndim2"])
+                ndim3 = int(hdr["ndim3"])
+                imeth, delt, pertim, totim = 1, 0.0, 0.0, 0.0
+                if ndim3 < 0:
+                    imeth, delt, pertim, totim = _read(f, h2)[0].tolist()
+                txt = 4 * [b""]
+                naux = 0
+                nlist = 0
+                auxnames = []
+                if imeth in (0, 1):
+                    nlist = ndim1 * ndim2 * abs(ndim3)
+                    nbytes = nlist * realsize
+                elif imeth == 2:
+                    nlist = int(_read(f, np.int32)[0])
+                    nbytes = nlist * (4 + realsize)
+                elif imeth == 3:
+                    # skip the layer indicator array
+                    f.seek(ndim1 * ndim2 * 4, 1)
+                    nlist = ndim1 * ndim2
+                    nbytes = nlist * realsize
+                elif imeth == 4:
+                    nlist = ndim1 * ndim2
+                    nbytes = nlist * realsize
+                elif imeth in (5, 6):
+                    if imeth == 6:
+                        txt = [t for t in _read(f, "S16", count=4)]
+                    naux = int(_read(f, np.int32)[0]) - 1
+                    auxnames = [
+                        t.decode().strip() for t in _read(f, "S16", count=naux)
+                    ]
+                    nlist = int(_read(f, np.int32)[0])
+                    nints = 2 if imeth == 6 else 1
+                    nbytes = nlist * (4 * nints + realsize * (naux + 1))
+                else:
+                    msg = "invalid imeth ({}) in {}".format(imeth, self.fpth)
+                    raise ValueError(msg)
+                offset = f.tell()
+                records.append(
+                    (
+                        hdr["kstp"],
+                        hdr["kper"],
+                        hdr["text"],
+                        imeth,
+                        ndim1,
+                        ndim2,
+                        ndim3,
+                        delt,
+                        pertim,
+                        totim,
+                        txt[0],
+                        txt[1],
+                        txt[2],
+                        txt[3],
+                        naux,
+                        nlist,
+                        offset,
+                    )
+                )
+                self.auxnames.append(auxnames)
+                f.seek(nbytes, 1)
+        index = np.array(records, dtype=budget_index_dtype)
+        return index.view(np.recarray)
+
+    def _get_memmap(self):
+        if self._mm is None:
+            self._mm = np.memmap(self.fpth, dtype=np.uint8, mode="r")
+        return self._mm
+
+    def close(self):
+        """Release the memory-mapped file"""
+        self._mm = None
+
+    def get_record_dtype(self, idx):
+        """Get the numpy dtype of the data for record idx"""
+        rec = self.index[idx]
+        imeth = rec["imeth"]
+        if imeth in (0, 1, 3, 4):
+            return self.realtype
+        elif imeth == 2:
+            return np.dtype([("node", np.int32), ("q", self.realtype)])
+        fields = [("node", np.int32)]
+        if imeth == 6:
+            fields.append(("node2", np.int32))
+        fields.append(("q", self.realtype))
+        for name in self.auxnames[idx]:
+            fields.append((name, self.realtype))
+        return np.dtype(fields)
+
+    def get_record(self, idx):
+        """
+        Get the data for record idx as a view of the memory-mapped file
+
+        Returns
+        -------
+        data : numpy.ndarray
+            one-dimensional array of values for imeth 0, 1, 3, and 4 and
+            structured array with node, (node2), q, and auxiliary
+            variables for list based records
+
+        """
+        rec = self.index[idx]
+        if rec["nlist"] < 1:
+            return np.zeros(0, dtype=self.get_record_dtype(idx))
+        return np.ndarray(
+            shape=(int(rec["nlist"]),),
+            dtype=self.get_record_dtype(idx),
+            buffer=self._get_memmap(),
+            offset=int(rec["offset"]),
+        )
+
+    def get_unique_record_names(self):
+        """Get a list of unique record names in the order they are found"""
+        names = []
+        for text in self.index["text"]:
+            text = text.decode().strip()
+            if text not in names:
+                names.append(text)
+        return names
+
+    def get_kstpkper(self):
+        """Get a list of unique (kstp, kper) tuples (zero-based)"""
+        kstpkper = []
+        for kstp, kper in zip(self.index["kstp"], self.index["kper"]):
+            k = (kstp - 1, kper - 1)
+            if k not in kstpkper:
+                kstpkper.append(k)
+        return kstpkper
+
+
+def get_head_header_dtype(realtype):
+    """Get the numpy dtype of a head, concentration, or array record header"""
+    return np.dtype(
+        [
+            ("kstp", np.int32),
+            ("kper", np.int32),
+            ("pertim", realtype),
+            ("totim", realtype),
+            ("text", "S16"),
+            ("ncol", np.int32),
+            ("nrow", np.int32),
+            ("ilay", np.int32),
+        ]
+    )
+
+
+head_index_dtype = np.dtype(
+    [
+        ("kstp", np.int32),
+        ("kper", np.int32),
+        ("pertim", np.float64),
+        ("totim", np.float64),
+        ("text", "S16"),
+        ("ncol", np.int32),
+        ("nrow", np.int32),
+        ("ilay", np.int32),
+        ("offset", np.int64),
+    ]
+)
+
+
+def _valid_head_header(hdr):
+    text = hdr["text"]
+    return (
+        hdr["ncol"] > 0
+        and hdr["nrow"] > 0
+        and hdr["ilay"] > 0
+        and hdr["kstp"] > 0
+        and hdr["kper"] > 0
+        and len(text.strip()) > 0
+        and all(32 <= c < 127 for c in text)
+    )
+
+
+class HeadFile(object):
+    """
+    Indexed reader for MODFLOW 6 binary head and concentration files
+
+    Binary dependent-variable files written by OutputControlData contain
+    one record per layer for DIS grids (ncol, nrow, ilay), one record per
+    layer for DISV grids (ncpl, 1, ilay), and one record for DISU grids
+    (nodes, 1, 1). Advanced package files (for example lake stage) use the
+    DISU layout. All data are returned as views of the memory-mapped file.
+
+    Parameters
+    ----------
+    fpth : str
+        path to the binary file
+    precision : str
+        precision of the floating point data ("single", "double", or
+        "auto"). (default is "auto")
+    text : str
+        only records with text containing this string are indexed. If
+        text is None, all records are indexed. (default is None)
+
+    Attributes
+    ----------
+    index : numpy.recarray
+        record index with kstp, kper, pertim, totim, text, ncol, nrow,
+        ilay, and the offset to the data for each record.
+    shape : tuple
+        (nlay, nrow, ncol) shape of the data for a time
+    times : numpy.ndarray
+        unique simulation times in the file
+
+    """
+
+    def __init__(self, fpth, precision="auto", text=None):
+        self.fpth = fpth
+        if precision == "auto":
+            precision = self._get_precision()
+        self.realtype = get_float_type(precision)
+        self.header_dtype = get_head_header_dtype(self.realtype)
+        self._mm = None
+        index = self._build_index()
+        if text is not None:
+            text = text.upper().encode()
+            keep = [text in t.upper() for t in index["text"]]
+            index = index[np.array(keep, dtype=bool)]
+        self.index = index
+        self.times, ifirst, itime = np.unique(
+            index["totim"], return_index=True, return_inverse=True
+        )
+        self._ifirst = ifirst
+        if len(index) > 0:
+            nlay = int(index["ilay"].max())
+            self.shape = (nlay, int(index["nrow"][0]), int(index["ncol"][0]))
+        else:
+            self.shape = (0, 0, 0)
+
+        # data offsets for each time and layer
+        self._offsets = np.zeros((self.times.shape[0], self.shape[0]), int)
+        self._offsets[itime, index["ilay"] - 1] = index["offset"]
+
+    def __len__(self):
+        return self.index.shape[0]
+
+    def _get_precision(self):
+        with open(self.fpth, "rb") as f:
+            b = f.read(get_head_header_dtype(np.float64).itemsize)
+        for precision in ("double", "single"):
+            dtype = get_head_header_dtype(get_float_type(precision))
+            if len(b) < dtype.itemsize:
+                continue
+            hdr = np.frombuffer(b, dtype=dtype, count=1)[0]
+            if _valid_head_header(hdr):
+                return precision
+        msg = "could not determine the precision of {}".format(self.fpth)
+        raise ValueError(msg)
+
+    def _get_memmap(self):
+        if self._mm is None:
+            self._mm = np.memmap(self.fpth, dtype=np.uint8, mode="r")
+        return self._mm
+
+    def close(self):
+        """Release the memory-mapped file"""
+        self._mm = None
+
+    def _build_index(self):
+        hdt = self.header_dtype
+        realsize = self.realtype.itemsize
+        with open(self.fpth, "rb") as f:
+            f.seek(0, 2)
+            fsize = f.tell()
+            f.seek(0)
+            if fsize < hdt.itemsize:
+                return np.zeros(0, dtype=head_index_dtype).view(np.recarray)
+            hdr = _read(f, hdt)[0]
+
+        # all of the records have the same size for most files, so the
+        # headers can be read directly from the memory-mapped file
+        n = int(hdr["ncol"]) * int(hdr["nrow"])
+        recsize = hdt.itemsize + n * realsize
+        if fsize % recsize == 0:
+            rec_dtype = np.dtype(
+                [("header", hdt), ("data", self.realtype, (n,))]
+            )
+            headers = np.memmap(
+                self.fpth, dtype=rec_dtype, mode="r", shape=(fsize // recsize,)
+            )["header"]
+            if np.all(headers["ncol"] * headers["nrow"] == n):
+                index = np.zeros(headers.shape[0], dtype=head_index_dtype)
+                for name in hdt.names:
+                    index[name] = headers[name]
+                index["offset"] = (
+                    np.arange(headers.shape[0], dtype=np.int64) * recsize
+                    + hdt.itemsize
+                )
+                return index.view(np.recarray)
+
+        # scan records with different sizes
+        records = []
+        with open(self.fpth, "rb") as f:
+            while f.tell() < fsize:
+                hdr = _read(f, hdt)[0]
+                offset = f.tell()
+                records.append(tuple(hdr.tolist()) + (offset,))
+                n = int(hdr["ncol"]) * int(hdr["nrow"])
+                f.seek(n * realsize, 1)
+        index = np.array(records, dtype=head_index_dtype)
+        return index.view(np.recarray)
+
+    def get_times(self):
+        """Get a list of unique simulation times"""
+        return self.times.tolist()
+
+    def get_kstpkper(self):
+        """Get a list of unique (kstp, kper) tuples (zero-based)"""
+        recs = self.index[self._ifirst]
+        return [(int(k) - 1, int(p) - 1) for k, p in recs[["kstp", "kper"]]]
+
+    def _view(self, offset, shape, strides):
+        return np.ndarray(
+            shape=shape,
+            dtype=self.realtype,
+            buffer=self._get_memmap(),
+            offset=int(offset),
+            strides=strides,
+        )
+
+    def get_record(self, idx):
+        """Get the (nrow, ncol) data for record idx"""
+        rec = self.index[idx]
+        nrow, ncol = int(rec["nrow"]), int(rec["ncol"])
+        size = self.realtype.itemsize
+        return self._view(rec["offset"], (nrow, ncol), (ncol * size, size))
+
+    def _get_time_index(self, totim=None, kstpkper=None, idx=None):
+        if idx is not None:
+            return idx
+        elif totim is not None:
+            itime = np.flatnonzero(np.isclose(self.times, totim))
+            if itime.size < 1:
+                raise ValueError("totim {} not found".format(totim))
+            return int(itime[0])
+        elif kstpkper is not None:
+            kstpkper = list(self.get_kstpkper()).index(tuple(kstpkper))
+            return kstpkper
+        return self.times.shape[0] - 1
+
+    def _get_offsets(self, itime):
+        """Get the data offsets for each layer in a time"""
+        return self._offsets[itime]
+
+    @staticmethod
+    def _stride(offsets):
+        """Get the stride between offsets or None if it is not constant"""
+        if offsets.size < 2:
+            return 0
+        d = np.diff(offsets)
+        if np.all(d == d[0]) and d[0] > 0:
+            return int(d[0])
+        return None
+
+    def get_data(self, totim=None, kstpkper=None, idx=None, mflay=None):
+        """
+        Get the data for a time as a view of the memory-mapped file
+
+        Parameters
+        ----------
+        totim : float
+            simulation time (default is None)
+        kstpkper : tuple
+            zero-based (kstp, kper) tuple (default is None)
+        idx : int
+            zero-based time index (default is None). The last time is
+            returned if totim, kstpkper, and idx are None.
+        mflay : int
+            zero-based layer. All layers are returned if mflay is None.
+            (default is None)
+
+        Returns
+        -------
+        data : numpy.ndarray
+            (nlay, nrow, ncol) array or (nrow, ncol) array if mflay is
+            specified
+
+        """
+        itime = self._get_time_index(totim=totim, kstpkper=kstpkper, idx=idx)
+        offsets = self._get_offsets(itime)
+        nlay, nrow, ncol = self.shape
+        size = self.realtype.itemsize
+        if mflay is not None:
+            return self._view(
+                offsets[mflay], (nrow, ncol), (ncol * size, size)
+            )
+        stride = self._stride(offsets)
+        if stride is None:
+            return np.stack(
+                [
+                    self._view(offset, (nrow, ncol), (ncol * size, size))
+                    for offset in offsets
+                ]
+            )
+        return self._view(
+            offsets[0], (nlay, nrow, ncol), (stride, ncol * size, size)
+        )
+
+    def get_alldata(self, mflay=None):
+        """
+        Get the data for all times. A view of the memory-mapped file is
+        returned if the records are evenly spaced in the file, which is the
+        case for files written by MODFLOW 6 without advanced package output.
+
+        Returns
+        -------
+        data : numpy.ndarray
+            (ntimes, nlay, nrow, ncol) array or (ntimes, nrow, ncol) array
+            if mflay is specified
+
+        """
+        ntimes = self.times.shape[0]
+        nlay, nrow, ncol = self.shape
+        size = self.realtype.itemsize
+        offsets = self._offsets
+        if ntimes < 1:
+            return np.zeros((0,) + self.shape, dtype=self.realtype)
+        tstride = self._stride(offsets[:, 0])
+        lstride = self._stride(offsets[0])
+        uniform = tstride is not None and lstride is not None
+        if uniform:
+            uniform = np.array_equal(
+                offsets, offsets[0] + tstride * np.arange(ntimes)[:, None]
+            )
+        if not uniform:
+            data = np.stack([self.get_data(idx=i) for i in range(ntimes)])
+            if mflay is not None:
+                data = data[:, mflay]
+            return data
+        if mflay is not None:
+            return self._view(
+                offsets[0, mflay],
+                (ntimes, nrow, ncol),
+                (tstride, ncol * size, size),
+            )
+        return self._view(
+            offsets[0, 0],
+            (ntimes, nlay, nrow, ncol),
+            (tstride, lstride, ncol * size, size),
+        )
+
+    def get_ts(self, idx):
+        """
+        Get a time series for one or more cells
+
+        Parameters
+        ----------
+        idx : tuple or list of tuples
+            zero-based (layer, row, column) cell indices
+
+        Returns
+        -------
+        ts : numpy.ndarray
+            array with the simulation times in the first column and the
+            values for each cell in the remaining columns
+
+        """
+        if isinstance(idx, tuple):
+            idx = [idx]
+        data = self.get_alldata()
+        ts = np.zeros((self.times.shape[0], len(idx) + 1), dtype=np.float64)
+        ts[:, 0] = self.times
+        for icol, (k, i, j) in enumerate(idx):
+            ts[:, icol + 1] = data[:, k, i, j]
+        return ts
@@ -14,6 +14,8 @@
 import os
 import numpy as np
 
+from binary_file_reader import BudgetFile
+
 
 def eval_bud_diff(fpth, b0, b1, ia=None, dtol=1e-6):
     diffmax = 0.0
@@ -121,3 +123,147 @@ def eval_bud_diff(fpth, b0, b1, ia=None, dtol=1e-6):
     assert abs(v1sum) < dtol, msg
 
     return
+
+
+def compare_budget_files(
+    fpth0, fpth1, outfile, rclose, pdtol, verbose=False, precision="double"
+):
+    """
+    Compare two MODFLOW 6 binary budget files in a single pass and write
+    differences that exceed the comparison criteria to outfile.
+
+    Both files are indexed once and records with the same time step,
+    stress period, budget text, and occurrence in the time step are
+    compared using views of the memory-mapped files.
+
+    Parameters
+    ----------
+    fpth0 : str
+        path to the base budget file
+    fpth1 : str
+        path to the comparison budget file
+    outfile : str
+        path to the comparison output file
+    rclose : float
+        flows less than rclose are not compared and differences greater
+        than 5 * rclose are reported
+    pdtol : float
+        tolerance included in the comparison output
+    verbose : bool
+        boolean indicating if differences should be written to the
+        terminal (default is False)
+    precision : str
+        precision of the budget files (default is "double")
+
+    Returns
+    -------
+    success : bool
+        boolean indicating if all of the differences are less than the
+        comparison criteria
+
+    """
+    cbc0 = BudgetFile(fpth0, precision=precision)
+    cbc1 = BudgetFile(fpth1, precision=precision)
+
+    # build list of cbc data to compare
+    avail0 = cbc0.get_unique_record_names()
+    avail1 = cbc1.get_unique_record_names()
+    keymap = {}
+    for t in avail0:
+        t1 = t
+        if t not in avail1:
+            # check if RCHA or EVTA is available and use that instead
+            # should be able to remove this once v6.3.0 is released
+            if t[:-1] in avail1:
+                t1 = t[:-1]
+            else:
+                raise Exception(f"Could not find {t} in {fpth1}")
+        keymap[t] = t1
+
+    # index the records in the comparison file using the time step, stress
+    # period, text, and the occurrence of the text in the time step
+    records1 = {}
+    for idx, rec in enumerate(cbc1.index):
+        key = (rec["kstp"], rec["kper"], rec["text"].decode().strip())
+        n = 0
+        while key + (n,) in records1:
+            n += 1
+        records1[key + (n,)] = idx
+
+    # match the records in the base file to the comparison file
+    pairs = []
+    occurrence = {}
+    for idx, rec in enumerate(cbc0.index):
+        text = rec["text"].decode().strip()
+        key = (rec["kstp"], rec["kper"], text)
+        n = occurrence.get(key, 0)
+        occurrence[key] = n + 1
+        key1 = (rec["kstp"], rec["kper"], keymap[text], n)
+        pairs.append((avail0.index(text), idx, records1.get(key1)))
+
+    vmin = rclose
+    if vmin < 1e-6:
+        vmin = 1e-6
+    vmin_tol = 5.0 * vmin
+
+    # process data in budget term order
+    success = True
+    fcmp = open(outfile, "w")
+    for itext, idx0, idx1 in sorted(pairs):
+        rec = cbc0.index[idx0]
+        key = avail0[itext]
+        t = rec["totim"]
+        msg = None
+        if idx1 is None:
+            msg = (
+                "{} - ".format(os.path.basename(fpth0))
+                + "{:16s} ".format(key)
+                + "not found in {} ".format(os.path.basename(fpth1))
+                + "at time {} ".format(t)
+            )
+        else:
+            v0 = cbc0.get_record(idx0)
+            v1 = cbc1.get_record(idx1)
+            if v0.dtype.names is not None:
+                v0 = v0["q"]
+                v1 = v1["q"]
+            # skip empty vectors
+            if v0.size < 1:
+                continue
+            if v0.shape != v1.shape:
+                msg = (
+                    "{} - ".format(os.path.basename(fpth0))
+                    + "{:16s} ".format(key)
+                    + "size ({}) ".format(v0.size)
+                    + "is not equal to {} ".format(v1.size)
+                    + "at time {} ".format(t)
+                )
+            else:
+                a0 = np.abs(v0)
+                a1 = np.abs(v1)
+                diff = np.where(
+                    (a0 > vmin) & (a1 > vmin), np.abs(v0 - v1), 0.0
+                )
+                diffmax = diff.max()
+                if diffmax > vmin_tol:
+                    indices = np.flatnonzero(diff == diffmax)
+                    msg = (
+                        "{} - ".format(os.path.basename(fpth0))
+                        + "{:16s} ".format(key)
+                        + "difference ({:10.4g}) ".format(diffmax)
+                        + "> {:10.4g} ".format(pdtol)
+                        + "at {} nodes ".format(indices.size)
+                        + " [first location ({})] ".format(indices[0] + 1)
+                        + "at time {} ".format(t)
+                    )
+        if msg is not None:
+            success = False
+            fcmp.write("{}\n".format(msg))
+            if verbose:
+                print(msg)
+
+    fcmp.close()
+    cbc0.close()
+    cbc1.close()
+
+    return success
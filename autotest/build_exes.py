@@ -6,6 +6,10 @@
 # can compile only mf6 directly using this command:
 #  python -c "import build_exes; build_exes.test_build_modflow6()"
 
+# to build all of the targets in parallel and only compile the source files
+# that changed since the last build, run this
+# python build_exes.py --incremental [-j 4]
+
 import os
 import sys
 import shutil
@@ -181,6 +185,27 @@ def build_zbud6():
     assert pm.returncode == 0, msg
 
 
+def build_incremental(names=None):
+    """
+    Build the targets using the parallel incremental build in
+    incremental_build.py. All of the targets are built if names is None.
+    """
+    from incremental_build import Builder
+
+    fc = get_compiler_envvar("gfortran")
+    nworkers = None
+    for idx, arg in enumerate(sys.argv):
+        if arg == "-fc":
+            fc = sys.argv[idx + 1]
+        elif arg in ("-j", "--jobs"):
+            nworkers = int(sys.argv[idx + 1])
+    builder = Builder(fc=fc, nworkers=nworkers)
+    targets = builder.build(names=names, appdir=os.path.join("..", "bin"))
+    for target in targets:
+        msg = "{} does not exist.".format(relpath_fallback(target))
+        assert os.path.isfile(target), msg
+
+
 def test_create_dirs():
     pths = [os.path.join("..", "bin"), os.path.join("temp")]
 
@@ -208,7 +233,10 @@ def test_build_zbud6():
 
 if __name__ == "__main__":
     test_create_dirs()
-    test_build_modflow6()
-    test_build_modflow6_so()
-    test_build_mf5to6()
-    test_build_zbud6()
+    if "--incremental" in sys.argv:
+        build_incremental()
+    else:
+        test_build_modflow6()
+        test_build_modflow6_so()
+        test_build_mf5to6()
+        test_build_zbud6()
@@ -17,6 +17,8 @@ except:
     msg += " pip install flopy"
     raise Exception(msg)
 
+from corpus_manifest import find_basedir, load_manifest
+
 
 def get_home_dir():
     # determine if CI run
@@ -73,47 +75,25 @@ def is_directory_available(example_basedir):
 
 
 def get_example_basedir(home, find_dir, subdir=None):
-    example_basedir = None
-    for root, dirs, files in os.walk(home):
-        for d in dirs:
-            if d == find_dir or d == find_dir + ".git":
-                example_basedir = os.path.join(root, d)
-                if subdir is not None:
-                    example_basedir = os.path.join(example_basedir, subdir)
-                break
-        if example_basedir is not None:
-            example_basedir = os.path.abspath(example_basedir)
-            print("Example base directory: {}".format(example_basedir))
-            break
+    example_basedir = find_basedir(home, find_dir)
+    if example_basedir is not None:
+        if subdir is not None:
+            example_basedir = os.path.join(example_basedir, subdir)
+        example_basedir = os.path.abspath(example_basedir)
+        print("Example base directory: {}".format(example_basedir))
     return example_basedir
 
 
 def get_example_dirs(example_basedir, exclude, prefix="test", find_sim=True):
+    # get the models from the cached corpus manifest
+    models = load_manifest(example_basedir)
     example_dirs = [
-        d
-        for d in os.listdir(example_basedir)
-        if prefix in d and d not in exclude
+        d for d in models.keys() if prefix in d and d not in exclude
     ]
 
     # make sure mfsim.nam is present in each directory
     if find_sim:
-        remove_dirs = []
-        # add_dirs = []
-        for temp_dir in example_dirs:
-            epth = os.path.join(example_basedir, temp_dir)
-            fpth = os.path.join(epth, "mfsim.nam")
-            if not os.path.isfile(fpth):
-                remove_dirs.append(temp_dir)
-            # for sub_dir in ("mf6gwf", "mf6gwt"):
-            #     tpth = os.path.join(epth, sub_dir)
-            #     fpth = os.path.join(tpth, "mfsim.nam")
-            #     if os.path.isfile(fpth):
-            #         add_dirs.append(os.path.join(temp_dir, sub_dir))
-
-        for remove_dir in remove_dirs:
-            example_dirs.remove(remove_dir)
-
-        # example_dirs += add_dirs
+        example_dirs = [d for d in example_dirs if models[d]["mfsim"]]
 
     # sort in numerical order for case sensitive os
     example_dirs = sorted(
@@ -150,19 +130,12 @@ def get_select_dirs(select_dirs, dirs):
 
 
 def get_select_packages(select_packages, exdir, dirs):
+    models = load_manifest(exdir)
     found_dirs = []
     for d in dirs:
-        pth = os.path.join(exdir, d)
-        namefiles = pymake.get_namefiles(pth)
-        ftypes = []
-        for namefile in namefiles:
-            ftype = pymake.get_mf6_ftypes(namefile, select_packages)
-            if ftype not in ftypes:
-                ftypes += ftype
-        if len(ftypes) > 0:
-            ftypes = [item.upper() for item in ftypes]
-            for pak in select_packages:
-                if pak in ftypes:
-                    found_dirs.append(d)
-                    break
+        ftypes = models[d]["ftypes"]
+        for pak in select_packages:
+            if pak in ftypes:
+                found_dirs.append(d)
+                break
     return found_dirs
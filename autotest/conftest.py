@@ -0,0 +1,43 @@
+import os
+import pytest
+
+from framework import get_temp_dir
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--shard",
+        action="store",
+        default=None,
+        help="run shard i of N of the regression test models (i/N)",
+    )
+
+
+def pytest_configure(config):
+    # the regression test modules read the shard when they are imported
+    shard = config.getoption("shard")
+    if shard is not None:
+        os.environ["MF6_AUTOTEST_SHARD"] = shard
+
+
+@pytest.fixture(scope="session", autouse=True)
+def workspace():
+    """
+    Create the temp workspace for the current pytest-xdist worker. Tests
+    run by different workers use separate temp/<worker_id> directories.
+    """
+    pth = get_temp_dir()
+    os.makedirs(pth, exist_ok=True)
+    return pth
+
+
+def pytest_make_parametrize_id(config, val, argname):
+    """
+    Remove the worker id from workspace paths used as test ids, so all of
+    the pytest-xdist workers collect the same tests
+    """
+    if isinstance(val, str):
+        pth = get_temp_dir()
+        if val.startswith(pth + os.sep):
+            return os.path.join("temp", val[len(pth) + 1 :])
+    return None
@@ -0,0 +1,241 @@
+# cached manifest of the external test model corpora
+#
+# The modflow6-testmodels, modflow6-largetestmodels, and modflow6-examples
+# repositories contain hundreds of models. Finding the repositories and
+# parsing every name file to select models by package is slow on network
+# file systems, so the location of each repository and a manifest of the
+# models in it are cached in the autotest cache directory.
+#
+# The manifest contains the files (size and sha256 digest), the name files,
+# and the package types (ftypes) of each model, and the last recorded
+# durations of the model in each test suite. A model is scanned again when
+# the modification time of the model directory or one of its
+# sub-directories changes, and the list of models is updated when the
+# modification time of the base directory changes.
+
+import os
+import json
+import hashlib
+
+from framework import get_cache_dir
+from durations import get_durations_file
+from regression_cache import file_digest
+
+cache_name = "corpus"
+basedirs_name = "basedirs.json"
+manifest_version = 1
+
+
+def _read_json(fpth):
+    try:
+        with open(fpth) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_json(fpth, data):
+    tmp = "{}.{}".format(fpth, os.getpid())
+    try:
+        with open(tmp, "w") as f:
+            json.dump(data, f, indent=1, sort_keys=True)
+        os.replace(tmp, fpth)
+    except OSError:
+        pass
+
+
+def find_basedir(home, find_dir):
+    """
+    Find a directory in home using the cached location if it still exists
+
+    Parameters
+    ----------
+    home : str
+        directory that is searched
+    find_dir : str
+        name of the directory (or the directory name + ".git")
+
+    Returns
+    -------
+    pth : str
+        absolute path to the directory or None if it was not found
+
+    """
+    fpth = os.path.join(get_cache_dir(cache_name), basedirs_name)
+    basedirs = _read_json(fpth)
+    key = "{}|{}".format(os.path.abspath(home), find_dir)
+    pth = basedirs.get(key)
+    if pth is not None and os.path.isdir(pth):
+        return pth
+
+    pth = None
+    for root, dirs, files in os.walk(home):
+        for d in dirs:
+            if d == find_dir or d == find_dir + ".git":
+                pth = os.path.abspath(os.path.join(root, d))
+                break
+        if pth is not None:
+            break
+
+    if pth is not None:
+        basedirs = _read_json(fpth)
+        basedirs[key] = pth
+        _write_json(fpth, basedirs)
+    return pth
+
+
+def _get_manifest_path(basedir):
+    key = hashlib.sha1(os.path.abspath(basedir).encode()).hexdigest()
+    return os.path.join(get_cache_dir(cache_name), "{}.json".format(key))
+
+
+def _get_mtime(pth):
+    try:
+        return os.stat(pth).st_mtime_ns
+    except OSError:
+        return None
+
+
+def get_ftypes(namefile):
+    """
+    Get the upper case file types in a name file. Blank lines, comments,
+    and block BEGIN and END lines are skipped.
+    """
+    ftypes = []
+    with open(namefile, "r") as f:
+        for line in f:
+            ll = line.strip().split()
+            if len(ll) < 2 or ll[0][0] in ("#", "!"):
+                continue
+            ftype = ll[0].upper()
+            if ftype in ("BEGIN", "END"):
+                continue
+            if ftype not in ftypes:
+                ftypes.append(ftype)
+    return ftypes
+
+
+def scan_model(pth):
+    """
+    Scan a model directory
+
+    Parameters
+    ----------
+    pth : str
+        path to the model directory
+
+    Returns
+    -------
+    entry : dict
+        manifest entry for the model
+
+    """
+    dirs = {}
+    files = {}
+    namefiles = []
+    for root, subdirs, names in os.walk(pth):
+        dirs[os.path.relpath(root, pth)] = _get_mtime(root)
+        for name in sorted(names):
+            fpth = os.path.join(root, name)
+            relpth = os.path.relpath(fpth, pth).replace(os.sep, "/")
+            files[relpth] = [os.path.getsize(fpth), file_digest(fpth)]
+            if name.endswith(".nam"):
+                namefiles.append(relpth)
+
+    ftypes = []
+    for namefile in namefiles:
+        try:
+            for ftype in get_ftypes(os.path.join(pth, namefile)):
+                if ftype not in ftypes:
+                    ftypes.append(ftype)
+        except (OSError, UnicodeDecodeError):
+            continue
+
+    return {
+        "dirs": dirs,
+        "files": files,
+        "namefiles": namefiles,
+        "ftypes": ftypes,
+        "mfsim": os.path.isfile(os.path.join(pth, "mfsim.nam")),
+        "size": sum(v[0] for v in files.values()),
+    }
+
+
+def _is_current(pth, entry):
+    """Determine if the directory mtimes of a model entry are unchanged"""
+    for relpth, mtime in entry.get("dirs", {}).items():
+        if _get_mtime(os.path.join(pth, relpth)) != mtime:
+            return False
+    return len(entry.get("dirs", {})) > 0
+
+
+def _add_durations(models):
+    """Add the last recorded durations of each model in each test suite"""
+    durations = _read_json(get_durations_file())
+    for name, entry in models.items():
+        entry["durations"] = {
+            suite: values[name]
+            for suite, values in durations.items()
+            if name in values
+        }
+
+
+def load_manifest(basedir, verbose=False):
+    """
+    Get the manifest of the models in a base directory. The manifest is
+    updated for models with directory modification times that have changed.
+
+    Parameters
+    ----------
+    basedir : str
+        path to the directory with the model directories
+    verbose : bool
+        boolean indicating if the models that are scanned should be
+        printed (default is False)
+
+    Returns
+    -------
+    models : dict
+        dictionary of model directory names and manifest entries
+
+    """
+    basedir = os.path.abspath(basedir)
+    fpth = _get_manifest_path(basedir)
+    manifest = _read_json(fpth)
+    if manifest.get("version") != manifest_version:
+        manifest = {}
+    models = manifest.get("models", {})
+    basedir_mtime = _get_mtime(basedir)
+
+    # update the list of model directories
+    if manifest.get("mtime") != basedir_mtime:
+        names = [
+            d
+            for d in os.listdir(basedir)
+            if os.path.isdir(os.path.join(basedir, d))
+        ]
+        models = {name: models[name] for name in names if name in models}
+        for name in names:
+            models.setdefault(name, {})
+
+    # scan new and modified models
+    changed = manifest.get("mtime") != basedir_mtime
+    for name, entry in models.items():
+        pth = os.path.join(basedir, name)
+        if not _is_current(pth, entry):
+            if verbose:
+                print("updating manifest for {}".format(name))
+            models[name] = scan_model(pth)
+            changed = True
+
+    _add_durations(models)
+    if changed:
+        manifest = {
+            "version": manifest_version,
+            "basedir": basedir,
+            "mtime": basedir_mtime,
+            "models": models,
+        }
+        _write_json(fpth, manifest)
+
+    return models
@@ -93,3 +93,69 @@ def get_disu_kwargs(nlay, nrow, ncol, delr, delc, tp, botm):
     kw["cl12"] = cl12
     kw["hwva"] = hwva
     return kw
+
+
+def get_structured_disu_kwargs(nlay, nrow, ncol, delr, delc, tp, botm):
+    """
+    Get the DISU arguments for a structured grid using numpy arrays. The
+    connections are the same as get_disu_kwargs() but the grid is not built
+    one cell at a time, so it can be used for grids with millions of cells.
+    The connection angles (angldegx) needed by transport models are also
+    returned.
+    """
+    delr = np.broadcast_to(np.asarray(delr, dtype=float), (ncol,))
+    delc = np.broadcast_to(np.asarray(delc, dtype=float), (nrow,))
+    botm = np.asarray(botm, dtype=float).reshape(nlay, -1)
+    botm = np.broadcast_to(botm.reshape(nlay, -1), (nlay, nrow * ncol))
+    tops = np.vstack((np.full((1, nrow * ncol), float(tp)), botm[:-1]))
+    thick = (tops - botm).reshape(nlay, nrow, ncol)
+
+    nodes = nlay * nrow * ncol
+    shape = (nlay, nrow, ncol)
+    k, i, j = np.indices(shape, dtype=np.int32)
+    n = np.arange(nodes, dtype=np.int64).reshape(shape)
+    cell_area = np.outer(delc, delr)[np.newaxis, :, :]
+    cell_area = np.broadcast_to(cell_area, shape)
+
+    # diagonal, up, back, left, right, front, and bottom connections in
+    # the order used by get_disu_kwargs()
+    width_r = np.broadcast_to(delr[np.newaxis, np.newaxis, :], shape)
+    width_c = np.broadcast_to(delc[np.newaxis, :, np.newaxis], shape)
+    connections = (
+        (np.ones(shape, dtype=bool), n, n + 1, n + 1, n + 1, 0.0),
+        (k > 0, n - nrow * ncol, 0, 0.5 * thick, cell_area, 0.0),
+        (i > 0, n - ncol, 1, 0.5 * width_c, width_r, 90.0),
+        (j > 0, n - 1, 1, 0.5 * width_r, width_c, 180.0),
+        (j < ncol - 1, n + 1, 1, 0.5 * width_r, width_c, 0.0),
+        (i < nrow - 1, n + ncol, 1, 0.5 * width_c, width_r, 270.0),
+        (k < nlay - 1, n + nrow * ncol, 0, 0.5 * thick, cell_area, 0.0),
+    )
+    mask = np.stack([c[0].ravel() for c in connections], axis=1)
+    ja = np.stack([c[1].ravel() for c in connections], axis=1)[mask]
+    ihc = np.stack(
+        [np.broadcast_to(c[2], shape).ravel() for c in connections], axis=1
+    )[mask]
+    cl12 = np.stack(
+        [np.broadcast_to(c[3], shape).ravel() for c in connections], axis=1
+    )[mask].astype(float)
+    hwva = np.stack(
+        [np.broadcast_to(c[4], shape).ravel() for c in connections], axis=1
+    )[mask].astype(float)
+    angldegx = np.stack(
+        [np.broadcast_to(c[5], shape).ravel() for c in connections], axis=1
+    )[mask].astype(float)
+
+    kw = {}
+    kw["nodes"] = nodes
+    kw["nja"] = ja.shape[0]
+    kw["nvert"] = None
+    kw["top"] = tops.ravel()
+    kw["bot"] = botm.ravel()
+    kw["area"] = cell_area.ravel().copy()
+    kw["iac"] = mask.sum(axis=1)
+    kw["ja"] = ja
+    kw["ihc"] = ihc
+    kw["cl12"] = cl12
+    kw["hwva"] = hwva
+    kw["angldegx"] = angldegx
+    return kw
@@ -0,0 +1,220 @@
+# duration-aware ordering and sharding of the regression test models
+#
+# The wall time used to run and compare each test model is recorded in a
+# persistent durations file. The durations are used to run the longest
+# models first and to split the models in a suite between N shards using
+# greedy bin-packing, so the shards take about the same time to run.
+#
+# The durations file is stored in the autotest cache directory unless the
+# MF6_AUTOTEST_DURATIONS environmental variable defines the path to the file.
+# The shard to run is defined using the --shard i/N command line argument
+# or the MF6_AUTOTEST_SHARD environmental variable, where i is the one-based
+# shard number and N is the number of shards.
+
+import os
+import sys
+import json
+import time
+
+from framework import get_cache_dir
+
+durations_name = "durations.json"
+
+
+def get_durations_file():
+    """Get the path to the durations file"""
+    fpth = os.environ.get("MF6_AUTOTEST_DURATIONS")
+    if fpth is None:
+        fpth = os.path.join(get_cache_dir(), durations_name)
+    return fpth
+
+
+def _read(fpth):
+    try:
+        with open(fpth) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def get_durations(suite):
+    """
+    Get the recorded durations for a test suite
+
+    Parameters
+    ----------
+    suite : str
+        name of the test suite (for example, "test_z01_testmodels_mf6")
+
+    Returns
+    -------
+    durations : dict
+        dictionary of model names and wall times in seconds
+
+    """
+    return _read(get_durations_file()).get(suite, {})
+
+
+class _FileLock(object):
+    """Simple lock file used to serialize updates of the durations file"""
+
+    def __init__(self, fpth, timeout=30.0):
+        self.fpth = fpth + ".lock"
+        self.timeout = timeout
+        self.fd = None
+
+    def __enter__(self):
+        t0 = time.time()
+        while True:
+            try:
+                self.fd = os.open(
+                    self.fpth, os.O_CREAT | os.O_EXCL | os.O_WRONLY
+                )
+                return self
+            except FileExistsError:
+                # remove a lock left by a process that was killed
+                if time.time() - t0 > self.timeout:
+                    try:
+                        os.remove(self.fpth)
+                    except OSError:
+                        pass
+                    t0 = time.time()
+                time.sleep(0.05)
+
+    def __exit__(self, *args):
+        os.close(self.fd)
+        try:
+            os.remove(self.fpth)
+        except OSError:
+            pass
+
+
+def record_duration(suite, name, elapsed):
+    """
+    Record the wall time used to run and compare a test model
+
+    Parameters
+    ----------
+    suite : str
+        name of the test suite
+    name : str
+        name of the test model
+    elapsed : float
+        wall time in seconds
+
+    """
+    fpth = get_durations_file()
+    os.makedirs(os.path.dirname(os.path.abspath(fpth)), exist_ok=True)
+    with _FileLock(fpth):
+        durations = _read(fpth)
+        durations.setdefault(suite, {})[name] = round(elapsed, 3)
+        tmp = "{}.{}".format(fpth, os.getpid())
+        with open(tmp, "w") as f:
+            json.dump(durations, f, indent=1, sort_keys=True)
+        os.replace(tmp, fpth)
+
+
+def get_shard():
+    """
+    Get the shard to run
+
+    Returns
+    -------
+    shard : tuple
+        (i, N) tuple with the one-based shard number and the number of
+        shards or None if the models are not sharded
+
+    """
+    shard = None
+    for idx, arg in enumerate(sys.argv):
+        if arg.lower() == "--shard":
+            if len(sys.argv) > idx + 1:
+                shard = sys.argv[idx + 1]
+                break
+        elif arg.lower().startswith("--shard="):
+            shard = arg.split("=", 1)[1]
+            break
+    if shard is None:
+        shard = os.environ.get("MF6_AUTOTEST_SHARD")
+    if shard is None:
+        return None
+    try:
+        ishard, nshards = [int(v) for v in shard.split("/")]
+    except ValueError:
+        msg = "shard must be defined as i/N (not '{}')".format(shard)
+        raise ValueError(msg)
+    if nshards < 1 or not 1 <= ishard <= nshards:
+        msg = "shard {} is not in the range 1/{}-{}/{}".format(
+            shard, nshards, nshards, nshards
+        )
+        raise ValueError(msg)
+    return ishard, nshards
+
+
+def order_by_duration(names, durations):
+    """
+    Sort model names from the longest to the shortest recorded duration.
+    Models without a recorded duration use the mean duration of the other
+    models. Models with the same duration keep their original order.
+    """
+    known = [durations[name] for name in names if name in durations]
+    default = sum(known) / len(known) if known else 1.0
+    return sorted(names, key=lambda name: -durations.get(name, default))
+
+
+def pack_shards(names, durations, nshards):
+    """
+    Split model names between shards using greedy bin-packing. The longest
+    remaining model is added to the shard with the smallest total duration.
+
+    Returns
+    -------
+    shards : list of lists
+        model names in each shard, longest first
+    totals : list
+        estimated total duration of each shard
+
+    """
+    names = order_by_duration(names, durations)
+    known = [durations[name] for name in names if name in durations]
+    default = sum(known) / len(known) if known else 1.0
+    shards = [[] for i in range(nshards)]
+    totals = [0.0 for i in range(nshards)]
+    for name in names:
+        ipos = totals.index(min(totals))
+        shards[ipos].append(name)
+        totals[ipos] += durations.get(name, default)
+    return shards, totals
+
+
+def select_models(suite, names):
+    """
+    Order the models in a test suite from longest to shortest and select
+    the models in the current shard
+
+    Parameters
+    ----------
+    suite : str
+        name of the test suite
+    names : list
+        list of model names
+
+    Returns
+    -------
+    names : list
+        list of model names to run, longest first
+
+    """
+    durations = get_durations(suite)
+    shard = get_shard()
+    if shard is None:
+        return order_by_duration(names, durations)
+
+    ishard, nshards = shard
+    shards, totals = pack_shards(names, durations, nshards)
+    print(
+        "running shard {} of {} of {} ".format(ishard, nshards, suite)
+        + "({} of {} models, ".format(len(shards[ishard - 1]), len(names))
+        + "estimated time {:.1f} seconds)".format(totals[ishard - 1])
+    )
+    return shards[ishard - 1]
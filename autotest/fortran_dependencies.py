@@ -0,0 +1,284 @@
+# dependency graph for the MODFLOW 6 Fortran source files
+#
+# The modules defined and used by each source file are determined from the
+# module, use, and include statements in the file. Free-form source lines
+# are joined using get_full_lines() in doc/mf6io/mf6ivar/fortran_parser.py
+# so continued use statements are parsed correctly. The graph is used to
+# find the source files affected by a change and the order that the source
+# files need to be compiled.
+
+import os
+import re
+import sys
+
+pth = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    "..",
+    "doc",
+    "mf6io",
+    "mf6ivar",
+)
+if pth not in sys.path:
+    sys.path.append(pth)
+from fortran_parser import get_full_lines
+
+source_extensions = (".f90", ".F90", ".f", ".F", ".fpp")
+fixed_form_extensions = (".f", ".F")
+
+re_module = re.compile(r"^module\s+(\w+)\s*$", re.IGNORECASE)
+re_use = re.compile(
+    r"^use\s*(?:,\s*(?:non_)?intrinsic\s*::\s*|::\s*|\s)(\w+)", re.IGNORECASE
+)
+re_intrinsic = re.compile(r"^use\s*,\s*intrinsic", re.IGNORECASE)
+re_include = re.compile(r"""^#?include\s+["'<]([^"'>]+)["'>]""", re.IGNORECASE)
+re_program = re.compile(r"^program\s+(\w+)", re.IGNORECASE)
+
+
+def get_source_files(srcdirs, extensions=source_extensions):
+    """
+    Get the Fortran source files in one or more directories
+
+    Parameters
+    ----------
+    srcdirs : str or list
+        source directories that are searched recursively
+    extensions : tuple
+        source file extensions
+
+    Returns
+    -------
+    files : list
+        list of source file paths sorted by source directory. Modules
+        defined in more than one source directory are assigned to the
+        file in the last directory by DependencyGraph.
+
+    """
+    if isinstance(srcdirs, str):
+        srcdirs = [srcdirs]
+    files = []
+    for srcdir in srcdirs:
+        dirfiles = []
+        for root, dirs, names in os.walk(srcdir):
+            for name in names:
+                if name.endswith(extensions):
+                    fpth = os.path.normpath(os.path.join(root, name))
+                    dirfiles.append(fpth)
+        files += sorted(dirfiles)
+    return files
+
+
+def _get_fixed_form_lines(fpth):
+    """Get the non-comment lines in a fixed-form source file"""
+    lines = []
+    with open(fpth, "r", errors="replace") as f:
+        for line in f:
+            if len(line) < 1 or line[0] in "cC*!":
+                continue
+            line = line.split("!")[0].strip()
+            if len(line) > 0:
+                lines.append(line)
+    return lines
+
+
+def parse_source(fpth):
+    """
+    Parse the module, use, include, and program statements in a source file
+
+    Parameters
+    ----------
+    fpth : str
+        path to the source file
+
+    Returns
+    -------
+    info : dict
+        dictionary with the lower case names of the modules defined
+        ("modules") and used ("uses") in the file, the files included in
+        the file ("includes"), and the name of the program in the file
+        ("program", None if the file does not contain a program)
+
+    """
+    if fpth.endswith(fixed_form_extensions):
+        lines = _get_fixed_form_lines(fpth)
+    else:
+        try:
+            lines = get_full_lines(fpth)
+        except UnicodeDecodeError:
+            lines = _get_fixed_form_lines(fpth)
+
+    modules = []
+    uses = []
+    includes = []
+    program = None
+    for line in lines:
+        m = re_module.match(line)
+        if m is not None:
+            name = m.group(1).lower()
+            if name != "procedure" and name not in modules:
+                modules.append(name)
+            continue
+        m = re_use.match(line)
+        if m is not None:
+            if re_intrinsic.match(line) is None:
+                name = m.group(1).lower()
+                if name not in uses:
+                    uses.append(name)
+            continue
+        m = re_include.match(line)
+        if m is not None:
+            includes.append(m.group(1))
+            continue
+        m = re_program.match(line)
+        if m is not None:
+            program = m.group(1).lower()
+
+    # modules used in the file that are defined in the file
+    uses = [name for name in uses if name not in modules]
+    return {
+        "modules": modules,
+        "uses": uses,
+        "includes": includes,
+        "program": program,
+    }
+
+
+class DependencyGraph(object):
+    """
+    Dependency graph for a set of Fortran source files
+
+    Parameters
+    ----------
+    srcdirs : str or list
+        source directories that are searched recursively
+    files : list
+        list of source files. If files is None, the source files in
+        srcdirs are used. (default is None)
+
+    Attributes
+    ----------
+    files : list
+        list of source files
+    info : dict
+        dictionary of source files and parse_source() results
+    module_files : dict
+        dictionary of lower case module names and the file that defines
+        the module
+    dependencies : dict
+        dictionary of source files and the set of source files that
+        define the modules used or the files included by each file
+    dependents : dict
+        dictionary of source files and the set of source files that use a
+        module defined or include the file
+
+    """
+
+    def __init__(self, srcdirs=None, files=None):
+        if files is None:
+            files = get_source_files(srcdirs)
+        self.files = [os.path.normpath(fpth) for fpth in files]
+        self.info = {fpth: parse_source(fpth) for fpth in self.files}
+
+        self.module_files = {}
+        for fpth, info in self.info.items():
+            for name in info["modules"]:
+                self.module_files[name] = fpth
+
+        self.dependencies = {fpth: set() for fpth in self.files}
+        self.dependents = {fpth: set() for fpth in self.files}
+        for fpth, info in self.info.items():
+            for name in info["uses"]:
+                dep = self.module_files.get(name)
+                if dep is not None:
+                    self._add(fpth, dep)
+            for include in info["includes"]:
+                dep = os.path.normpath(
+                    os.path.join(os.path.dirname(fpth), include)
+                )
+                if not os.path.isfile(dep):
+                    continue
+                if dep not in self.dependents:
+                    self.dependents[dep] = set()
+                    self.dependencies[dep] = set()
+                self._add(fpth, dep)
+
+    def _add(self, fpth, dep):
+        self.dependencies[fpth].add(dep)
+        self.dependents[dep].add(fpth)
+
+    def get_dependents(self, files, stop=None):
+        """
+        Get the source files that depend directly or indirectly on files
+
+        Parameters
+        ----------
+        files : list
+            list of source files
+        stop : function
+            function that returns True for source files where the search
+            should stop, including files. The dependents of these files are
+            not added. (default is None)
+
+        Returns
+        -------
+        dependents : set
+            set of source files including files
+
+        """
+        files = [os.path.normpath(fpth) for fpth in files]
+        found = set(files)
+        stack = [fpth for fpth in files if stop is None or not stop(fpth)]
+        while stack:
+            fpth = stack.pop()
+            for dep in self.dependents.get(fpth, ()):
+                if dep in found:
+                    continue
+                found.add(dep)
+                if stop is None or not stop(dep):
+                    stack.append(dep)
+        return found
+
+    def get_compile_order(self, files=None):
+        """
+        Get the order the source files need to be compiled so the module
+        files used by each source file are created first
+
+        Parameters
+        ----------
+        files : list
+            subset of the source files to order. If files is None, all of
+            the source files are ordered. (default is None)
+
+        Returns
+        -------
+        order : list
+            list of source files
+
+        """
+        if files is None:
+            files = self.files
+        files = [os.path.normpath(fpth) for fpth in files]
+        selected = set(files)
+        order = []
+        state = {}
+        for fpth in files:
+            if fpth in state:
+                continue
+            stack = [(fpth, iter(sorted(self.dependencies[fpth])))]
+            state[fpth] = 1
+            while stack:
+                node, deps = stack[-1]
+                for dep in deps:
+                    if dep not in selected or state.get(dep) == 2:
+                        continue
+                    if state.get(dep) == 1:
+                        msg = "circular module dependency between "
+                        msg += "{} and {}".format(node, dep)
+                        raise Exception(msg)
+                    state[dep] = 1
+                    stack.append((dep, iter(sorted(self.dependencies[dep]))))
+                    break
+                else:
+                    stack.pop()
+                    state[node] = 2
+                    order.append(node)
+        return order
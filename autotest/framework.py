@@ -21,6 +21,93 @@ def running_on_CI():
     return "TRAVIS" in os.environ or "CI" in os.environ
 
 
+def get_cache_dir(*subdirs):
+    """
+    Get the path to a persistent autotest cache directory. The cache is
+    stored in the directory defined by the MF6_AUTOTEST_CACHE environmental
+    variable or in ~/.cache/modflow6-autotest if it is not defined.
+
+    Parameters
+    ----------
+    subdirs : str
+        optional sub-directories of the cache directory
+
+    Returns
+    -------
+    pth : str
+        path to the cache directory, which is created if it does not exist
+    """
+    pth = os.environ.get("MF6_AUTOTEST_CACHE")
+    if pth is None:
+        pth = os.path.join(
+            os.path.expanduser("~"), ".cache", "modflow6-autotest"
+        )
+    pth = os.path.join(pth, *subdirs)
+    os.makedirs(pth, exist_ok=True)
+    return pth
+
+
+def get_worker_id():
+    """
+    Get the id of the pytest-xdist worker running the tests
+
+    Returns
+    -------
+    worker_id : str
+        pytest-xdist worker id (for example, "gw0") or None if the tests are
+        not being run by a pytest-xdist worker
+    """
+    return os.environ.get("PYTEST_XDIST_WORKER")
+
+
+def get_temp_dir(*subdirs):
+    """
+    Get the path to a test workspace in the temp directory. Each
+    pytest-xdist worker uses a separate temp/<worker_id> directory, so
+    workers can not remove or overwrite the files used by other workers.
+
+    Parameters
+    ----------
+    subdirs : str
+        optional sub-directories of the workspace
+
+    Returns
+    -------
+    pth : str
+        relative path to the workspace
+    """
+    pth = "temp"
+    worker_id = get_worker_id()
+    if worker_id is not None:
+        pth = os.path.join(pth, worker_id)
+    return os.path.join(pth, *subdirs)
+
+
+def resolve_temp_path(pth):
+    """
+    Move a path in the temp directory into the workspace of the current
+    pytest-xdist worker. Paths outside of the temp directory and paths that
+    are already in the workspace of the worker are not changed.
+
+    Parameters
+    ----------
+    pth : str
+        path to resolve
+
+    Returns
+    -------
+    pth : str
+        path in the workspace of the current worker
+    """
+    worker_id = get_worker_id()
+    if worker_id is None or os.path.isabs(pth):
+        return pth
+    parts = os.path.normpath(pth).split(os.sep)
+    if parts[0] != "temp" or parts[1:2] == [worker_id]:
+        return pth
+    return get_temp_dir(*parts[1:])
+
+
 class testing_framework(object):
     def __init__(self):
         return
@@ -41,6 +128,7 @@ class testing_framework(object):
         exdir : str
             path to regression model files
         """
+        exdir = resolve_temp_path(exdir)
         base, regression = build_function(idx, exdir)
         base.write_simulation()
         if regression is not None:
@@ -62,6 +150,7 @@ class testing_framework(object):
         exdir : str
             path to regression model files
         """
+        exdir = resolve_temp_path(exdir)
         base, regression = build_function(idx, exdir)
         base.write_simulation()
         if regression is not None:
@@ -0,0 +1,269 @@
+# utility for comparing two MODFLOW 6 binary head or concentration files
+#
+# The files are indexed using binary_file_reader.HeadFile and compared one
+# layer record at a time using views of the memory-mapped files, so the
+# comparison of large models is limited by disk access instead of by
+# python. The maximum absolute difference, root mean square difference, and
+# maximum difference in units in the last place (ULP) are calculated for
+# every time in the files.
+
+import os
+import numpy as np
+
+from binary_file_reader import HeadFile
+
+
+def _ulp_difference(v0, v1):
+    """Calculate the difference between two arrays in units in last place"""
+    spacing = np.spacing(np.maximum(np.abs(v0), np.abs(v1)))
+    return np.abs(v0 - v1) / spacing
+
+
+def compare_heads(
+    fpth0,
+    fpth1,
+    outfile=None,
+    htol=0.001,
+    difftol=False,
+    exfile=None,
+    text="head",
+    precision="auto",
+    verbose=False,
+    fail_fast=False,
+    maxerr=None,
+):
+    """
+    Compare the results in two MODFLOW 6 binary head or concentration files
+
+    Parameters
+    ----------
+    fpth0 : str
+        path to the base binary file
+    fpth1 : str
+        path to the comparison binary file
+    outfile : str
+        comparison output file name. If outfile is None, no comparison
+        output is saved. (default is None)
+    htol : float
+        maximum allowed difference, a value that is not finite in either
+        file always exceeds it (default is 0.001)
+    difftol : bool
+        boolean indicating if the node locations where the absolute
+        difference exceeds htol should be reported instead of the node
+        locations with the maximum difference (default is False)
+    exfile : str
+        path to a file with exclusion array data. Differences will not be
+        evaluated where exclusion array values are greater than zero.
+        (default is None)
+    text : str
+        text identifying the records to compare (default is "head")
+    precision : str
+        precision of the binary files ("single", "double", or "auto").
+        (default is "auto")
+    verbose : bool
+        boolean indicating if the node locations exceeding the criteria
+        should be written to the output file and terminal
+        (default is False)
+    fail_fast : bool
+        boolean indicating if the comparison should stop at the first time
+        that exceeds htol (default is False)
+    maxerr : int
+        maximum number of node locations reported for a time. If maxerr is
+        None, all node locations are reported. (default is None)
+
+    Returns
+    -------
+    success : bool
+        boolean indicating if the differences are less than htol
+
+    """
+    # make sure the file paths exist
+    if not os.path.isfile(fpth0) or not os.path.isfile(fpth1):
+        print("fpth0 or fpth1 is not a file")
+        print("fpth0 isfile: {}".format(os.path.isfile(fpth0)))
+        print("fpth1 isfile: {}".format(os.path.isfile(fpth1)))
+        return False
+
+    # get exclusion data
+    exd = None
+    if exfile is not None:
+        try:
+            exd = np.genfromtxt(exfile).flatten() > 0
+        except:
+            print(
+                "Could not read exclusion file {}".format(
+                    os.path.basename(exfile)
+                )
+            )
+            return False
+
+    hfile0 = _open(fpth0, precision, text)
+    hfile1 = _open(fpth1, precision, text)
+
+    # check the times
+    times0 = hfile0.times
+    times1 = hfile1.times
+    if times0.shape != times1.shape or not np.allclose(times0, times1):
+        msg = "times in two head files are not equal ({},{})".format(
+            fpth0, fpth1
+        )
+        raise ValueError(msg)
+
+    nlay, nrow, ncol = hfile0.shape
+    if hfile1.shape != hfile0.shape:
+        msg = "shape of {} ({}) is not equal to shape of {} ({})".format(
+            fpth0, hfile0.shape, fpth1, hfile1.shape
+        )
+        raise ValueError(msg)
+    if exd is not None:
+        if exd.shape[0] != nlay * nrow * ncol:
+            e = (
+                "shape of exclusion data ({})".format(exd.shape)
+                + "can not be reshaped to the size of the "
+                + "head arrays ({})".format(hfile0.shape)
+            )
+            raise ValueError(e)
+        exd = exd.reshape(hfile0.shape)
+
+    f = None
+    if outfile is not None:
+        f = open(outfile, "w")
+        f.write("Created by head_file_compare.compare_heads\n")
+        f.write(
+            "Performing {} to {} comparison\n".format(
+                text.upper(), text.upper()
+            )
+        )
+        if exfile is not None:
+            f.write("Using exclusion file {}\n".format(exfile))
+        f.write("{} is a binary file.\n".format(fpth0))
+        f.write("{} is a binary file.\n".format(fpth1))
+        f.write(
+            "{:>15s} {:>15s} {:>15s} {:>15s} {:>15s} {:>15s}\n".format(
+                " ", " ", "MAXIMUM", "EXCEEDS", "RMS", "MAXIMUM"
+            )
+            + "{:>15s} {:>15s} {:>15s} {:>15s} {:>15s} {:>15s}\n".format(
+                "STRESS PERIOD",
+                "TIME STEP",
+                "HEAD DIFFERENCE",
+                "CRITERIA",
+                "DIFFERENCE",
+                "ULP DIFFERENCE",
+            )
+            + "{0:>15s} {0:>15s} {0:>15s} {0:>15s} {0:>15s} {0:>15s}\n".format(
+                15 * "-"
+            )
+        )
+
+    kstpkper = hfile0.get_kstpkper()
+    icnt = 0
+    for itime in range(times0.shape[0]):
+        diffmax = 0.0
+        sumsq = 0.0
+        ulpmax = 0.0
+        nodes = []
+        nonfinite_nodes = []
+
+        # compare one layer at a time
+        for k in range(nlay):
+            h0 = hfile0.get_data(idx=itime, mflay=k)
+            h1 = hfile1.get_data(idx=itime, mflay=k)
+            diff = np.abs(h0 - h1)
+            if exd is not None:
+                diff[exd[k]] = 0.0
+            # nodes with a head that is not finite always exceed htol
+            nonfinite = ~np.isfinite(diff)
+            for i, j in np.argwhere(nonfinite):
+                nonfinite_nodes.append((k, i, j, h0[i, j], h1[i, j]))
+            dmax = np.where(nonfinite, 0.0, diff).max()
+            sumsq += np.square(diff).sum()
+            ulp = _ulp_difference(h0, h1)
+            if exd is not None:
+                ulp[exd[k]] = 0.0
+            ulpmax = max(ulpmax, ulp.max())
+            if dmax > diffmax:
+                diffmax = dmax
+                if not difftol:
+                    nodes = []
+            # save the node locations that will be reported
+            if verbose and dmax >= htol:
+                if difftol:
+                    idx = np.argwhere(diff > htol)
+                elif dmax == diffmax:
+                    idx = np.argwhere(diff == diffmax)
+                else:
+                    idx = []
+                for i, j in idx:
+                    nodes.append((k, i, j, h0[i, j], h1[i, j]))
+
+        rms = np.sqrt(sumsq / (nlay * nrow * ncol))
+        if nonfinite_nodes:
+            diffmax = np.nan
+            nodes = nonfinite_nodes + nodes
+        exceeds = not np.isfinite(diffmax) or diffmax >= htol
+        if f is not None:
+            kk = kstpkper[itime]
+            f.write(
+                "{:15d} {:15d} {:15.6g} {:15s} {:15.6g} {:15.6g}\n".format(
+                    kk[1] + 1,
+                    kk[0] + 1,
+                    diffmax,
+                    "*" if exceeds else "",
+                    rms,
+                    ulpmax,
+                )
+            )
+
+        if exceeds:
+            icnt += 1
+            if verbose:
+                ee = (
+                    "Maximum absolute {} difference ".format(text)
+                    + "({}) -- ".format(diffmax)
+                    + "{} tolerance exceeded at ".format(htol)
+                    + "{} node location(s)".format(len(nodes))
+                )
+                if nonfinite_nodes:
+                    ee += (
+                        " -- {} node location(s) with a {} ".format(
+                            len(nonfinite_nodes), text
+                        )
+                        + "that is not finite"
+                    )
+                print(ee + " at time {}".format(times0[itime]))
+                if f is not None:
+                    f.write("{}\n".format(ee))
+                    for jdx, (k, i, j, v0, v1) in enumerate(nodes):
+                        if maxerr is not None and jdx >= maxerr:
+                            break
+                        f.write(
+                            "    {} {} -- ".format(
+                                jdx + 1, (k + 1, i + 1, j + 1)
+                            )
+                            + "h1: {:20} h2: {:20} ".format(v0, v1)
+                            + "diff: {:20}\n".format(v0 - v1)
+                        )
+            if fail_fast:
+                if f is not None:
+                    f.write(
+                        "Comparison stopped at time {}\n".format(times0[itime])
+                    )
+                break
+
+    if f is not None:
+        f.close()
+    hfile0.close()
+    hfile1.close()
+
+    return icnt == 0
+
+
+def _open(fpth, precision, text):
+    """
+    Open a binary file and only use records matching text if the file
+    contains them
+    """
+    hfile = HeadFile(fpth, precision=precision, text=text)
+    if len(hfile) < 1:
+        hfile = HeadFile(fpth, precision=precision)
+    return hfile
@@ -0,0 +1,421 @@
+# select the autotests affected by a set of changed files
+#
+# Changed Fortran source files are mapped to the MODFLOW 6 package file
+# types (ftypes) they can affect using the module dependency graph in
+# fortran_dependencies.py. The dependents of a changed file are followed
+# until a source file that implements a model, package, exchange, solution,
+# or the time discretization is reached. If a changed file is used by the
+# simulation driver (mf6core.f90) without passing through one of these
+# files, all of the tests are selected.
+#
+# The ftypes are used to select the test_*.py modules that create the
+# packages with flopy and the external test models that include the
+# packages in their name files (corpus_manifest.py). The libmf6 tests are
+# selected by the ftypes they create like the other tests, all of them are
+# only selected for changes to srcbmi and to files that srcbmi uses without
+# passing through a package source file. Changes to utils/zonebudget and
+# utils/mf5to6 select the zonebudget and mf5to6 tests.
+#
+# Usage:
+#   python impact_analysis.py [--base REF] [--files FILE [FILE ...]]
+#                             [--json FPTH]
+#
+# The changed files are determined using git diff against REF (default is
+# HEAD, which selects the tests for the uncommitted changes) unless they
+# are specified with --files.
+
+import os
+import re
+import sys
+import json
+import subprocess
+
+from fortran_dependencies import DependencyGraph
+
+autotest_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.abspath(os.path.join(autotest_dir, ".."))
+dfn_dir = os.path.join(root_dir, "doc", "mf6io", "mf6ivar", "dfn")
+
+# source directories for each program. Program specific directories are
+# listed last so their modules are used when module names are duplicated.
+program_dirs = {
+    "mf6": ("src",),
+    "libmf6": ("src", "srcbmi"),
+    "zbud6": ("src", os.path.join("utils", "zonebudget")),
+    "mf5to6": ("src", os.path.join("utils", "mf5to6")),
+}
+
+# tags used to select tests of programs other than mf6
+program_tags = {
+    "libmf6": "LIBMF6",
+    "zbud6": "ZBUD6",
+    "mf5to6": "MF5TO6",
+}
+
+# source files that are not packages but define name file ftypes
+source_ftypes = {
+    "gwf3.f90": ("GWF6",),
+    "gwt1.f90": ("GWT6",),
+    "GwfGwfExchange.f90": ("GWF6-GWF6",),
+    "GwfGwtExchange.f90": ("GWF6-GWT6",),
+    "tdis.f90": ("TDIS6",),
+    "ims8base.f90": ("IMS6",),
+    "ims8linear.f90": ("IMS6",),
+    "ims8reordering.f90": ("IMS6",),
+    "ims8sparsekit.f90": ("IMS6",),
+}
+
+# harness files that do not affect the test selection
+ignore_autotest = (
+    "impact_analysis.py",
+    "build_mfio_tex.py",
+    "update_flopy.py",
+)
+
+# external test model suites and the corpus used by each suite
+corpus_suites = {
+    "test_z01_testmodels_mf6.py": ("modflow6-testmodels", "mf6"),
+    "test_z03_examples.py": ("modflow6-examples", "examples"),
+    "test_z03_largetests.py": ("modflow6-largetestmodels", None),
+}
+
+re_gwf = re.compile(r"^gwf3(\w+?)8\.f90$")
+re_gwt = re.compile(r"^gwt1(\w+?)1?\.f90$")
+re_flopy = re.compile(r"\bModflow(Gwf|Gwt|Ims|Tdis)(\w*)\s*\(")
+
+
+def get_dfn_ftypes(component):
+    """Get the name file ftypes for a dfn component (gwf, gwt, or exg)"""
+    ftypes = {}
+    for fname in os.listdir(dfn_dir):
+        name, ext = os.path.splitext(fname)
+        if ext != ".dfn" or not name.startswith(component + "-"):
+            continue
+        name = name[len(component) + 1 :]
+        if name not in ("nam",):
+            ftypes[name] = name.upper() + "6"
+    return ftypes
+
+
+gwf_ftypes = get_dfn_ftypes("gwf")
+gwt_ftypes = get_dfn_ftypes("gwt")
+
+
+def get_file_ftypes(fpth):
+    """
+    Get the name file ftypes implemented by a source file
+
+    Returns
+    -------
+    ftypes : tuple
+        ftypes for the source file. An empty tuple is returned if the file
+        does not implement a model, package, exchange, or solution, so the
+        function can be used as the stop function in
+        DependencyGraph.get_dependents().
+
+    """
+    fname = os.path.basename(fpth)
+    if fname in source_ftypes:
+        return source_ftypes[fname]
+    for regex, ftypes in ((re_gwf, gwf_ftypes), (re_gwt, gwt_ftypes)):
+        m = regex.match(fname)
+        if m is not None:
+            name = m.group(1)
+            return tuple(
+                ftypes[key] for key in (name, name + "a") if key in ftypes
+            )
+    return ()
+
+
+def get_changed_files(base="HEAD"):
+    """
+    Get the files changed relative to a git reference
+
+    Parameters
+    ----------
+    base : str
+        git reference. Committed changes on the current branch since the
+        merge base with base and uncommitted changes are included.
+
+    Returns
+    -------
+    files : list
+        paths relative to the root of the repository
+
+    """
+    cmd = ["git", "merge-base", base, "HEAD"]
+    merge_base = subprocess.check_output(cmd, cwd=root_dir).decode().strip()
+    cmd = ["git", "diff", "--name-only", merge_base]
+    buff = subprocess.check_output(cmd, cwd=root_dir).decode()
+    cmd = ["git", "ls-files", "--others", "--exclude-standard"]
+    buff += subprocess.check_output(cmd, cwd=root_dir).decode()
+    files = []
+    for line in buff.splitlines():
+        line = line.strip()
+        if len(line) > 0 and line not in files:
+            files.append(line)
+    return files
+
+
+class ImpactAnalysis(object):
+    """
+    Map changed files to the ftypes and tests they affect
+
+    Parameters
+    ----------
+    files : list
+        changed files relative to the root of the repository
+
+    Attributes
+    ----------
+    all_tests : bool
+        boolean indicating if all of the tests are affected
+    ftypes : set
+        affected name file ftypes and program tags
+    modules : set
+        changed test modules (file names)
+
+    """
+
+    def __init__(self, files):
+        self.files = [os.path.normpath(f) for f in files]
+        self.all_tests = False
+        self.ftypes = set()
+        self.modules = set()
+        self._graphs = {}
+        for fpth in self.files:
+            self._add_file(fpth)
+
+    def _get_graph(self, program):
+        if program not in self._graphs:
+            srcdirs = [
+                os.path.join(root_dir, d) for d in program_dirs[program]
+            ]
+            self._graphs[program] = DependencyGraph(srcdirs)
+        return self._graphs[program]
+
+    def _add_file(self, fpth):
+        parts = fpth.split(os.sep)
+        ext = os.path.splitext(fpth)[1]
+        if parts[0] == "autotest":
+            fname = parts[-1]
+            if len(parts) == 2 and fname.startswith("test_"):
+                self.modules.add(fname)
+            elif len(parts) == 2 and fname.endswith(".py"):
+                if fname not in ignore_autotest:
+                    self.all_tests = True
+            elif parts[1] == "data":
+                self.all_tests = True
+        elif parts[0] in ("src", "srcbmi", "utils"):
+            if ext.lower() in (".f90", ".f", ".fpp", ".inc"):
+                self._add_source(os.path.join(root_dir, fpth))
+            elif parts[-1] == "meson.build":
+                self.all_tests = True
+        elif parts[0] in ("meson.build", "meson_options.txt"):
+            self.all_tests = True
+
+    def _add_source(self, fpth):
+        fpth = os.path.normpath(fpth)
+
+        # mf6 - follow the dependents to the package source files
+        graph = self._get_graph("mf6")
+        if fpth in graph.dependents:
+            for dep in graph.get_dependents([fpth], stop=get_file_ftypes):
+                ftypes = get_file_ftypes(dep)
+                if len(ftypes) > 0:
+                    self.ftypes.update(ftypes)
+                elif len(graph.dependents[dep]) < 1:
+                    self.all_tests = True
+
+        # other programs - determine if the program source files depend
+        # on the changed file. srcbmi uses the simulation driver, so the
+        # search for libmf6 stops at the package source files and the
+        # libmf6 tests of a package are selected by its ftypes.
+        for program, tag in program_tags.items():
+            graph = self._get_graph(program)
+            if fpth not in graph.dependents:
+                continue
+            stop = get_file_ftypes if program == "libmf6" else None
+            srcdir = os.path.join(root_dir, program_dirs[program][-1])
+            for dep in graph.get_dependents([fpth], stop=stop):
+                if dep.startswith(srcdir + os.sep):
+                    self.ftypes.add(tag)
+                    break
+
+    def get_module_ftypes(self, fpth):
+        """Get the ftypes and program tags used by a test module"""
+        with open(fpth) as f:
+            text = f.read()
+        ftypes = set()
+        for component, name in re_flopy.findall(text):
+            component = component.lower()
+            name = name.lower()
+            if component in ("ims", "tdis"):
+                ftypes.add(component.upper() + "6")
+            elif name == "":
+                ftypes.add(component.upper() + "6")
+            elif component == "gwf" and name in ("gwf", "gwt"):
+                ftypes.add("GWF6-{}6".format(name.upper()))
+            elif component == "gwf" and name in gwf_ftypes:
+                ftypes.add(gwf_ftypes[name])
+            elif component == "gwt" and name in gwt_ftypes:
+                ftypes.add(gwt_ftypes[name])
+        fname = os.path.basename(fpth)
+        if "libmf6" in fname:
+            ftypes.add("LIBMF6")
+        if "zbud6" in text:
+            ftypes.add("ZBUD6")
+        return ftypes
+
+    def select_modules(self):
+        """
+        Get the test_*.py modules affected by the changed files
+
+        Returns
+        -------
+        modules : list
+            sorted list of test module file names
+
+        """
+        selected = set(self.modules)
+        for fname in os.listdir(autotest_dir):
+            if not fname.startswith("test_") or not fname.endswith(".py"):
+                continue
+            if fname in corpus_suites or fname.startswith("test_z02"):
+                continue
+            if self.all_tests:
+                selected.add(fname)
+                continue
+            if len(self.ftypes) < 1:
+                continue
+            ftypes = self.get_module_ftypes(os.path.join(autotest_dir, fname))
+            # modules that do not create packages with flopy are selected
+            # for any change to mf6
+            if len(ftypes) < 1 or ftypes & self.ftypes:
+                selected.add(fname)
+        return sorted(selected)
+
+    def select_models(self, models):
+        """
+        Get the external test models affected by the changed files
+
+        Parameters
+        ----------
+        models : dict
+            corpus manifest returned by corpus_manifest.load_manifest()
+
+        Returns
+        -------
+        names : list or None
+            sorted list of model names or None if all of the models are
+            affected
+
+        """
+        if self.all_tests:
+            return None
+        return sorted(
+            name
+            for name, entry in models.items()
+            if self.ftypes & set(entry.get("ftypes", ()))
+        )
+
+    def select_suites(self):
+        """
+        Get the external test model suites and the models to run
+
+        Returns
+        -------
+        suites : dict
+            dictionary of suite module names and lists of model names. The
+            list of model names is None if all of the models are selected.
+
+        """
+        from common_regression import get_home_dir, get_example_basedir
+        from corpus_manifest import load_manifest
+
+        suites = {}
+        home = None
+        for suite, (find_dir, subdir) in corpus_suites.items():
+            if suite in self.modules:
+                suites[suite] = None
+                continue
+            if not self.all_tests and len(self.ftypes) < 1:
+                continue
+            if home is None:
+                # get_home_dir only works in a modflow6* directory
+                try:
+                    home = get_home_dir()
+                except TypeError:
+                    home = os.path.dirname(root_dir)
+            basedir = get_example_basedir(home, find_dir, subdir=subdir)
+            if basedir is None or not os.path.isdir(basedir):
+                continue
+            names = self.select_models(load_manifest(basedir))
+            if names is None or len(names) > 0:
+                suites[suite] = names
+
+        # mf5to6 test models
+        suite = "test_z02_testmodels_mf5to6.py"
+        if suite in self.modules or self.all_tests or "MF5TO6" in self.ftypes:
+            suites[suite] = None
+        return suites
+
+
+def main():
+    base = "HEAD"
+    files = None
+    json_pth = None
+    for idx, arg in enumerate(sys.argv):
+        if arg.lower() == "--base":
+            if len(sys.argv) > idx + 1:
+                base = sys.argv[idx + 1]
+        elif arg.lower() == "--json":
+            if len(sys.argv) > idx + 1:
+                json_pth = sys.argv[idx + 1]
+        elif arg.lower() == "--files":
+            files = []
+            for value in sys.argv[idx + 1 :]:
+                if value.startswith("--"):
+                    break
+                files.append(value)
+
+    if files is None:
+        files = get_changed_files(base)
+
+    impact = ImpactAnalysis(files)
+    modules = impact.select_modules()
+    suites = impact.select_suites()
+
+    print("changed files:")
+    for fpth in files:
+        print("    {}".format(fpth))
+    if impact.all_tests:
+        print("affected ftypes: all")
+    else:
+        print("affected ftypes: {}".format(" ".join(sorted(impact.ftypes))))
+    print("selected {} test modules".format(len(modules)))
+    if len(modules) > 0:
+        print("    pytest -n auto {}".format(" ".join(modules)))
+    for suite, names in suites.items():
+        if names is None:
+            print("    python {}".format(suite))
+        else:
+            print("    python {} --sim {}".format(suite, " ".join(names)))
+
+    if json_pth is not None:
+        with open(json_pth, "w") as f:
+            json.dump(
+                {
+                    "files": files,
+                    "all_tests": impact.all_tests,
+                    "ftypes": sorted(impact.ftypes),
+                    "modules": modules,
+                    "suites": suites,
+                },
+                f,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,692 @@
+# parallel incremental build of the MODFLOW 6 targets
+#
+# The Fortran source files of the mf6, libmf6, zbud6, and mf5to6 targets
+# are compiled in the order defined by the module dependency graph in
+# fortran_dependencies.py. Source files whose dependencies have been
+# compiled are compiled at the same time by a pool of workers. Each object
+# file and the module files it creates are stored in a cache directory
+# using a key calculated from the compiler, the compiler flags, the
+# contents of the source file and the files it includes, and the contents
+# of the module files of all of the modules it depends on. An object is
+# only compiled if its key is not in the cache, so
+#
+#   * objects are shared by the targets that compile a source file with
+#     the same flags (for example, mf6 and libmf6),
+#   * only the source files that changed, and the source files that use
+#     a module whose interface changed, are compiled after a change, and
+#   * source files that use a module are not compiled again if a change
+#     does not change the module file (the implementation of a procedure
+#     changed but its interface did not).
+#
+# All of the objects are compiled as position independent code on linux
+# and macOS so the objects can be linked into executables and libmf6.
+# The least recently used cache entries are removed when the size of the
+# cache exceeds MF6_BUILD_CACHE_MAXSIZE megabytes (default is 2048).
+#
+#     python incremental_build.py [mf6] [libmf6] [zbud6] [mf5to6]
+#         [-fc gfortran] [-j N] [--debug] [--appdir PATH]
+
+import os
+import sys
+import gzip
+import json
+import time
+import shutil
+import hashlib
+import tempfile
+import subprocess
+import concurrent.futures
+
+from framework import get_cache_dir
+from fortran_dependencies import DependencyGraph, get_source_files
+
+cache_name = "fortran_objects"
+manifest_name = "manifest.json"
+default_maxsize = 2048
+
+root_dir = os.path.normpath(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+)
+
+osname = sys.platform.lower()
+if osname.startswith("linux"):
+    osname = "linux"
+eext = ""
+soext = ".so"
+if osname == "win32":
+    eext = ".exe"
+    soext = ".dll"
+
+# some flags to check for errors in the code
+strict_flags = [
+    "-Wtabs",
+    "-Wline-truncation",
+    "-Wunused-label",
+    "-Wunused-variable",
+    "-pedantic",
+    "-std=f2008",
+    "-Wcharacter-truncation",
+]
+
+
+def _read_extrafiles(fpth):
+    """Read the paths in a pymake extrafiles.txt file"""
+    files = []
+    with open(fpth) as f:
+        for line in f:
+            line = line.strip()
+            if len(line) > 0 and not line.startswith("#"):
+                files.append(
+                    os.path.normpath(os.path.join(os.path.dirname(fpth), line))
+                )
+    return files
+
+
+def get_targets():
+    """
+    Get the definitions of the targets
+
+    Returns
+    -------
+    targets : dict
+        dictionary of target names and dictionaries with the name of the
+        target file, the source files, if the target is a shared library,
+        and if the strict compiler flags are used
+
+    """
+    src = os.path.join(root_dir, "src")
+    srcbmi = os.path.join(root_dir, "srcbmi")
+    zbud6 = os.path.join(root_dir, "utils", "zonebudget")
+    mf5to6 = os.path.join(root_dir, "utils", "mf5to6")
+    mf6_main = os.path.normpath(os.path.join(src, "mf6.f90"))
+    return {
+        "mf6": {
+            "target": "mf6" + eext,
+            "files": get_source_files([src]),
+            "shared": False,
+            "strict": True,
+        },
+        "libmf6": {
+            "target": "libmf6" + soext,
+            "files": [
+                fpth
+                for fpth in get_source_files([srcbmi, src])
+                if fpth != mf6_main
+            ],
+            "shared": True,
+            "strict": True,
+        },
+        "zbud6": {
+            "target": "zbud6" + eext,
+            "files": get_source_files([os.path.join(zbud6, "src")])
+            + _read_extrafiles(
+                os.path.join(zbud6, "pymake", "extrafiles.txt")
+            ),
+            "shared": False,
+            "strict": True,
+        },
+        "mf5to6": {
+            "target": "mf5to6" + eext,
+            "files": get_source_files([os.path.join(mf5to6, "src")])
+            + _read_extrafiles(
+                os.path.join(mf5to6, "pymake", "extrafiles.txt")
+            ),
+            "shared": False,
+            "strict": False,
+        },
+    }
+
+
+def get_compiler_version(fc):
+    """Get the first line of the compiler version string"""
+    try:
+        proc = subprocess.run(
+            [fc, "--version"],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+        )
+    except OSError:
+        raise Exception("Fortran compiler {} is not available".format(fc))
+    lines = proc.stdout.decode("utf-8", errors="replace").splitlines()
+    if len(lines) < 1:
+        return fc
+    return lines[0].strip()
+
+
+def get_fortran_flags(fc, strict=False, debug=False, fflags=None):
+    """
+    Get the Fortran compiler flags. The flags are the same as the flags
+    used by pymake except all objects are compiled as position independent
+    code on linux and macOS.
+    """
+    fc_name = os.path.splitext(os.path.basename(fc))[0]
+    flags = []
+    if fc_name == "gfortran":
+        flags.append("-O0" if debug else "-O2")
+        if osname != "win32":
+            flags.append("-fPIC")
+        else:
+            flags.append("-static")
+        flags.append("-fbacktrace")
+        if debug:
+            flags += ["-g", "-fcheck=all", "-fbounds-check", "-Wall"]
+            flags.append("-ffpe-trap=overflow,zero,invalid,denormal")
+        else:
+            flags.append("-ffpe-summary=overflow")
+            flags.append("-ffpe-trap=overflow,zero,invalid")
+        os_macro = {
+            "win32": "-D_WIN32",
+            "darwin": "-D__APPLE__",
+            "linux": "-D__linux__",
+        }.get(osname)
+        if os_macro is not None:
+            flags.append(os_macro)
+        if strict:
+            flags += strict_flags
+    elif fc_name in ("ifort", "mpiifort"):
+        if osname == "win32":
+            flags += ["/Od" if debug else "/O2"]
+            flags += ["/heap-arrays:0", "/fpe:0", "/traceback", "/nologo"]
+            if debug:
+                flags += ["/debug:full", "/Zi"]
+        else:
+            flags.append("-O0" if debug else "-O2")
+            flags.append("-fPIC")
+            if debug:
+                flags.append("-g")
+            flags += ["-no-heap-arrays", "-fpe0", "-traceback"]
+    else:
+        flags.append("-O0" if debug else "-O2")
+    if fflags is not None:
+        flags += list(fflags)
+    return flags
+
+
+def get_linker_flags(fc, shared=False):
+    """Get the linker flags for an executable or a shared library"""
+    fc_name = os.path.splitext(os.path.basename(fc))[0]
+    flags = []
+    if shared:
+        if osname == "darwin":
+            flags.append("-dynamiclib")
+        elif osname == "win32" and fc_name in ("ifort", "mpiifort"):
+            flags.append("/dll")
+        else:
+            flags.append("-shared")
+        if fc_name in ("ifort", "mpiifort") and osname != "win32":
+            flags.append("-static-intel")
+    elif osname == "win32" and fc_name == "gfortran":
+        flags += ["-static", "-static-libgfortran", "-static-libgcc", "-lm"]
+    return flags
+
+
+def _digest_file(fpth):
+    """
+    Calculate the sha256 digest of a file. Compressed (gfortran) module
+    files are decompressed so the digest does not depend on the gzip
+    header.
+    """
+    with open(fpth, "rb") as f:
+        data = f.read()
+    if data[:2] == b"\x1f\x8b":
+        try:
+            data = gzip.decompress(data)
+        except (OSError, EOFError):
+            pass
+    return hashlib.sha256(data).hexdigest()
+
+
+def get_maxsize():
+    """Get the maximum size of the object cache in bytes"""
+    maxsize = os.environ.get("MF6_BUILD_CACHE_MAXSIZE")
+    if maxsize is None:
+        maxsize = default_maxsize
+    return int(float(maxsize) * 1024 * 1024)
+
+
+def evict(cache_dir, maxsize=None):
+    """Remove the least recently used entries in the object cache"""
+    if maxsize is None:
+        maxsize = get_maxsize()
+    entries = []
+    total = 0
+    for key in os.listdir(cache_dir):
+        fpth = os.path.join(cache_dir, key, manifest_name)
+        try:
+            with open(fpth) as f:
+                size = json.load(f)["size"]
+            entries.append((os.path.getmtime(fpth), size, key))
+        except (OSError, ValueError, KeyError):
+            continue
+        total += size
+    for mtime, size, key in sorted(entries):
+        if total <= maxsize:
+            break
+        shutil.rmtree(os.path.join(cache_dir, key), ignore_errors=True)
+        total -= size
+
+
+class Builder(object):
+    """
+    Parallel incremental builder for one or more targets
+
+    Parameters
+    ----------
+    fc : str
+        Fortran compiler (default is the FC environmental variable or
+        gfortran)
+    debug : bool
+        build debug versions of the targets (default is False)
+    fflags : list
+        additional compiler flags (default is None)
+    nworkers : int
+        number of source files compiled at the same time. If nworkers is
+        None, the number of cpus is used. (default is None)
+    build_dir : str
+        directory with the module files of each target (default is
+        temp/build in the autotest directory)
+    verbose : bool
+        print the source files that are compiled (default is True)
+    ldflags : list
+        additional linker flags (default is None)
+    profile_dir : str
+        directory with the profile data files of a profile guided
+        optimization build (default is None). gfortran names the profile
+        data file of an object after the path of the object, so objects
+        are compiled in a fixed directory in build_dir instead of a
+        temporary directory in the cache when profile_dir is defined. The
+        profile data file of each object is included in its cache key if
+        the objects are compiled with -fprofile-use.
+
+    Attributes
+    ----------
+    compiled : int
+        number of source files compiled by the last call to build()
+    cached : int
+        number of source files reused from the cache by the last call to
+        build()
+
+    """
+
+    def __init__(
+        self,
+        fc=None,
+        debug=False,
+        fflags=None,
+        nworkers=None,
+        build_dir=None,
+        verbose=True,
+        ldflags=None,
+        profile_dir=None,
+    ):
+        if fc is None:
+            fc = os.environ.get("FC", "gfortran")
+        self.fc = fc
+        self.debug = debug
+        self.fflags = fflags
+        if nworkers is None:
+            nworkers = os.cpu_count() or 1
+        self.nworkers = max(1, nworkers)
+        if build_dir is None:
+            build_dir = os.path.join(
+                os.path.dirname(os.path.abspath(__file__)), "temp", "build"
+            )
+        self.build_dir = build_dir
+        self.verbose = verbose
+        self.ldflags = ldflags
+        if profile_dir is not None:
+            profile_dir = os.path.abspath(profile_dir)
+        self.profile_dir = profile_dir
+        self.compiler_version = get_compiler_version(fc)
+        self.cache_dir = get_cache_dir(cache_name)
+        self.compiled = 0
+        self.cached = 0
+        # keys of the source files compiled in this session
+        self._keys = {}
+
+    def _get_key(self, fpth, flags, graph, mod_digests):
+        """
+        Calculate the cache key of a source file from the compiler, flags,
+        source file, included files, and the module files of the modules
+        the source file depends on
+        """
+        h = hashlib.sha256()
+        h.update(self.compiler_version.encode())
+        h.update(" ".join(flags).encode())
+        h.update(os.path.basename(fpth).encode())
+        h.update(_digest_file(fpth).encode())
+        deps = set()
+        stack = list(graph.dependencies.get(fpth, ()))
+        while stack:
+            dep = stack.pop()
+            if dep in deps:
+                continue
+            deps.add(dep)
+            stack += list(graph.dependencies.get(dep, ()))
+        for dep in sorted(deps):
+            if dep in graph.info:
+                for name in graph.info[dep]["modules"]:
+                    h.update(name.encode())
+                    h.update(mod_digests.get(name, "").encode())
+            else:
+                # included file
+                h.update(_digest_file(dep).encode())
+        # only the objects compiled with the profile data depend on it, the
+        # instrumented objects do not
+        if any(flag.startswith("-fprofile-use") for flag in flags):
+            fpth = self._get_profile_path(fpth)
+            if fpth is not None and os.path.isfile(fpth):
+                h.update(_digest_file(fpth).encode())
+        return h.hexdigest()
+
+    def _get_stage_dir(self, fpth):
+        """
+        Get the fixed directory a source file is compiled in for a profile
+        guided optimization build
+        """
+        rel = os.path.relpath(os.path.splitext(fpth)[0], root_dir)
+        rel = rel.replace("..", "__")
+        return os.path.abspath(os.path.join(self.build_dir, "objects", rel))
+
+    def _get_profile_path(self, fpth):
+        """
+        Get the path of the profile data file of a source file (None if
+        profile_dir is not defined). gfortran writes the profile data file
+        of an object with an absolute path to the object path, without the
+        extension, in profile_dir.
+        """
+        if self.profile_dir is None:
+            return None
+        obj = os.path.join(self._get_stage_dir(fpth), os.path.basename(fpth))
+        name = os.path.splitdrive(os.path.splitext(obj)[0])[1]
+        return os.path.join(self.profile_dir, name.lstrip(os.sep) + ".gcda")
+
+    def _compile(self, fpth, key, flags, mod_dir):
+        """
+        Compile a source file or restore the object and module files from
+        the cache
+
+        Returns
+        -------
+        obj : str
+            path to the object file in the cache
+        digests : dict
+            dictionary of module names and module file digests
+        cached : bool
+            boolean indicating if the files were restored from the cache
+
+        """
+        entry = os.path.join(self.cache_dir, key)
+        manifest = os.path.join(entry, manifest_name)
+        if os.path.isfile(manifest):
+            with open(manifest) as f:
+                data = json.load(f)
+            for name in data["modules"]:
+                src = os.path.join(entry, name + ".mod")
+                shutil.copy2(src, os.path.join(mod_dir, name + ".mod"))
+            # update the modification time used for lru eviction
+            os.utime(manifest)
+            return os.path.join(entry, data["object"]), data["digests"], True
+
+        if self.verbose:
+            print("compiling {}".format(os.path.relpath(fpth, root_dir)))
+        if self.profile_dir is None:
+            tmp = tempfile.mkdtemp(
+                prefix=".{}.".format(key[:12]), dir=self.cache_dir
+            )
+        else:
+            tmp = self._get_stage_dir(fpth)
+            shutil.rmtree(tmp, ignore_errors=True)
+            os.makedirs(tmp)
+        obj_name = os.path.splitext(os.path.basename(fpth))[0] + ".o"
+        cmd = (
+            [self.fc, "-c", fpth, "-o", os.path.join(tmp, obj_name)]
+            + flags
+            + self._get_module_flags(tmp, mod_dir)
+        )
+        proc = subprocess.run(
+            cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT
+        )
+        if proc.returncode != 0:
+            shutil.rmtree(tmp, ignore_errors=True)
+            msg = "could not compile {}\n{}\n{}".format(
+                fpth,
+                " ".join(cmd),
+                proc.stdout.decode("utf-8", errors="replace"),
+            )
+            raise Exception(msg)
+
+        # compilers may write module names in upper or lower case
+        digests = {}
+        size = os.path.getsize(os.path.join(tmp, obj_name))
+        for fname in os.listdir(tmp):
+            name, ext = os.path.splitext(fname)
+            if ext.lower() != ".mod":
+                continue
+            if fname != name.lower() + ".mod":
+                os.rename(
+                    os.path.join(tmp, fname),
+                    os.path.join(tmp, name.lower() + ".mod"),
+                )
+            name = name.lower()
+            src = os.path.join(tmp, name + ".mod")
+            digests[name] = _digest_file(src)
+            size += os.path.getsize(src)
+            shutil.copy2(src, os.path.join(mod_dir, name + ".mod"))
+        if self.profile_dir is not None:
+            # move the object and module files to a temporary directory in
+            # the cache
+            stage = tmp
+            tmp = tempfile.mkdtemp(
+                prefix=".{}.".format(key[:12]), dir=self.cache_dir
+            )
+            for fname in os.listdir(stage):
+                shutil.move(os.path.join(stage, fname), tmp)
+        with open(os.path.join(tmp, manifest_name), "w") as f:
+            json.dump(
+                {
+                    "source": fpth,
+                    "object": obj_name,
+                    "modules": sorted(digests),
+                    "digests": digests,
+                    "size": size,
+                    "created": time.time(),
+                },
+                f,
+            )
+
+        # rename is atomic so concurrent builds never see a partial entry
+        try:
+            os.rename(tmp, entry)
+        except OSError:
+            shutil.rmtree(tmp, ignore_errors=True)
+        return os.path.join(entry, obj_name), digests, False
+
+    def _get_module_flags(self, out_dir, mod_dir):
+        """Get the flags for the module output and search directories"""
+        fc_name = os.path.splitext(os.path.basename(self.fc))[0]
+        if fc_name in ("ifort", "mpiifort"):
+            if osname == "win32":
+                return ["/module:{}".format(out_dir), "/I{}".format(mod_dir)]
+            return ["-module", out_dir, "-I{}".format(mod_dir)]
+        return ["-J{}".format(out_dir), "-I{}".format(mod_dir)]
+
+    def compile_target(self, name, definition):
+        """
+        Compile the source files of a target
+
+        Returns
+        -------
+        objects : list
+            list of object files in link order
+
+        """
+        flags = get_fortran_flags(
+            self.fc,
+            strict=definition["strict"],
+            debug=self.debug,
+            fflags=self.fflags,
+        )
+        graph = DependencyGraph(files=definition["files"])
+        order = graph.get_compile_order()
+        mod_dir = os.path.join(self.build_dir, name, "mod")
+        os.makedirs(mod_dir, exist_ok=True)
+
+        # dependencies of each source file that have not been compiled
+        pending = {
+            fpth: set(d for d in graph.dependencies[fpth] if d in graph.info)
+            for fpth in order
+        }
+        ready = [fpth for fpth in order if len(pending[fpth]) < 1]
+        objects = {}
+        mod_digests = {}
+        futures = {}
+        with concurrent.futures.ThreadPoolExecutor(self.nworkers) as pool:
+            while len(objects) < len(order):
+                # submit the source files with compiled dependencies
+                for fpth in ready:
+                    key = self._get_key(fpth, flags, graph, mod_digests)
+                    future = pool.submit(
+                        self._compile, fpth, key, flags, mod_dir
+                    )
+                    futures[future] = fpth
+                ready = []
+                if len(futures) < 1:
+                    raise Exception(
+                        "could not order the source files of {}".format(name)
+                    )
+                done, _ = concurrent.futures.wait(
+                    futures, return_when=concurrent.futures.FIRST_COMPLETED
+                )
+                for future in done:
+                    fpth = futures.pop(future)
+                    try:
+                        obj, digests, cached = future.result()
+                    except Exception:
+                        for f in futures:
+                            f.cancel()
+                        raise
+                    # the counters are only updated in this thread
+                    if cached:
+                        self.cached += 1
+                    else:
+                        self.compiled += 1
+                    objects[fpth] = obj
+                    mod_digests.update(digests)
+                    for dep in graph.dependents.get(fpth, ()):
+                        if dep in pending and fpth in pending[dep]:
+                            pending[dep].discard(fpth)
+                            if len(pending[dep]) < 1:
+                                ready.append(dep)
+        return [objects[fpth] for fpth in order]
+
+    def link_target(self, name, definition, objects, appdir):
+        """
+        Link the objects of a target. The target is not linked if it
+        exists and was linked from the same objects.
+        """
+        target = os.path.join(appdir, definition["target"])
+        cmd = (
+            [self.fc, "-o", target]
+            + objects
+            + get_linker_flags(self.fc, shared=definition["shared"])
+        )
+        if self.ldflags is not None:
+            cmd += list(self.ldflags)
+        h = hashlib.sha256()
+        for item in cmd:
+            h.update(item.encode())
+        key = h.hexdigest()
+        stamp = os.path.join(self.build_dir, name, "link.json")
+        if os.path.isfile(target) and os.path.isfile(stamp):
+            with open(stamp) as f:
+                if json.load(f).get("key") == key:
+                    print("{} is up to date".format(target))
+                    return target
+        os.makedirs(appdir, exist_ok=True)
+        print("linking {}".format(target))
+        proc = subprocess.run(
+            cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT
+        )
+        if proc.returncode != 0:
+            msg = "could not link {}\n{}".format(
+                target, proc.stdout.decode("utf-8", errors="replace")
+            )
+            raise Exception(msg)
+        with open(stamp, "w") as f:
+            json.dump({"key": key}, f)
+        return target
+
+    def build(self, names=None, appdir=None):
+        """
+        Build one or more targets
+
+        Parameters
+        ----------
+        names : list
+            names of the targets (mf6, libmf6, zbud6, and mf5to6). If names
+            is None, all of the targets are built. (default is None)
+        appdir : str
+            directory the targets are written to (default is bin in the
+            root of the repository)
+
+        Returns
+        -------
+        targets : list
+            list of paths to the targets
+
+        """
+        definitions = get_targets()
+        if names is None:
+            names = list(definitions.keys())
+        if appdir is None:
+            appdir = os.path.join(root_dir, "bin")
+        # the counts of the summary are for this build only
+        self.compiled = 0
+        self.cached = 0
+        t0 = time.perf_counter()
+        paths = []
+        for name in names:
+            if name not in definitions:
+                raise Exception("unknown target {}".format(name))
+            objects = self.compile_target(name, definitions[name])
+            paths.append(
+                self.link_target(name, definitions[name], objects, appdir)
+            )
+        print(
+            "compiled {} and reused {} source files in {:.1f} seconds".format(
+                self.compiled, self.cached, time.perf_counter() - t0
+            )
+        )
+        evict(self.cache_dir)
+        return paths
+
+
+def main():
+    names = []
+    fc = None
+    nworkers = None
+    appdir = None
+    debug = False
+    for idx, arg in enumerate(sys.argv[1:], start=1):
+        if arg == "-fc":
+            fc = sys.argv[idx + 1]
+        elif arg in ("-j", "--jobs"):
+            nworkers = int(sys.argv[idx + 1])
+        elif arg == "--appdir":
+            appdir = sys.argv[idx + 1]
+        elif arg == "--debug":
+            debug = True
+        elif not arg.startswith("-") and sys.argv[idx - 1] not in (
+            "-fc",
+            "-j",
+            "--jobs",
+            "--appdir",
+        ):
+            names.append(arg)
+    builder = Builder(fc=fc, debug=debug, nworkers=nworkers)
+    builder.build(names=names if names else None, appdir=appdir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,491 @@
+# streaming readers for MODFLOW 6 simulation and model listing files
+#
+# The readers are generators that read a listing file one line at a time and
+# yield a dictionary for each record as soon as it is complete, so listing
+# files of any size can be processed in bounded memory. Every record has a
+# "type" key that identifies the record.
+#
+# Records in the simulation listing file (mfsim.lst):
+#
+#     timestep        outer and inner iterations used by a solution in a
+#                     time step that converged. Written if the solution
+#                     PRINT_OPTION is SUMMARY or ALL.
+#     nonconvergence  solution or solution group that did not converge
+#     ats_step        time step length set by the ATS package
+#     ats_preferred   time step length submitted by a solution or package
+#     ats_retry       failed time step that is retried with a smaller step
+#     solution_timer  total formulate and solution times (DEV_MODE only)
+#     memory          total memory allocated by the memory manager
+#     run_time        start and end date and time and the elapsed run time
+#     convergence_failures  number of convergence failures in the simulation
+#     termination     normal termination of the simulation
+#
+# Records in a model listing file:
+#
+#     budget          volume or mass budget for the entire model
+#     time_summary    time step length, stress period time, and total time
+
+import os
+import re
+import sys
+import json
+
+re_solving = re.compile(
+    r"Solving:\s+Stress period:\s+(\d+)\s+Time step:\s+(\d+)"
+)
+re_outer_summary = re.compile(r"^\s*(\S+) OUTER ITERATION SUMMARY")
+re_calls = re.compile(
+    r"^\s*(\d+) CALLS TO NUMERICAL SOLUTION IN TIME STEP (\d+) "
+    r"STRESS PERIOD (\d+)"
+)
+re_total_iterations = re.compile(r"^\s*(\d+) TOTAL ITERATIONS")
+re_nocnvg = re.compile(
+    r"^\s*Solution( Group)? (\d+) did not converge for stress period "
+    r"(\d+) and time step (\d+)"
+)
+re_ats_step = re.compile(
+    r"ATS: time step set to\s+(\S+)\s+for step (\d+) and period (\d+)"
+)
+re_ats_preferred = re.compile(
+    r"ATS: (.+?) submitted a preferred time step size of\s+(\S+)"
+)
+re_ats_retry = re.compile(
+    r"Failed solution for step (\d+) and period (\d+) will be retried "
+    r"using time step of\s+(\S+)"
+)
+re_solution_timer = re.compile(r"^\s*Solution (\S+) summary")
+re_timer = re.compile(r"^\s*Total (formulate|solution) time:\s+(\S+)")
+re_memory = re.compile(r"MEMORY MANAGER TOTAL STORAGE BY DATA TYPE, IN (\w+)")
+re_run_date = re.compile(r"^\s*Run (start|end) date and time.*:\s+(.+?)\s*$")
+re_elapsed = re.compile(r"^\s*Elapsed run time:\s+(.+?)\s*$")
+re_failures = re.compile(r"Simulation convergence failure occurred (\d+) time")
+re_budget = re.compile(
+    r"^\s*(.+?) BUDGET FOR ENTIRE MODEL AT END OF TIME STEP\s+(\d+), "
+    r"STRESS PERIOD\s+(\d+)"
+)
+re_budget_term = re.compile(
+    r"^\s*(.+?)\s*=\s*(\S+)\s+(.+?)\s*=\s*(\S+)\s*(\S*)\s*$"
+)
+re_time_summary = re.compile(
+    r"TIME SUMMARY AT END OF TIME STEP\s+(\d+) IN STRESS PERIOD\s+(\d+)"
+)
+
+memory_units = {
+    "BYTES": 1,
+    "KILOBYTES": 1024,
+    "MEGABYTES": 1024**2,
+    "GIGABYTES": 1024**3,
+}
+
+time_units = {
+    "SECONDS": 1.0,
+    "MINUTES": 60.0,
+    "HOURS": 3600.0,
+}
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except ValueError:
+        # values that overflow the output format (for example, ********)
+        return float("nan")
+
+
+def elapsed_to_seconds(elapsed):
+    """Convert an elapsed run time string (for example, "1 Minutes,
+    2.5 Seconds") to seconds"""
+    t = elapsed.replace(",", " ").split()
+    seconds = 0.0
+    for idx in range(0, len(t) - 1, 2):
+        seconds += _to_float(t[idx]) * time_units.get(t[idx + 1].upper(), 1.0)
+    return seconds
+
+
+def _open(fpth):
+    return open(fpth, "r", errors="replace")
+
+
+def iter_simulation_records(fpth):
+    """
+    Read the records in a simulation listing file (mfsim.lst)
+
+    Parameters
+    ----------
+    fpth : str
+        path to the simulation listing file
+
+    Yields
+    ------
+    record : dict
+        dictionary with the record type and values. Stress period and time
+        step numbers (kper, kstp) are one-based. Solutions are identified
+        by name (for example, "SLN_1"). Timestep and nonconvergence records
+        include the attempt number of the time step, which is incremented
+        when the ATS package retries a failed time step.
+
+    """
+    kper = kstp = None
+    attempt = 1
+    # outer iteration table of the current solution
+    solution = None
+    outer = inner = 0
+    in_table = False
+    calls = None
+    timer = None
+    memory_factor = None
+    run_time = {}
+
+    with _open(fpth) as f:
+        for line in f:
+            # outer iteration table rows
+            if in_table:
+                label = line[1:26].strip()
+                if label in ("Model", "Package", "Backtracking") or (
+                    label == "Newton under-relaxation"
+                ):
+                    values = line[26:].split()
+                    if len(values) > 0 and values[0].isdigit():
+                        outer = max(outer, int(values[0]))
+                    if label == "Model" and len(values) > 1:
+                        if values[1].isdigit():
+                            inner += int(values[1])
+                    continue
+                if line.strip().startswith("-") or len(line.strip()) < 1:
+                    continue
+                if line.lstrip().startswith(("OUTER ", "OUTER\t")):
+                    continue
+                in_table = False
+
+            # number of outer iterations in a time step that converged
+            if calls is not None:
+                m = re_total_iterations.match(line)
+                if m is not None:
+                    yield {
+                        "type": "timestep",
+                        "kper": calls[2],
+                        "kstp": calls[1],
+                        "attempt": attempt,
+                        "solution": solution,
+                        "outer": calls[0],
+                        "inner": int(m.group(1)),
+                        "converged": True,
+                    }
+                    calls = None
+                    continue
+            calls = None
+
+            if "Solving:" in line:
+                m = re_solving.search(line)
+                if m is not None:
+                    kper, kstp = int(m.group(1)), int(m.group(2))
+                    attempt = 1
+                    continue
+
+            m = re_outer_summary.match(line)
+            if m is not None:
+                solution = m.group(1)
+                outer = inner = 0
+                in_table = True
+                continue
+
+            m = re_calls.match(line)
+            if m is not None:
+                calls = (int(m.group(1)), int(m.group(2)), int(m.group(3)))
+                continue
+
+            m = re_nocnvg.match(line)
+            if m is not None:
+                group = m.group(1) is not None
+                record = {
+                    "type": "nonconvergence",
+                    "kper": int(m.group(3)),
+                    "kstp": int(m.group(4)),
+                    "attempt": attempt,
+                }
+                if group:
+                    record["solution_group"] = int(m.group(2))
+                else:
+                    record["solution"] = "SLN_{}".format(m.group(2))
+                    if solution == record["solution"]:
+                        record["outer"] = outer
+                        record["inner"] = inner
+                yield record
+                continue
+
+            if "ATS:" in line:
+                m = re_ats_step.search(line)
+                if m is not None:
+                    yield {
+                        "type": "ats_step",
+                        "kper": int(m.group(3)),
+                        "kstp": int(m.group(2)),
+                        "delt": _to_float(m.group(1)),
+                    }
+                    continue
+                m = re_ats_preferred.search(line)
+                if m is not None:
+                    yield {
+                        "type": "ats_preferred",
+                        "kper": kper,
+                        "kstp": kstp,
+                        "source": m.group(1),
+                        "delt": _to_float(m.group(2)),
+                    }
+                    continue
+
+            m = re_ats_retry.search(line)
+            if m is not None:
+                yield {
+                    "type": "ats_retry",
+                    "kper": int(m.group(2)),
+                    "kstp": int(m.group(1)),
+                    "attempt": attempt,
+                    "delt": _to_float(m.group(3)),
+                }
+                attempt += 1
+                continue
+
+            m = re_solution_timer.match(line)
+            if m is not None:
+                timer = {"type": "solution_timer", "solution": m.group(1)}
+                continue
+            if timer is not None:
+                m = re_timer.match(line)
+                if m is not None:
+                    timer[m.group(1)] = _to_float(m.group(2))
+                    if "formulate" in timer and "solution" in timer:
+                        yield timer
+                        timer = None
+                    continue
+
+            m = re_memory.search(line)
+            if m is not None:
+                memory_factor = memory_units.get(m.group(1).upper(), 1)
+                continue
+            if memory_factor is not None:
+                ll = line.split()
+                if len(ll) == 2 and ll[0] == "Total":
+                    yield {
+                        "type": "memory",
+                        "total": _to_float(ll[1]) * memory_factor,
+                    }
+                    memory_factor = None
+                continue
+
+            m = re_run_date.match(line)
+            if m is not None:
+                run_time[m.group(1)] = m.group(2)
+                continue
+
+            m = re_elapsed.match(line)
+            if m is not None:
+                run_time["elapsed"] = elapsed_to_seconds(m.group(1))
+                yield dict(type="run_time", **run_time)
+                continue
+
+            m = re_failures.search(line)
+            if m is not None:
+                yield {
+                    "type": "convergence_failures",
+                    "count": int(m.group(1)),
+                }
+                continue
+
+            if "Normal termination of simulation" in line:
+                yield {"type": "termination", "normal": True}
+
+
+def _new_budget(m):
+    return {
+        "type": "budget",
+        "name": m.group(1).strip(),
+        "kper": int(m.group(3)),
+        "kstp": int(m.group(2)),
+        "terms": [],
+    }
+
+
+def iter_listing_records(fpth):
+    """
+    Read the budget and time summary records in a model listing file
+
+    Parameters
+    ----------
+    fpth : str
+        path to the model listing file
+
+    Yields
+    ------
+    record : dict
+        budget records include the budget name (for example, "VOLUME" or
+        "MASS"), a list of terms with the term name, package name, and the
+        cumulative and rate values into (IN) and out of (OUT) the model,
+        the total in and out, the in minus out, and the percent
+        discrepancy of the cumulative values and the rates. Time summary
+        records include the time step length (delt), stress period time
+        (pertim), and total time (totim) in seconds, or in the model time
+        units if the model time units are not defined (units is None).
+
+    """
+    budget = None
+    direction = None
+    terms = {}
+    time_summary = None
+
+    with _open(fpth) as f:
+        for line in f:
+            if budget is not None:
+                stripped = line.strip()
+                if stripped.startswith("IN:"):
+                    direction = "in"
+                    continue
+                if stripped.startswith("OUT:"):
+                    direction = "out"
+                    continue
+                m = re_budget_term.match(line)
+                if m is None:
+                    continue
+                name = m.group(1)
+                cumulative = _to_float(m.group(2))
+                rate = _to_float(m.group(4))
+                if name == "TOTAL IN":
+                    budget["total_in"] = cumulative
+                    budget["total_in_rate"] = rate
+                elif name == "TOTAL OUT":
+                    budget["total_out"] = cumulative
+                    budget["total_out_rate"] = rate
+                elif name == "IN - OUT":
+                    budget["in_minus_out"] = cumulative
+                    budget["in_minus_out_rate"] = rate
+                elif name == "PERCENT DISCREPANCY":
+                    budget["percent_discrepancy"] = cumulative
+                    budget["percent_discrepancy_rate"] = rate
+                    budget["terms"] = list(terms.values())
+                    yield budget
+                    budget = None
+                    terms = {}
+                elif direction is not None:
+                    package = m.group(5)
+                    key = (name, package)
+                    if key not in terms:
+                        terms[key] = {"name": name, "package": package}
+                    terms[key][direction] = cumulative
+                    terms[key][direction + "_rate"] = rate
+                continue
+
+            if time_summary is not None:
+                ll = line.split()
+                if "SECONDS" in ll:
+                    time_summary["units"] = "seconds"
+                    continue
+                for tag, key in (
+                    ("TIME STEP LENGTH", "delt"),
+                    ("STRESS PERIOD TIME", "pertim"),
+                    ("TOTAL", "totim"),
+                ):
+                    if tag in line and key not in time_summary:
+                        # the value follows the label (and an equal sign
+                        # if the time units are not defined)
+                        text = line.split("=")[-1] if "=" in line else line
+                        values = [v for v in text.split() if not v.isalpha()]
+                        if len(values) > 0:
+                            time_summary[key] = _to_float(values[0])
+                        break
+                if "totim" in time_summary:
+                    yield time_summary
+                    time_summary = None
+                continue
+
+            if "BUDGET FOR ENTIRE MODEL" in line:
+                m = re_budget.match(line)
+                if m is not None:
+                    budget = _new_budget(m)
+                    direction = None
+                continue
+
+            if "TIME SUMMARY" in line:
+                m = re_time_summary.search(line)
+                if m is not None:
+                    time_summary = {
+                        "type": "time_summary",
+                        "kper": int(m.group(2)),
+                        "kstp": int(m.group(1)),
+                        "units": None,
+                    }
+
+
+def get_solver_summary(fpth):
+    """
+    Summarize the solver iterations in a simulation listing file
+
+    Parameters
+    ----------
+    fpth : str
+        path to the simulation listing file
+
+    Returns
+    -------
+    summary : dict
+        dictionary of solution names and a dictionary with the number of
+        time steps that converged, the total and maximum outer iterations,
+        the total inner iterations, and the number of nonconvergent time
+        step attempts. The "ats_retries" and "convergence_failures" keys
+        contain the number of time steps retried by the ATS package and
+        the number of convergence failures reported for the simulation.
+
+    """
+    summary = {"ats_retries": 0, "convergence_failures": 0}
+    for record in iter_simulation_records(fpth):
+        rtype = record["type"]
+        if rtype in ("timestep", "nonconvergence"):
+            name = record.get("solution")
+            if name is None:
+                continue
+            s = summary.setdefault(
+                name,
+                {
+                    "timesteps": 0,
+                    "outer": 0,
+                    "max_outer": 0,
+                    "inner": 0,
+                    "nonconvergence": 0,
+                },
+            )
+            s["outer"] += record.get("outer", 0)
+            s["max_outer"] = max(s["max_outer"], record.get("outer", 0))
+            s["inner"] += record.get("inner", 0)
+            if rtype == "timestep":
+                s["timesteps"] += 1
+            else:
+                s["nonconvergence"] += 1
+        elif rtype == "ats_retry":
+            summary["ats_retries"] += 1
+        elif rtype == "convergence_failures":
+            summary["convergence_failures"] = record["count"]
+    return summary
+
+
+def get_total_iterations(fpth):
+    """
+    Get the total number of inner iterations of all of the solutions in a
+    simulation listing file
+    """
+    summary = get_solver_summary(fpth)
+    return sum(
+        value["inner"] for value in summary.values() if isinstance(value, dict)
+    )
+
+
+if __name__ == "__main__":
+    # write the records in a listing file to stdout as json lines
+    #     python listing_file_reader.py mfsim.lst
+    #     python listing_file_reader.py model.lst
+    for fpth in sys.argv[1:]:
+        if os.path.basename(fpth).lower() == "mfsim.lst":
+            records = iter_simulation_records(fpth)
+        else:
+            records = iter_listing_records(fpth)
+        for record in records:
+            record["file"] = fpth
+            sys.stdout.write(json.dumps(record) + "\n")
@@ -0,0 +1,229 @@
+# content-addressed cache for mf6-regression comparison runs
+#
+# The output from an mf6-regression run only depends on the input files in
+# the comparison directory and on the regression executable. Results are
+# stored in a cache directory using a key calculated from the contents of
+# the input files and the executable, so the reference heads,
+# concentrations, and budgets are only calculated once and reused by later
+# test sessions. The least recently used entries are removed when the size
+# of the cache exceeds MF6_REGRESSION_CACHE_MAXSIZE megabytes (default is
+# 10240). The cache can be disabled using the --no_regression_cache
+# command line argument.
+
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+
+from framework import get_cache_dir
+from scheduler import run_model
+
+cache_name = "mf6-regression"
+manifest_name = "manifest.json"
+default_maxsize = 10240
+flopy_header = b"# File generated by Flopy"
+
+
+def use_cache():
+    """Determine if the regression cache should be used"""
+    for arg in sys.argv:
+        if arg.lower() == "--no_regression_cache":
+            return False
+    return True
+
+
+def get_maxsize():
+    """Get the maximum size of the regression cache in bytes"""
+    maxsize = os.environ.get("MF6_REGRESSION_CACHE_MAXSIZE")
+    if maxsize is None:
+        maxsize = default_maxsize
+    return int(float(maxsize) * 1024 * 1024)
+
+
+def file_digest(fpth, blocksize=1024 * 1024, skip_header=False):
+    """
+    Calculate the sha256 digest of a file. The time stamped header written
+    by flopy is not included in the digest if skip_header is True.
+    """
+    h = hashlib.sha256()
+    with open(fpth, "rb") as f:
+        if skip_header:
+            line = f.readline()
+            if not line.startswith(flopy_header):
+                h.update(line)
+        for block in iter(lambda: f.read(blocksize), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def get_files(model_ws):
+    """Get a dictionary of relative file paths and (size, mtime) tuples"""
+    files = {}
+    for root, dirs, names in os.walk(model_ws):
+        for name in names:
+            fpth = os.path.join(root, name)
+            st = os.stat(fpth)
+            files[os.path.relpath(fpth, model_ws)] = (st.st_size, st.st_mtime)
+    return files
+
+
+def get_key(exe, model_ws, files=None):
+    """
+    Calculate the cache key for a model directory and executable
+
+    Parameters
+    ----------
+    exe : str
+        path to the regression executable
+    model_ws : str
+        path to the model directory with the input files
+    files : dict
+        dictionary of input files returned by get_files(). If files is
+        None, all of the files in model_ws are used. (default is None)
+
+    Returns
+    -------
+    key : str
+        hexadecimal cache key
+
+    """
+    if files is None:
+        files = get_files(model_ws)
+    h = hashlib.sha256()
+    h.update(file_digest(exe).encode())
+    for relpth in sorted(files):
+        h.update(relpth.replace(os.sep, "/").encode())
+        fpth = os.path.join(model_ws, relpth)
+        h.update(file_digest(fpth, skip_header=True).encode())
+    return h.hexdigest()
+
+
+def _read_manifest(entry):
+    with open(os.path.join(entry, manifest_name)) as f:
+        return json.load(f)
+
+
+def restore(key, model_ws):
+    """
+    Copy cached results into model_ws
+
+    Returns
+    -------
+    buff : list or None
+        stdout from the cached run or None if the key is not in the cache
+
+    """
+    entry = os.path.join(get_cache_dir(cache_name), key)
+    try:
+        manifest = _read_manifest(entry)
+        for relpth in manifest["files"]:
+            dst = os.path.join(model_ws, relpth)
+            os.makedirs(os.path.dirname(dst), exist_ok=True)
+            shutil.copy2(os.path.join(entry, "files", relpth), dst)
+    except (OSError, ValueError, KeyError):
+        return None
+
+    # update the access time used for lru eviction
+    os.utime(os.path.join(entry, manifest_name))
+    return manifest["buff"]
+
+
+def store(key, model_ws, input_files, buff):
+    """Store the files created or modified by a run in the cache"""
+    cache_dir = get_cache_dir(cache_name)
+    entry = os.path.join(cache_dir, key)
+    if os.path.isdir(entry):
+        return
+
+    files = []
+    size = 0
+    tmp = os.path.join(cache_dir, ".{}.{}".format(key, os.getpid()))
+    for relpth, stat in get_files(model_ws).items():
+        if input_files.get(relpth) == stat:
+            continue
+        dst = os.path.join(tmp, "files", relpth)
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        shutil.copy2(os.path.join(model_ws, relpth), dst)
+        files.append(relpth)
+        size += stat[0]
+    manifest = {
+        "files": files,
+        "size": size,
+        "buff": buff,
+        "created": time.time(),
+    }
+    os.makedirs(tmp, exist_ok=True)
+    with open(os.path.join(tmp, manifest_name), "w") as f:
+        json.dump(manifest, f)
+
+    # rename is atomic so concurrent test sessions never see a partial entry
+    try:
+        os.rename(tmp, entry)
+    except OSError:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    evict()
+
+
+def evict(maxsize=None):
+    """Remove least recently used cache entries until the cache fits"""
+    if maxsize is None:
+        maxsize = get_maxsize()
+    cache_dir = get_cache_dir(cache_name)
+    entries = []
+    total = 0
+    for key in os.listdir(cache_dir):
+        entry = os.path.join(cache_dir, key)
+        fpth = os.path.join(entry, manifest_name)
+        if key.startswith(".") or not os.path.isfile(fpth):
+            continue
+        try:
+            size = _read_manifest(entry)["size"]
+            atime = os.stat(fpth).st_mtime
+        except (OSError, ValueError, KeyError):
+            continue
+        entries.append((atime, size, entry))
+        total += size
+
+    for atime, size, entry in sorted(entries):
+        if total <= maxsize:
+            break
+        shutil.rmtree(entry, ignore_errors=True)
+        total -= size
+
+
+def run_cached(exe, model_ws):
+    """
+    Run an mf6-regression simulation or restore the results from the cache
+
+    Parameters
+    ----------
+    exe : str
+        path to the regression executable
+    model_ws : str
+        path to the model directory
+
+    Returns
+    -------
+    success : bool
+        boolean indicating if the model terminated normally
+    buff : list
+        list of lines written to stdout by the model
+    usage : dict
+        resource usage of the run ({"cached": True} if the results were
+        restored from the cache)
+
+    """
+    input_files = get_files(model_ws)
+    key = get_key(exe, model_ws, files=input_files)
+    buff = restore(key, model_ws)
+    if buff is not None:
+        print("using cached mf6-regression results ({})".format(key[:12]))
+        return True, buff, {"cached": True}
+
+    success, buff, usage = run_model(exe, None, model_ws)
+    if success:
+        store(key, model_ws, input_files, buff)
+    return success, buff, usage
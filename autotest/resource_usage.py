@@ -0,0 +1,380 @@
+# resource usage of model runs
+#
+# The resource usage of a child process is returned by wait4. On linux the
+# peak resident memory (ru_maxrss) of a child includes the memory of the
+# parent process when the child calls exec, so a child of a python process
+# with numpy and flopy loaded reports at least the memory of the python
+# process. Commands are therefore run through this file as a small launcher
+# (python -S resource_usage.py), which forks and runs the command and
+# returns the resource usage of the command to the calling process through
+# a pipe. The peak memory reported for very small models is the memory of
+# the launcher (about 10 MB). Functions that run a model in the current
+# process (libmf6) are measured using the peak resident memory of the
+# process (VmHWM), which is reset before the function is called on linux.
+#
+# The resource usage of each test is stored in a record in the autotest
+# cache directory (or the directory defined by the
+# MF6_AUTOTEST_RESOURCE_USAGE environmental variable). A test fails if the
+# peak memory of the model exceeds a memory budget, in megabytes, defined
+# by the --max_memory command line argument, the MF6_AUTOTEST_MAX_MEMORY
+# environmental variable, or the test. A test also fails if the peak memory
+# grows by more than the percentage defined by the --memory_growth command
+# line argument or the MF6_AUTOTEST_MEMORY_GROWTH environmental variable
+# relative to the last record of the test that passed.
+
+import os
+import sys
+import json
+import time
+import subprocess
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+record_name = "resource_usage"
+io_fields = ("rchar", "wchar", "read_bytes", "write_bytes")
+
+
+def _parse_status(status):
+    if os.WIFEXITED(status):
+        return os.WEXITSTATUS(status)
+    return -os.WTERMSIG(status)
+
+
+def _get_usage(rusage, wall):
+    """Convert a resource usage structure to a dictionary"""
+    maxrss = rusage.ru_maxrss
+    # ru_maxrss is in kilobytes on linux and bytes on macOS
+    if sys.platform != "darwin":
+        maxrss *= 1024
+    return {
+        "wall": wall,
+        "user": rusage.ru_utime,
+        "system": rusage.ru_stime,
+        "maxrss": maxrss,
+        "minflt": rusage.ru_minflt,
+        "majflt": rusage.ru_majflt,
+        "inblock": rusage.ru_inblock,
+        "oublock": rusage.ru_oublock,
+    }
+
+
+def _read_proc_io(pid="self"):
+    """Read the I/O byte counters of a process (linux only)"""
+    io = {}
+    try:
+        with open("/proc/{}/io".format(pid)) as f:
+            for line in f:
+                name, value = line.split(":")
+                if name in io_fields:
+                    io[name] = int(value)
+    except (OSError, ValueError):
+        pass
+    return io
+
+
+def _read_proc_status(fields=("VmRSS", "VmHWM")):
+    """Read memory values from /proc/self/status in bytes (linux only)"""
+    values = {}
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                name, value = line.split(":", 1)
+                if name in fields:
+                    values[name] = int(value.split()[0]) * 1024
+    except (OSError, ValueError):
+        pass
+    return values
+
+
+def _launch(fd, cpus, argv):
+    """Run argv in a child process and write the resource usage to fd"""
+    if cpus and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, [int(cpu) for cpu in cpus.split(",")])
+    t0 = time.perf_counter()
+    pid = os.fork()
+    if pid == 0:
+        os.close(fd)
+        try:
+            os.execvp(argv[0], argv)
+        except OSError as e:
+            sys.stderr.write("could not run {}: {}\n".format(argv[0], e))
+            sys.stderr.flush()
+        os._exit(127)
+    # read the I/O counters of the child before it is reaped
+    io = {}
+    if hasattr(os, "waitid"):
+        try:
+            os.waitid(os.P_PID, pid, os.WEXITED | os.WNOWAIT)
+            io = _read_proc_io(pid)
+        except OSError:
+            pass
+    _, status, rusage = os.wait4(pid, 0)
+    wall = time.perf_counter() - t0
+    returncode = _parse_status(status)
+    usage = _get_usage(rusage, wall)
+    usage.update(io)
+    usage["returncode"] = returncode
+    with os.fdopen(fd, "w") as f:
+        json.dump(usage, f)
+    return returncode
+
+
+def run_command(argv, cwd=None, cpus=None):
+    """
+    Run a command and get the resource usage of the command
+
+    Parameters
+    ----------
+    argv : list
+        command and arguments
+    cwd : str
+        directory the command is run in (default is None)
+    cpus : list
+        cpus the command is pinned to. If cpus is None, the command is not
+        pinned. (default is None)
+
+    Returns
+    -------
+    returncode : int
+        return code of the command
+    buff : list
+        lines written to stdout and stderr by the command
+    usage : dict
+        dictionary with the wall time, user and system cpu times in
+        seconds, peak resident memory (maxrss) in bytes, minor and major
+        page faults, block input and output operations, and bytes read and
+        written (linux only) by the command. Only the wall time is available
+        on platforms without wait4.
+
+    """
+    if not hasattr(os, "wait4"):
+        t0 = time.perf_counter()
+        proc = subprocess.Popen(
+            argv,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            cwd=cwd,
+        )
+        stdout, _ = proc.communicate()
+        usage = {"wall": time.perf_counter() - t0}
+        buff = stdout.decode("utf-8", errors="replace").splitlines()
+        return proc.returncode, buff, usage
+
+    fdr, fdw = os.pipe()
+    cmd = [
+        sys.executable,
+        "-S",
+        os.path.abspath(__file__),
+        str(fdw),
+        ",".join(str(cpu) for cpu in cpus) if cpus else "",
+    ] + list(argv)
+    proc = subprocess.Popen(
+        cmd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        cwd=cwd,
+        pass_fds=(fdw,),
+    )
+    os.close(fdw)
+    stdout, _ = proc.communicate()
+    with os.fdopen(fdr, "r") as f:
+        data = f.read()
+    buff = stdout.decode("utf-8", errors="replace").splitlines()
+    if len(data) < 1:
+        return proc.returncode, buff, {}
+    usage = json.loads(data)
+    returncode = usage.pop("returncode")
+    return returncode, buff, usage
+
+
+def measure_function(func, *args, **kwargs):
+    """
+    Call a function that runs a model in the current process and get the
+    resource usage of the call
+
+    Returns
+    -------
+    result : object
+        value returned by func
+    usage : dict
+        dictionary with the wall time, user and system cpu times, peak
+        resident memory of the process during the call (maxrss), resident
+        memory before the call (baseline_rss), page faults, block input
+        and output operations, and bytes read and written. The maxrss is the
+        peak memory of the process since it started on platforms where the
+        peak can not be reset.
+
+    """
+    # reset the peak resident memory of the process (linux only)
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+    status0 = _read_proc_status()
+    io0 = _read_proc_io()
+    if resource is not None:
+        r0 = resource.getrusage(resource.RUSAGE_SELF)
+    t0 = time.perf_counter()
+    result = func(*args, **kwargs)
+    wall = time.perf_counter() - t0
+    if resource is None:
+        return result, {"wall": wall}
+    r1 = resource.getrusage(resource.RUSAGE_SELF)
+    io1 = _read_proc_io()
+    status1 = _read_proc_status()
+
+    usage = _get_usage(r1, wall)
+    usage0 = _get_usage(r0, 0.0)
+    for name in ("user", "system", "minflt", "majflt", "inblock", "oublock"):
+        usage[name] -= usage0[name]
+    for name in io_fields:
+        if name in io0 and name in io1:
+            usage[name] = io1[name] - io0[name]
+    if "VmHWM" in status1:
+        usage["maxrss"] = status1["VmHWM"]
+    if "VmRSS" in status0:
+        usage["baseline_rss"] = status0["VmRSS"]
+    return result, usage
+
+
+def get_record_dir():
+    """Get the path to the directory with the resource usage records"""
+    pth = os.environ.get("MF6_AUTOTEST_RESOURCE_USAGE")
+    if pth is None:
+        from framework import get_cache_dir
+
+        pth = get_cache_dir(record_name)
+    os.makedirs(pth, exist_ok=True)
+    return pth
+
+
+def _get_record_path(name):
+    name = "".join(c if c.isalnum() or c in "-_." else "_" for c in name)
+    return os.path.join(get_record_dir(), "{}.json".format(name))
+
+
+def read_record(name):
+    """
+    Read the last resource usage record of a test (an empty dictionary is
+    returned if the test does not have a record)
+    """
+    try:
+        with open(_get_record_path(name)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def write_record(name, record):
+    """
+    Write the resource usage record of a test. The record is a dictionary
+    of run keys (for example, "mf6" or "mf6-regression") and resource
+    usage dictionaries.
+    """
+    fpth = _get_record_path(name)
+    tmp = "{}.{}".format(fpth, os.getpid())
+    try:
+        with open(tmp, "w") as f:
+            json.dump(record, f, indent=1, sort_keys=True)
+        os.replace(tmp, fpth)
+    except OSError:
+        pass
+
+
+def _get_option(tag, envvar):
+    for idx, arg in enumerate(sys.argv):
+        if arg.lower() == tag and len(sys.argv) > idx + 1:
+            return float(sys.argv[idx + 1])
+    value = os.environ.get(envvar)
+    if value is not None:
+        return float(value)
+    return None
+
+
+def get_max_memory(max_memory=None):
+    """
+    Get the memory budget in megabytes. The --max_memory command line
+    argument and the MF6_AUTOTEST_MAX_MEMORY environmental variable take
+    precedence over the budget defined by a test (max_memory).
+    """
+    value = _get_option("--max_memory", "MF6_AUTOTEST_MAX_MEMORY")
+    if value is not None:
+        return value
+    return max_memory
+
+
+def get_memory_growth():
+    """Get the allowed percent growth of the peak memory of a test"""
+    return _get_option("--memory_growth", "MF6_AUTOTEST_MEMORY_GROWTH")
+
+
+def get_model_memory(usage):
+    """
+    Get the peak memory used by a model in bytes. The memory of the process
+    before the model was run is not included for models run in the current
+    process (None is returned if the peak memory is not available).
+    """
+    maxrss = usage.get("maxrss")
+    if maxrss is None:
+        return None
+    return maxrss - usage.get("baseline_rss", 0)
+
+
+def check_memory(record, previous, keys=None, max_memory=None, growth=None):
+    """
+    Check the peak memory of the runs in a test
+
+    Parameters
+    ----------
+    record : dict
+        dictionary of run keys and resource usage dictionaries
+    previous : dict
+        last record of the test that passed
+    keys : list
+        run keys that are checked. If keys is None, all of the runs are
+        checked. (default is None)
+    max_memory : float
+        memory budget in megabytes. If max_memory is None, the peak memory
+        is not compared to a budget. (default is None)
+    growth : float
+        allowed percent growth of the peak memory relative to previous.
+        If growth is None, the growth is not checked. (default is None)
+
+    Returns
+    -------
+    errors : list
+        list of messages for the runs that exceed the thresholds
+
+    """
+    errors = []
+    if keys is None:
+        keys = list(record.keys())
+    for key in keys:
+        maxrss = get_model_memory(record.get(key, {}))
+        if maxrss is None:
+            continue
+        mb = maxrss / 1024.0**2
+        if max_memory is not None and mb > max_memory:
+            errors.append(
+                "{} peak memory ({:.1f} MB) ".format(key, mb)
+                + "exceeds the memory budget ({:.1f} MB)".format(max_memory)
+            )
+        maxrss0 = get_model_memory(previous.get(key, {}))
+        if growth is not None and maxrss0:
+            pd = 100.0 * (maxrss - maxrss0) / maxrss0
+            if pd > growth:
+                errors.append(
+                    "{} peak memory ({:.1f} MB) ".format(key, mb)
+                    + "grew {:.1f}% relative to the ".format(pd)
+                    + "last record ({:.1f} MB), ".format(maxrss0 / 1024.0**2)
+                    + "more than the allowed growth ({}%)".format(growth)
+                )
+    return errors
+
+
+if __name__ == "__main__":
+    sys.exit(_launch(int(sys.argv[1]), sys.argv[2], sys.argv[3:]))
@@ -0,0 +1,159 @@
+# utility for running independent autotest jobs concurrently
+#
+# Base and comparison model runs, and the comparisons of individual output
+# files, do not depend on each other and can be run at the same time in a
+# pool of worker processes. The number of workers can be set using the
+# --nworkers command line argument or the MF6_AUTOTEST_NWORKERS
+# environmental variable. Setting the number of workers to 1 runs all of the
+# jobs serially in the current process. When the tests are run using
+# pytest-xdist, the processors are divided between the pytest-xdist workers
+# by default.
+
+import os
+import sys
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+
+from resource_usage import run_command, measure_function
+
+
+def get_max_workers():
+    """Get the maximum number of worker processes used to run jobs
+
+    Returns
+    -------
+    max_workers : int
+        maximum number of worker processes
+
+    """
+    max_workers = None
+    for idx, arg in enumerate(sys.argv):
+        if arg.lower() == "--nworkers":
+            if len(sys.argv) > idx + 1:
+                max_workers = int(sys.argv[idx + 1])
+                break
+    if max_workers is None:
+        max_workers = os.environ.get("MF6_AUTOTEST_NWORKERS")
+        if max_workers is not None:
+            max_workers = int(max_workers)
+    if max_workers is None:
+        max_workers = os.cpu_count()
+        # share the processors with the other pytest-xdist workers
+        worker_count = os.environ.get("PYTEST_XDIST_WORKER_COUNT")
+        if worker_count is not None:
+            max_workers //= int(worker_count)
+    return max(1, max_workers)
+
+
+def run_jobs(jobs, max_workers=None, cancel=None):
+    """Run a list of independent jobs and return the results in order
+
+    Parameters
+    ----------
+    jobs : list of tuples
+        list of (function, args, kwargs) tuples. The function must be
+        defined at the top level of a module so it can be sent to a
+        worker process.
+    max_workers : int
+        maximum number of worker processes. If max_workers is None, the
+        value returned by get_max_workers() is used. (default is None)
+    cancel : function
+        function that is called with the result of the first job. If it
+        returns True, the other jobs are cancelled and their results are
+        None. Jobs that are already running can not be cancelled and
+        are finished before run_jobs returns. (default is None)
+
+    Returns
+    -------
+    results : list
+        list of values returned by each job
+
+    """
+    if max_workers is None:
+        max_workers = get_max_workers()
+    max_workers = min(max_workers, len(jobs))
+
+    # run serially in the current process
+    if max_workers < 2:
+        results = []
+        for func, args, kwargs in jobs:
+            if len(results) == 1 and cancel is not None and cancel(results[0]):
+                results += [None] * (len(jobs) - 1)
+                break
+            results.append(func(*args, **kwargs))
+        return results
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(_run_job, func, args, kwargs)
+            for func, args, kwargs in jobs
+        ]
+        results = [futures[0].result()]
+        if cancel is not None and cancel(results[0]):
+            for future in futures[1:]:
+                future.cancel()
+            results += [None] * (len(jobs) - 1)
+        else:
+            results += [future.result() for future in futures[1:]]
+    return results
+
+
+def _run_job(func, args, kwargs):
+    """Run a job in a worker process and flush the output from the job"""
+    try:
+        return func(*args, **kwargs)
+    finally:
+        sys.stdout.flush()
+
+
+def run_model(exe, namefile, model_ws, api_func=None, idxsim=None):
+    """Run a model executable or a libmf6 api function
+
+    Parameters
+    ----------
+    exe : str
+        path to the executable or shared library
+    namefile : str
+        name of the name file. None for MODFLOW 6 simulations.
+    model_ws : str
+        path to the model directory
+    api_func : function
+        function used to run the shared library. If api_func is None,
+        exe is run in a separate process. (default is None)
+    idxsim : int
+        simulation index passed to api_func (default is None)
+
+    Returns
+    -------
+    success : bool
+        boolean indicating if the model terminated normally
+    buff : list
+        list of lines written to stdout by the model, or the lines of the
+        traceback if an exception was raised
+    usage : dict
+        resource usage of the run from resource_usage.run_command or
+        resource_usage.measure_function
+
+    """
+    try:
+        if api_func is None:
+            argv = [exe]
+            if namefile is not None:
+                argv.append(namefile)
+            returncode, buff, usage = run_command(argv, cwd=model_ws)
+            for line in buff:
+                print(line)
+            success = any(
+                "normal termination" in line.lower() for line in buff
+            )
+        else:
+            (success, buff), usage = measure_function(
+                api_func, exe, idxsim, model_ws=model_ws
+            )
+    except Exception:
+        # return the traceback, for example of a failed assert in api_func
+        success, usage = False, {}
+        buff = traceback.format_exc().splitlines()
+        for line in buff:
+            print(line)
+    return success, buff, usage
@@ -2,6 +2,7 @@ import os
 import sys
 import shutil
 import time
+import warnings
 import numpy as np
 
 try:
@@ -21,7 +22,25 @@ except:
     raise Exception(msg)
 
 import targets
-from framework import running_on_CI
+from framework import running_on_CI, resolve_temp_path
+from scheduler import run_jobs, run_model
+from regression_cache import run_cached, use_cache
+from budget_file_compare import compare_budget_files
+from head_file_compare import compare_heads
+from resource_usage import (
+    check_memory,
+    get_max_memory,
+    get_memory_growth,
+    get_model_memory,
+    read_record,
+    write_record,
+)
+from solver_iterations import (
+    compare_iterations,
+    get_iteration_ratio,
+    get_iterations,
+    get_max_iteration_ratio,
+)
 
 sfmt = "{:25s} - {}"
 extdict = {
@@ -48,11 +67,15 @@ class Simulation(object):
         api_func=None,
         mf6_regression=False,
         make_comparison=True,
+        fail_fast=False,
+        max_memory=None,
     ):
         delFiles = True
         for idx, arg in enumerate(sys.argv):
             if arg.lower() == "--keep":
                 delFiles = False
+            elif arg.lower() == "--fail_fast":
+                fail_fast = True
             elif arg[2:].lower() in list(targets.target_dict.keys()):
                 key = arg[2:].lower()
                 exe0 = targets.target_dict[key]
@@ -132,9 +155,17 @@ class Simulation(object):
         # set compare verbosity
         self.cmp_verbose = cmp_verbose
 
+        # stop head and concentration comparisons at the first failure
+        self.fail_fast = fail_fast
+
         # set allow failure
         self.require_failure = require_failure
 
+        # memory budget for the model in megabytes and the resource usage
+        # of each run
+        self.max_memory = get_max_memory(max_memory)
+        self.resource_usage = {}
+
         self.delFiles = delFiles
         self.success = False
 
@@ -150,6 +181,9 @@ class Simulation(object):
         """
         Set paths to MODFLOW 6 model and associated comparison test
         """
+        # use the workspace of the current pytest-xdist worker
+        pth = resolve_temp_path(pth)
+
         # make sure this is a valid path
         if not os.path.isdir(pth):
             assert False, "{} is not a valid directory".format(pth)
@@ -174,6 +208,7 @@ class Simulation(object):
     def setup(self, src, dst):
         msg = sfmt.format("Setup test", self.name)
         print(msg)
+        dst = resolve_temp_path(dst)
         self.originpath = src
         self.simpath = dst
         # write message
@@ -235,31 +270,34 @@ class Simulation(object):
     def run(self):
         """
         Run the model and assert if the model terminated successfully
+
+        The base model and the comparison model are run at the same time
+        in a pool of worker processes.
         """
         msg = sfmt.format("Run test", self.name)
         print(msg)
 
-        # Set nam as namefile name without path
-        nam = None
-
         # run mf6 models
         target, ext = os.path.splitext(targets.program)
         exe = os.path.abspath(targets.target_dict[target])
         msg = sfmt.format("using executable", exe)
         print(msg)
-        try:
-            success, buff = flopy.run_model(
-                exe, nam, model_ws=self.simpath, silent=False, report=True
-            )
-            msg = sfmt.format("MODFLOW 6 run", self.name)
-            if success:
-                print(msg)
-            else:
-                print(msg)
-        except:
-            msg = sfmt.format("MODFLOW 6 run", self.name)
-            print(msg)
-            success = False
+        jobs = [(run_model, (exe, None, self.simpath), {})]
+
+        # add the comparison model run if the base model is not expected
+        # to fail
+        cmp_job = None
+        self.nam_cmp = None
+        if not self.require_failure:
+            cmp_job = self._get_comparison_job()
+            if cmp_job is not None:
+                jobs.append(cmp_job[2])
+
+        # the comparison is cancelled if the base model fails
+        results = run_jobs(jobs, cancel=lambda result: not result[0])
+        success, buff, self.resource_usage["mf6"] = results[0]
+        msg = sfmt.format("MODFLOW 6 run", self.name)
+        print(msg)
 
         # set failure based on success and require_failure setting
         if self.require_failure is None:
@@ -288,69 +326,137 @@ class Simulation(object):
             msg = self._get_mfsim_listing(fpth) + msg
 
         # test for failure
+        if failure:
+            msg = _get_traceback(buff) + msg
         assert not failure, msg
 
-        self.nam_cmp = None
+        if success and cmp_job is not None:
+            key, cpth = cmp_job[:2]
+            success_cmp, buff, self.resource_usage[key] = results[1]
+            msg = sfmt.format("Comparison run", self.name + "/" + key)
+            print(msg)
+
+            # print end of mfsim.lst to the screen
+            if "mf6" in key:
+                if not success_cmp and self.is_CI:
+                    fpth = os.path.join(cpth, "mfsim.lst")
+                    print(self._get_mfsim_listing(fpth))
+
+            assert success_cmp, (
+                _get_traceback(buff) + "Unsuccessful comparison run"
+            )
+
+            # compare the solver iterations to mf6-regression
+            if key == "mf6-regression":
+                self._check_solver_iterations(cpth)
+
+        # check the memory used by the model
         if success:
-            if self.action is not None:
-                if self.action.lower() == "compare":
-                    msg = sfmt.format("Comparison files", self.name)
-                    print(msg)
-                else:
-                    cpth = os.path.join(self.simpath, self.action)
-                    key = self.action.lower().replace(".cmp", "")
-                    exe = os.path.abspath(targets.target_dict[key])
-                    msg = sfmt.format("comparison executable", exe)
+            self._check_resource_usage()
+
+        return
+
+    def _check_resource_usage(self):
+        """
+        Check the peak memory of the model against the memory budget and
+        the last resource usage record of the test, and save the record if
+        the checks pass
+        """
+        name = os.path.basename(os.path.normpath(self.name))
+        record = dict(self.resource_usage)
+        for key, usage in record.items():
+            maxrss = get_model_memory(usage)
+            if maxrss is not None:
+                msg = sfmt.format(
+                    "{} peak memory".format(key),
+                    "{:.1f} MB".format(maxrss / 1024.0**2),
+                )
+                print(msg)
+        errors = check_memory(
+            record,
+            read_record(name),
+            keys=["mf6", "libmf6"],
+            max_memory=self.max_memory,
+            growth=get_memory_growth(),
+        )
+        assert len(errors) < 1, "\n".join(errors)
+        write_record(name, record)
+
+    def _check_solver_iterations(self, cpth):
+        """
+        Compare the solver iterations and convergence failures of the model
+        to the mf6-regression run. The iterations are added to the resource
+        usage record of the test.
+        """
+        current = get_iterations(self.simpath)
+        regression = get_iterations(cpth)
+        self.resource_usage["mf6"]["iterations"] = current
+        self.resource_usage["mf6-regression"]["iterations"] = regression
+        if current is None or regression is None:
+            return
+        if not any(isinstance(v, dict) for v in current.values()):
+            msg = sfmt.format(
+                "solver iterations", "not printed (IMS PRINT_OPTION)"
+            )
+            print(msg)
+        for key, summary in (("mf6", current), ("mf6-regression", regression)):
+            for name, values in summary.items():
+                if isinstance(values, dict):
+                    msg = sfmt.format(
+                        "{} {} iterations".format(key, name),
+                        "{} outer, {} inner".format(
+                            values["outer"], values["inner"]
+                        ),
+                    )
                     print(msg)
-                    if (
-                        "mf6" in key
-                        or "libmf6" in key
-                        or "mf6-regression" in key
-                    ):
-                        nam = None
-                    else:
-                        npth = pymake.get_namefiles(cpth)[0]
-                        nam = os.path.basename(npth)
-                    self.nam_cmp = nam
-                    try:
-                        if self.api_func is None:
-                            success_cmp, buff = flopy.run_model(
-                                exe,
-                                nam,
-                                model_ws=cpth,
-                                silent=False,
-                                report=True,
-                            )
-                        else:
-                            success_cmp, buff = self.api_func(
-                                exe, self.idxsim, model_ws=cpth
-                            )
-                        msg = sfmt.format(
-                            "Comparison run", self.name + "/" + key
-                        )
-                        print(msg)
-
-                        # print end of mfsim.lst to the screen
-                        if "mf6" in key:
-                            if not success and self.is_CI:
-                                fpth = os.path.join(cpth, "mfsim.lst")
-                                print(self._get_mfsim_listing(fpth))
-
-                    except:
-                        success_cmp = False
-                        msg = sfmt.format(
-                            "Comparison run", self.name + "/" + key
-                        )
-                        print(msg)
 
-                    assert success_cmp, "Unsuccessful comparison run"
+        errors = compare_iterations(
+            current, regression, get_max_iteration_ratio()
+        )
+        assert len(errors) < 1, "\n".join(errors)
+        for msg in compare_iterations(
+            current, regression, get_iteration_ratio()
+        ):
+            print(msg)
+            warnings.warn(msg)
 
-        return
+    def _get_comparison_job(self):
+        """
+        Get the key, path, and job used to run the comparison model
+        """
+        if self.action is None or self.action.lower() == "compare":
+            if self.action is not None:
+                msg = sfmt.format("Comparison files", self.name)
+                print(msg)
+            return None
+
+        cpth = os.path.join(self.simpath, self.action)
+        key = self.action.lower().replace(".cmp", "")
+        exe = os.path.abspath(targets.target_dict[key])
+        msg = sfmt.format("comparison executable", exe)
+        print(msg)
+        if "mf6" in key or "libmf6" in key or "mf6-regression" in key:
+            nam = None
+        else:
+            npth = pymake.get_namefiles(cpth)[0]
+            nam = os.path.basename(npth)
+        self.nam_cmp = nam
+        if key == "mf6-regression" and self.api_func is None and use_cache():
+            job = (run_cached, (exe, cpth), {})
+        else:
+            job = (
+                run_model,
+                (exe, nam, cpth),
+                {"api_func": self.api_func, "idxsim": self.idxsim},
+            )
+        return key, cpth, job
 
     def compare(self):
         """
         Compare the model results
 
+        The comparisons for all of the output files are run at the same
+        time in a pool of worker processes.
         """
         self.success = True
 
@@ -374,6 +480,9 @@ class Simulation(object):
                 fpth = os.path.join(cpth, "mfsim.nam")
                 cinp, self.coutp = pymake.get_mf6_files(fpth)
 
+            # list of (message, job) tuples for each comparison
+            jobs = []
+
             head_extensions = (
                 "hds",
                 "hed",
@@ -382,12 +491,7 @@ class Simulation(object):
                 "bin",
             )
             if "mf6-regression" in self.action:
-                success, msgall = self._compare_heads(
-                    msgall,
-                    extensions=head_extensions,
-                )
-                if not success:
-                    self.success = False
+                jobs += self._compare_heads(extensions=head_extensions)
             # non-regression runs - for new features
             else:
                 files1 = []
@@ -465,36 +569,50 @@ class Simulation(object):
                                 )
                                 print(txt)
 
-                    # make comparison
-                    success_tst = pymake.compare_heads(
-                        None,
-                        pth,
-                        precision="double",
-                        text=extdict[ext],
-                        outfile=outfile,
-                        files1=file1,
-                        files2=file2,
-                        htol=self.htol,
-                        difftol=True,
-                        # Change to true to have list of all nodes exceeding htol
-                        verbose=self.cmp_verbose,
-                        exfile=exfile,
-                    )
+                    # make comparison - pymake is used if the comparison
+                    # files are defined by the comparison name file
+                    if file2 is None:
+                        job = (
+                            pymake.compare_heads,
+                            (None, pth),
+                            {
+                                "precision": "double",
+                                "text": extdict[ext],
+                                "outfile": outfile,
+                                "files1": file1,
+                                "files2": file2,
+                                "htol": self.htol,
+                                "difftol": True,
+                                # Change to true to have list of all nodes
+                                # exceeding htol
+                                "verbose": self.cmp_verbose,
+                                "exfile": exfile,
+                            },
+                        )
+                    else:
+                        job = (
+                            compare_heads,
+                            (file1, file2),
+                            {
+                                "outfile": outfile,
+                                "htol": self.htol,
+                                "difftol": True,
+                                "exfile": exfile,
+                                "text": extdict[ext],
+                                "precision": "double",
+                                "verbose": self.cmp_verbose,
+                                "fail_fast": self.fail_fast,
+                            },
+                        )
                     msg = sfmt.format(
                         "{} comparison {}".format(extdict[ext], ipos + 1),
                         self.name,
                     )
-                    print(msg)
-
-                    if not success_tst:
-                        self.success = False
-                        msgall += msg + " ... FAILED\n"
+                    jobs.append((msg, job))
 
             # compare concentrations
             if "mf6-regression" in self.action:
-                success, msgall = self._compare_concentrations(msgall)
-                if not success:
-                    self.success = False
+                jobs += self._compare_concentrations()
 
             # compare cbc files
             if "mf6-regression" in self.action:
@@ -502,11 +620,15 @@ class Simulation(object):
                     "cbc",
                     "bud",
                 )
-                success, msgall = self._compare_budgets(
-                    msgall, extensions=cbc_extensions
-                )
-                if not success:
+                jobs += self._compare_budgets(extensions=cbc_extensions)
+
+            # run the comparisons
+            results = run_jobs([job for msg, job in jobs])
+            for (msg, job), success_tst in zip(jobs, results):
+                print(msg)
+                if not success_tst:
                     self.success = False
+                    msgall += msg + " ... FAILED\n"
 
         assert self.success, msgall
         return
@@ -616,82 +738,48 @@ class Simulation(object):
                         break
         return files0, files1
 
-    def _compare_heads(self, msgall, extensions="hds"):
-        if isinstance(extensions, str):
-            extensions = [extensions]
-        success = True
-        files0, files1 = self._regression_files(extensions)
-        extension = "hds"
-        ipos = 0
-        for idx, (fpth0, fpth1) in enumerate(zip(files0, files1)):
-            outfile = os.path.splitext(os.path.basename(fpth0))[0]
-            outfile = os.path.join(
-                self.simpath, outfile + ".{}.cmp.out".format(extension)
-            )
-            success_tst = pymake.compare_heads(
-                None,
-                None,
-                precision="double",
-                htol=self.htol,
-                text=extdict[extension],
-                outfile=outfile,
-                files1=fpth0,
-                files2=fpth1,
-                verbose=self.cmp_verbose,
-            )
-            msg = sfmt.format(
-                "{} comparison {}".format(extdict[extension], ipos + 1),
-                "{} ({})".format(self.name, os.path.basename(fpth0)),
-            )
-            ipos += 1
-            print(msg)
-
-            if not success_tst:
-                success = False
-                msgall += msg + " ... FAILED\n"
+    def _compare_heads(self, extensions="hds"):
+        return self._compare_arrays(extensions, "hds")
 
-        return success, msgall
+    def _compare_concentrations(self, extensions="ucn"):
+        return self._compare_arrays(extensions, "ucn")
 
-    def _compare_concentrations(self, msgall, extensions="ucn"):
+    def _compare_arrays(self, extensions, extension):
+        """Get the jobs used to compare binary head or concentration files"""
         if isinstance(extensions, str):
             extensions = [extensions]
-        success = True
+        jobs = []
         files0, files1 = self._regression_files(extensions)
-        extension = "ucn"
-        ipos = 0
-        for idx, (fpth0, fpth1) in enumerate(zip(files0, files1)):
+        for ipos, (fpth0, fpth1) in enumerate(zip(files0, files1)):
             outfile = os.path.splitext(os.path.basename(fpth0))[0]
             outfile = os.path.join(
                 self.simpath, outfile + ".{}.cmp.out".format(extension)
             )
-            success_tst = pymake.compare_heads(
-                None,
-                None,
-                precision="double",
-                htol=self.htol,
-                text=extdict[extension],
-                outfile=outfile,
-                files1=fpth0,
-                files2=fpth1,
-                verbose=self.cmp_verbose,
+            job = (
+                compare_heads,
+                (fpth0, fpth1),
+                {
+                    "outfile": outfile,
+                    "htol": self.htol,
+                    "text": extdict[extension],
+                    "precision": "double",
+                    "verbose": self.cmp_verbose,
+                    "fail_fast": self.fail_fast,
+                },
             )
             msg = sfmt.format(
                 "{} comparison {}".format(extdict[extension], ipos + 1),
                 "{} ({})".format(self.name, os.path.basename(fpth0)),
             )
-            ipos += 1
-            print(msg)
-
-            if not success_tst:
-                success = False
-                msgall += msg + " ... FAILED\n"
+            jobs.append((msg, job))
 
-        return success, msgall
+        return jobs
 
-    def _compare_budgets(self, msgall, extensions="cbc"):
+    def _compare_budgets(self, extensions="cbc"):
+        """Get the jobs used to compare binary budget files"""
         if isinstance(extensions, str):
             extensions = [extensions]
-        success = True
+        jobs = []
         files0, files1 = self._regression_files(extensions)
         extension = "cbc"
         ipos = 0
@@ -702,91 +790,33 @@ class Simulation(object):
             outfile = os.path.join(
                 self.simpath, outfile + ".{}.cmp.out".format(extension)
             )
-            fcmp = open(outfile, "w")
-
-            # open the files
-            cbc0 = flopy.utils.CellBudgetFile(
-                fpth0, precision="double", verbose=self.cmp_verbose
-            )
-            cbc1 = flopy.utils.CellBudgetFile(
-                fpth1, precision="double", verbose=self.cmp_verbose
+            job = (
+                compare_budget_files,
+                (fpth0, fpth1, outfile),
+                {
+                    "rclose": self.rclose,
+                    "pdtol": self.pdtol,
+                    "verbose": self.cmp_verbose,
+                },
             )
-
-            # build list of cbc data to retrieve
-            avail0 = cbc0.get_unique_record_names()
-            avail1 = cbc1.get_unique_record_names()
-            avail0 = [t.decode().strip() for t in avail0]
-            avail1 = [t.decode().strip() for t in avail1]
-
-            # initialize list for storing totals for each budget term terms
-            cbc_keys0 = []
-            cbc_keys1 = []
-            for t in avail0:
-                t1 = t
-                if t not in avail1:
-                    # check if RCHA or EVTA is available and use that instead
-                    # should be able to remove this once v6.3.0 is released
-                    if t[:-1] in avail1:
-                        t1 = t[:-1]
-                    else:
-                        raise Exception(f"Could not find {t} in {fpth1}")
-                cbc_keys0.append(t)
-                cbc_keys1.append(t1)
-
-            # get list of times and kstpkper
-            kk = cbc0.get_kstpkper()
-            times = cbc0.get_times()
-
-            # process data
-            success_tst = True
-            for key, key1 in zip(cbc_keys0, cbc_keys1):
-                for idx, (k, t) in enumerate(zip(kk, times)):
-                    v0 = cbc0.get_data(kstpkper=k, text=key)[0]
-                    v1 = cbc1.get_data(kstpkper=k, text=key1)[0]
-                    if v0.dtype.names is not None:
-                        v0 = v0["q"]
-                        v1 = v1["q"]
-                    # skip empty vectors
-                    if v0.size < 1:
-                        continue
-                    vmin = self.rclose
-                    if vmin < 1e-6:
-                        vmin = 1e-6
-                    vmin_tol = 5.0 * vmin
-                    idx = (abs(v0) > vmin) & (abs(v1) > vmin)
-                    diff = np.zeros(v0.shape, dtype=v0.dtype)
-                    diff[idx] = abs(v0[idx] - v1[idx])
-                    diffmax = diff.max()
-                    indices = np.where(diff == diffmax)[0]
-                    if diffmax > vmin_tol:
-                        success_tst = False
-                        msg = (
-                            "{} - ".format(os.path.basename(fpth0))
-                            + "{:16s} ".format(key)
-                            + "difference ({:10.4g}) ".format(diffmax)
-                            + "> {:10.4g} ".format(self.pdtol)
-                            + "at {} nodes ".format(indices.size)
-                            + " [first location ({})] ".format(indices[0] + 1)
-                            + "at time {} ".format(t)
-                        )
-                        fcmp.write("{}\n".format(msg))
-                        if self.cmp_verbose:
-                            print(msg)
-
             msg = sfmt.format(
                 "{} comparison {}".format(extdict[extension], ipos + 1),
                 "{} ({})".format(self.name, os.path.basename(fpth0)),
             )
             ipos += 1
-            print(msg)
+            jobs.append((msg, job))
 
-            fcmp.close()
+        return jobs
 
-            if not success_tst:
-                success = False
-                msgall += msg + " ... FAILED\n"
 
-        return success, msgall
+def _get_traceback(buff):
+    """
+    Get the traceback returned by scheduler.run_model for a run that raised
+    an exception, or an empty string
+    """
+    if buff and buff[0].startswith("Traceback"):
+        return "\n".join(buff) + "\n"
+    return ""
 
 
 def api_return(success, model_ws):
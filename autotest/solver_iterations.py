@@ -0,0 +1,127 @@
+# solver iteration comparison for mf6-regression tests
+#
+# A change in the solver or in the formulation of a package can increase
+# the number of outer and inner iterations without changing the simulated
+# heads enough to fail the head comparison. The outer and inner iterations
+# and the convergence failures of the current and mf6-regression runs are
+# read from the simulation listing files and compared. The input files of
+# the test are not changed, so the iterations are only compared for
+# simulations that already write them to the simulation listing file with
+# an IMS PRINT_OPTION of SUMMARY or ALL. The convergence failures are
+# compared for all simulations.
+#
+# A warning is issued if the iterations of the current version exceed the
+# iterations of mf6-regression by more than the ratio defined by the
+# --iteration_ratio command line argument or the
+# MF6_AUTOTEST_ITERATION_RATIO environmental variable (default is 1.1). A
+# test fails if the iterations exceed the ratio defined by the
+# --max_iteration_ratio command line argument or the
+# MF6_AUTOTEST_MAX_ITERATION_RATIO environmental variable. Differences of
+# less than min_difference iterations are not reported.
+
+import os
+import sys
+
+from listing_file_reader import get_solver_summary
+
+default_ratio = 1.1
+min_difference = 5
+
+
+def _get_option(tag, envvar, default=None):
+    for idx, arg in enumerate(sys.argv):
+        if arg.lower() == tag and len(sys.argv) > idx + 1:
+            return float(sys.argv[idx + 1])
+    value = os.environ.get(envvar)
+    if value is not None:
+        return float(value)
+    return default
+
+
+def get_iteration_ratio():
+    """Get the iteration ratio that results in a warning"""
+    return _get_option(
+        "--iteration_ratio", "MF6_AUTOTEST_ITERATION_RATIO", default_ratio
+    )
+
+
+def get_max_iteration_ratio():
+    """Get the iteration ratio that results in a test failure (None if
+    the iterations do not fail a test)"""
+    return _get_option(
+        "--max_iteration_ratio", "MF6_AUTOTEST_MAX_ITERATION_RATIO"
+    )
+
+
+def get_iterations(sim_ws):
+    """
+    Get the solver iteration summary of a simulation
+
+    Returns
+    -------
+    summary : dict
+        solver summary returned by listing_file_reader.get_solver_summary()
+        or None if the simulation listing file does not exist
+
+    """
+    fpth = os.path.join(sim_ws, "mfsim.lst")
+    if not os.path.isfile(fpth):
+        return None
+    return get_solver_summary(fpth)
+
+
+def compare_iterations(current, regression, ratio):
+    """
+    Compare the solver iterations of the current and regression runs
+
+    Parameters
+    ----------
+    current : dict
+        solver summary of the current version
+    regression : dict
+        solver summary of mf6-regression
+    ratio : float
+        allowed ratio of the current to the regression iterations
+
+    Returns
+    -------
+    errors : list
+        list of messages for the iterations that exceed the ratio and for
+        convergence failures that are not in the regression run
+
+    """
+    errors = []
+    if current is None or regression is None or ratio is None:
+        return errors
+    for name, values in current.items():
+        if not isinstance(values, dict):
+            continue
+        values0 = regression.get(name)
+        if values0 is None:
+            continue
+        for key in ("outer", "inner"):
+            v, v0 = values[key], values0[key]
+            if v0 < 1 or v - v0 < min_difference:
+                continue
+            if v / v0 > ratio:
+                errors.append(
+                    "{} {} iterations ({}) ".format(name, key, v)
+                    + "exceed the mf6-regression iterations ({}) ".format(v0)
+                    + "by more than a factor of {}".format(ratio)
+                )
+        if values["nonconvergence"] > values0["nonconvergence"]:
+            errors.append(
+                "{} did not converge in {} ".format(
+                    name, values["nonconvergence"]
+                )
+                + "time steps ({} in mf6-regression)".format(
+                    values0["nonconvergence"]
+                )
+            )
+    key = "convergence_failures"
+    if current[key] > regression[key]:
+        errors.append(
+            "simulation convergence failures ({}) ".format(current[key])
+            + "exceed the mf6-regression failures ({})".format(regression[key])
+        )
+    return errors
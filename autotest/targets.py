@@ -1,8 +1,13 @@
 import os
 import sys
+import json
 import subprocess
+from collections.abc import MutableMapping
+
 import flopy
 
+from framework import get_cache_dir
+
 
 def target_pth(target, pth):
     exe_exists = flopy.which(target)
@@ -27,43 +32,83 @@ rebuilt_bindir = os.path.join("..", "bin", "rebuilt")
 # paths to MODFLOW 6 executable, source files, and example files
 bindir = os.path.join("..", "bin")
 
-# create dictionary of valid executable targets for regression tests
-target_dict = {}
-
-target = target_pth("mf2005dbl{}".format(target_ext), downloaded_bindir)
-target_dict["mf2005"] = target
-target = target_pth("mfnwtdbl{}".format(target_ext), downloaded_bindir)
-target_dict["mfnwt"] = target
-target = target_pth("mfusgdbl{}".format(target_ext), downloaded_bindir)
-target_dict["mfusg"] = target
-target = target_pth("mflgrdbl{}".format(target_ext), downloaded_bindir)
-target_dict["mflgr"] = target
-target = target_pth("mf2005{}".format(target_ext), downloaded_bindir)
-target_dict["mf2005s"] = target
-target = target_pth("mt3dms{}".format(target_ext), downloaded_bindir)
-target_dict["mt3dms"] = target
-target = target_pth("mf6{}".format(target_ext), rebuilt_bindir)
-target_dict["mf6-regression"] = target
+# version and compiler probe results
+probe_file = "targets.json"
+_probes = {}
+
+# executable targets for regression tests. The path to an executable is
+# only resolved the first time it is used, because searching the path for
+# executables is slow and most tests only use a few of the targets. Each
+# target is defined by (program, directory, search) where search indicates
+# if the system path is searched before directory.
+target_specs = {
+    "mf2005": ("mf2005dbl{}".format(target_ext), downloaded_bindir, True),
+    "mfnwt": ("mfnwtdbl{}".format(target_ext), downloaded_bindir, True),
+    "mfusg": ("mfusgdbl{}".format(target_ext), downloaded_bindir, True),
+    "mflgr": ("mflgrdbl{}".format(target_ext), downloaded_bindir, True),
+    "mf2005s": ("mf2005{}".format(target_ext), downloaded_bindir, True),
+    "mt3dms": ("mt3dms{}".format(target_ext), downloaded_bindir, True),
+    "mf6-regression": ("mf6{}".format(target_ext), rebuilt_bindir, True),
+}
 
 # create MODFLOW 6 target name and add to dictionary
 program = "mf6{}".format(target_ext)
-target = os.path.join(bindir, program)
-target_dict["mf6"] = target
+target_specs["mf6"] = (program, bindir, False)
 
 # create MODFLOW 6 so/dll target name
 tprog = "libmf6{}".format(target_so)
-ttarg = os.path.join(bindir, tprog)
-target_dict["libmf6"] = ttarg
+target_specs["libmf6"] = (tprog, bindir, False)
 
 # add MODFLOW 5 to 6 converter to dictionary of valid executable targets
 tprog = "mf5to6{}".format(target_ext)
-ttarg = os.path.join(bindir, tprog)
-target_dict["mf5to6"] = ttarg
+target_specs["mf5to6"] = (tprog, bindir, False)
 
 # add Zonebudget for 6 to dictionary of valid executable targets
 tprog = "zbud6{}".format(target_ext)
-ttarg = os.path.join(bindir, tprog)
-target_dict["zbud6"] = ttarg
+target_specs["zbud6"] = (tprog, bindir, False)
+
+
+class TargetDict(MutableMapping):
+    """
+    Dictionary of executable targets that are resolved when they are
+    first accessed. Targets can be replaced by assigning a new path.
+    """
+
+    def __init__(self, specs):
+        self._specs = dict(specs)
+        self._targets = {}
+
+    def __getitem__(self, key):
+        if key not in self._targets:
+            program, pth, search = self._specs[key]
+            if search:
+                target = target_pth(program, pth)
+            else:
+                target = os.path.join(pth, program)
+            self._targets[key] = target
+        return self._targets[key]
+
+    def __setitem__(self, key, value):
+        if key not in self._specs:
+            self._specs[key] = (os.path.basename(value), "", False)
+        self._targets[key] = value
+
+    def __delitem__(self, key):
+        del self._specs[key]
+        self._targets.pop(key, None)
+
+    def __iter__(self):
+        return iter(self._specs)
+
+    def __len__(self):
+        return len(self._specs)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+# create dictionary of valid executable targets for regression tests
+target_dict = TargetDict(target_specs)
 
 
 def run_exe(argv, ws="."):
@@ -81,12 +126,92 @@ def run_exe(argv, ws="."):
     return proc.returncode, buff
 
 
+def _get_probe_key(exe, arg):
+    """Get the probe cache key for an executable path and argument"""
+    st = os.stat(exe)
+    return "{}|{}|{}|{}".format(
+        os.path.abspath(exe), st.st_mtime_ns, st.st_size, arg
+    )
+
+
+def _read_probes():
+    fpth = os.path.join(get_cache_dir(), probe_file)
+    try:
+        with open(fpth) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_probe(key, value):
+    """Add a probe result to the on-disk cache"""
+    fpth = os.path.join(get_cache_dir(), probe_file)
+    probes = _read_probes()
+    probes[key] = value
+    tmp = "{}.{}".format(fpth, os.getpid())
+    try:
+        with open(tmp, "w") as f:
+            json.dump(probes, f, indent=1)
+        os.replace(tmp, fpth)
+    except OSError:
+        pass
+
+
+def probe_exe(exe, arg):
+    """
+    Run an executable with a single command line argument and return the
+    stdout lines. Results are cached in memory and on disk using the path,
+    modification time, and size of the executable, so executables are only
+    run again after they are rebuilt.
+
+    Parameters
+    ----------
+    exe : str
+        path to the executable
+    arg : str
+        command line argument (for example, "-v")
+
+    Returns
+    -------
+    buff : list or None
+        list of lines written to stdout or None if the executable does not
+        exist or did not terminate normally
+
+    """
+    try:
+        key = _get_probe_key(exe, arg)
+    except OSError:
+        return None
+    if key in _probes:
+        return _probes[key]
+    probes = _read_probes()
+    if key in probes:
+        buff = probes[key]
+    else:
+        return_code, buff = run_exe((exe, arg))
+        if return_code != 0:
+            buff = None
+        _write_probe(key, buff)
+    _probes[key] = buff
+    return buff
+
+
 def get_mf6_version(version="mf6"):
     """Function to get MODFLOW 6 version number"""
     exe = target_dict[version]
-    return_code, buff = run_exe((exe, "-v"))
-    if return_code == 0:
+    buff = probe_exe(exe, "-v")
+    if buff:
         version = buff[0].split()[1]
     else:
         version = None
     return version
+
+
+def get_mf6_compiler(version="mf6"):
+    """Function to get the compiler used to build MODFLOW 6"""
+    exe = target_dict[version]
+    buff = probe_exe(exe, "-c")
+    compiler = None
+    if buff:
+        compiler = buff[0].split(":", 1)[-1].strip()
+    return compiler
@@ -23,13 +23,14 @@ except:
     msg += " pip install flopy"
     raise Exception(msg)
 
-from framework import testing_framework
+from framework import testing_framework, get_temp_dir
 from simulation import Simulation
+from listing_file_reader import iter_simulation_records
 
 ex = ["gwf_ats01a"]
 exdirs = []
 for s in ex:
-    exdirs.append(os.path.join("temp", s))
+    exdirs.append(get_temp_dir(s))
 ddir = "data"
 nlay, nrow, ncol = 1, 1, 2
 
@@ -224,6 +225,22 @@ def eval_flow(sim):
         assert np.all(np.diff(v) < 0), msg
     v = tc["time"][-1]
     assert v == 10.0, "Last time should be 10.  Found {}".format(v)
+
+    # the first time step (dt0) does not converge and is retried, and every
+    # time step in the budget converged
+    fpth = os.path.join(sim.simpath, "mfsim.lst")
+    records = list(iter_simulation_records(fpth))
+    retries = [r for r in records if r["type"] == "ats_retry"]
+    msg = "first time step should be retried once.  Found {}".format(retries)
+    assert len(retries) == 1 and retries[0]["kstp"] == 1, msg
+    assert retries[0]["delt"] < dt0, msg
+    timesteps = [r for r in records if r["type"] == "timestep"]
+    msg = "number of converged time steps ({}) ".format(len(timesteps))
+    msg += "not equal to number of budget times ({})".format(len(inc))
+    assert len(timesteps) == len(inc), msg
+    assert (
+        max(r["outer"] for r in timesteps) <= 10
+    ), "too many outer iterations"
     return
 
 
@@ -24,13 +24,13 @@ except:
     msg += " pip install flopy"
     raise Exception(msg)
 
-from framework import testing_framework
+from framework import testing_framework, get_temp_dir
 from simulation import Simulation
 
 ex = ["gwf_ats02a"]
 exdirs = []
 for s in ex:
-    exdirs.append(os.path.join("temp", s))
+    exdirs.append(get_temp_dir(s))
 ddir = "data"
 nlay, nrow, ncol = 5, 1, 1
 botm = [80.0, 60.0, 40.0, 20.0, 0.0]
@@ -30,13 +30,13 @@ except:
     msg += " pip install flopy"
     raise Exception(msg)
 
-from framework import testing_framework
+from framework import testing_framework, get_temp_dir
 from simulation import Simulation
 
 ex = ["gwf_ats03a"]
 exdirs = []
 for s in ex:
-    exdirs.append(os.path.join("temp", s))
+    exdirs.append(get_temp_dir(s))
 ddir = "data"
 nlay, nrow, ncol = 1, 1, 10
 
@@ -15,13 +15,13 @@ except:
     msg += " pip install flopy"
     raise Exception(msg)
 
-from framework import testing_framework
+from framework import testing_framework, get_temp_dir
 from simulation import Simulation
 
 ex = ["gwf_ats_lak_01a"]
 exdirs = []
 for s in ex:
-    exdirs.append(os.path.join("temp", s))
+    exdirs.append(get_temp_dir(s))
 
 # store global gwf for subsequent plotting
 gwf = None
@@ -19,13 +19,13 @@ except:
     msg += " pip install flopy"
     raise Exception(msg)
 
-from framework import testing_framework
+from framework import testing_framework, get_temp_dir
 from simulation import Simulation
 
 ex = ["aux01"]
 exdirs = []
 for s in ex:
-    exdirs.append(os.path.join("temp", s))
+    exdirs.append(get_temp_dir(s))
 auxvar1 = 101.0
 auxvar2 = 102.0
 
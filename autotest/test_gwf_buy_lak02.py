@@ -24,7 +24,7 @@ except:
     msg += " pip install flopy"
     raise Exception(msg)
 
-from framework import testing_framework
+from framework import testing_framework, get_temp_dir
 from simulation import Simulation
 
 ex = ["buy_lak_02a", "buy_lak_02b", "buy_lak_02c", "buy_lak_02d"]
@@ -32,7 +32,7 @@ gwt_conc_list = [0.0, 35.0, 35.0, 0.0]
 lak_conc_list = [0.0, 35.0, 0.0, 35.0]
 exdirs = []
 for s in ex:
-    exdirs.append(os.path.join("temp", s))
+    exdirs.append(get_temp_dir(s))
 
 
 def build_model(idx, dir):
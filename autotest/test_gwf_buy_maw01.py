@@ -22,7 +22,7 @@ except:
     msg += " pip install flopy"
     raise Exception(msg)
 
-from framework import testing_framework
+from framework import testing_framework, get_temp_dir
 from simulation import Simulation
 
 ex = ["buy_maw_01a"]  # , 'buy_maw_01b', 'buy_maw_01c']
@@ -30,7 +30,7 @@ buy_on_list = [False]  # , True, True]
 concbuylist = [0.0]  # , 0., 35.]
 exdirs = []
 for s in ex:
-    exdirs.append(os.path.join("temp", s))
+    exdirs.append(get_temp_dir(s))
 
 
 def build_model(idx, dir):
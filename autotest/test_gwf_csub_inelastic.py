@@ -18,7 +18,7 @@ except:
     msg += " pip install flopy"
     raise Exception(msg)
 
-from framework import testing_framework, running_on_CI
+from framework import testing_framework, running_on_CI, get_temp_dir
 from simulation import Simulation
 
 paktest = "csub"
@@ -27,7 +27,7 @@ budtol = 1e-2
 ex = ["csub_de01a"]
 exdirs = []
 for s in ex:
-    exdirs.append(os.path.join("temp", s))
+    exdirs.append(get_temp_dir(s))
 ddir = "data"
 
 updatemat = [None, True]
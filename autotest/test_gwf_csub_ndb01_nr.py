@@ -18,7 +18,7 @@ except:
     msg += " pip install flopy"
     raise Exception(msg)
 
-from framework import testing_framework, running_on_CI
+from framework import testing_framework, running_on_CI, get_temp_dir
 from simulation import Simulation
 
 ex = (
@@ -33,7 +33,7 @@ ex = (
 )
 exdirs = []
 for s in ex:
-    exdirs.append(os.path.join("temp", s))
+    exdirs.append(get_temp_dir(s))
 newtons = (
     True,
     False,
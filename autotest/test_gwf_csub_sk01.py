@@ -18,13 +18,13 @@ except:
     msg += " pip install flopy"
     raise Exception(msg)
 
-from framework import testing_framework, running_on_CI
+from framework import testing_framework, running_on_CI, get_temp_dir
 from simulation import Simulation
 
 ex = ["csub_sk01a", "csub_sk01b", "csub_sk01c"]
 exdirs = []
 for s in ex:
-    exdirs.append(os.path.join("temp", s))
+    exdirs.append(get_temp_dir(s))
 cvopt = [None, None, None]
 constantcv = [True, True, True]
 ndelaybeds = [0, 0, 0]
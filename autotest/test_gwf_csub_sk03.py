@@ -19,13 +19,13 @@ except:
     msg += " pip install flopy"
     raise Exception(msg)
 
-from framework import testing_framework, running_on_CI
+from framework import testing_framework, running_on_CI, get_temp_dir
 from simulation import Simulation
 
 ex = ["csub_sk03a"]
 exdirs = []
 for s in ex:
-    exdirs.append(os.path.join("temp", s))
+    exdirs.append(get_temp_dir(s))
 constantcv = [True for idx in range(len(exdirs))]
 
 cmppths = ["mf6-regression" for idx in range(len(exdirs))]
@@ -18,14 +18,14 @@ except:
     msg += " pip install flopy"
     raise Exception(msg)
 
-from framework import testing_framework, running_on_CI
+from framework import testing_framework, running_on_CI, get_temp_dir
 from simulation import Simulation
 
 ex = ["csub_subwt02a", "csub_subwt02b", "csub_subwt02c", "csub_subwt02d"]
 timeseries = [True, False, True, False]
 exdirs = []
 for s in ex:
-    exdirs.append(os.path.join("temp", s))
+    exdirs.append(get_temp_dir(s))
 ddir = "data"
 cmppth = "mf6-regression"
 
@@ -19,11 +19,11 @@ except:
     msg += " pip install flopy"
     raise Exception(msg)
 
-from framework import testing_framework, running_on_CI
+from framework import testing_framework, running_on_CI, get_temp_dir
 from simulation import Simulation
 
 ex = ["csub_wc01a", "csub_wc02b"]
-exdirs = [os.path.join("temp", s) for s in ex]
+exdirs = [get_temp_dir(s) for s in ex]
 
 ddir = "data"
 cmppth = "mf6"
@@ -18,13 +18,13 @@ except:
     msg += " pip install https://github.com/modflowpy/pymake/zipball/master"
     raise Exception(msg)
 
-from framework import testing_framework, running_on_CI
+from framework import testing_framework, running_on_CI, get_temp_dir
 from simulation import Simulation
 
 ex = ["csub_zdisp01"]
 exdirs = []
 for s in ex:
-    exdirs.append(os.path.join("temp", s))
+    exdirs.append(get_temp_dir(s))
 
 cmppth = "mfnwt"
 
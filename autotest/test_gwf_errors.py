@@ -21,10 +21,11 @@ except:
     raise Exception(msg)
 
 import targets
+from framework import get_temp_dir
 
 mf6_exe = os.path.abspath(targets.target_dict["mf6"])
 testname = "gwf_errors"
-testdir = os.path.join("temp", testname)
+testdir = get_temp_dir(testname)
 os.makedirs(testdir, exist_ok=True)
 everything_was_successful = True
 
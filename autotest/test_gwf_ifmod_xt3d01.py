@@ -11,7 +11,7 @@ except:
     raise Exception(msg)
 
 from flopy.utils.lgrutil import Lgr
-from framework import testing_framework
+from framework import testing_framework, get_temp_dir
 from simulation import Simulation
 
 # Test for the interface model approach, when running
@@ -41,7 +41,7 @@ from simulation import Simulation
 ex = ["ifmod_xt3d01"]
 exdirs = []
 for s in ex:
-    exdirs.append(os.path.join("temp", s))
+    exdirs.append(get_temp_dir(s))
 
 # globally for convenience...
 useXT3D = True
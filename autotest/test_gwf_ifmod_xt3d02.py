@@ -11,7 +11,7 @@ except:
     raise Exception(msg)
 
 from flopy.utils.lgrutil import Lgr
-from framework import testing_framework
+from framework import testing_framework, get_temp_dir
 from simulation import Simulation
 
 # Test for the interface model approach.
@@ -42,7 +42,7 @@ from simulation import Simulation
 ex = ["ifmod_xt3d02"]
 exdirs = []
 for s in ex:
-    exdirs.append(os.path.join("temp", s))
+    exdirs.append(get_temp_dir(s))
 
 # global convenience...
 mname_ref = "refmodel"
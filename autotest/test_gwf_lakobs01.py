@@ -18,14 +18,14 @@ except:
     msg += " pip install flopy"
     raise Exception(msg)
 
-from framework import testing_framework
+from framework import testing_framework, get_temp_dir
 from simulation import Simulation
 import targets
 
 mf6_exe = os.path.abspath(targets.target_dict["mf6"])
 
 ex = "gwf_lakobs_01a"
-exdir = os.path.join("temp", ex)
+exdir = get_temp_dir(ex)
 
 
 # store global gwf for subsequent plotting
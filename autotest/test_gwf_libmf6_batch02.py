@@ -0,0 +1,302 @@
+"""
+MODFLOW 6 Autotest
+Test the batched access to variables in the bmi for a variable that is
+reallocated during the simulation. The cross-section data of the SFR
+package are reallocated when a cross-section table is read in the second
+stress period, after which the batch with the old buffer size must be
+rejected by libmf6 and a new batch must return the same values as
+get_value.
+"""
+
+import os
+import pytest
+import numpy as np
+from modflowapi import ModflowApi
+
+try:
+    import pymake
+except:
+    msg = "Error. Pymake package is not available.\n"
+    msg += "Try installing using the following command:\n"
+    msg += " pip install https://github.com/modflowpy/pymake/zipball/master"
+    raise Exception(msg)
+
+try:
+    import flopy
+except:
+    msg = "Error. FloPy package is not available.\n"
+    msg += "Try installing using the following command:\n"
+    msg += " pip install flopy"
+    raise Exception(msg)
+
+from framework import testing_framework, get_temp_dir
+from simulation import Simulation, api_return
+from xmi_batch import VariableBatch
+
+ex = ["libgwf_batch02"]
+exdirs = []
+for s in ex:
+    exdirs.append(get_temp_dir(s))
+
+# temporal discretization
+nper = 2
+tdis_rc = []
+for n in range(nper):
+    tdis_rc.append((1.0, 1, 1.0))
+
+# spatial discretization data
+nlay, nrow, ncol = 1, 1, 1
+delr, delc = 100.0, 100.0
+top = 0.0
+botm = -10.0
+strt = 0.0
+
+# sfr data
+sfr_packname = "SFR-1"
+nreaches = 2
+rlen = 50.0
+rwid = 10.0
+roughness = 0.001
+rbth = 1.0
+rhk = 0.0
+slope = 0.001
+ustrf = 1.0
+ndv = 0
+inflow = 1000.0
+
+# cross-section of the first reach, read in the second stress period
+xs_station = [0.0, 0.5, 1.0]
+xs_depth = [1.0, 0.0, 1.0]
+
+
+def get_model(ws, name):
+    sim = flopy.mf6.MFSimulation(
+        sim_name=name,
+        version="mf6",
+        exe_name="mf6",
+        sim_ws=ws,
+    )
+    # create tdis package
+    tdis = flopy.mf6.ModflowTdis(
+        sim,
+        time_units="seconds",
+        nper=nper,
+        perioddata=tdis_rc,
+    )
+
+    # create iterative model solution
+    ims = flopy.mf6.ModflowIms(sim, print_option="SUMMARY")
+
+    # create gwf model
+    gwf = flopy.mf6.ModflowGwf(sim, modelname=name, save_flows=True)
+
+    dis = flopy.mf6.ModflowGwfdis(
+        gwf,
+        length_units="meters",
+        nlay=nlay,
+        nrow=nrow,
+        ncol=ncol,
+        delr=delr,
+        delc=delc,
+        top=top,
+        botm=botm,
+    )
+
+    # initial conditions
+    ic = flopy.mf6.ModflowGwfic(gwf, strt=strt)
+
+    # node property flow
+    npf = flopy.mf6.ModflowGwfnpf(gwf)
+
+    # chd file
+    chd = flopy.mf6.ModflowGwfchd(gwf, stress_period_data=[[(0, 0, 0), 0.0]])
+
+    # sfr file
+    packagedata = []
+    connectiondata = []
+    for irch in range(nreaches):
+        packagedata.append(
+            [
+                irch,
+                "none",
+                rlen,
+                rwid,
+                slope,
+                top,
+                rbth,
+                rhk,
+                roughness,
+                1,
+                ustrf,
+                ndv,
+            ]
+        )
+        if irch == 0:
+            connectiondata.append([irch, -(irch + 1)])
+        else:
+            connectiondata.append([irch, irch - 1])
+
+    sfr_tab = "{}.sfr.tab".format(name)
+    flopy.mf6.ModflowUtlsfrtab(
+        gwf,
+        nrow=len(xs_station),
+        ncol=2,
+        table=[[x, d] for x, d in zip(xs_station, xs_depth)],
+        filename=sfr_tab,
+        pname="sfrtab",
+    ).write()
+    perioddata = {
+        0: [(0, "inflow", inflow)],
+        1: [(0, "cross_section", sfr_tab)],
+    }
+    sfr = flopy.mf6.ModflowGwfsfr(
+        gwf,
+        nreaches=nreaches,
+        packagedata=packagedata,
+        connectiondata=connectiondata,
+        perioddata=perioddata,
+        pname=sfr_packname,
+    )
+
+    # output control
+    oc = flopy.mf6.ModflowGwfoc(
+        gwf,
+        head_filerecord="{}.hds".format(name),
+        saverecord=[("HEAD", "ALL")],
+        printrecord=[("BUDGET", "ALL")],
+    )
+    return sim
+
+
+def build_model(idx, dir):
+    # build MODFLOW 6 files
+    ws = dir
+    name = ex[idx]
+    sim = get_model(ws, name)
+
+    # build comparison model
+    ws = os.path.join(dir, "libmf6")
+    mc = get_model(ws, name)
+
+    return sim, mc
+
+
+def api_func(exe, idx, model_ws=None):
+    success = False
+
+    name = ex[idx].upper()
+    if model_ws is None:
+        model_ws = "."
+
+    try:
+        mf6 = ModflowApi(exe, working_directory=model_ws)
+    except Exception as e:
+        print("Failed to load " + exe)
+        print("with message: " + str(e))
+        return api_return(success, model_ws)
+
+    # initialize the model
+    try:
+        mf6.initialize()
+    except:
+        return api_return(success, model_ws)
+
+    # a batch with the cross-section stations, which are reallocated when
+    # the cross-section table is read, and the heads
+    station_tag = mf6.get_var_address("STATION", name, sfr_packname)
+    head_tag = mf6.get_var_address("X", name)
+    batch = VariableBatch(mf6, [station_tag, head_tag])
+    size0 = batch.buffer.size
+
+    # model time loop
+    current_time = mf6.get_current_time()
+    end_time = mf6.get_end_time()
+    kper = 0
+    while current_time < end_time:
+        kper += 1
+
+        # prepare... and reads the SFR data from file
+        dt = mf6.get_time_step()
+        mf6.prepare_time_step(dt)
+
+        station = mf6.get_value(station_tag)
+        if station.size == batch.values[0].size:
+            batch.get()
+        else:
+            # the stations have been reallocated, the old batch may not
+            # access the buffer
+            try:
+                batch.get()
+                rejected = False
+            except Exception:
+                rejected = True
+            assert rejected, "batch accessed reallocated variable"
+            try:
+                batch.set()
+                rejected = False
+            except Exception:
+                rejected = True
+            assert rejected, "batch set reallocated variable"
+            batch = VariableBatch(mf6, [station_tag, head_tag])
+            batch.get()
+        assert np.array_equal(
+            batch.values[0], station
+        ), "batched stations differ from get_value"
+        if kper == 2:
+            assert (
+                batch.buffer.size > size0
+            ), "stations were not reallocated in stress period 2"
+
+        mf6.do_time_step()
+        mf6.finalize_time_step()
+
+        # update time
+        current_time = mf6.get_current_time()
+
+    # cleanup
+    try:
+        mf6.finalize()
+        success = True
+    except:
+        return api_return(success, model_ws)
+
+    # cleanup and return
+    return api_return(success, model_ws)
+
+
+# - No need to change any code below
+@pytest.mark.parametrize(
+    "idx, dir",
+    list(enumerate(exdirs)),
+)
+def test_mf6model(idx, dir):
+    # initialize testing framework
+    test = testing_framework()
+
+    # build the models
+    test.build_mf6_models(build_model, idx, dir)
+
+    # run the test model
+    test.run_mf6(Simulation(dir, idxsim=idx, api_func=api_func))
+
+
+def main():
+    # initialize testing framework
+    test = testing_framework()
+
+    # build the models
+    # run the test model
+    for idx, dir in enumerate(exdirs):
+        test.build_mf6_models(build_model, idx, dir)
+        sim = Simulation(dir, idxsim=idx, api_func=api_func)
+        test.run_mf6(sim)
+
+    return
+
+
+if __name__ == "__main__":
+    # print message
+    print("standalone run of {}".format(os.path.basename(__file__)))
+
+    # run main routine
+    main()
@@ -0,0 +1,384 @@
+"""
+MODFLOW 6 Autotest
+Test the checkpoint and restore of the state of a simulation through the
+xmi. The simulation is saved in the middle of a stress period that uses
+adaptive time stepping, advanced a number of time steps, restored and
+advanced again, which must reproduce the time and the heads exactly. A
+restore after the stress period input beyond the checkpoint has been read
+must fail. The checkpoint file is also restored in a second instance of
+libmf6, which replays the stress period input up to the checkpoint and is
+run to the end of the simulation with the same result. The heads of the
+simulation are compared with a run of the mf6 executable.
+"""
+
+import os
+import shutil
+import pytest
+import numpy as np
+from modflowapi import ModflowApi
+
+try:
+    import pymake
+except:
+    msg = "Error. Pymake package is not available.\n"
+    msg += "Try installing using the following command:\n"
+    msg += " pip install https://github.com/modflowpy/pymake/zipball/master"
+    raise Exception(msg)
+
+try:
+    import flopy
+except:
+    msg = "Error. FloPy package is not available.\n"
+    msg += "Try installing using the following command:\n"
+    msg += " pip install flopy"
+    raise Exception(msg)
+
+from framework import testing_framework, get_temp_dir
+from simulation import Simulation, api_return
+from xmi_checkpoint import (
+    save_checkpoint,
+    restore_checkpoint,
+    save_checkpoint_file,
+    restore_checkpoint_file,
+)
+
+ex = ["libgwf_chkp01"]
+exdirs = []
+for s in ex:
+    exdirs.append(get_temp_dir(s))
+
+# temporal discretization, the second stress period uses adaptive time
+# stepping and the well rate changes in the third stress period
+nper = 4
+perlen = 10.0
+tdis_rc = []
+for i in range(nper):
+    tdis_rc.append((perlen, 2, 1.0))
+
+# set dt0, dtmin, dtmax, dtadj, dtfailadj of the adaptive stress period
+kper_ats = 2
+dt0 = 1.0
+dtmin = 0.01
+dtmax = 10.0
+dtadj = 2.0
+dtfailadj = 5.0
+
+# number of time steps that are run after the checkpoint before it is
+# restored
+nstp_rewind = 2
+
+# model spatial dimensions
+nlay, nrow, ncol = 1, 1, 20
+
+# cell spacing
+delr = 50.0
+delc = 1.0
+
+# top and bottom of the aquifer
+top = 25.0
+botm = 0.0
+
+# hydraulic conductivity and storage
+hk = 50.0
+ss = 1e-4
+sy = 0.1
+
+# boundary heads
+h1 = 20.0
+h2 = 11.0
+
+# build chd stress period data
+chd_spd = {0: [[(0, 0, 0), h1], [(0, 0, ncol - 1), h2]]}
+
+# build wel stress period data
+wel_spd = {
+    0: [[(0, 0, ncol // 2), -10.0]],
+    2: [[(0, 0, ncol // 2), -50.0]],
+}
+
+strt = np.linspace(h1, h2, num=ncol)
+
+# solver data
+nouter, ninner = 100, 300
+hclose, rclose, relax = 1e-9, 1e-3, 0.97
+
+
+def get_model(ws, name):
+    sim = flopy.mf6.MFSimulation(
+        sim_name=name,
+        version="mf6",
+        exe_name="mf6",
+        sim_ws=ws,
+    )
+
+    # create ats and tdis package
+    atsperiod = [(kper_ats - 1, dt0, dtmin, dtmax, dtadj, dtfailadj)]
+    ats = flopy.mf6.ModflowUtlats(
+        sim, maxats=len(atsperiod), perioddata=atsperiod
+    )
+    tdis = flopy.mf6.ModflowTdis(
+        sim,
+        ats_filerecord=name + ".ats",
+        time_units="DAYS",
+        nper=nper,
+        perioddata=tdis_rc,
+    )
+
+    # create iterative model solution
+    ims = flopy.mf6.ModflowIms(
+        sim,
+        print_option="SUMMARY",
+        outer_dvclose=hclose,
+        outer_maximum=nouter,
+        inner_maximum=ninner,
+        inner_dvclose=hclose,
+        rcloserecord=rclose,
+        linear_acceleration="BICGSTAB",
+        relaxation_factor=relax,
+    )
+
+    # create gwf model
+    gwf = flopy.mf6.ModflowGwf(sim, modelname=name, save_flows=True)
+
+    dis = flopy.mf6.ModflowGwfdis(
+        gwf,
+        nlay=nlay,
+        nrow=nrow,
+        ncol=ncol,
+        delr=delr,
+        delc=delc,
+        top=top,
+        botm=botm,
+    )
+
+    # initial conditions
+    ic = flopy.mf6.ModflowGwfic(gwf, strt=strt)
+
+    # node property flow
+    npf = flopy.mf6.ModflowGwfnpf(gwf, save_flows=True, k=hk)
+
+    # storage
+    sto = flopy.mf6.ModflowGwfsto(
+        gwf,
+        iconvert=0,
+        ss=ss,
+        sy=sy,
+        transient={0: True},
+    )
+
+    # chd file
+    chd = flopy.mf6.ModflowGwfchd(gwf, stress_period_data=chd_spd)
+
+    # wel file
+    wel = flopy.mf6.ModflowGwfwel(gwf, stress_period_data=wel_spd)
+
+    # output control, the heads are only saved at the end of a stress
+    # period so that the time steps that are run again after a restore
+    # do not add records to the head file
+    oc = flopy.mf6.ModflowGwfoc(
+        gwf,
+        head_filerecord="{}.hds".format(name),
+        saverecord=[("HEAD", "LAST")],
+        printrecord=[("BUDGET", "LAST")],
+    )
+    return sim
+
+
+def build_model(idx, dir):
+    # build MODFLOW 6 files
+    ws = dir
+    name = ex[idx]
+    sim = get_model(ws, name)
+
+    # build comparison model
+    ws = os.path.join(dir, "libmf6")
+    mc = get_model(ws, name)
+
+    return sim, mc
+
+
+def run_time_step(mf6, name):
+    """Run a single time step and return the time and the heads"""
+    mf6.update()
+    head = mf6.get_value(mf6.get_var_address("X", name.upper()))
+    return mf6.get_current_time(), head
+
+
+def get_kper(mf6):
+    return int(mf6.get_value(mf6.get_var_address("KPER", "TDIS"))[0])
+
+
+def api_func(exe, idx, model_ws=None):
+    success = False
+
+    name = ex[idx]
+
+    if model_ws is None:
+        model_ws = "."
+
+    # input files and library for the second instance of libmf6, a copy
+    # of the library is loaded because a library is only loaded once by
+    # the process
+    restart_ws = os.path.join(model_ws, "restart")
+    shutil.copytree(
+        model_ws, restart_ws, ignore=shutil.ignore_patterns("restart")
+    )
+    root, ext = os.path.splitext(os.path.basename(exe))
+    restart_exe = os.path.join(restart_ws, root + "_restart" + ext)
+    shutil.copy(exe, restart_exe)
+
+    try:
+        mf6 = ModflowApi(exe, working_directory=model_ws)
+    except Exception as e:
+        print("Failed to load " + exe)
+        print("with message: " + str(e))
+        return api_return(success, model_ws)
+
+    # initialize the model
+    try:
+        mf6.initialize()
+    except:
+        return api_return(success, model_ws)
+
+    # run to the end of the first time step of the adaptive stress period
+    try:
+        while get_kper(mf6) < kper_ats:
+            mf6.update()
+    except:
+        return api_return(success, model_ws)
+
+    # checkpoint of the simulation
+    try:
+        buffer = save_checkpoint(mf6)
+        save_checkpoint_file(mf6, "checkpoint.bin")
+    except:
+        return api_return(success, model_ws)
+    time_checkpoint = mf6.get_current_time()
+    print(
+        "checkpoint of {} bytes at time {}".format(
+            buffer.size, time_checkpoint
+        )
+    )
+
+    # run, restore and run again
+    results = []
+    for i in range(2):
+        result = []
+        try:
+            for n in range(nstp_rewind):
+                result.append(run_time_step(mf6, name))
+            if i == 0:
+                restore_checkpoint(mf6, buffer)
+        except:
+            return api_return(success, model_ws)
+        results.append(result)
+        if i == 0:
+            assert (
+                mf6.get_current_time() == time_checkpoint
+            ), "time after restore ({}) is not ".format(
+                mf6.get_current_time()
+            ) + "the time of the checkpoint ({})".format(
+                time_checkpoint
+            )
+
+    # the time steps must be in the adaptive stress period and reproduce
+    # the time step length and the heads
+    for (t0, h0), (t1, h1) in zip(*results):
+        print("time step to {} and {}".format(t0, t1))
+        assert t0 < kper_ats * perlen, "time steps leave the stress period"
+        assert t0 == t1, "time of the time steps after restore differ"
+        assert np.array_equal(h0, h1), "heads after restore differ"
+
+    # run the rest of the simulation, a restore after the input of the
+    # next stress period has been read is not possible
+    try:
+        while get_kper(mf6) == kper_ats:
+            mf6.update()
+    except:
+        return api_return(success, model_ws)
+    try:
+        restore_checkpoint(mf6, buffer)
+        restored = True
+    except:
+        restored = False
+    assert not restored, "restore after reading the input of period 3"
+
+    current_time = mf6.get_current_time()
+    end_time = mf6.get_end_time()
+    while current_time < end_time:
+        try:
+            mf6.update()
+        except:
+            return api_return(success, model_ws)
+        current_time = mf6.get_current_time()
+    head = mf6.get_value(mf6.get_var_address("X", name.upper())).copy()
+
+    # cleanup
+    try:
+        mf6.finalize()
+        success = True
+    except:
+        return api_return(success, model_ws)
+
+    # restore the checkpoint file in the second instance and run to the
+    # end of the simulation
+    mf6 = ModflowApi(restart_exe, working_directory=restart_ws)
+    mf6.initialize()
+    restore_checkpoint_file(mf6, os.path.join("..", "checkpoint.bin"))
+    assert mf6.get_current_time() == time_checkpoint, (
+        "time after restore in the second instance "
+        + "({}) is not the time of the checkpoint".format(
+            mf6.get_current_time()
+        )
+    )
+    current_time = mf6.get_current_time()
+    end_time = mf6.get_end_time()
+    while current_time < end_time:
+        mf6.update()
+        current_time = mf6.get_current_time()
+    head_restart = mf6.get_value(mf6.get_var_address("X", name.upper()))
+    mf6.finalize()
+    assert np.array_equal(
+        head, head_restart
+    ), "heads of the restored simulation differ"
+
+    # cleanup and return
+    return api_return(success, model_ws)
+
+
+# - No need to change any code below
+@pytest.mark.parametrize(
+    "idx, dir",
+    list(enumerate(exdirs)),
+)
+def test_mf6model(idx, dir):
+    # initialize testing framework
+    test = testing_framework()
+
+    # build the models
+    test.build_mf6_models(build_model, idx, dir)
+
+    # run the test model
+    test.run_mf6(Simulation(dir, idxsim=idx, api_func=api_func))
+
+
+def main():
+    # initialize testing framework
+    test = testing_framework()
+
+    # build the models
+    # run the test model
+    for idx, dir in enumerate(exdirs):
+        test.build_mf6_models(build_model, idx, dir)
+        sim = Simulation(dir, idxsim=idx, api_func=api_func)
+        test.run_mf6(sim)
+
+    return
+
+
+if __name__ == "__main__":
+    # print message
+    print("standalone run of {}".format(os.path.basename(__file__)))
+
+    # run main routine
+    main()
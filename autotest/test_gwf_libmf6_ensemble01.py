@@ -0,0 +1,304 @@
+"""
+MODFLOW 6 Autotest
+Test the process-parallel ensemble runner for libmf6. The members of the
+ensemble override the specific storage of the model after initialize()
+and the heads at the end of every stress period are returned through
+shared memory. Members without overrides must reproduce the heads of the
+simulation run through the bmi in this process, members with the same
+overrides must have the same heads independent of the worker that ran
+them, and a different specific storage must change the heads. The heads
+of the simulation run through the bmi are compared with a run of the mf6
+executable.
+"""
+
+import os
+import pytest
+import numpy as np
+from modflowapi import ModflowApi
+
+try:
+    import pymake
+except:
+    msg = "Error. Pymake package is not available.\n"
+    msg += "Try installing using the following command:\n"
+    msg += " pip install https://github.com/modflowpy/pymake/zipball/master"
+    raise Exception(msg)
+
+try:
+    import flopy
+except:
+    msg = "Error. FloPy package is not available.\n"
+    msg += "Try installing using the following command:\n"
+    msg += " pip install flopy"
+    raise Exception(msg)
+
+from framework import testing_framework, get_temp_dir
+from simulation import Simulation, api_return
+from xmi_ensemble import run_ensemble
+
+ex = ["libgwf_ens01"]
+exdirs = []
+for s in ex:
+    exdirs.append(get_temp_dir(s))
+
+# number of worker processes of the ensemble
+nworkers = 2
+
+# specific storage of the members, None runs the simulation without an
+# override
+ss_members = [None, 1e-1, 1e-3, 1e-1, None, 1e-3]
+
+# temporal discretization
+nper = 3
+tdis_rc = []
+for i in range(nper):
+    tdis_rc.append((10.0, 5, 1.0))
+
+# model spatial dimensions
+nlay, nrow, ncol = 1, 1, 20
+
+# cell spacing
+delr = 50.0
+delc = 1.0
+
+# top and bottom of the aquifer
+top = 25.0
+botm = 0.0
+
+# hydraulic conductivity and specific storage
+hk = 50.0
+ss = 1e-2
+
+# boundary heads
+h1 = 20.0
+h2 = 11.0
+
+# build chd stress period data
+chd_spd = {0: [[(0, 0, 0), h1], [(0, 0, ncol - 1), h2]]}
+
+# build wel stress period data
+wel_spd = {
+    0: [[(0, 0, ncol // 2), -10.0]],
+    1: [[(0, 0, ncol // 2), -50.0]],
+    2: [[(0, 0, ncol // 2), 0.0]],
+}
+
+strt = np.linspace(h1, h2, num=ncol)
+
+# solver data
+nouter, ninner = 100, 300
+hclose, rclose, relax = 1e-9, 1e-3, 0.97
+
+
+def get_model(ws, name):
+    sim = flopy.mf6.MFSimulation(
+        sim_name=name,
+        version="mf6",
+        exe_name="mf6",
+        sim_ws=ws,
+    )
+    # create tdis package
+    tdis = flopy.mf6.ModflowTdis(
+        sim, time_units="DAYS", nper=nper, perioddata=tdis_rc
+    )
+
+    # create iterative model solution
+    ims = flopy.mf6.ModflowIms(
+        sim,
+        print_option="SUMMARY",
+        outer_dvclose=hclose,
+        outer_maximum=nouter,
+        inner_maximum=ninner,
+        inner_dvclose=hclose,
+        rcloserecord=rclose,
+        linear_acceleration="BICGSTAB",
+        relaxation_factor=relax,
+    )
+
+    # create gwf model
+    gwf = flopy.mf6.ModflowGwf(sim, modelname=name, save_flows=True)
+
+    dis = flopy.mf6.ModflowGwfdis(
+        gwf,
+        nlay=nlay,
+        nrow=nrow,
+        ncol=ncol,
+        delr=delr,
+        delc=delc,
+        top=top,
+        botm=botm,
+    )
+
+    # initial conditions
+    ic = flopy.mf6.ModflowGwfic(gwf, strt=strt)
+
+    # node property flow
+    npf = flopy.mf6.ModflowGwfnpf(gwf, save_flows=True, k=hk)
+
+    # storage
+    sto = flopy.mf6.ModflowGwfsto(
+        gwf,
+        iconvert=0,
+        ss=ss,
+        transient={0: True},
+    )
+
+    # chd file
+    chd = flopy.mf6.ModflowGwfchd(gwf, stress_period_data=chd_spd)
+
+    # wel file
+    wel = flopy.mf6.ModflowGwfwel(gwf, stress_period_data=wel_spd)
+
+    # output control
+    oc = flopy.mf6.ModflowGwfoc(
+        gwf,
+        head_filerecord="{}.hds".format(name),
+        saverecord=[("HEAD", "ALL")],
+        printrecord=[("BUDGET", "LAST")],
+    )
+    return sim
+
+
+def build_model(idx, dir):
+    # build MODFLOW 6 files
+    ws = dir
+    name = ex[idx]
+    sim = get_model(ws, name)
+
+    # build comparison model
+    ws = os.path.join(dir, "libmf6")
+    mc = get_model(ws, name)
+
+    return sim, mc
+
+
+def api_func(exe, idx, model_ws=None):
+    success = False
+
+    name = ex[idx].upper()
+    head_address = "{}/X".format(name)
+    ss_address = "{}/STO/SS".format(name)
+
+    if model_ws is None:
+        model_ws = "."
+
+    # run the ensemble before the library is loaded in this process
+    members = []
+    for value in ss_members:
+        if value is None:
+            members.append({})
+        else:
+            members.append({ss_address: value})
+    try:
+        result = run_ensemble(
+            exe,
+            model_ws,
+            members,
+            [head_address],
+            nworkers=nworkers,
+            verbose=True,
+        )
+    except Exception as e:
+        print("ensemble run failed with message: " + str(e))
+        return api_return(success, model_ws)
+
+    try:
+        mf6 = ModflowApi(exe, working_directory=model_ws)
+    except Exception as e:
+        print("Failed to load " + exe)
+        print("with message: " + str(e))
+        return api_return(success, model_ws)
+
+    # initialize the model
+    try:
+        mf6.initialize()
+    except:
+        return api_return(success, model_ws)
+
+    # model time loop, the heads are saved at the end of every stress
+    # period
+    head = []
+    current_time = mf6.get_current_time()
+    end_time = mf6.get_end_time()
+    while current_time < end_time:
+
+        # run the time step
+        try:
+            mf6.update()
+        except:
+            return api_return(success, model_ws)
+
+        # update time
+        current_time = mf6.get_current_time()
+        if np.isclose(current_time % tdis_rc[0][0], 0.0):
+            head.append(mf6.get_value(head_address))
+    head = np.array(head)
+
+    # cleanup
+    try:
+        mf6.finalize()
+        success = True
+    except:
+        return api_return(success, model_ws)
+
+    # evaluate the ensemble
+    heads = result.outputs[head_address]
+    shape = (len(members), nper, nlay * nrow * ncol)
+    assert (
+        heads.shape == shape
+    ), "unexpected shape of the ensemble heads {}".format(heads.shape)
+    assert not result.failed, "members {} failed".format(result.failed)
+    for imember, value in enumerate(ss_members):
+        if value is None:
+            assert np.array_equal(
+                heads[imember], head
+            ), "heads of member {} differ from the bmi run".format(imember)
+        else:
+            jmember = ss_members.index(value)
+            assert np.array_equal(
+                heads[imember], heads[jmember]
+            ), "heads of members {} and {} differ".format(imember, jmember)
+            assert not np.allclose(
+                heads[imember, 0], head[0]
+            ), "specific storage of member {} not set".format(imember)
+
+    # cleanup and return
+    return api_return(success, model_ws)
+
+
+# - No need to change any code below
+@pytest.mark.parametrize(
+    "idx, dir",
+    list(enumerate(exdirs)),
+)
+def test_mf6model(idx, dir):
+    # initialize testing framework
+    test = testing_framework()
+
+    # build the models
+    test.build_mf6_models(build_model, idx, dir)
+
+    # run the test model
+    test.run_mf6(Simulation(dir, idxsim=idx, api_func=api_func))
+
+
+def main():
+    # initialize testing framework
+    test = testing_framework()
+
+    # build the models
+    # run the test model
+    for idx, dir in enumerate(exdirs):
+        test.build_mf6_models(build_model, idx, dir)
+        sim = Simulation(dir, idxsim=idx, api_func=api_func)
+        test.run_mf6(sim)
+
+    return
+
+
+if __name__ == "__main__":
+    # print message
+    print("standalone run of {}".format(os.path.basename(__file__)))
+
+    # run main routine
+    main()
@@ -0,0 +1,293 @@
+"""
+MODFLOW 6 Autotest
+Benchmark the lookup of variables in the memory manager through the bmi.
+The simulation has enough models for a memory list with tens of thousands
+of variables. The pointers to the first and the last variable in the
+memory list are retrieved many times with get_value_ptr, which looks up the
+variable for the rank, type, shape and the pointer, and the minimum time of
+a number of repetitions is reported. The time it takes to look up the last
+variable may not depend on the number of variables in front of it in the
+memory list, the ratio of the times is only checked against a generous
+limit because the timings also include the overhead of the Python calls.
+"""
+
+import os
+import time
+import pytest
+import numpy as np
+from modflowapi import ModflowApi
+
+try:
+    import pymake
+except:
+    msg = "Error. Pymake package is not available.\n"
+    msg += "Try installing using the following command:\n"
+    msg += " pip install https://github.com/modflowpy/pymake/zipball/master"
+    raise Exception(msg)
+
+try:
+    import flopy
+except:
+    msg = "Error. FloPy package is not available.\n"
+    msg += "Try installing using the following command:\n"
+    msg += " pip install flopy"
+    raise Exception(msg)
+
+from framework import testing_framework, get_temp_dir
+from simulation import Simulation, api_return
+
+ex = ["libgwf_memlookup01"]
+exdirs = []
+for s in ex:
+    exdirs.append(get_temp_dir(s))
+
+# number of groundwater flow models, which sets the size of the memory list
+nmodels = 80
+
+# minimum number of variables in the memory list
+min_variables = 20000
+
+# number of lookups of each variable and number of repetitions
+nlookup = 2000
+nrepeat = 7
+
+# maximum ratio of the lookup times of the last and the first variable,
+# a scan of the memory list is orders of magnitude slower
+max_ratio = 5.0
+
+# temporal discretization
+nper = 2
+tdis_rc = []
+for i in range(nper):
+    tdis_rc.append((1.0, 1, 1))
+
+# model spatial dimensions
+nlay, nrow, ncol = 1, 1, 10
+
+# cell spacing
+delr = 50.0
+delc = 1.0
+
+# top and bottom of the aquifer
+top = 25.0
+botm = 0.0
+
+# hydraulic conductivity
+hk = 50.0
+
+# boundary heads
+h1 = 20.0
+h2 = 11.0
+
+# build chd stress period data
+chd_spd = {0: [[(0, 0, 0), h1], [(0, 0, ncol - 1), h2]]}
+
+strt = np.linspace(h1, h2, num=ncol)
+
+# solver data
+nouter, ninner = 100, 300
+hclose, rclose, relax = 1e-9, 1e-3, 0.97
+
+
+def get_model(ws, name):
+    sim = flopy.mf6.MFSimulation(
+        sim_name=name,
+        version="mf6",
+        exe_name="mf6",
+        sim_ws=ws,
+    )
+    # create tdis package
+    tdis = flopy.mf6.ModflowTdis(
+        sim, time_units="DAYS", nper=nper, perioddata=tdis_rc
+    )
+
+    # create iterative model solution
+    ims = flopy.mf6.ModflowIms(
+        sim,
+        print_option="SUMMARY",
+        outer_dvclose=hclose,
+        outer_maximum=nouter,
+        inner_maximum=ninner,
+        inner_dvclose=hclose,
+        rcloserecord=rclose,
+        linear_acceleration="BICGSTAB",
+        relaxation_factor=relax,
+    )
+
+    # create the gwf models
+    mnames = []
+    for n in range(nmodels):
+        mname = "gwf_{}".format(n + 1)
+        mnames.append(mname)
+        gwf = flopy.mf6.ModflowGwf(sim, modelname=mname, save_flows=True)
+
+        dis = flopy.mf6.ModflowGwfdis(
+            gwf,
+            nlay=nlay,
+            nrow=nrow,
+            ncol=ncol,
+            delr=delr,
+            delc=delc,
+            top=top,
+            botm=botm,
+        )
+
+        # initial conditions
+        ic = flopy.mf6.ModflowGwfic(gwf, strt=strt)
+
+        # node property flow
+        npf = flopy.mf6.ModflowGwfnpf(gwf, save_flows=True, k=hk)
+
+        # chd file
+        chd = flopy.mf6.ModflowGwfchd(gwf, stress_period_data=chd_spd)
+
+        # output control
+        oc = flopy.mf6.ModflowGwfoc(
+            gwf,
+            head_filerecord="{}.hds".format(mname),
+            saverecord=[("HEAD", "ALL")],
+            printrecord=[("BUDGET", "ALL")],
+        )
+    sim.register_ims_package(ims, mnames)
+    return sim
+
+
+def build_model(idx, dir):
+    # build MODFLOW 6 files
+    ws = dir
+    name = ex[idx]
+    sim = get_model(ws, name)
+
+    # build comparison model
+    ws = os.path.join(dir, "libmf6")
+    mc = get_model(ws, name)
+
+    return sim, mc
+
+
+def get_lookup_time(mf6, address):
+    """Return the minimum time of nrepeat times nlookup get_value_ptr calls"""
+    elapsed = []
+    for i in range(nrepeat):
+        t0 = time.perf_counter()
+        for n in range(nlookup):
+            mf6.get_value_ptr(address)
+        elapsed.append(time.perf_counter() - t0)
+    return min(elapsed)
+
+
+def api_func(exe, idx, model_ws=None):
+    success = False
+
+    if model_ws is None:
+        model_ws = "."
+
+    try:
+        mf6 = ModflowApi(exe, working_directory=model_ws)
+    except Exception as e:
+        print("Failed to load " + exe)
+        print("with message: " + str(e))
+        return api_return(success, model_ws)
+
+    # initialize the model
+    try:
+        mf6.initialize()
+    except:
+        return api_return(success, model_ws)
+
+    # the first and the last double precision array in the memory list,
+    # so both lookups return the same kind of pointer
+    variables = mf6.get_input_var_names()
+    addresses = [
+        address
+        for address in variables
+        if mf6.get_var_type(address).startswith("DOUBLE")
+        and mf6.get_var_rank(address) == 1
+    ]
+    first, last = addresses[0], addresses[-1]
+
+    # benchmark the lookups
+    t_first = get_lookup_time(mf6, first)
+    t_last = get_lookup_time(mf6, last)
+    ratio = t_last / t_first
+    msg = (
+        "{} variables in the memory list\n".format(len(variables))
+        + "{} lookups of {}: {:.6f} s\n".format(nlookup, first, t_first)
+        + "{} lookups of {}: {:.6f} s\n".format(nlookup, last, t_last)
+        + "ratio: {:.2f}".format(ratio)
+    )
+    print(msg)
+    if len(variables) < min_variables:
+        print(
+            "the memory list has less than "
+            + "{} variables".format(min_variables)
+        )
+        return api_return(success, model_ws)
+    if ratio > max_ratio:
+        print(
+            "lookup of the last variable is more than "
+            + "{} times slower than of the first variable".format(max_ratio)
+        )
+        return api_return(success, model_ws)
+
+    # model time loop
+    current_time = mf6.get_current_time()
+    end_time = mf6.get_end_time()
+    while current_time < end_time:
+
+        # run the time step
+        try:
+            mf6.update()
+        except:
+            return api_return(success, model_ws)
+
+        # update time
+        current_time = mf6.get_current_time()
+
+    # cleanup
+    try:
+        mf6.finalize()
+        success = True
+    except:
+        return api_return(success, model_ws)
+
+    # cleanup and return
+    return api_return(success, model_ws)
+
+
+# - No need to change any code below
+@pytest.mark.parametrize(
+    "idx, dir",
+    list(enumerate(exdirs)),
+)
+def test_mf6model(idx, dir):
+    # initialize testing framework
+    test = testing_framework()
+
+    # build the models
+    test.build_mf6_models(build_model, idx, dir)
+
+    # run the test model
+    test.run_mf6(Simulation(dir, idxsim=idx, api_func=api_func))
+
+
+def main():
+    # initialize testing framework
+    test = testing_framework()
+
+    # build the models
+    # run the test model
+    for idx, dir in enumerate(exdirs):
+        test.build_mf6_models(build_model, idx, dir)
+        sim = Simulation(dir, idxsim=idx, api_func=api_func)
+        test.run_mf6(sim)
+
+    return
+
+
+if __name__ == "__main__":
+    # print message
+    print("standalone run of {}".format(os.path.basename(__file__)))
+
+    # run main routine
+    main()
@@ -0,0 +1,301 @@
+"""
+MODFLOW 6 Autotest
+Test the discovery of the variables under a memory path prefix through the
+bmi. The addresses, types, ranks and shapes returned in pages for a model,
+a package and the whole simulation are compared to the values returned by
+get_input_var_names, get_var_type, get_var_rank and get_var_shape.
+"""
+
+import os
+import time
+import pytest
+import numpy as np
+from modflowapi import ModflowApi
+
+try:
+    import pymake
+except:
+    msg = "Error. Pymake package is not available.\n"
+    msg += "Try installing using the following command:\n"
+    msg += " pip install https://github.com/modflowpy/pymake/zipball/master"
+    raise Exception(msg)
+
+try:
+    import flopy
+except:
+    msg = "Error. FloPy package is not available.\n"
+    msg += "Try installing using the following command:\n"
+    msg += " pip install flopy"
+    raise Exception(msg)
+
+from framework import testing_framework, get_temp_dir
+from simulation import Simulation, api_return
+from xmi_discovery import get_variables, get_variable_count
+
+ex = ["libgwf_vars01"]
+exdirs = []
+for s in ex:
+    exdirs.append(get_temp_dir(s))
+
+# the models, the variables of GWF_10 may not be found for the prefix GWF_1
+mnames = ["gwf_1", "gwf_2", "gwf_10"]
+
+# memory path prefixes, the page size is small to test the pagination
+prefixes = ["GWF_1", "GWF_10", "GWF_2/NPF", "TDIS", ""]
+page_size = 7
+
+# temporal discretization
+nper = 2
+tdis_rc = []
+for i in range(nper):
+    tdis_rc.append((1.0, 1, 1))
+
+# model spatial dimensions
+nlay, nrow, ncol = 1, 1, 10
+
+# cell spacing
+delr = 50.0
+delc = 1.0
+
+# top and bottom of the aquifer
+top = 25.0
+botm = 0.0
+
+# hydraulic conductivity
+hk = 50.0
+
+# boundary heads
+h1 = 20.0
+h2 = 11.0
+
+# build chd stress period data
+chd_spd = {0: [[(0, 0, 0), h1], [(0, 0, ncol - 1), h2]]}
+
+strt = np.linspace(h1, h2, num=ncol)
+
+# solver data
+nouter, ninner = 100, 300
+hclose, rclose, relax = 1e-9, 1e-3, 0.97
+
+
+def get_model(ws, name):
+    sim = flopy.mf6.MFSimulation(
+        sim_name=name,
+        version="mf6",
+        exe_name="mf6",
+        sim_ws=ws,
+    )
+    # create tdis package
+    tdis = flopy.mf6.ModflowTdis(
+        sim, time_units="DAYS", nper=nper, perioddata=tdis_rc
+    )
+
+    # create iterative model solution
+    ims = flopy.mf6.ModflowIms(
+        sim,
+        print_option="SUMMARY",
+        outer_dvclose=hclose,
+        outer_maximum=nouter,
+        inner_maximum=ninner,
+        inner_dvclose=hclose,
+        rcloserecord=rclose,
+        linear_acceleration="BICGSTAB",
+        relaxation_factor=relax,
+    )
+
+    # create the gwf models
+    for mname in mnames:
+        gwf = flopy.mf6.ModflowGwf(sim, modelname=mname, save_flows=True)
+
+        dis = flopy.mf6.ModflowGwfdis(
+            gwf,
+            nlay=nlay,
+            nrow=nrow,
+            ncol=ncol,
+            delr=delr,
+            delc=delc,
+            top=top,
+            botm=botm,
+        )
+
+        # initial conditions
+        ic = flopy.mf6.ModflowGwfic(gwf, strt=strt)
+
+        # node property flow
+        npf = flopy.mf6.ModflowGwfnpf(gwf, save_flows=True, k=hk)
+
+        # chd file
+        chd = flopy.mf6.ModflowGwfchd(gwf, stress_period_data=chd_spd)
+
+        # output control
+        oc = flopy.mf6.ModflowGwfoc(
+            gwf,
+            head_filerecord="{}.hds".format(mname),
+            saverecord=[("HEAD", "ALL")],
+            printrecord=[("BUDGET", "ALL")],
+        )
+    sim.register_ims_package(ims, mnames)
+    return sim
+
+
+def build_model(idx, dir):
+    # build MODFLOW 6 files
+    ws = dir
+    name = ex[idx]
+    sim = get_model(ws, name)
+
+    # build comparison model
+    ws = os.path.join(dir, "libmf6")
+    mc = get_model(ws, name)
+
+    return sim, mc
+
+
+def get_expected(addresses, prefix):
+    """Return the addresses under the prefix"""
+    expected = []
+    for address in addresses:
+        path = address.rsplit("/", 1)[0]
+        if prefix == "" or path == prefix or path.startswith(prefix + "/"):
+            expected.append(address)
+    return expected
+
+
+def check_variables(mf6, addresses, prefix):
+    """Return an error message when the discovered variables are wrong"""
+    expected = get_expected(addresses, prefix)
+    variables = get_variables(mf6, prefix, page_size=page_size)
+    found = [var.address for var in variables]
+    if found != expected:
+        return "prefix '{}': {} variables found, {} expected".format(
+            prefix, len(found), len(expected)
+        )
+    if get_variable_count(mf6, prefix) != len(expected):
+        return "prefix '{}': variable count differs".format(prefix)
+
+    for var in variables:
+        vtype = mf6.get_var_type(var.address)
+        if var.type != vtype:
+            return "{}: type {} is not {}".format(var.address, var.type, vtype)
+        if var.rank < 0:
+            # character variables and deallocated arrays have no rank
+            try:
+                mf6.get_var_rank(var.address)
+            except:
+                continue
+            return "{}: no rank for type {}".format(var.address, vtype)
+        rank = mf6.get_var_rank(var.address)
+        if var.rank != rank:
+            return "{}: rank {} is not {}".format(var.address, var.rank, rank)
+        shape = tuple(int(v) for v in mf6.get_var_shape(var.address))
+        if var.shape != shape:
+            return "{}: shape {} is not {}".format(
+                var.address, var.shape, shape
+            )
+    return None
+
+
+def api_func(exe, idx, model_ws=None):
+    success = False
+
+    if model_ws is None:
+        model_ws = "."
+
+    try:
+        mf6 = ModflowApi(exe, working_directory=model_ws)
+    except Exception as e:
+        print("Failed to load " + exe)
+        print("with message: " + str(e))
+        return api_return(success, model_ws)
+
+    # initialize the model
+    try:
+        mf6.initialize()
+    except:
+        return api_return(success, model_ws)
+
+    # check the variables under each of the prefixes
+    addresses = mf6.get_input_var_names()
+    for prefix in prefixes:
+        msg = check_variables(mf6, addresses, prefix)
+        if msg is not None:
+            print(msg)
+            return api_return(success, model_ws)
+
+    # time the discovery of a model with and without the prefix
+    t0 = time.perf_counter()
+    variables = get_variables(mf6, "GWF_10")
+    t1 = time.perf_counter()
+    for address in get_expected(mf6.get_input_var_names(), "GWF_10"):
+        mf6.get_var_type(address)
+        try:
+            mf6.get_var_shape(address)
+        except:
+            pass
+    t2 = time.perf_counter()
+    print(
+        "discovery of {} variables: ".format(len(variables))
+        + "{:.4f} s with prefix, {:.4f} s without".format(t1 - t0, t2 - t1)
+    )
+
+    # model time loop
+    current_time = mf6.get_current_time()
+    end_time = mf6.get_end_time()
+    while current_time < end_time:
+
+        # run the time step
+        try:
+            mf6.update()
+        except:
+            return api_return(success, model_ws)
+
+        # update time
+        current_time = mf6.get_current_time()
+
+    # cleanup
+    try:
+        mf6.finalize()
+        success = True
+    except:
+        return api_return(success, model_ws)
+
+    # cleanup and return
+    return api_return(success, model_ws)
+
+
+# - No need to change any code below
+@pytest.mark.parametrize(
+    "idx, dir",
+    list(enumerate(exdirs)),
+)
+def test_mf6model(idx, dir):
+    # initialize testing framework
+    test = testing_framework()
+
+    # build the models
+    test.build_mf6_models(build_model, idx, dir)
+
+    # run the test model
+    test.run_mf6(Simulation(dir, idxsim=idx, api_func=api_func))
+
+
+def main():
+    # initialize testing framework
+    test = testing_framework()
+
+    # build the models
+    # run the test model
+    for idx, dir in enumerate(exdirs):
+        test.build_mf6_models(build_model, idx, dir)
+        sim = Simulation(dir, idxsim=idx, api_func=api_func)
+        test.run_mf6(sim)
+
+    return
+
+
+if __name__ == "__main__":
+    # print message
+    print("standalone run of {}".format(os.path.basename(__file__)))
+
+    # run main routine
+    main()
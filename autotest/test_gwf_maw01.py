@@ -18,14 +18,14 @@ except:
     msg += " pip install flopy"
     raise Exception(msg)
 
-from framework import testing_framework
+from framework import testing_framework, get_temp_dir
 from simulation import Simulation
 
 ex = ["maw01", "maw01nwt", "maw01nwtur"]
 newtonoptions = [None, "NEWTON", "NEWTON UNDER_RELAXATION"]
 exdirs = []
 for s in ex:
-    exdirs.append(os.path.join("temp", s))
+    exdirs.append(get_temp_dir(s))
 ddir = "data"
 
 
@@ -13,13 +13,13 @@ except:
     msg += " pip install flopy"
     raise Exception(msg)
 
-from framework import testing_framework
+from framework import testing_framework, get_temp_dir
 from simulation import Simulation
 
 ex = ("maw_09a", "maw_09b", "maw_09c", "maw_09d")
 exdirs = []
 for s in ex:
-    exdirs.append(os.path.join("temp", s))
+    exdirs.append(get_temp_dir(s))
 dis_option = ("dis", "dis", "disv", "disv")
 flow_correction = (None, True, None, True)
 
@@ -25,7 +25,7 @@ except:
     msg += " pip install flopy"
     raise Exception(msg)
 
-from framework import testing_framework
+from framework import testing_framework, get_temp_dir
 from simulation import Simulation
 import targets
 
@@ -33,7 +33,7 @@ mf6_exe = os.path.abspath(targets.target_dict["mf6"])
 
 newtonoptions = [None, "NEWTON", "NEWTON UNDER_RELAXATION"]
 ex = "maw_obs"
-exdir = os.path.join("temp", ex)
+exdir = get_temp_dir(ex)
 
 ddir = "data"
 
@@ -14,14 +14,14 @@ except:
     msg += " pip install flopy"
     raise Exception(msg)
 
-from framework import testing_framework
+from framework import testing_framework, get_temp_dir
 from simulation import Simulation
 
 mf6exe = os.path.abspath(targets.target_dict["mf6"])
 
 name = "gwf"
 mvr_scens = ["mltmvr", "mltmvr5050", "mltmvr7525"]
-ws = os.path.join("temp", name)
+ws = get_temp_dir(name)
 exdirs = [f"{ws}-{s}" for s in mvr_scens]
 sim_workspaces = []
 gwf_names = []
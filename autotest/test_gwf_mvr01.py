@@ -10,11 +10,11 @@ except:
     msg += " pip install flopy"
     raise Exception(msg)
 
-from framework import testing_framework
+from framework import testing_framework, get_temp_dir
 from simulation import Simulation
 
 name = "gwf_mvr01"
-ws = os.path.join("temp", name)
+ws = get_temp_dir(name)
 exdirs = [ws]
 
 
@@ -11,7 +11,7 @@ except:
     msg += " pip install flopy"
     raise Exception(msg)
 
-from framework import testing_framework
+from framework import testing_framework, get_temp_dir
 from simulation import Simulation
 
 ex = ["npf01a_75x75", "npf01b_75x75"]
@@ -21,7 +21,7 @@ ss = [0.0, 1.0e-4]
 sy = [0.1, 0.0]
 exdirs = []
 for s in ex:
-    exdirs.append(os.path.join("temp", s))
+    exdirs.append(get_temp_dir(s))
 ddir = "data"
 
 
@@ -13,10 +13,11 @@ except:
     raise Exception(msg)
 
 import targets
+from framework import get_temp_dir
 
 mf6_exe = os.path.abspath(targets.target_dict["mf6"])
 name = "gwf_ret_codes01"
-ws = os.path.join("temp", name)
+ws = get_temp_dir(name)
 app = "mf6"
 if sys.platform.lower() == "win32":
     app += ".exe"
@@ -13,7 +13,7 @@ except:
     msg += " pip install flopy"
     raise Exception(msg)
 
-from framework import testing_framework
+from framework import testing_framework, get_temp_dir
 from simulation import Simulation
 
 import targets
@@ -22,7 +22,7 @@ mf6_exe = os.path.abspath(targets.target_dict["mf6"])
 
 paktest = "sfr"
 testname = "ts_sfr01"
-testdir = os.path.join("temp", testname)
+testdir = get_temp_dir(testname)
 os.makedirs(testdir, exist_ok=True)
 everything_was_successful = True
 
@@ -10,7 +10,7 @@ except:
     msg += " pip install flopy"
     raise Exception(msg)
 
-from framework import testing_framework
+from framework import testing_framework, get_temp_dir
 from simulation import Simulation
 
 paktest = "sfr"
@@ -26,7 +26,7 @@ ex = [
     "sfr_npt01h",
     "sfr_npt01i",
 ]
-exdirs = [os.path.join("temp", s) for s in ex]
+exdirs = [get_temp_dir(s) for s in ex]
 
 xsect_types = (
     "wide",
@@ -10,7 +10,7 @@ except:
     msg += " pip install flopy"
     raise Exception(msg)
 
-from framework import testing_framework
+from framework import testing_framework, get_temp_dir
 from simulation import Simulation
 
 paktest = "sfr"
@@ -18,7 +18,7 @@ paktest = "sfr"
 ex = [
     "sfr_npt02a",
 ]
-exdirs = [os.path.join("temp", s) for s in ex]
+exdirs = [get_temp_dir(s) for s in ex]
 
 # temporal discretization
 nper = 10
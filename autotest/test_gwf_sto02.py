@@ -23,7 +23,7 @@ except:
     msg += " pip install flopy"
     raise Exception(msg)
 
-from framework import testing_framework
+from framework import testing_framework, get_temp_dir
 from simulation import Simulation
 
 ex = ["gwf_sto02a", "gwf_sto02b"]
@@ -31,7 +31,7 @@ ncols = [1, 2]
 
 exdirs = []
 for s in ex:
-    exdirs.append(os.path.join("temp", s))
+    exdirs.append(get_temp_dir(s))
 ddir = "data"
 
 nlay, nrow, = (
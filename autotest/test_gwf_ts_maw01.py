@@ -10,14 +10,14 @@ except:
     msg += " pip install flopy"
     raise Exception(msg)
 
-from framework import testing_framework
+from framework import testing_framework, get_temp_dir
 from simulation import Simulation
 
 paktest = "maw"
 ex = ["ts_{}01".format(paktest)]
 exdirs = []
 for s in ex:
-    exdirs.append(os.path.join("temp", s))
+    exdirs.append(get_temp_dir(s))
 
 # run all examples on Travis
 continuous_integration = [True for idx in range(len(exdirs))]
@@ -23,7 +23,7 @@ except:
     msg += " pip install flopy"
     raise Exception(msg)
 
-from framework import testing_framework
+from framework import testing_framework, get_temp_dir
 from simulation import Simulation
 
 ex = ["gwf_utl05"]
@@ -32,7 +32,7 @@ ss = [1.0e-10]
 sy = [0.1]
 exdirs = []
 for s in ex:
-    exdirs.append(os.path.join("temp", s))
+    exdirs.append(get_temp_dir(s))
 ddir = "data"
 nlay, nrow, ncol = 1, 1, 1
 
@@ -21,7 +21,7 @@ except:
     raise Exception(msg)
 
 import flopy.utils.binaryfile as bf
-from framework import testing_framework
+from framework import testing_framework, get_temp_dir
 from simulation import Simulation
 
 mf6_exe = os.path.abspath(targets.target_dict["mf6"])
@@ -33,7 +33,7 @@ iuz_cell_dict = {}
 cell_iuz_dict = {}
 
 for s in ex:
-    exdirs.append(os.path.join("temp", s))
+    exdirs.append(get_temp_dir(s))
 
 nlay, nrow, ncol = 3, 1, 10
 nper = 6
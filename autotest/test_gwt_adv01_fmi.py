@@ -18,7 +18,7 @@ except:
     msg += " pip install flopy"
     raise Exception(msg)
 
-from framework import testing_framework
+from framework import testing_framework, get_temp_dir
 from simulation import Simulation
 from binary_file_writer import write_head, write_budget, uniform_flow_field
 
@@ -26,7 +26,7 @@ ex = ["adv01a_fmi", "adv01b_fmi", "adv01c_fmi"]
 scheme = ["upstream", "central", "tvd"]
 exdirs = []
 for s in ex:
-    exdirs.append(os.path.join("temp", s))
+    exdirs.append(get_temp_dir(s))
 ddir = "data"
 
 
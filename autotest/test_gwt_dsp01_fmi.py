@@ -19,7 +19,7 @@ except:
     msg += " pip install flopy"
     raise Exception(msg)
 
-from framework import testing_framework
+from framework import testing_framework, get_temp_dir
 from simulation import Simulation
 from binary_file_writer import write_head, write_budget
 
@@ -27,7 +27,7 @@ ex = ["dsp01a_fmi", "dsp01b_fmi"]
 xt3d = [False, True]
 exdirs = []
 for s in ex:
-    exdirs.append(os.path.join("temp", s))
+    exdirs.append(get_temp_dir(s))
 ddir = "data"
 
 
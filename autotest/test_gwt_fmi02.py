@@ -23,10 +23,11 @@ except:
 
 
 import targets
+from framework import get_temp_dir
 
 exe_name_mf6 = targets.target_dict["mf6"]
 exe_name_mf6 = os.path.abspath(exe_name_mf6)
-testdir = "./temp"
+testdir = get_temp_dir()
 testgroup = "fmi02"
 d = os.path.join(testdir, testgroup)
 if os.path.isdir(d):
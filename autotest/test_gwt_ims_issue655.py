@@ -26,7 +26,7 @@ except:
     msg += " pip install flopy"
     raise Exception(msg)
 
-from framework import testing_framework
+from framework import testing_framework, get_temp_dir
 from simulation import Simulation
 
 ex = ["issue655a", "issue655b"]
@@ -39,7 +39,7 @@ ss = [1.0e-10]
 sy = [0.1]
 exdirs = []
 for s in ex:
-    exdirs.append(os.path.join("temp", s))
+    exdirs.append(get_temp_dir(s))
 nlay, nrow, ncol = 1, 11, 11
 
 
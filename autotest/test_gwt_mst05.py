@@ -17,7 +17,7 @@ except:
     msg += " pip install flopy"
     raise Exception(msg)
 
-from framework import testing_framework
+from framework import testing_framework, get_temp_dir
 from simulation import Simulation
 from binary_file_writer import write_head, write_budget, uniform_flow_field
 
@@ -29,7 +29,7 @@ xmax_plot = [1500, 500]
 ymax_plot = [0.5, 1.0]
 exdirs = []
 for s in ex:
-    exdirs.append(os.path.join("temp", s))
+    exdirs.append(get_temp_dir(s))
 ddir = "data"
 
 
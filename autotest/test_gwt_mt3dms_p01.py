@@ -42,11 +42,12 @@ except:
     raise Exception(msg)
 
 import targets
+from framework import get_temp_dir
 
 exe_name_mf = targets.target_dict["mf2005s"]
 exe_name_mt = targets.target_dict["mt3dms"]
 exe_name_mf6 = targets.target_dict["mf6"]
-testdir = "./temp"
+testdir = get_temp_dir()
 testgroup = "mt3dms_p01"
 remove_files = True
 
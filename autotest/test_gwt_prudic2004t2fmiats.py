@@ -27,12 +27,13 @@ except:
 
 
 import targets
+from framework import get_temp_dir
 
 exe_name_mf6 = targets.target_dict["mf6"]
 exe_name_mf6 = os.path.abspath(exe_name_mf6)
 
 data_ws = os.path.abspath("./data/prudic2004test2/")
-testdir = "./temp"
+testdir = get_temp_dir()
 testgroup = "prudic2004t2fmiats"
 d = os.path.join(testdir, testgroup)
 if os.path.isdir(d):
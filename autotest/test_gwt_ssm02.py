@@ -27,7 +27,7 @@ except:
     msg += " pip install flopy"
     raise Exception(msg)
 
-from framework import testing_framework
+from framework import testing_framework, get_temp_dir
 from simulation import Simulation
 
 ex = ["ssm02"]
@@ -36,7 +36,7 @@ ss = [1.0e-10]
 sy = [0.1]
 exdirs = []
 for s in ex:
-    exdirs.append(os.path.join("temp", s))
+    exdirs.append(get_temp_dir(s))
 nlay, nrow, ncol = 1, 1, 1
 
 
@@ -0,0 +1,138 @@
+"""
+MODFLOW 6 Autotest
+Test the memory-mapped head file reader in binary_file_reader.py. Head
+files with the DIS (ncol, nrow, ilay), DISV (ncpl, 1, ilay) and DISU
+(nodes, 1, 1) record layouts are written with flopy in single and double
+precision, and the times, shapes, get_data, get_alldata and get_ts results
+of the reader are compared with flopy.utils.HeadFile.
+"""
+
+import os
+import shutil
+import pytest
+import numpy as np
+
+try:
+    import flopy
+except:
+    msg = "Error. FloPy package is not available.\n"
+    msg += "Try installing using the following command:\n"
+    msg += " pip install flopy"
+    raise Exception(msg)
+
+from framework import get_temp_dir
+from binary_file_reader import HeadFile
+
+# grid type and the (nlay, nrow, ncol) shape of the records
+grids = {
+    "dis": (3, 4, 5),
+    "disv": (2, 1, 7),
+    "disu": (1, 1, 11),
+}
+
+# (kstp, kper, pertim, totim) of the saved times
+times = [(1, 1, 1.0, 1.0), (1, 2, 2.5, 3.5), (2, 2, 5.0, 6.0)]
+
+cases = [
+    (grid, precision) for grid in grids for precision in ("single", "double")
+]
+
+
+def write_head_file(fpth, shape, precision):
+    """Write a head file with flopy and return the data for every time"""
+    nlay, nrow, ncol = shape
+    dtype = np.float32 if precision == "single" else np.float64
+    data = np.arange(len(times) * nlay * nrow * ncol, dtype=dtype)
+    data = data.reshape((len(times),) + shape) * 0.5 - 10.0
+    with open(fpth, "wb") as f:
+        for itime, (kstp, kper, pertim, totim) in enumerate(times):
+            for k in range(nlay):
+                header = flopy.utils.BinaryHeader.create(
+                    bintype="head",
+                    precision=precision,
+                    text="HEAD",
+                    nrow=nrow,
+                    ncol=ncol,
+                    ilay=k + 1,
+                    pertim=pertim,
+                    totim=totim,
+                    kstp=kstp,
+                    kper=kper,
+                )
+                flopy.utils.Util2d.write_bin(
+                    (nrow, ncol), f, data[itime, k], header_data=header
+                )
+    return data
+
+
+@pytest.mark.parametrize("grid, precision", cases)
+def test_head_file(grid, precision):
+    ws = get_temp_dir("binary_file_reader")
+    if not os.path.isdir(ws):
+        os.makedirs(ws)
+    fpth = os.path.join(ws, "{}_{}.hds".format(grid, precision))
+    shape = grids[grid]
+    data = write_head_file(fpth, shape, precision)
+
+    hfile = HeadFile(fpth)
+    fhfile = flopy.utils.HeadFile(fpth, precision=precision)
+
+    # times and shapes
+    assert hfile.realtype == data.dtype, "precision was not detected"
+    assert len(hfile) == len(times) * shape[0], "unexpected number of records"
+    assert hfile.shape == shape, "unexpected shape {}".format(hfile.shape)
+    assert np.allclose(hfile.get_times(), fhfile.get_times())
+    assert hfile.get_kstpkper() == [
+        (int(k), int(p)) for k, p in fhfile.get_kstpkper()
+    ]
+
+    # data for a time and a layer
+    for itime, totim in enumerate(fhfile.get_times()):
+        fdata = fhfile.get_data(totim=totim)
+        assert np.array_equal(hfile.get_data(idx=itime), fdata)
+        assert np.array_equal(hfile.get_data(totim=totim), fdata)
+        assert np.array_equal(hfile.get_data(idx=itime), data[itime])
+        for k in range(shape[0]):
+            assert np.array_equal(
+                hfile.get_data(idx=itime, mflay=k),
+                fhfile.get_data(totim=totim, mflay=k),
+            )
+    kstpkper = fhfile.get_kstpkper()[1]
+    assert np.array_equal(
+        hfile.get_data(kstpkper=kstpkper),
+        fhfile.get_data(kstpkper=kstpkper),
+    )
+
+    # data for all times
+    alldata = hfile.get_alldata()
+    assert alldata.shape == (len(times),) + shape
+    assert np.array_equal(alldata, fhfile.get_alldata())
+    assert np.array_equal(
+        hfile.get_alldata(mflay=shape[0] - 1),
+        fhfile.get_alldata(mflay=shape[0] - 1),
+    )
+
+    # time series of the first and the last cell
+    idx = [(0, 0, 0), (shape[0] - 1, shape[1] - 1, shape[2] - 1)]
+    ts = hfile.get_ts(idx)
+    assert ts.shape == (len(times), len(idx) + 1)
+    assert np.allclose(ts, fhfile.get_ts(idx))
+
+    hfile.close()
+    fhfile.close()
+    os.remove(fpth)
+
+
+def main():
+    for grid, precision in cases:
+        test_head_file(grid, precision)
+    ws = get_temp_dir("binary_file_reader")
+    shutil.rmtree(ws, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    # print message
+    print("standalone run of {}".format(os.path.basename(__file__)))
+
+    # run main routine
+    main()
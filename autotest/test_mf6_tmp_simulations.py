@@ -18,6 +18,7 @@ except:
     msg += " pip install flopy"
     raise Exception(msg)
 
+from framework import get_temp_dir
 from simulation import Simulation
 
 exdir = os.path.join("..", "tmp_simulations")
@@ -119,7 +120,7 @@ def run_mf6(sim):
     """
     print(os.getcwd())
     src = os.path.join(exdir, sim.name)
-    dst = os.path.join("temp", sim.name)
+    dst = get_temp_dir(sim.name)
     sim.setup(src, dst)
     sim.run()
     sim.compare()
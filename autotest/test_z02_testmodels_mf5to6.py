@@ -22,10 +22,12 @@ except:
     msg += " pip install flopy"
     raise Exception(msg)
 
+from framework import get_temp_dir
 from simulation import Simulation
 
 from targets import target_dict as target_dict
 from targets import get_mf6_version
+from durations import record_duration, select_models
 from common_regression import (
     get_home_dir,
     get_example_basedir,
@@ -36,6 +38,9 @@ from common_regression import (
     set_mf6_regression,
 )
 
+# name of the test suite used to record durations
+suite = os.path.splitext(os.path.basename(__file__))[0]
+
 
 # find path to examples directory
 home = get_home_dir()
@@ -113,6 +118,10 @@ def get_mf5to6_models():
             msg += "]"
             print(msg)
 
+    # order the models from longest to shortest and select the models
+    # in the current shard
+    example_dirs = select_models(suite, example_dirs)
+
     return example_dirs
 
 
@@ -122,8 +131,9 @@ def run_mf5to6(sim):
     appropriate MODFLOW-2005, MODFLOW-NWT, MODFLOW-USG, or MODFLOW-LGR run.
 
     """
+    t0 = time.perf_counter()
     src = os.path.join(example_basedir, sim.name)
-    dst = os.path.join("temp", "working")
+    dst = get_temp_dir("working")
     os.makedirs(dst, exist_ok=True)
 
     # set lgrpth to None
@@ -183,7 +193,7 @@ def run_mf5to6(sim):
 
     # standard setup
     src = dst
-    dst = os.path.join("temp", sim.name)
+    dst = get_temp_dir(sim.name)
     sim.setup(src, dst)
 
     # clean up temp/working directory (src)
@@ -196,6 +206,7 @@ def run_mf5to6(sim):
     # standard comparison run
     sim.run()
     sim.compare()
+    record_duration(suite, sim.name, time.perf_counter() - t0)
     sim.teardown()
 
 
@@ -1,6 +1,7 @@
 import os
 import pytest
 import sys
+import time
 
 try:
     import pymake
@@ -18,8 +19,10 @@ except:
     msg += " pip install flopy"
     raise Exception(msg)
 
+from framework import get_temp_dir
 from simulation import Simulation
 from targets import get_mf6_version
+from durations import record_duration, select_models
 from common_regression import (
     get_home_dir,
     get_example_basedir,
@@ -30,6 +33,9 @@ from common_regression import (
     set_mf6_regression,
 )
 
+# name of the test suite used to record durations
+suite = os.path.splitext(os.path.basename(__file__))[0]
+
 home = get_home_dir()
 
 find_dir = "modflow6-largetestmodels"
@@ -104,6 +110,10 @@ def get_mf6_models():
             msg += "]"
             print(msg)
 
+    # order the models from longest to shortest and select the models
+    # in the current shard
+    example_dirs = select_models(suite, example_dirs)
+
     return example_dirs
 
 
@@ -114,11 +124,13 @@ def run_mf6(sim):
 
     """
     print(os.getcwd())
+    t0 = time.perf_counter()
     src = os.path.join(example_basedir, sim.name)
-    dst = os.path.join("temp", sim.name)
+    dst = get_temp_dir(sim.name)
     sim.setup(src, dst)
     sim.run()
     sim.compare()
+    record_duration(suite, sim.name, time.perf_counter() - t0)
     sim.teardown()
 
 
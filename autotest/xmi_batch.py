@@ -0,0 +1,125 @@
+# batched access to the variables of a libmf6 simulation
+#
+# The values of many variables are copied from and to a single contiguous
+# buffer in one call using the variable handles of the batched XMI
+# functions in srcbmi/mf6xmiBatch.f90. The variable addresses are only
+# parsed once, when the batch is created, so coupled model drivers that
+# exchange many variables every time step avoid the cost of get_value and
+# set_value calls for each variable. The values of each variable are
+# available as a view of the buffer with the shape of the variable. The
+# size of the buffer is checked by libmf6 on every call, so get() and set()
+# fail when one of the variables has been reallocated to a different size
+# after the batch was created, and a new batch has to be created.
+#
+#     batch = VariableBatch(mf6, [riv_address, ghb_address])
+#     batch.get()
+#     batch.values[0][:, 0] = stage
+#     batch.set()
+
+import ctypes
+import numpy as np
+
+
+class VariableBatch(object):
+    """
+    Values of a list of libmf6 variables of the same type
+
+    Parameters
+    ----------
+    mf6 : ModflowApi
+        initialized libmf6 instance
+    addresses : list
+        variable addresses (from get_var_address())
+    dtype : numpy dtype
+        type of the variables (np.float64 or np.int32). (default is
+        np.float64)
+
+    Attributes
+    ----------
+    buffer : numpy.ndarray
+        contiguous buffer with the values of all of the variables
+    values : list
+        views of the buffer with the values of each variable
+
+    """
+
+    def __init__(self, mf6, addresses, dtype=np.float64):
+        self.mf6 = mf6
+        self.addresses = list(addresses)
+        self.dtype = np.dtype(dtype)
+        if self.dtype == np.float64:
+            self._ctype = ctypes.c_double
+            suffix = "double"
+        elif self.dtype == np.int32:
+            self._ctype = ctypes.c_int
+            suffix = "int"
+        else:
+            raise Exception("unsupported batch type {}".format(dtype))
+        self._get = getattr(mf6.lib, "get_value_handles_{}".format(suffix))
+        self._set = getattr(mf6.lib, "set_value_handles_{}".format(suffix))
+
+        # resolve the addresses
+        lenaddress = mf6.get_constant_int("BMI_LENVARADDRESS")
+        names = ctypes.create_string_buffer(
+            b"".join(
+                address.encode().ljust(lenaddress, b"\0")[:lenaddress]
+                for address in self.addresses
+            ),
+            lenaddress * len(self.addresses),
+        )
+        self._count = ctypes.c_int(len(self.addresses))
+        self.handles = np.zeros(len(self.addresses), dtype=np.int32)
+        mf6.execute_function(
+            mf6.lib.get_var_handles,
+            names,
+            ctypes.byref(self._count),
+            self._handles_ptr(),
+        )
+
+        size = ctypes.c_int(0)
+        mf6.execute_function(
+            mf6.lib.get_handles_size,
+            ctypes.byref(self._count),
+            self._handles_ptr(),
+            ctypes.byref(size),
+        )
+        self.buffer = np.zeros(size.value, dtype=self.dtype)
+
+        # views of the buffer with the shape of each variable
+        self.values = []
+        offset = 0
+        for address in self.addresses:
+            # the shape of a scalar is empty
+            shape = tuple(int(n) for n in mf6.get_var_shape(address))
+            n = int(np.prod(shape))
+            self.values.append(self.buffer[offset : offset + n].reshape(shape))
+            offset += n
+
+    def _handles_ptr(self):
+        return self.handles.ctypes.data_as(ctypes.POINTER(ctypes.c_int))
+
+    def _buffer_ptr(self):
+        return ctypes.byref(
+            self.buffer.ctypes.data_as(ctypes.POINTER(self._ctype))
+        )
+
+    def get(self):
+        """Copy the values of all of the variables into the buffer"""
+        self.mf6.execute_function(
+            self._get,
+            ctypes.byref(self._count),
+            self._handles_ptr(),
+            self._buffer_ptr(),
+            ctypes.byref(ctypes.c_int(self.buffer.size)),
+        )
+        return self.values
+
+    def set(self):
+        """Set the values of all of the variables from the buffer"""
+        self.mf6.execute_function(
+            self._set,
+            ctypes.byref(self._count),
+            self._handles_ptr(),
+            self._buffer_ptr(),
+            ctypes.byref(ctypes.c_int(self.buffer.size)),
+        )
@@ -0,0 +1,104 @@
+# checkpoint and restore of the state of a libmf6 simulation
+#
+# The state of a simulation is saved to a numpy buffer or a binary file and
+# restored later in the same or in a fresh process with the XMI functions
+# in srcbmi/mf6xmiCheckpoint.f90. A simulation that has read stress period
+# input beyond the stress period of the checkpoint can not be restored to
+# it, see the documentation of the module for the details.
+#
+#     buffer = save_checkpoint(mf6)
+#     for member in ensemble:
+#         restore_checkpoint(mf6, buffer)
+#         ...
+
+import ctypes
+import numpy as np
+from xmipy.utils import cd
+
+
+def _c_str(s):
+    return ctypes.c_char_p(str(s).encode())
+
+
+def save_checkpoint(mf6):
+    """
+    Save the state of the simulation
+
+    Parameters
+    ----------
+    mf6 : ModflowApi
+        initialized libmf6 instance
+
+    Returns
+    -------
+    buffer : numpy.ndarray
+        checkpoint of the simulation (np.uint8)
+
+    """
+    size = ctypes.c_longlong(0)
+    mf6.execute_function(mf6.lib.get_checkpoint_size, ctypes.byref(size))
+    buffer = np.zeros(size.value, dtype=np.uint8)
+    mf6.execute_function(
+        mf6.lib.save_checkpoint,
+        ctypes.byref(buffer.ctypes.data_as(ctypes.c_void_p)),
+        ctypes.byref(size),
+    )
+    return buffer
+
+
+def restore_checkpoint(mf6, buffer):
+    """
+    Restore the state of the simulation
+
+    Parameters
+    ----------
+    mf6 : ModflowApi
+        initialized libmf6 instance
+    buffer : numpy.ndarray
+        checkpoint from save_checkpoint()
+
+    """
+    buffer = np.ascontiguousarray(buffer, dtype=np.uint8)
+    size = ctypes.c_longlong(buffer.size)
+
+    # the stress period input may be read from file
+    with cd(mf6.working_directory):
+        mf6.execute_function(
+            mf6.lib.restore_checkpoint,
+            ctypes.byref(buffer.ctypes.data_as(ctypes.c_void_p)),
+            ctypes.byref(size),
+        )
+
+
+def save_checkpoint_file(mf6, fpth):
+    """
+    Save the state of the simulation to a binary file
+
+    Parameters
+    ----------
+    mf6 : ModflowApi
+        initialized libmf6 instance
+    fpth : str
+        path of the checkpoint file, relative to the working directory of
+        the simulation
+
+    """
+    with cd(mf6.working_directory):
+        mf6.execute_function(mf6.lib.save_checkpoint_file, _c_str(fpth))
+
+
+def restore_checkpoint_file(mf6, fpth):
+    """
+    Restore the state of the simulation from a binary file
+
+    Parameters
+    ----------
+    mf6 : ModflowApi
+        initialized libmf6 instance
+    fpth : str
+        path of the checkpoint file, relative to the working directory of
+        the simulation
+
+    """
+    with cd(mf6.working_directory):
+        mf6.execute_function(mf6.lib.restore_checkpoint_file, _c_str(fpth))
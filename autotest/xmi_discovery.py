@@ -0,0 +1,119 @@
+# discovery of the variables of a libmf6 simulation by memory path prefix
+#
+# The variables under a memory path prefix, for example a single model or
+# package, are returned in pages together with their type, rank and shape
+# by the XMI functions in srcbmi/mf6xmiDiscovery.f90. This avoids decoding
+# the addresses of all of the variables in the simulation returned by
+# get_input_var_names() and the calls to get_var_type(), get_var_rank()
+# and get_var_shape() for each variable.
+#
+#     for var in get_variables(mf6, "GWF_1/NPF"):
+#         print(var.address, var.type, var.shape)
+
+import ctypes
+from collections import namedtuple
+import numpy as np
+
+Variable = namedtuple("Variable", ["address", "type", "rank", "shape"])
+
+
+def _decode(buffer, stride, count):
+    names = []
+    for i in range(count):
+        name = buffer[i * stride : (i + 1) * stride]
+        names.append(name.split(b"\0", 1)[0].decode())
+    return names
+
+
+def get_variable_count(mf6, prefix=""):
+    """
+    Get the number of variables under a memory path prefix
+
+    Parameters
+    ----------
+    mf6 : ModflowApi
+        initialized libmf6 instance
+    prefix : str
+        memory path prefix, for example a model name. The variables of
+        the whole simulation are counted for an empty prefix. (default is
+        "")
+
+    Returns
+    -------
+    count : int
+        number of variables
+
+    """
+    count = ctypes.c_int(0)
+    mf6.execute_function(
+        mf6.lib.get_var_count_prefix,
+        ctypes.c_char_p(prefix.encode()),
+        ctypes.byref(count),
+    )
+    return count.value
+
+
+def get_variables(mf6, prefix="", page_size=1000):
+    """
+    Get the variables under a memory path prefix
+
+    Parameters
+    ----------
+    mf6 : ModflowApi
+        initialized libmf6 instance
+    prefix : str
+        memory path prefix, for example a model name ("GWF_1") or package
+        ("GWF_1/NPF"). All of the variables of the simulation are returned
+        for an empty prefix. (default is "")
+    page_size : int
+        maximum number of variables returned by a single call to libmf6.
+        (default is 1000)
+
+    Returns
+    -------
+    variables : list
+        Variable tuples with the address, type, rank and shape of the
+        variables, in the order of get_input_var_names(). The shape is a
+        tuple in C order, which is empty for scalars and None for
+        character variables and deallocated arrays, which have a rank
+        of -1.
+
+    """
+    lenaddress = mf6.get_constant_int("BMI_LENVARADDRESS")
+    lentype = mf6.get_constant_int("BMI_LENVARTYPE")
+    maxrank = mf6.get_constant_int("BMI_MAXVARRANK")
+
+    names = ctypes.create_string_buffer(lenaddress * page_size)
+    types = ctypes.create_string_buffer(lentype * page_size)
+    ranks = np.zeros(page_size, dtype=np.int32)
+    shapes = np.zeros((page_size, maxrank), dtype=np.int32)
+
+    variables = []
+    cursor = ctypes.c_int(0)
+    count = ctypes.c_int(0)
+    while cursor.value >= 0:
+        mf6.execute_function(
+            mf6.lib.get_var_names_prefix,
+            ctypes.c_char_p(prefix.encode()),
+            ctypes.byref(cursor),
+            ctypes.byref(ctypes.c_int(page_size)),
+            ctypes.byref(count),
+            names,
+            types,
+            ranks.ctypes.data_as(ctypes.POINTER(ctypes.c_int)),
+            shapes.ctypes.data_as(ctypes.POINTER(ctypes.c_int)),
+        )
+        n = count.value
+        for address, vtype, rank, shape in zip(
+            _decode(names.raw, lenaddress, n),
+            _decode(types.raw, lentype, n),
+            ranks[:n],
+            shapes[:n],
+        ):
+            rank = int(rank)
+            if rank < 0:
+                shape = None
+            else:
+                shape = tuple(int(v) for v in shape[:rank])
+            variables.append(Variable(address, vtype, rank, shape))
+    return variables
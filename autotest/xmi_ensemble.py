@@ -0,0 +1,359 @@
+# process-parallel ensemble runs of a libmf6 simulation
+#
+# The shared library keeps the state of the simulation in global variables,
+# so a process can only run one simulation at a time. The members of an
+# ensemble, for example the realizations of a Monte Carlo analysis, are
+# run in a pool of worker processes that each load their own copy of
+# libmf6 in their own copy of the simulation directory. A worker runs its
+# members one after the other: initialize(), set the parameter overrides of
+# the member with set_value(), run to the end of the simulation and
+# finalize(). The values of the selected output variables at the end of
+# every stress period are written directly into shared memory, so the
+# results do not have to be pickled or written to file. The number of
+# workers defaults to the number of autotest workers, see scheduler.py.
+#
+#     members = [{ss_address: ss} for ss in samples]
+#     result = run_ensemble(libmf6, model_ws, members, [head_address])
+#     head = result.outputs[head_address]  # (nmember, nper, ncell)
+#     print(result.report())
+
+import os
+import sys
+import time
+import shutil
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory, resource_tracker
+
+import numpy as np
+from modflowapi import ModflowApi
+
+from scheduler import get_max_workers
+
+# state of a worker process, set by _init_worker()
+_worker = {}
+
+
+class EnsembleResult(object):
+    """
+    Outputs and throughput of an ensemble run
+
+    Attributes
+    ----------
+    outputs : dict
+        values of the output variables by address, with the shape
+        (nmember, nper) + the shape of the variable. The values of members
+        that failed are NaN for double precision variables and zero for
+        integer variables.
+    failed : list
+        indices of the members that failed
+    run_times : numpy.ndarray
+        run time of each member in seconds
+    workers : numpy.ndarray
+        process id of the worker that ran each member
+    nworkers : int
+        number of worker processes
+    startup_time : float
+        time to start the workers and copy the simulation in seconds
+    elapsed : float
+        wall time of the ensemble run in seconds, including the startup
+
+    """
+
+    def __init__(self, outputs, failed, run_times, workers, nworkers):
+        self.outputs = outputs
+        self.failed = failed
+        self.run_times = run_times
+        self.workers = workers
+        self.nworkers = nworkers
+        self.startup_time = 0.0
+        self.elapsed = 0.0
+
+    @property
+    def nmember(self):
+        return self.run_times.size
+
+    @property
+    def throughput(self):
+        """Number of members run per hour"""
+        if self.elapsed <= 0.0:
+            return 0.0
+        return 3600.0 * self.nmember / self.elapsed
+
+    @property
+    def efficiency(self):
+        """Time spent running members as a fraction of the worker time"""
+        if self.elapsed <= 0.0:
+            return 0.0
+        return self.run_times.sum() / (self.nworkers * self.elapsed)
+
+    def report(self):
+        """
+        Summary of the throughput of the ensemble run
+
+        Returns
+        -------
+        report : str
+            multi-line summary
+
+        """
+        run_times = self.run_times[self.run_times > 0.0]
+        if run_times.size == 0:
+            run_times = np.zeros(1)
+        lines = [
+            "members:            {} ({} failed)".format(
+                self.nmember, len(self.failed)
+            ),
+            "workers:            {}".format(self.nworkers),
+            "startup time:       {:.3f} s".format(self.startup_time),
+            "elapsed time:       {:.3f} s".format(self.elapsed),
+            "member run time:    {:.3f} s mean, {:.3f} s min, "
+            "{:.3f} s max".format(
+                run_times.mean(), run_times.min(), run_times.max()
+            ),
+            "throughput:         {:.1f} members per hour".format(
+                self.throughput
+            ),
+            "worker efficiency:  {:.1%}".format(self.efficiency),
+        ]
+        pids, counts = np.unique(self.workers, return_counts=True)
+        for pid, count in zip(pids, counts):
+            if pid > 0:
+                lines.append(
+                    "  worker {:>8d}:   {} members".format(pid, count)
+                )
+        return "\n".join(lines)
+
+
+def run_ensemble(
+    libmf6,
+    model_ws,
+    members,
+    outputs,
+    nworkers=None,
+    ensemble_ws=None,
+    verbose=False,
+):
+    """
+    Run the members of an ensemble in a pool of worker processes
+
+    Parameters
+    ----------
+    libmf6 : str
+        path to the shared library
+    model_ws : str
+        path to the simulation directory, which is copied for every worker
+    members : list
+        one dict for each member with the values to set after
+        initialize(), by variable address. A value is broadcast to the
+        shape of the variable, so a scalar sets all of the values of an
+        array. An empty dict runs the simulation without changes.
+    outputs : list
+        addresses of the variables that are saved at the end of every
+        stress period
+    nworkers : int
+        number of worker processes. If nworkers is None, the value returned
+        by scheduler.get_max_workers() is used. (default is None)
+    ensemble_ws : str
+        directory with the copies of the simulation for the workers. The
+        directory is removed after the run. (default is
+        model_ws/ensemble)
+    verbose : bool
+        print the progress of the run and the report. (default is False)
+
+    Returns
+    -------
+    result : EnsembleResult
+        outputs and throughput of the run
+
+    """
+    t0 = time.perf_counter()
+    libmf6 = os.path.abspath(libmf6)
+    model_ws = os.path.abspath(model_ws)
+    if ensemble_ws is None:
+        ensemble_ws = os.path.join(model_ws, "ensemble")
+    ensemble_ws = os.path.abspath(ensemble_ws)
+    members = list(members)
+    outputs = list(outputs)
+    nmember = len(members)
+    if nworkers is None:
+        nworkers = get_max_workers()
+    nworkers = max(1, min(nworkers, nmember))
+
+    # the workers are forked where possible, a forked worker would share
+    # the state of a library that is loaded in this process, so every
+    # worker loads its own copy of the library file
+    if "fork" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("fork")
+    else:
+        context = multiprocessing.get_context()
+    slots = context.Queue()
+    for i in range(nworkers):
+        slots.put(i)
+
+    # the workers share the resource tracker of this process, which
+    # removes the shared memory of the outputs when it is unlinked here
+    if os.name == "posix":
+        resource_tracker.ensure_running()
+
+    if os.path.isdir(ensemble_ws):
+        shutil.rmtree(ensemble_ws)
+    os.makedirs(ensemble_ws)
+
+    blocks = []
+    try:
+        with ProcessPoolExecutor(
+            max_workers=nworkers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(libmf6, model_ws, ensemble_ws, slots),
+        ) as executor:
+            # the number of stress periods and the shape and type of the
+            # outputs
+            nper, specs = executor.submit(_get_output_specs, outputs).result()
+            startup_time = time.perf_counter() - t0
+
+            # shared memory for the outputs of all of the members
+            arrays = {}
+            output_specs = []
+            for address, (shape, dtype) in zip(outputs, specs):
+                shape = (nmember, nper) + tuple(shape)
+                dtype = np.dtype(dtype)
+                nbytes = max(1, int(np.prod(shape)) * dtype.itemsize)
+                block = shared_memory.SharedMemory(create=True, size=nbytes)
+                blocks.append(block)
+                array = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+                array[...] = np.nan if dtype.kind == "f" else 0
+                arrays[address] = array
+                output_specs.append((address, block.name, shape, dtype.str))
+
+            futures = [
+                executor.submit(_run_member, imember, overrides, output_specs)
+                for imember, overrides in enumerate(members)
+            ]
+            run_times = np.zeros(nmember)
+            workers = np.zeros(nmember, dtype=int)
+            failed = []
+            for ndone, future in enumerate(as_completed(futures), start=1):
+                imember, pid, run_time, msg = future.result()
+                run_times[imember] = run_time
+                workers[imember] = pid
+                if msg is not None:
+                    failed.append(imember)
+                if verbose:
+                    status = "ok" if msg is None else "failed: " + msg
+                    print(
+                        "member {} of {} ({}) {:.3f} s {}".format(
+                            ndone, nmember, imember, run_time, status
+                        )
+                    )
+
+            result = EnsembleResult(
+                {address: array.copy() for address, array in arrays.items()},
+                sorted(failed),
+                run_times,
+                workers,
+                nworkers,
+            )
+    except BrokenProcessPool:
+        raise Exception(
+            "an ensemble worker terminated, libmf6 may have stopped the "
+            + "process on an error in the simulation, see the mfsim.lst "
+            + "files in {}".format(ensemble_ws)
+        )
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+    shutil.rmtree(ensemble_ws, ignore_errors=True)
+    result.startup_time = startup_time
+    result.elapsed = time.perf_counter() - t0
+    if verbose:
+        print(result.report())
+    return result
+
+
+def _init_worker(libmf6, model_ws, ensemble_ws, slots):
+    """Copy the simulation and the library for a worker and load it"""
+    islot = slots.get()
+    ws = os.path.join(ensemble_ws, "worker_{}".format(islot))
+    shutil.copytree(
+        model_ws,
+        ws,
+        ignore=shutil.ignore_patterns(os.path.basename(ensemble_ws)),
+    )
+    root, ext = os.path.splitext(os.path.basename(libmf6))
+    exe = os.path.join(ws, "{}_worker{}{}".format(root, islot, ext))
+    shutil.copy(libmf6, exe)
+    _worker["mf6"] = ModflowApi(exe, working_directory=ws)
+    _worker["blocks"] = {}
+
+
+def _get_output_specs(outputs):
+    """Return the number of stress periods and the outputs shape and type"""
+    mf6 = _worker["mf6"]
+    mf6.initialize()
+    try:
+        nper = int(mf6.get_value(mf6.get_var_address("NPER", "TDIS"))[0])
+        specs = []
+        for address in outputs:
+            values = mf6.get_value(address)
+            shape = () if values.size == 1 else values.shape
+            specs.append((shape, values.dtype.str))
+    finally:
+        mf6.finalize()
+    return nper, specs
+
+
+def _get_output_array(imember, block_name, shape, dtype):
+    """Return the view of the shared memory for the outputs of a member"""
+    blocks = _worker["blocks"]
+    if block_name not in blocks:
+        blocks[block_name] = shared_memory.SharedMemory(name=block_name)
+    array = np.ndarray(shape, dtype=dtype, buffer=blocks[block_name].buf)
+    return array[imember]
+
+
+def _run_member(imember, overrides, output_specs):
+    """Run a member and write the outputs to shared memory"""
+    mf6 = _worker["mf6"]
+    msg = None
+    t0 = time.perf_counter()
+    try:
+        mf6.initialize()
+        try:
+            for address, value in overrides.items():
+                values = mf6.get_value(address)
+                values[...] = value
+                mf6.set_value(address, values)
+
+            saved = [
+                (address, _get_output_array(imember, *spec))
+                for address, *spec in output_specs
+            ]
+            kper = mf6.get_value_ptr(mf6.get_var_address("KPER", "TDIS"))
+            pertim = mf6.get_value_ptr(mf6.get_var_address("PERTIM", "TDIS"))
+            perlen = mf6.get_value_ptr(mf6.get_var_address("PERLEN", "TDIS"))
+
+            # pertim is set to the length of the stress period at the end
+            # of the last time step of a stress period
+            current_time = mf6.get_current_time()
+            end_time = mf6.get_end_time()
+            while current_time < end_time:
+                mf6.update()
+                current_time = mf6.get_current_time()
+                iper = kper[0] - 1
+                if pertim[0] == perlen[iper]:
+                    for address, array in saved:
+                        array[iper] = mf6.get_value(address).reshape(
+                            array.shape[1:]
+                        )
+        finally:
+            mf6.finalize()
+    except Exception as e:
+        msg = str(e)
+    finally:
+        sys.stdout.flush()
+    return imember, os.getpid(), time.perf_counter() - t0, msg
@@ -0,0 +1,529 @@
+# persistent history of the simulation run times
+#
+# Every simulation run by evaluate_run_times.py is stored as a row in a
+# SQLite database with the commit (or release tag) and compiler of the
+# binary, the example, the wall time, the peak memory, and the number of
+# solver iterations. The database is stored in the autotest cache directory
+# unless the --db command line argument or the MF6_BENCHMARK_HISTORY
+# environmental variable defines the path to the database.
+#
+# The report command compares the latest build with a rolling baseline
+# made up of the previous builds with the same compiler and writes a trend
+# table that doc/ReleaseNotes/mk_runtimecomp.py includes in the release
+# notes.
+#
+#     python benchmark_history.py report [--commit C] [--window N]
+#         [--alpha A] [--threshold PCT] [--ncommits N] [--md FILE] [--fail]
+
+import os
+import sys
+import math
+import random
+import sqlite3
+import platform
+import datetime
+import itertools
+import subprocess
+import numpy as np
+
+# add path to the autotest directory to use the autotest cache directory
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "autotest"))
+from framework import get_cache_dir
+
+history_name = "benchmark_history.sqlite"
+trend_name = "run-time-trend.md"
+
+schema = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL,
+    host TEXT,
+    commit_id TEXT NOT NULL,
+    version TEXT,
+    compiler TEXT,
+    binary TEXT,
+    example TEXT NOT NULL,
+    run INTEGER,
+    warmup INTEGER NOT NULL DEFAULT 0,
+    success INTEGER NOT NULL,
+    wall_time REAL,
+    elapsed REAL,
+    peak_memory INTEGER,
+    iterations INTEGER
+);
+CREATE INDEX IF NOT EXISTS runs_example ON runs (example, compiler);
+CREATE INDEX IF NOT EXISTS runs_commit ON runs (commit_id);
+"""
+
+columns = (
+    "timestamp",
+    "host",
+    "commit_id",
+    "version",
+    "compiler",
+    "binary",
+    "example",
+    "run",
+    "warmup",
+    "success",
+    "wall_time",
+    "elapsed",
+    "peak_memory",
+    "iterations",
+)
+
+
+def _get_argv_value(tag, default=None):
+    value = default
+    for idx, arg in enumerate(sys.argv):
+        if arg == tag:
+            value = sys.argv[idx + 1]
+            break
+        elif arg.startswith(tag + "="):
+            value = arg.split("=", 1)[1]
+            break
+    return value
+
+
+def get_history_file():
+    """Get the path to the benchmark history database"""
+    fpth = _get_argv_value("--db")
+    if fpth is None:
+        fpth = os.environ.get("MF6_BENCHMARK_HISTORY")
+    if fpth is None:
+        fpth = os.path.join(get_cache_dir(), history_name)
+    return fpth
+
+
+def connect(fpth=None):
+    """
+    Open the benchmark history database and create the tables if they do
+    not exist
+
+    Parameters
+    ----------
+    fpth : str
+        path to the database. If fpth is None, the path returned by
+        get_history_file() is used. (default is None)
+
+    Returns
+    -------
+    conn : sqlite3.Connection
+        database connection
+
+    """
+    if fpth is None:
+        fpth = get_history_file()
+    conn = sqlite3.connect(fpth, timeout=60.0)
+    conn.executescript(schema)
+    return conn
+
+
+def get_git_commit(pth="."):
+    """Get the commit of the git repository in pth (None if not found)"""
+    try:
+        commit = subprocess.check_output(
+            ["git", "rev-parse", "HEAD"],
+            cwd=pth,
+            stderr=subprocess.DEVNULL,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return commit.decode().strip()
+
+
+def add_runs(conn, runs):
+    """
+    Add runs to the benchmark history
+
+    Parameters
+    ----------
+    conn : sqlite3.Connection
+        database connection
+    runs : list
+        list of dictionaries with the values of the run columns. The
+        timestamp and host are set if they are not defined.
+
+    """
+    timestamp = datetime.datetime.now().isoformat(timespec="seconds")
+    host = platform.node()
+    rows = []
+    for run in runs:
+        run = dict(run)
+        run.setdefault("timestamp", timestamp)
+        run.setdefault("host", host)
+        rows.append(tuple(run.get(column) for column in columns))
+    sql = "INSERT INTO runs ({}) VALUES ({})".format(
+        ", ".join(columns), ", ".join(len(columns) * ["?"])
+    )
+    with conn:
+        conn.executemany(sql, rows)
+
+
+def get_builds(conn, compiler=None):
+    """
+    Get the builds in the benchmark history ordered from the oldest to the
+    newest run
+
+    Parameters
+    ----------
+    conn : sqlite3.Connection
+        database connection
+    compiler : str
+        only include builds with this compiler. If compiler is None, all
+        builds are included. (default is None)
+
+    Returns
+    -------
+    builds : list
+        list of (commit, version, compiler, timestamp of the last run,
+        binary) tuples
+
+    """
+    sql = (
+        "SELECT commit_id, version, compiler, MAX(timestamp) AS last, "
+        + "binary "
+        + "FROM runs WHERE success = 1 AND warmup = 0"
+    )
+    args = []
+    if compiler is not None:
+        sql += " AND compiler = ?"
+        args.append(compiler)
+    sql += " GROUP BY commit_id, compiler, binary ORDER BY last, MAX(id)"
+    return list(conn.execute(sql, args))
+
+
+def get_wall_times(conn, commits, compiler, binary="current"):
+    """
+    Get the wall times of the timed runs of the examples for a list of
+    commits
+
+    Returns
+    -------
+    wall_times : dict
+        dictionary of example names and a list of wall times
+
+    """
+    wall_times = {}
+    if len(commits) < 1:
+        return wall_times
+    sql = (
+        "SELECT example, wall_time FROM runs WHERE success = 1 "
+        + "AND warmup = 0 AND compiler IS ? AND binary IS ? "
+        + "AND commit_id IN ({})".format(", ".join(len(commits) * ["?"]))
+    )
+    for example, wall in conn.execute(sql, [compiler, binary] + list(commits)):
+        wall_times.setdefault(example, []).append(wall)
+    return wall_times
+
+
+def get_statistics(times):
+    """
+    Get the summary statistics for a list of run times
+
+    Parameters
+    ----------
+    times : list
+        run times in seconds
+
+    Returns
+    -------
+    stats : dict
+        dictionary with the number of runs, median, interquartile range,
+        minimum, maximum, mean, and standard deviation of the run times
+
+    """
+    t = np.array(times, dtype=float)
+    q25, q50, q75 = np.percentile(t, [25.0, 50.0, 75.0])
+    return {
+        "n": int(t.shape[0]),
+        "median": float(q50),
+        "iqr": float(q75 - q25),
+        "min": float(t.min()),
+        "max": float(t.max()),
+        "mean": float(t.mean()),
+        "std": float(t.std(ddof=1)) if t.shape[0] > 1 else 0.0,
+    }
+
+
+def _get_ranks(values):
+    """Get the ranks of values with the average rank assigned to ties"""
+    order = np.argsort(values, kind="mergesort")
+    ranks = np.empty(values.shape[0], dtype=float)
+    sorted_values = values[order]
+    i0 = 0
+    while i0 < values.shape[0]:
+        i1 = i0
+        while (
+            i1 + 1 < values.shape[0]
+            and sorted_values[i1 + 1] == sorted_values[i0]
+        ):
+            i1 += 1
+        ranks[order[i0 : i1 + 1]] = 0.5 * (i0 + i1) + 1.0
+        i0 = i1 + 1
+    return ranks
+
+
+def permutation_test(times, times0, nperm=10000, seed=7):
+    """
+    Two-sided permutation test (Mann-Whitney) of the rank sum of the run
+    times of two binaries. All of the permutations are evaluated if there
+    are fewer than nperm, otherwise nperm random permutations are evaluated.
+
+    Parameters
+    ----------
+    times : list
+        run times for the current binary
+    times0 : list
+        run times for the previous binary
+    nperm : int
+        maximum number of permutations (default is 10000)
+    seed : int
+        seed for the random permutations (default is 7)
+
+    Returns
+    -------
+    pvalue : float
+        probability of a rank sum at least as extreme as the observed rank
+        sum if both binaries had the same run time distribution
+
+    """
+    ranks = _get_ranks(np.array(list(times) + list(times0), dtype=float))
+    ntot = ranks.shape[0]
+    n = len(times)
+    expected = 0.5 * n * (ntot + 1)
+    # small tolerance so permutations equal to the observed rank sum are
+    # counted despite round off
+    observed = abs(ranks[:n].sum() - expected) - 1e-9
+
+    if math.comb(ntot, n) <= nperm:
+        samples = itertools.combinations(range(ntot), n)
+    else:
+        rng = random.Random(seed)
+        samples = (rng.sample(range(ntot), n) for _ in range(nperm))
+
+    count = 0
+    total = 0
+    for sample in samples:
+        if abs(ranks[list(sample)].sum() - expected) >= observed:
+            count += 1
+        total += 1
+    return count / total
+
+
+def get_slowdowns(
+    conn,
+    commit=None,
+    compiler=None,
+    window=5,
+    alpha=0.05,
+    threshold=5.0,
+    binary="current",
+):
+    """
+    Compare the run times of a build with a rolling baseline made up of
+    the previous builds with the same compiler
+
+    Parameters
+    ----------
+    conn : sqlite3.Connection
+        database connection
+    commit : str
+        commit of the build. If commit is None, the newest build is used.
+        (default is None)
+    compiler : str
+        compiler of the build. If compiler is None, the compiler of the
+        newest run of commit is used. (default is None)
+    window : int
+        number of previous builds in the baseline (default is 5)
+    alpha : float
+        significance level of the permutation test (default is 0.05)
+    threshold : float
+        minimum percent increase in the median run time that is flagged as
+        a slowdown (default is 5.0)
+    binary : str
+        binary label of the runs that are compared (default is "current")
+
+    Returns
+    -------
+    comparisons : list
+        list of dictionaries with the example, the median run time of the
+        build and the baseline, the percent difference, the p-value, and a
+        boolean indicating if the difference is a significant slowdown,
+        sorted from the largest to the smallest percent difference
+
+    """
+    builds = [b for b in get_builds(conn, compiler) if b[4] == binary]
+    if commit is None:
+        if len(builds) < 1:
+            return []
+        commit, compiler = builds[-1][0], builds[-1][2]
+    elif compiler is None:
+        matches = [b for b in builds if b[0] == commit]
+        msg = "commit {} is not in the benchmark history".format(commit)
+        assert len(matches) > 0, msg
+        compiler = matches[-1][2]
+
+    builds = [b for b in builds if b[2] == compiler]
+    idx = [i for i, b in enumerate(builds) if b[0] == commit][-1]
+    baseline = [b[0] for b in builds[max(0, idx - window) : idx]]
+
+    current = get_wall_times(conn, [commit], compiler, binary)
+    previous = get_wall_times(conn, baseline, compiler, binary)
+    comparisons = []
+    for example in sorted(current.keys()):
+        if example not in previous:
+            continue
+        t = get_statistics(current[example])["median"]
+        t0 = get_statistics(previous[example])["median"]
+        pd = 100.0 * (t - t0) / t0 if t0 > 0.0 else 0.0
+        pvalue = permutation_test(current[example], previous[example])
+        comparisons.append(
+            {
+                "example": example,
+                "commit": commit,
+                "compiler": compiler,
+                "baseline": baseline,
+                "median": t,
+                "baseline_median": t0,
+                "percent_difference": pd,
+                "pvalue": pvalue,
+                "slowdown": pd > threshold and pvalue < alpha,
+            }
+        )
+    return sorted(comparisons, key=lambda c: -c["percent_difference"])
+
+
+def get_trend_table(conn, compiler=None, ncommits=5, binary="current"):
+    """
+    Get a markdown table with the median run time of each example for the
+    newest builds
+
+    Parameters
+    ----------
+    conn : sqlite3.Connection
+        database connection
+    compiler : str
+        compiler of the builds. If compiler is None, the compiler of the
+        newest build is used. (default is None)
+    ncommits : int
+        number of builds in the table (default is 5)
+    binary : str
+        binary label of the runs in the table (default is "current")
+
+    Returns
+    -------
+    table : str
+        markdown table
+
+    """
+    builds = [b for b in get_builds(conn, compiler) if b[4] == binary]
+    if len(builds) < 1:
+        return ""
+    if compiler is None:
+        compiler = builds[-1][2]
+    builds = [b for b in builds if b[2] == compiler][-ncommits:]
+
+    medians = []
+    examples = set()
+    for build in builds:
+        wall_times = get_wall_times(conn, [build[0]], compiler, binary)
+        medians.append(
+            {
+                example: get_statistics(values)["median"]
+                for example, values in wall_times.items()
+            }
+        )
+        examples.update(wall_times.keys())
+
+    table = "### Run time trend\n\n"
+    table += (
+        "Median run times, in seconds, of the example models for the "
+        + "{} most recent builds ".format(len(builds))
+        + "compiled with {}. ".format(compiler)
+        + "Examples that were not run for a build are indicated "
+        + "by '--'.\n\n"
+    )
+    table += "| Example Problem |"
+    for build in builds:
+        label = build[0][:8]
+        if build[1] is not None:
+            label = "{} ({})".format(build[1], label)
+        table += " {} |".format(label)
+    table += "\n| :---------- |" + len(builds) * " :----------: |" + "\n"
+    for example in sorted(examples):
+        table += "| {} |".format(example)
+        for values in medians:
+            if example in values:
+                table += " {:.3f} |".format(values[example])
+            else:
+                table += " -- |"
+        table += "\n"
+    return table
+
+
+def report():
+    """
+    Print the slowdowns of the newest build (or --commit), write the trend
+    table, and return the number of significant slowdowns
+    """
+    conn = connect()
+    commit = _get_argv_value("--commit")
+    window = int(_get_argv_value("--window", 5))
+    alpha = float(_get_argv_value("--alpha", 0.05))
+    threshold = float(_get_argv_value("--threshold", 5.0))
+    ncommits = int(_get_argv_value("--ncommits", 5))
+    fmd = _get_argv_value("--md", trend_name)
+
+    comparisons = get_slowdowns(
+        conn,
+        commit=commit,
+        window=window,
+        alpha=alpha,
+        threshold=threshold,
+    )
+    nslow = 0
+    if len(comparisons) < 1:
+        print("no runs to compare in {}".format(get_history_file()))
+    else:
+        c = comparisons[0]
+        print(
+            "comparing {} ({}) ".format(c["commit"], c["compiler"])
+            + "to {} previous builds".format(len(c["baseline"]))
+        )
+        for c in comparisons:
+            tag = "  "
+            if c["slowdown"]:
+                tag = "SLOWDOWN"
+                nslow += 1
+            print(
+                "{:8s} {:40s} {:10.3f} {:10.3f} {:8.2f}% p={:.3f}".format(
+                    tag,
+                    c["example"],
+                    c["median"],
+                    c["baseline_median"],
+                    c["percent_difference"],
+                    c["pvalue"],
+                )
+            )
+
+    table = get_trend_table(conn, ncommits=ncommits)
+    if len(table) > 0:
+        with open(fmd, "w") as f:
+            f.write(table)
+        print("trend table written to {}".format(fmd))
+    conn.close()
+    return nslow
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "report":
+        nslow = report()
+        if nslow > 0 and "--fail" in sys.argv:
+            sys.exit(1)
+    else:
+        print(
+            "usage: python benchmark_history.py report [--db FILE] "
+            + "[--commit C] [--window N] [--alpha A] [--threshold PCT] "
+            + "[--ncommits N] [--md FILE] [--fail]"
+        )
@@ -1,10 +1,12 @@
 import os
 import sys
+import json
+import queue
+import threading
 import flopy
 import pymake
 import shutil
 import subprocess
-from multiprocessing import Pool
 
 # Set VERIFY
 VERIFY = False
@@ -12,10 +14,22 @@ VERIFY = False
 # add path to build script in autotest directory and reuse mf6 build scripts
 sys.path.append(os.path.join("..", "autotest"))
 from build_exes import build_mf6
+from resource_usage import run_command
+from listing_file_reader import get_total_iterations
+from durations import get_durations, order_by_duration, record_duration
+from benchmark_history import (
+    add_runs,
+    connect,
+    get_git_commit,
+    get_statistics,
+    permutation_test,
+)
 
 github_repo = "MODFLOW-USGS/modflow6"
 working_dir = "./temp/"
 examples_dir = "examples"
+runs_dir = "runs"
+durations_suite = "run_time_comparison"
 app_ext = ""
 if sys.platform == "win32":
     app_ext = ".exe"
@@ -53,6 +67,90 @@ def _is_dryrun():
     return dryrun
 
 
+def _get_argv_value(tag, default=None):
+    value = default
+    for idx, arg in enumerate(sys.argv):
+        if arg == tag:
+            value = sys.argv[idx + 1]
+            break
+        elif arg.startswith(tag + "="):
+            value = arg.split("=", 1)[1]
+            break
+    return value
+
+
+def _parse_cpus(cpus):
+    """Parse a list of cpus (for example, "2,3" or "2-5")"""
+    if cpus is None:
+        return None
+    cpu_list = []
+    for item in cpus.split(","):
+        item = item.strip()
+        if "-" in item:
+            i0, i1 = item.split("-")
+            cpu_list += list(range(int(i0), int(i1) + 1))
+        elif len(item) > 0:
+            cpu_list.append(int(item))
+    return sorted(set(cpu_list))
+
+
+def _get_options():
+    """
+    Get the run options from the command line. Each example is run once
+    with each binary unless --benchmark is specified.
+
+        --benchmark     run each binary --warmup + --repeat times
+        --warmup N      number of discarded runs of each binary
+                        (default 1 in benchmark mode)
+        --repeat N      number of timed runs of each binary
+                        (default 5 in benchmark mode)
+        --alpha A       significance level for the percent difference
+                        (default 0.05)
+        --nworkers N    number of simulations that are run at the same time.
+                        Simulations that run at the same time compete for
+                        the cpus and memory bandwidth, so more than one
+                        worker requires --affinity. (default is 1, or the
+                        number of cpus in --affinity)
+        --affinity L    isolated cpus that simulations are run on (for
+                        example, 2,3 or 2-5). Each worker is pinned to one
+                        of the cpus.
+        --json FILE     json file with the timing results
+                        (default run-time-comparison.json)
+
+    """
+    benchmark = "--benchmark" in sys.argv
+    options = {
+        "benchmark": benchmark,
+        "warmup": int(_get_argv_value("--warmup", 1 if benchmark else 0)),
+        "repeat": int(_get_argv_value("--repeat", 5 if benchmark else 1)),
+        "cpus": _parse_cpus(_get_argv_value("--affinity")),
+        "alpha": float(_get_argv_value("--alpha", 0.05)),
+        "json": _get_argv_value("--json", "run-time-comparison.json"),
+    }
+    msg = "number of repetitions must be greater than 1"
+    assert not benchmark or options["repeat"] > 1, msg
+    msg = "number of warmup runs must be greater than or equal to 0"
+    assert options["warmup"] >= 0, msg
+
+    nworkers = _get_argv_value("--nworkers")
+    if options["cpus"] is not None:
+        if nworkers is None:
+            nworkers = len(options["cpus"])
+        msg = "more workers ({}) than isolated cpus ({})".format(
+            nworkers, len(options["cpus"])
+        )
+        assert int(nworkers) <= len(options["cpus"]), msg
+    elif nworkers is None:
+        nworkers = 1
+    else:
+        msg = (
+            "--affinity is required to run more than one simulation at a time"
+        )
+        assert int(nworkers) <= 1, msg
+    options["nworkers"] = max(1, int(nworkers))
+    return options
+
+
 def _get_download_dir():
     return "mf{}".format(_get_version())
 
@@ -191,6 +289,58 @@ def elapsed_string_to_real(elt_str):
     return time_sec
 
 
+def time_model(app, example, cpus=None):
+    """
+    Run a simulation and time it
+
+    Parameters
+    ----------
+    app : str
+        path to the mf6 executable
+    example : str
+        path to the simulation directory
+    cpus : list
+        cpus the process is pinned to. If cpus is None, the process is not
+        pinned. (default is None)
+
+    Returns
+    -------
+    success : bool
+        boolean indicating if the simulation ran successfully
+    wall : float
+        wall clock time of the process in seconds
+    elapsed : float
+        elapsed run time reported by mf6 in seconds (None if it was not
+        reported)
+    peak_memory : int
+        peak resident memory of the process in bytes (None if it is not
+        available on the platform)
+
+    """
+    returncode, buff, usage = run_command([app], cwd=example, cpus=cpus)
+    wall = usage.get("wall")
+    peak_memory = usage.get("maxrss")
+    success = returncode == 0 and any(
+        "normal termination" in line.lower() for line in buff
+    )
+    elapsed = None
+    elt_str = get_elapsed_time(buff)
+    if len(elt_str) > 0:
+        elapsed = elapsed_string_to_real(elt_str)
+    return success, wall, elapsed, peak_memory
+
+
+def get_solver_iterations(example, fname="mfsim.lst"):
+    """
+    Get the total number of solver iterations in a simulation listing file
+    (None if the listing file does not exist)
+    """
+    fpth = os.path.join(example, fname)
+    if not os.path.isfile(fpth):
+        return None
+    return get_total_iterations(fpth)
+
+
 def get_examples():
     examples_repo = "MODFLOW-USGS/modflow6-examples"
     version = pymake.repo_latest_version(
@@ -211,87 +361,294 @@ def get_examples():
     return sorted(example_files)
 
 
-def run_function(app, example):
-    return flopy.run_model(
-        app,
-        None,
-        model_ws=example,
-        silent=True,
-        report=True,
-    )
-
-
-def run_model(app, app0, example, fmd, silent=True, pool=False):
+def get_example_name(example):
     id0 = example.index(examples_dir) + len(examples_dir) + 1
-    test = example[id0:]
-    print("Running simulation: {}".format(test))
-    line = "| {} |".format(test)
-
-    # copy directory for previous application
-    prev_dir = os.path.join(example, "previous")
-    if os.path.isdir(prev_dir):
-        shutil.rmtree(prev_dir)
-    print("Copying {} ==> {}".format(example, prev_dir))
-    shutil.copytree(example, prev_dir)
-
-    # modify input files to use deprecated keywords in directory
-    # used with the previous application
-    revert_files(app0, prev_dir)
-
-    # # run the current application
-    # success, buff = run_function(app, example)
-    #
-    # # run the previous application
-    # success0, buff0 = run_function(app0, prev_dir)
-
-    # processing options
-    args = (
-        (app, example),
-        (app0, prev_dir),
+    return example[id0:]
+
+
+def setup_examples(app, app0, example_dirs):
+    """
+    Create the copy of each example used with the previous binary
+
+    Returns
+    -------
+    runs : dict
+        dictionary of example names and a dictionary with the binary and
+        the simulation directory used for the "current" and "previous"
+        runs of the example
+
+    """
+    runs = {}
+    for example in example_dirs:
+        test = get_example_name(example)
+
+        # copy directory for previous application
+        prev_dir = os.path.join(example, "previous")
+        if os.path.isdir(prev_dir):
+            shutil.rmtree(prev_dir)
+        print("Copying {} ==> {}".format(example, prev_dir))
+        shutil.copytree(example, prev_dir)
+
+        # modify input files to use deprecated keywords in directory
+        # used with the previous application
+        revert_files(app0, prev_dir)
+
+        runs[test] = {
+            "current": (app, example),
+            "previous": (app0, prev_dir),
+        }
+    return runs
+
+
+def get_jobs(runs, warmup=0, repeat=1):
+    """
+    Get the (example, binary, run) jobs for all of the examples. Examples
+    are ordered from the longest to the shortest run time recorded by
+    earlier comparisons. The warmup runs of an example are queued before
+    the timed runs and the order of the binaries is alternated in each
+    repetition.
+
+    Returns
+    -------
+    jobs : list
+        list of (example name, binary key, run number) tuples. Run numbers
+        less than warmup are warmup runs.
+
+    """
+    durations = get_durations(durations_suite)
+    jobs = []
+    for test in order_by_duration(list(runs.keys()), durations):
+        keys = list(runs[test].keys())
+        for irun in range(warmup + repeat):
+            for key in keys if irun % 2 == 0 else keys[::-1]:
+                jobs.append((test, key, irun))
+    return jobs
+
+
+def _run_job(job, runs, results, cpus):
+    """Run a job in a private copy of the simulation directory"""
+    test, key, irun = job
+    app, example = runs[test][key]
+    result = results[test][key]
+    if not result["success"]:
+        return
+    ws = os.path.join(
+        working_dir, runs_dir, "{}-{}-{}".format(test, key, irun)
+    )
+    if os.path.isdir(ws):
+        shutil.rmtree(ws)
+    shutil.copytree(example, ws, ignore=shutil.ignore_patterns("previous"))
+    try:
+        success, wall, elapsed, peak_memory = time_model(app, ws, cpus=cpus)
+        iterations = get_solver_iterations(ws)
+    finally:
+        shutil.rmtree(ws, ignore_errors=True)
+    if not success:
+        result["success"] = False
+    result["runs"].append(
+        (irun, success, wall, elapsed, peak_memory, iterations)
     )
 
-    # Multi-processing using Pool
-    # initialize the pool
-    pool = Pool(processes=2)
-
-    # run the models
-    results = [pool.apply_async(run_function, args=arg) for arg in args]
-
-    # close the pool
-    pool.close()
-
-    # set variables for processing
-    success, buff = results[0].get()
-    success0, buff0 = results[1].get()
 
-    if success:
-        elt = get_elapsed_time(buff)
-        line += " {} |".format(elt)
+def run_jobs(jobs, runs, nworkers=1, cpus=None):
+    """
+    Run the jobs using a pool of worker threads that each run one
+    simulation at a time. The worker threads are started once and take the
+    next job from a shared queue until all of the jobs have been run.
+
+    Parameters
+    ----------
+    jobs : list
+        list of jobs from get_jobs()
+    runs : dict
+        dictionary of examples from setup_examples()
+    nworkers : int
+        number of worker threads (default is 1)
+    cpus : list
+        isolated cpus. Worker i runs simulations pinned to cpu i. If cpus
+        is None, simulations are not pinned. (default is None)
+
+    Returns
+    -------
+    results : dict
+        dictionary of example names and a dictionary of the success and
+        the (run number, success, wall time, mf6 elapsed time, peak memory,
+        solver iterations) of each run of each binary
+
+    """
+    results = {
+        test: {key: {"success": True, "runs": []} for key in run}
+        for test, run in runs.items()
+    }
+    job_queue = queue.Queue()
+    for job in jobs:
+        job_queue.put(job)
+    lock = threading.Lock()
+    ndone = [0]
+
+    def worker(iworker):
+        worker_cpus = None
+        if cpus is not None:
+            worker_cpus = [cpus[iworker]]
+        while True:
+            try:
+                job = job_queue.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                _run_job(job, runs, results, worker_cpus)
+            except Exception as e:
+                results[job[0]][job[1]]["success"] = False
+                print("{} failed: {}".format(job, e))
+            with lock:
+                ndone[0] += 1
+                print(
+                    "[{}/{}] {} {} run {}".format(
+                        ndone[0], len(jobs), job[0], job[1], job[2]
+                    )
+                )
+
+    threads = [
+        threading.Thread(target=worker, args=(iworker,))
+        for iworker in range(min(nworkers, max(1, len(jobs))))
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def _format_time(t):
+    if t is None:
+        return "--"
+    return "{:.3f} Seconds".format(t)
+
+
+def summarize_example(test, result, warmup=0, alpha=0.05, benchmark=False):
+    """
+    Get the record and the markdown table row for an example
+
+    Parameters
+    ----------
+    test : str
+        example name
+    result : dict
+        results for the example from run_jobs()
+    warmup : int
+        number of warmup runs (default is 0)
+    alpha : float
+        significance level of the permutation test (default is 0.05)
+    benchmark : bool
+        boolean indicating if the benchmark statistics are included in the
+        markdown table row (default is False)
+
+    Returns
+    -------
+    record : dict
+        dictionary with the run times and statistics for the example
+    line : str
+        markdown table row
+
+    """
+    record = {"example": test}
+    for key, value in result.items():
+        runs = [run for run in sorted(value["runs"]) if run[0] >= warmup]
+        entry = {"success": value["success"]}
+        for idx, name in enumerate(
+            ("wall", "elapsed", "peak_memory", "iterations")
+        ):
+            entry[name] = [run[idx + 2] for run in runs]
+        if entry["success"] and len(entry["wall"]) > 0:
+            entry.update(get_statistics(entry["wall"]))
+        else:
+            entry["success"] = False
+        record[key] = entry
+
+    current = record["current"]
+    previous = record["previous"]
+    record["percent_difference"] = None
+    record["pvalue"] = None
+    record["significant"] = False
+    if benchmark:
+        t = current["median"] if current["success"] else None
+        t0 = previous["median"] if previous["success"] else None
     else:
-        line += " -- |"
-
-    if success0:
-        elt0 = get_elapsed_time(buff0)
-        line += " {} |".format(elt0)
+        # single runs use the elapsed run time reported by mf6
+        t = current["elapsed"][0] if current["success"] else None
+        t0 = previous["elapsed"][0] if previous["success"] else None
+
+    line = "| {} | {} | {} |".format(test, _format_time(t), _format_time(t0))
+    if t is not None and t0 is not None and t0 > 0.0:
+        record["percent_difference"] = 100.0 * (t - t0) / t0
+        line += " {:.2%} |".format((t - t0) / t0)
     else:
         line += " -- |"
 
-    if success and success0:
-        t = elapsed_string_to_real(elt)
-        t0 = elapsed_string_to_real(elt0)
-        pd = (t - t0) / t0
-        line += " {:.2%} |".format(pd)
-    else:
-        line += " -- |"
-
-    fmd.write("{}\n".format(line))
-    fmd.flush()
-
-    # clean up previous directory
-    if os.path.isdir(prev_dir):
-        shutil.rmtree(prev_dir)
-
-    return
+    if benchmark:
+        if current["success"] and previous["success"]:
+            pvalue = permutation_test(current["wall"], previous["wall"])
+            record["pvalue"] = pvalue
+            record["significant"] = pvalue < alpha
+        for stat in ("iqr", "min"):
+            for entry in (current, previous):
+                if entry["success"]:
+                    line += " {:.3f} |".format(entry[stat])
+                else:
+                    line += " -- |"
+        if record["pvalue"] is not None:
+            line += " {:.3f}{} |".format(
+                record["pvalue"], "*" if record["significant"] else ""
+            )
+        else:
+            line += " -- |"
+
+    return record, line
+
+
+def store_history(results, app, app0, tag0, warmup=0):
+    """
+    Add all of the runs to the benchmark history database. Runs of the
+    current binary are stored with the commit of this repository and runs
+    of the previous binary are stored with the release tag (tag0).
+    """
+    version = get_mf6_version(app)
+    version0 = get_mf6_version(app0)
+    builds = {
+        "current": {
+            "commit_id": get_git_commit(".."),
+            "version": version,
+            "compiler": get_mf6_compiler(app),
+        },
+        "previous": {
+            "commit_id": tag0,
+            "version": version0,
+            "compiler": get_mf6_compiler(app0),
+        },
+    }
+    if builds["current"]["commit_id"] is None:
+        builds["current"]["commit_id"] = version
+    rows = []
+    for test, result in results.items():
+        for key, value in result.items():
+            for run in value["runs"]:
+                irun, success, wall, elapsed, peak_memory, iterations = run
+                row = {
+                    "binary": key,
+                    "example": test,
+                    "run": irun,
+                    "warmup": int(irun < warmup),
+                    "success": int(success),
+                    "wall_time": wall,
+                    "elapsed": elapsed,
+                    "peak_memory": peak_memory,
+                    "iterations": iterations,
+                }
+                row.update(builds[key])
+                rows.append(row)
+    conn = connect()
+    add_runs(conn, rows)
+    conn.close()
 
 
 def cleanup():
@@ -302,7 +659,7 @@ def cleanup():
 
 
 if __name__ == "__main__":
-    _get_previous_version()
+    previous_tag, _ = _get_previous_version()
 
     # compile the previous version
     pth = os.path.join(working_dir, _get_download_dir())
@@ -317,12 +674,17 @@ if __name__ == "__main__":
     # get examples
     example_dirs = get_examples()
 
+    # get the run options
+    options = _get_options()
+    benchmark = options["benchmark"]
+
     # open markdown table
     f = open("run-time-comparison.md", "w")
 
     # get version numbers and write header
     v = get_mf6_version(current_app)
     v0 = get_mf6_version(previous_app)
+    compiler = get_mf6_compiler(current_app, verbose=True)
     line = "### Comparison of simulation run times\n\n"
     line += (
         "Comparison of run times of the current version of "
@@ -334,20 +696,109 @@ if __name__ == "__main__":
         + "used to compare run times. Simulations that fail are "
         + "indicated by '--'. The percent difference, where calculated, "
         + "is relative to the simulation run time for the previous "
-        + "version. Percent differences for example problems with "
-        + "short run times (less than 30 seconds) may not be significant.\n\n"
-        + "{}.\n\n\n".format(get_mf6_compiler(current_app, verbose=True))
+        + "version. "
     )
+    if not benchmark:
+        line += (
+            "Percent differences for example problems with "
+            + "short run times (less than 30 seconds) may not be "
+            + "significant.\n\n"
+        )
+    else:
+        line += (
+            "Run times are the median of {} runs ".format(options["repeat"])
+            + "of each version after {} ".format(options["warmup"])
+            + "discarded warmup runs. The interquartile range (IQR) and "
+            + "minimum run times are also listed. The p-value is from a "
+            + "permutation (Mann-Whitney) test of the run times "
+            + "and p-values less than {} ".format(options["alpha"])
+            + "are indicated by '*'.\n\n"
+        )
+    if options["nworkers"] < 2:
+        line += "Simulations were run one at a time"
+    else:
+        line += "{} simulations were run at a time".format(options["nworkers"])
+    if options["cpus"] is not None:
+        line += ", pinned to cpus {}".format(
+            ",".join(str(cpu) for cpu in options["cpus"])
+        )
+    line += ". "
+    line += "{}.\n\n\n".format(compiler)
     line += "| Example Problem "
     line += "| Current Version {} ".format(v)
     line += "| Previous Version {} ".format(v0)
-    line += "| Percent difference |\n"
-    line += "| :---------- | :----------: | :----------: | :----------: |\n"
+    line += "| Percent difference "
+    if not benchmark:
+        line += "|\n"
+        line += (
+            "| :---------- | :----------: | :----------: | :----------: |\n"
+        )
+    else:
+        line += "| Current IQR | Previous IQR "
+        line += "| Current minimum | Previous minimum | p-value |\n"
+        line += "| :---------- |" + 8 * " :----------: |" + "\n"
     f.write(line)
 
-    # run models
-    for idx, example in enumerate(example_dirs):
-        run_model(current_app, previous_app, example, f, silent=False)
+    # run all of the examples, binaries, and repetitions
+    runs = setup_examples(current_app, previous_app, example_dirs)
+    jobs = get_jobs(runs, warmup=options["warmup"], repeat=options["repeat"])
+    print(
+        "Running {} simulations using {} workers".format(
+            len(jobs), options["nworkers"]
+        )
+    )
+    results = run_jobs(
+        jobs, runs, nworkers=options["nworkers"], cpus=options["cpus"]
+    )
+
+    # write the results in example order
+    records = []
+    for example in example_dirs:
+        test = get_example_name(example)
+        record, line = summarize_example(
+            test,
+            results[test],
+            warmup=options["warmup"],
+            alpha=options["alpha"],
+            benchmark=benchmark,
+        )
+        records.append(record)
+        f.write("{}\n".format(line))
+
+        # save the run time used to order the examples in the next comparison
+        walls = [
+            record[key]["median"]
+            for key in ("current", "previous")
+            if record[key]["success"]
+        ]
+        if walls:
+            record_duration(durations_suite, test, max(walls))
+
+        # clean up previous directory
+        prev_dir = runs[test]["previous"][1]
+        if os.path.isdir(prev_dir):
+            shutil.rmtree(prev_dir)
 
     # close the markdown file
     f.close()
+
+    # add the runs to the benchmark history
+    if "--nohistory" not in sys.argv:
+        store_history(
+            results,
+            current_app,
+            previous_app,
+            previous_tag,
+            warmup=options["warmup"],
+        )
+
+    # write the timing results
+    results = {
+        "current": {"app": current_app, "version": v},
+        "previous": {"app": previous_app, "version": v0},
+        "compiler": compiler,
+        "options": options,
+        "examples": records,
+    }
+    with open(options["json"], "w") as f:
+        json.dump(results, f, indent=2)
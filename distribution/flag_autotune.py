@@ -0,0 +1,458 @@
+# compiler flag autotuning of mf6
+#
+# mf6 is built with each variant in a matrix of compiler flag sets (for
+# example -O3, -march=native, -funroll-loops, link time optimization, and
+# -ffast-math) and the variants are compared to the baseline build, which
+# uses the same flags as the release build. Each variant is first run on
+# all of the simulations and the binary head, concentration, and budget
+# files are compared to the files from the baseline build using the
+# comparisons in the autotest regression tests. A variant is rejected if a
+# simulation fails or if the differences exceed the head tolerance
+# (--htol) or the budget criteria (--rclose and --pdtol). The run times of
+# the variants that produce the same results are benchmarked using the
+# benchmark mode of evaluate_run_times.py and ranked by the geometric mean
+# of the run time ratios relative to the baseline build.
+#
+# The variants are selected using --variants and flag sets can be added
+# using --flags NAME "FLAGS", which can be repeated. The flags of each
+# variant are added to the release compiler flags and are also passed to
+# the linker. Simulations are found in the directories defined by
+# --examples (the modflow6-examples/examples and modflow6-testmodels/mf6
+# directories next to this repository by default) and can be limited using
+# --select and --max_sims.
+#
+#     python flag_autotune.py [--variants NAME ...] [--flags NAME "FLAGS"]
+#         [--examples DIR ...] [--select NAME ...] [--max_sims N]
+#         [-fc gfortran] [-j N] [--htol H] [--rclose R] [--pdtol P]
+#         [--warmup N] [--repeat N] [--alpha A] [--nworkers N]
+#         [--affinity L] [--md FILE] [--json FILE]
+#
+# Variants built with -march=native only run on cpus that support the
+# instruction set of the cpu they were built on.
+
+import os
+import sys
+import json
+import shutil
+import numpy as np
+
+# add path to the autotest directory to reuse the autotest modules
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "autotest"))
+from incremental_build import Builder, eext
+from resource_usage import run_command
+from head_file_compare import compare_heads
+from budget_file_compare import compare_budget_files
+from benchmark_history import get_statistics, permutation_test
+from pgo_build import _get_argv_list, _get_default_training_dirs
+from pgo_build import find_simulations
+import evaluate_run_times as ert
+
+working_dir = os.path.join("temp", "autotune")
+baseline = "baseline"
+
+# flags added to the release flags for each variant
+default_variants = {
+    baseline: [],
+    "O3": ["-O3"],
+    "native": ["-march=native"],
+    "unroll": ["-funroll-loops"],
+    "lto": ["-flto"],
+    "fast-math": ["-ffast-math"],
+    "O3-native-unroll": ["-O3", "-march=native", "-funroll-loops"],
+    "O3-lto": ["-O3", "-flto"],
+}
+
+# binary output file extensions and comparison types
+output_types = {
+    "hds": "head",
+    "hed": "head",
+    "bhd": "head",
+    "ucn": "concentration",
+    "cbc": "budget",
+    "bud": "budget",
+}
+
+
+def _get_flag_variants():
+    variants = {}
+    for idx, arg in enumerate(sys.argv):
+        if arg == "--flags" and len(sys.argv) > idx + 2:
+            variants[sys.argv[idx + 1]] = sys.argv[idx + 2].split()
+    return variants
+
+
+def _get_options():
+    examples = _get_argv_list("--examples", _get_default_training_dirs())
+    max_sims = ert._get_argv_value("--max_sims")
+    jobs = ert._get_argv_value("-j")
+    variants = dict(default_variants)
+    names = _get_argv_list("--variants")
+    if names is not None:
+        for name in names:
+            msg = "unknown variant {}".format(name)
+            assert name in default_variants, msg
+        variants = {
+            name: flags for name, flags in variants.items() if name in names
+        }
+    variants.update(_get_flag_variants())
+    variants[baseline] = default_variants[baseline]
+    options = {
+        "variants": variants,
+        "examples": [os.path.abspath(d) for d in examples],
+        "select": _get_argv_list("--select"),
+        "max_sims": int(max_sims) if max_sims else None,
+        "fc": ert._get_argv_value("-fc", os.environ.get("FC", "gfortran")),
+        "jobs": int(jobs) if jobs else None,
+        "htol": float(ert._get_argv_value("--htol", 0.001)),
+        "rclose": float(ert._get_argv_value("--rclose", 0.001)),
+        "pdtol": float(ert._get_argv_value("--pdtol", 0.001)),
+        "warmup": int(ert._get_argv_value("--warmup", 1)),
+        "repeat": int(ert._get_argv_value("--repeat", 5)),
+        "alpha": float(ert._get_argv_value("--alpha", 0.05)),
+        "nworkers": int(ert._get_argv_value("--nworkers", 1)),
+        "cpus": ert._parse_cpus(ert._get_argv_value("--affinity")),
+        "md": ert._get_argv_value("--md", "flag-autotune.md"),
+        "json": ert._get_argv_value("--json", "flag-autotune.json"),
+    }
+    msg = "no example directories, use --examples to define them"
+    assert len(options["examples"]) > 0, msg
+    msg = "number of repetitions must be greater than 1"
+    assert options["repeat"] > 1, msg
+    return options
+
+
+def build_variant(name, flags, fc, nworkers=None):
+    """
+    Build mf6 with the release flags and the flags of a variant in
+    working_dir/name
+
+    Returns
+    -------
+    app : str
+        path to the executable or None if the variant could not be built
+    msg : str
+        build error message (None if the variant was built)
+
+    """
+    builder = Builder(
+        fc=fc,
+        fflags=flags,
+        ldflags=flags,
+        nworkers=nworkers,
+        verbose=False,
+    )
+    appdir = os.path.abspath(os.path.join(working_dir, "bin", name))
+    print("building variant {} ({})".format(name, " ".join(flags)))
+    try:
+        builder.build(names=["mf6"], appdir=appdir)
+    except Exception as e:
+        return None, str(e)
+    return os.path.join(appdir, "mf6{}".format(eext)), None
+
+
+def run_variant(app, name, sims):
+    """
+    Run a variant on all of the simulations in working_dir/runs/name
+
+    Returns
+    -------
+    failed : list
+        names of the simulations that did not run successfully
+
+    """
+    failed = []
+    for sim, sim_ws in sorted(sims.items()):
+        ws = get_run_dir(name, sim)
+        if os.path.isdir(ws):
+            shutil.rmtree(ws)
+        shutil.copytree(sim_ws, ws)
+        returncode, buff, usage = run_command([app], cwd=ws)
+        if returncode != 0 or not any(
+            "Normal termination" in line for line in buff
+        ):
+            failed.append(sim)
+    return failed
+
+
+def get_run_dir(name, sim):
+    return os.path.join(working_dir, "runs", name, sim.replace("/", "_"))
+
+
+def get_output_files(ws):
+    """
+    Get the binary output files of a simulation
+
+    Returns
+    -------
+    files : dict
+        dictionary of paths relative to ws and comparison types
+
+    """
+    files = {}
+    for root, dirs, fnames in os.walk(ws):
+        for fname in fnames:
+            ext = os.path.splitext(fname)[1][1:].lower()
+            if ext in output_types:
+                fpth = os.path.relpath(os.path.join(root, fname), ws)
+                files[fpth] = output_types[ext]
+    return files
+
+
+def compare_variant(name, sims, options):
+    """
+    Compare the binary output files of a variant to the baseline build
+
+    Returns
+    -------
+    errors : list
+        list of messages for the simulations and files that differ from
+        the baseline build
+
+    """
+    errors = []
+    for sim in sorted(sims):
+        ws0 = get_run_dir(baseline, sim)
+        ws = get_run_dir(name, sim)
+        for fpth, cmp_type in sorted(get_output_files(ws0).items()):
+            fpth0 = os.path.join(ws0, fpth)
+            fpth1 = os.path.join(ws, fpth)
+            if not os.path.isfile(fpth1):
+                errors.append("{} {} was not written".format(sim, fpth))
+                continue
+            outfile = "{}.cmp.out".format(fpth1)
+            if cmp_type == "budget":
+                if os.path.getsize(fpth0) < 1:
+                    continue
+                success = compare_budget_files(
+                    fpth0,
+                    fpth1,
+                    outfile,
+                    options["rclose"],
+                    options["pdtol"],
+                )
+            else:
+                success = compare_heads(
+                    fpth0,
+                    fpth1,
+                    outfile=outfile,
+                    htol=options["htol"],
+                    text=cmp_type,
+                    precision="double",
+                    fail_fast=True,
+                )
+            if not success:
+                errors.append(
+                    "{} {} differs from the {} build (see {})".format(
+                        sim, fpth, baseline, outfile
+                    )
+                )
+    return errors
+
+
+def benchmark(apps, sims, options):
+    """
+    Benchmark the run times of the variants using evaluate_run_times.py
+
+    Returns
+    -------
+    results : dict
+        dictionary of simulation names and the run_jobs() results of each
+        variant
+
+    """
+    runs = {
+        sim: {name: (app, sim_ws) for name, app in apps.items()}
+        for sim, sim_ws in sims.items()
+    }
+    jobs = ert.get_jobs(
+        runs, warmup=options["warmup"], repeat=options["repeat"]
+    )
+    print(
+        "Running {} simulations using {} workers".format(
+            len(jobs), options["nworkers"]
+        )
+    )
+    return ert.run_jobs(
+        jobs, runs, nworkers=options["nworkers"], cpus=options["cpus"]
+    )
+
+
+def rank_variants(results, names, warmup=0, alpha=0.05):
+    """
+    Rank the variants by the geometric mean of the ratios of the median run
+    time of each simulation to the median run time of the baseline build
+
+    Returns
+    -------
+    ranking : list
+        list of dictionaries with the variant name, geometric mean ratio,
+        number of simulations that are significantly faster and slower
+        than the baseline build, and the statistics of each simulation,
+        sorted from the fastest to the slowest variant
+
+    """
+    ranking = []
+    for name in names:
+        ratios = []
+        entry = {"variant": name, "faster": 0, "slower": 0, "sims": {}}
+        for sim, result in sorted(results.items()):
+            walls0 = [r[2] for r in result[baseline]["runs"] if r[0] >= warmup]
+            walls = [r[2] for r in result[name]["runs"] if r[0] >= warmup]
+            if (
+                not result[name]["success"]
+                or not result[baseline]["success"]
+                or len(walls) < 1
+                or len(walls0) < 1
+            ):
+                continue
+            stats = get_statistics(walls)
+            ratio = stats["median"] / get_statistics(walls0)["median"]
+            stats["ratio"] = ratio
+            stats["pvalue"] = None
+            if name != baseline:
+                stats["pvalue"] = permutation_test(walls, walls0)
+                if stats["pvalue"] < alpha:
+                    entry["faster" if ratio < 1.0 else "slower"] += 1
+            entry["sims"][sim] = stats
+            ratios.append(ratio)
+        entry["ratio"] = None
+        if len(ratios) > 0:
+            entry["ratio"] = float(np.exp(np.mean(np.log(ratios))))
+        ranking.append(entry)
+    ranking.sort(
+        key=lambda e: (e["ratio"] is None, e["ratio"] or 0.0, e["variant"])
+    )
+    return ranking
+
+
+def write_markdown(fpth, ranking, rejected, variants, options, compiler):
+    """Write the ranked variants and the rejected variants to a file"""
+    text = "### Compiler flag autotuning of mf6\n\n"
+    text += (
+        "Variants of mf6 built with additional compiler flags are compared "
+        + "to the {} build, which uses the release flags. ".format(baseline)
+        + "Variants that fail or change the simulated heads by more than "
+        + "{} or the budgets by more than the ".format(options["htol"])
+        + "regression test criteria are rejected. The remaining variants "
+        + "are ranked by the geometric mean of the ratios of the median "
+        + "of {} run times of each simulation ".format(options["repeat"])
+        + "to the median run time of the {} build. ".format(baseline)
+        + "The number of simulations that are significantly faster or "
+        + "slower (p-value less than {}) is listed. ".format(options["alpha"])
+        + "{}.\n\n".format(compiler)
+    )
+    text += "| Rank | Variant | Flags | Time ratio | Faster | Slower |\n"
+    text += "| :---: | :---------- | :---------- |" + 3 * " :---: |" + "\n"
+    for idx, entry in enumerate(ranking):
+        ratio = entry["ratio"]
+        text += "| {} | {} | {} | {} | {} | {} |\n".format(
+            idx + 1,
+            entry["variant"],
+            " ".join(variants[entry["variant"]]) or "--",
+            "--" if ratio is None else "{:.3f}".format(ratio),
+            entry["faster"],
+            entry["slower"],
+        )
+    if rejected:
+        text += "\n#### Rejected variants\n\n"
+        text += "| Variant | Flags | Reason |\n"
+        text += "| :---------- | :---------- | :---------- |\n"
+        for name, reasons in rejected.items():
+            reason = reasons[0]
+            if len(reasons) > 1:
+                reason += " (and {} more)".format(len(reasons) - 1)
+            text += "| {} | {} | {} |\n".format(
+                name, " ".join(variants[name]), reason.replace("\n", " ")
+            )
+    with open(fpth, "w") as f:
+        f.write(text)
+
+
+def main():
+    options = _get_options()
+    variants = options["variants"]
+    sims = find_simulations(
+        options["examples"],
+        select=options["select"],
+        max_sims=options["max_sims"],
+    )
+    assert len(sims) > 0, "no simulations were found"
+
+    # build the variants
+    apps = {}
+    rejected = {}
+    for name, flags in variants.items():
+        app, msg = build_variant(
+            name, flags, options["fc"], nworkers=options["jobs"]
+        )
+        if app is None:
+            rejected[name] = ["build failed: {}".format(msg.splitlines()[0])]
+        else:
+            apps[name] = app
+    assert baseline in apps, "the {} build failed".format(baseline)
+
+    # run the variants and reject the variants that change the results
+    print("running {} variants on {} simulations".format(len(apps), len(sims)))
+    failed = run_variant(apps[baseline], baseline, sims)
+    if failed:
+        print(
+            "simulations that fail with the {} build are not used: {}".format(
+                baseline, ", ".join(failed)
+            )
+        )
+        sims = {sim: pth for sim, pth in sims.items() if sim not in failed}
+    assert len(sims) > 0, "all of the simulations failed"
+    for name in list(apps.keys()):
+        if name == baseline:
+            continue
+        errors = [
+            "{} failed".format(sim)
+            for sim in run_variant(apps[name], name, sims)
+        ]
+        errors += compare_variant(name, sims, options)
+        if errors:
+            print("variant {} rejected: {}".format(name, errors[0]))
+            rejected[name] = errors
+            apps.pop(name)
+        else:
+            print(
+                "variant {} reproduces the {} results".format(name, baseline)
+            )
+
+    # benchmark and rank the remaining variants
+    results = benchmark(apps, sims, options)
+    ranking = rank_variants(
+        results, list(apps.keys()), options["warmup"], options["alpha"]
+    )
+    compiler = ert.get_mf6_compiler(apps[baseline])
+    write_markdown(
+        options["md"], ranking, rejected, variants, options, compiler
+    )
+    with open(options["json"], "w") as f:
+        json.dump(
+            {
+                "apps": apps,
+                "simulations": sorted(sims),
+                "options": options,
+                "ranking": ranking,
+                "rejected": rejected,
+            },
+            f,
+            indent=2,
+        )
+    for idx, entry in enumerate(ranking):
+        print(
+            "{:>3d} {:<20s} {}".format(
+                idx + 1,
+                entry["variant"],
+                (
+                    "--"
+                    if entry["ratio"] is None
+                    else "{:.3f}".format(entry["ratio"])
+                ),
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,442 @@
+# profile guided optimization (PGO) build of mf6
+#
+# An instrumented mf6 executable is built with gfortran (-fprofile-generate)
+# and run on a set of training simulations from modflow6-examples and
+# modflow6-testmodels. The profile data files written by the training runs
+# are used to build the optimized executable (-fprofile-use), which is
+# benchmarked against the release build of the same source using the
+# benchmark mode of evaluate_run_times.py. All of the executables are
+# built with the incremental builder in the autotest directory, so the
+# release objects are shared with other incremental builds and only the
+# source files with new profile data are compiled again when the training
+# set changes.
+#
+# Training simulations are found in the directories defined by --training
+# (the modflow6-examples/examples and modflow6-testmodels/mf6 directories
+# next to this repository by default) and can be limited using --select,
+# which accepts names and name* patterns, and --max_training. The
+# benchmark is run on the simulations defined by --examples, which default
+# to the training simulations. Run times of simulations that were used
+# for training favor the optimized executable, so a separate set of
+# examples should be used to decide if the optimized executable is
+# shipped.
+#
+#     python pgo_build.py [--training DIR ...] [--select NAME ...]
+#         [--max_training N] [--examples DIR ...] [-fc gfortran] [-j N]
+#         [--warmup N] [--repeat N] [--alpha A] [--nworkers N]
+#         [--affinity L] [--md FILE] [--json FILE] [--skip_benchmark]
+#
+# Only gfortran on linux and macOS is supported.
+
+import os
+import sys
+import json
+import shutil
+
+# add path to the autotest directory to reuse the autotest modules
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "autotest"))
+from incremental_build import Builder, root_dir, eext
+from resource_usage import run_command
+from common_regression import get_select_dirs
+import evaluate_run_times as ert
+
+working_dir = os.path.join("temp", "pgo")
+profile_dir = os.path.join(working_dir, "profile")
+training_dir = os.path.join(working_dir, "training")
+instrumented_flags = ["-fprofile-generate={}"]
+optimized_flags = [
+    "-fprofile-use={}",
+    "-fprofile-correction",
+    "-fprofile-partial-training",
+    "-Wno-missing-profile",
+]
+
+
+def _get_argv_list(tag, default=None):
+    values = None
+    for idx, arg in enumerate(sys.argv):
+        if arg == tag:
+            values = []
+            for item in sys.argv[idx + 1 :]:
+                if item.startswith("-"):
+                    break
+                values.append(item)
+            break
+    if values is None:
+        return default
+    return values
+
+
+def _get_default_training_dirs():
+    parent = os.path.dirname(root_dir)
+    dirs = [
+        os.path.join(parent, "modflow6-examples", "examples"),
+        os.path.join(parent, "modflow6-testmodels", "mf6"),
+    ]
+    return [d for d in dirs if os.path.isdir(d)]
+
+
+def _get_options():
+    training = _get_argv_list("--training", _get_default_training_dirs())
+    max_training = ert._get_argv_value("--max_training")
+    options = {
+        "training": [os.path.abspath(d) for d in training],
+        "select": _get_argv_list("--select"),
+        "max_training": int(max_training) if max_training else None,
+        "examples": _get_argv_list("--examples"),
+        "fc": ert._get_argv_value("-fc", os.environ.get("FC", "gfortran")),
+        "jobs": ert._get_argv_value("-j"),
+        "warmup": int(ert._get_argv_value("--warmup", 1)),
+        "repeat": int(ert._get_argv_value("--repeat", 5)),
+        "alpha": float(ert._get_argv_value("--alpha", 0.05)),
+        "nworkers": int(ert._get_argv_value("--nworkers", 1)),
+        "cpus": ert._parse_cpus(ert._get_argv_value("--affinity")),
+        "md": ert._get_argv_value("--md", "pgo-comparison.md"),
+        "json": ert._get_argv_value("--json", "pgo-comparison.json"),
+        "benchmark": "--skip_benchmark" not in sys.argv,
+    }
+    if options["examples"] is not None:
+        options["examples"] = [os.path.abspath(d) for d in options["examples"]]
+    if options["jobs"] is not None:
+        options["jobs"] = int(options["jobs"])
+    msg = "no training directories, use --training to define them"
+    assert len(options["training"]) > 0, msg
+    msg = "number of repetitions must be greater than 1"
+    assert options["repeat"] > 1, msg
+    fc_name = os.path.splitext(os.path.basename(options["fc"]))[0]
+    msg = "profile guided optimization builds require gfortran"
+    assert fc_name == "gfortran", msg
+    return options
+
+
+def find_simulations(dirs, select=None, max_sims=None):
+    """
+    Find the simulations (directories with a mfsim.nam file) in one or more
+    directories
+
+    Parameters
+    ----------
+    dirs : list
+        directories that are searched
+    select : list
+        simulation names or name* patterns (default is None)
+    max_sims : int
+        maximum number of simulations (default is None)
+
+    Returns
+    -------
+    sims : dict
+        dictionary of simulation names, relative to the directory they were
+        found in, and simulation directories
+
+    """
+    sims = {}
+    for pth in dirs:
+        for root, subdirs, files in os.walk(pth):
+            subdirs.sort()
+            if "mfsim.nam" not in files:
+                continue
+            name = os.path.relpath(root, pth).replace(os.sep, "/")
+            if name == ".":
+                name = os.path.basename(root)
+            if name in sims:
+                name = "{}/{}".format(os.path.basename(pth), name)
+            sims[name] = root
+            # models in the subdirectories of a simulation are not
+            # separate simulations
+            subdirs[:] = []
+    if select is not None:
+        names = get_select_dirs(select, list(sims.keys()))
+        sims = {name: sims[name] for name in names}
+    if max_sims is not None:
+        sims = {name: sims[name] for name in sorted(sims)[:max_sims]}
+    return sims
+
+
+def build(name, fc, nworkers=None, fflags=None, profile=None):
+    """
+    Build mf6 in working_dir/name
+
+    Parameters
+    ----------
+    name : str
+        build name (release, instrumented, or optimized)
+    fc : str
+        Fortran compiler
+    nworkers : int
+        number of source files compiled at the same time (default is None)
+    fflags : list
+        additional compiler and linker flags (default is None)
+    profile : str
+        profile data directory (default is None)
+
+    Returns
+    -------
+    app : str
+        path to the executable
+
+    """
+    build_dir = None
+    if profile is not None:
+        # the instrumented and optimized objects must be compiled in the
+        # same directories
+        build_dir = os.path.abspath(os.path.join(working_dir, "build"))
+    builder = Builder(
+        fc=fc,
+        fflags=fflags,
+        ldflags=fflags,
+        nworkers=nworkers,
+        build_dir=build_dir,
+        profile_dir=profile,
+        verbose=False,
+    )
+    appdir = os.path.abspath(os.path.join(working_dir, name))
+    print("building the {} version of mf6".format(name))
+    builder.build(names=["mf6"], appdir=appdir)
+    return os.path.join(appdir, "mf6{}".format(eext))
+
+
+def train(app, sims):
+    """
+    Run the instrumented executable on the training simulations. Profile
+    data from earlier training runs are removed.
+
+    Returns
+    -------
+    failed : list
+        names of the simulations that did not run successfully
+
+    """
+    profile = os.path.abspath(profile_dir)
+    if os.path.isdir(profile):
+        shutil.rmtree(profile)
+    os.makedirs(profile)
+    failed = []
+    for idx, (name, sim_ws) in enumerate(sorted(sims.items())):
+        ws = os.path.join(training_dir, name.replace("/", "_"))
+        if os.path.isdir(ws):
+            shutil.rmtree(ws)
+        shutil.copytree(sim_ws, ws)
+        returncode, buff, usage = run_command([app], cwd=ws)
+        success = returncode == 0 and any(
+            "Normal termination" in line for line in buff
+        )
+        print(
+            "[{}/{}] training {} ({:.3f} seconds{})".format(
+                idx + 1,
+                len(sims),
+                name,
+                usage.get("wall", 0.0),
+                "" if success else ", failed",
+            )
+        )
+        if not success:
+            failed.append(name)
+        shutil.rmtree(ws, ignore_errors=True)
+    nfiles = 0
+    for root, dirs, files in os.walk(profile):
+        nfiles += len([f for f in files if f.endswith(".gcda")])
+    print("{} profile data files in {}".format(nfiles, profile))
+    return failed
+
+
+def benchmark(app, app0, sims, options):
+    """
+    Compare the run times of the optimized (current) and release
+    (previous) executables using evaluate_run_times.py
+
+    Returns
+    -------
+    records : list
+        list of records for each simulation from summarize_example()
+    lines : list
+        markdown table rows
+
+    """
+    runs = {
+        name: {"current": (app, sim_ws), "previous": (app0, sim_ws)}
+        for name, sim_ws in sims.items()
+    }
+    jobs = ert.get_jobs(
+        runs, warmup=options["warmup"], repeat=options["repeat"]
+    )
+    print(
+        "Running {} simulations using {} workers".format(
+            len(jobs), options["nworkers"]
+        )
+    )
+    results = ert.run_jobs(
+        jobs, runs, nworkers=options["nworkers"], cpus=options["cpus"]
+    )
+    records = []
+    lines = []
+    for name in sorted(sims):
+        record, line = ert.summarize_example(
+            name,
+            results[name],
+            warmup=options["warmup"],
+            alpha=options["alpha"],
+            benchmark=True,
+        )
+        records.append(record)
+        lines.append(line)
+    return records, lines
+
+
+def summarize(records):
+    """
+    Summarize the benchmark of the optimized executable. The gain is
+    consistent if the median percent difference is negative, at least one
+    of the simulations is significantly faster, and none of the
+    simulations are significantly slower than the release build.
+
+    Returns
+    -------
+    summary : dict
+        dictionary with the number of compared simulations, the number of
+        significantly faster and slower simulations, the median percent
+        difference, and a boolean indicating a consistent gain
+
+    """
+    pds = sorted(
+        r["percent_difference"]
+        for r in records
+        if r["percent_difference"] is not None
+    )
+    faster = [
+        r for r in records if r["significant"] and r["percent_difference"] < 0
+    ]
+    slower = [
+        r for r in records if r["significant"] and r["percent_difference"] > 0
+    ]
+    median = None
+    if len(pds) > 0:
+        n = len(pds)
+        median = 0.5 * (pds[(n - 1) // 2] + pds[n // 2])
+    return {
+        "compared": len(pds),
+        "faster": len(faster),
+        "slower": len(slower),
+        "median_percent_difference": median,
+        "consistent_gain": median is not None
+        and median < 0.0
+        and len(faster) > 0
+        and len(slower) < 1,
+    }
+
+
+def write_markdown(fpth, app, lines, summary, options, overlap):
+    """Write the benchmark results to a markdown file"""
+    compiler = ert.get_mf6_compiler(app)
+    text = "### Profile guided optimization of mf6\n\n"
+    text += (
+        "Comparison of run times of mf6 built with profile guided "
+        + "optimization (PGO) to the release build of the same source. "
+        + "Run times are the median of {} runs ".format(options["repeat"])
+        + "of each build after {} ".format(options["warmup"])
+        + "discarded warmup runs. The p-value is from a permutation "
+        + "(Mann-Whitney) test of the run times and p-values less than "
+        + "{} are indicated by '*'. ".format(options["alpha"])
+    )
+    if overlap:
+        text += (
+            "{} of the simulations were used to train ".format(overlap)
+            + "the PGO build. "
+        )
+    text += "{}.\n\n".format(compiler)
+    text += "| Simulation | PGO | Release | Percent difference "
+    text += "| PGO IQR | Release IQR | PGO minimum | Release minimum "
+    text += "| p-value |\n"
+    text += "| :---------- |" + 8 * " :----------: |" + "\n"
+    for line in lines:
+        text += "{}\n".format(line)
+    median = summary["median_percent_difference"]
+    text += (
+        "\nMedian percent difference: {}. ".format(
+            "--" if median is None else "{:.2f}%".format(median)
+        )
+        + "{} of {} simulations ".format(
+            summary["faster"], summary["compared"]
+        )
+        + "are significantly faster and {} ".format(summary["slower"])
+        + "are significantly slower with PGO.\n"
+    )
+    with open(fpth, "w") as f:
+        f.write(text)
+
+
+def main():
+    options = _get_options()
+    fc = options["fc"]
+    nworkers = options["jobs"]
+
+    # build the release and instrumented executables
+    app0 = build("release", fc, nworkers=nworkers)
+    profile = os.path.abspath(profile_dir)
+    app_instrumented = build(
+        "instrumented",
+        fc,
+        nworkers=nworkers,
+        fflags=[flag.format(profile) for flag in instrumented_flags],
+        profile=profile,
+    )
+
+    # train the instrumented executable
+    sims = find_simulations(
+        options["training"],
+        select=options["select"],
+        max_sims=options["max_training"],
+    )
+    assert len(sims) > 0, "no training simulations were found"
+    print("training mf6 on {} simulations".format(len(sims)))
+    failed = train(app_instrumented, sims)
+    if failed:
+        print("training failed for: {}".format(", ".join(failed)))
+
+    # build the optimized executable with the profile data
+    app = build(
+        "optimized",
+        fc,
+        nworkers=nworkers,
+        fflags=[flag.format(profile) for flag in optimized_flags],
+        profile=profile,
+    )
+    print("optimized app: {}\nrelease app: {}".format(app, app0))
+    if not options["benchmark"]:
+        return
+
+    if options["examples"] is not None:
+        examples = find_simulations(options["examples"])
+    else:
+        examples = sims
+    assert len(examples) > 0, "no benchmark simulations were found"
+    training_dirs = set(os.path.abspath(d) for d in sims.values())
+    overlap = len(
+        [d for d in examples.values() if os.path.abspath(d) in training_dirs]
+    )
+    records, lines = benchmark(app, app0, examples, options)
+    summary = summarize(records)
+    write_markdown(options["md"], app, lines, summary, options, overlap)
+    with open(options["json"], "w") as f:
+        json.dump(
+            {
+                "optimized": app,
+                "release": app0,
+                "training": sorted(sims),
+                "failed_training": failed,
+                "options": options,
+                "summary": summary,
+                "examples": records,
+            },
+            f,
+            indent=2,
+        )
+    print(
+        "median percent difference: {}, consistent gain: {}".format(
+            summary["median_percent_difference"], summary["consistent_gain"]
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,774 @@
+# scaling benchmark of synthetic models
+#
+# Synthetic groundwater flow (GWF) and coupled flow and transport (GWF-GWT)
+# models are generated for a range of grid sizes using the DIS, DISV, and
+# DISU discretizations, run with the current mf6 executable, and the wall
+# time and peak memory of each run are summarized as a function of the
+# number of cells. The exponents of the power-law fits of the time and
+# memory to the number of cells (scaling curves) are listed with the memory
+# and time per million cells, which can be used to estimate the hardware
+# needed for large models.
+#
+# The models have nlay layers of square cells with constant heads in the
+# first and last columns. Wells, rivers, streamflow routing reaches, and
+# multi-aquifer wells are added to a fraction (density) of the cells in a
+# layer. Generated models are reused if the model parameters have not
+# changed.
+#
+#     python scaling_benchmark.py [--cells 1000 10000 ...]
+#         [--grids dis disv disu] [--models gwf gwf-gwt] [--nlay N]
+#         [--nstp N] [--wel DENSITY] [--riv DENSITY] [--sfr DENSITY]
+#         [--maw DENSITY] [--repeat N] [--exe PATH] [--md FILE]
+#         [--json FILE] [--plot FILE] [--history]
+#
+# Models with 10^7 cells need several GB of memory to generate and run.
+
+import os
+import sys
+import json
+import shutil
+import numpy as np
+import flopy
+
+# add path to the autotest directory to reuse the autotest modules
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "autotest"))
+from disu_util import get_structured_disu_kwargs
+from resource_usage import run_command
+from listing_file_reader import get_total_iterations
+from benchmark_history import (
+    add_runs,
+    connect,
+    get_git_commit,
+    get_statistics,
+)
+
+working_dir = os.path.join("temp", "scaling")
+parameter_file = "parameters.json"
+app_ext = ""
+if sys.platform == "win32":
+    app_ext = ".exe"
+
+default_cells = (10**3, 10**4, 10**5, 10**6, 10**7)
+grid_types = ("dis", "disv", "disu")
+model_types = ("gwf", "gwf-gwt")
+
+# model dimensions and properties
+cell_size = 100.0
+top = 100.0
+thickness = 150.0
+hk = 10.0
+porosity = 0.2
+well_rate = 50.0
+well_concentration = 100.0
+maw_rate = -100.0
+sfr_inflow = 100.0
+
+
+def _get_argv_list(tag, default=None):
+    values = None
+    for idx, arg in enumerate(sys.argv):
+        if arg == tag:
+            values = []
+            for item in sys.argv[idx + 1 :]:
+                if item.startswith("--"):
+                    break
+                values.append(item)
+            break
+    if values is None:
+        return default
+    return values
+
+
+def _get_argv_value(tag, default=None):
+    values = _get_argv_list(tag)
+    if values is None or len(values) < 1:
+        return default
+    return values[0]
+
+
+def _get_options():
+    """Get the benchmark options from the command line"""
+    cells = _get_argv_list("--cells")
+    if cells is None:
+        cells = default_cells
+    else:
+        cells = [int(float(item)) for item in cells]
+    grids = [item.lower() for item in _get_argv_list("--grids", grid_types)]
+    models = [item.lower() for item in _get_argv_list("--models", model_types)]
+    for grid in grids:
+        assert grid in grid_types, "invalid grid type {}".format(grid)
+    for model in models:
+        assert model in model_types, "invalid model type {}".format(model)
+    exe = _get_argv_value(
+        "--exe", os.path.join("..", "bin", "mf6{}".format(app_ext))
+    )
+    return {
+        "cells": sorted(cells),
+        "grids": grids,
+        "models": models,
+        "nlay": int(_get_argv_value("--nlay", 3)),
+        "nstp": int(_get_argv_value("--nstp", 5)),
+        "density": {
+            "wel": float(_get_argv_value("--wel", 0.01)),
+            "riv": float(_get_argv_value("--riv", 0.01)),
+            "sfr": float(_get_argv_value("--sfr", 0.01)),
+            "maw": float(_get_argv_value("--maw", 0.001)),
+        },
+        "repeat": int(_get_argv_value("--repeat", 1)),
+        "exe": os.path.abspath(exe),
+        "md": _get_argv_value("--md", "scaling-benchmark.md"),
+        "json": _get_argv_value("--json", "scaling-benchmark.json"),
+        "plot": _get_argv_value("--plot"),
+        "history": "--history" in sys.argv,
+    }
+
+
+def get_dimensions(ncells, nlay):
+    """
+    Get the number of rows and columns of a square grid with approximately
+    ncells cells in nlay layers
+    """
+    ncpl = max(1, int(round(ncells / float(nlay))))
+    nrow = max(2, int(round(np.sqrt(ncpl))))
+    ncol = max(2, int(round(ncpl / float(nrow))))
+    return nrow, ncol
+
+
+def get_case_name(model, grid, ncells):
+    return "{}-{}-{}".format(model, grid, ncells)
+
+
+class Grid(object):
+    """Cell numbering of a structured grid for the DIS, DISV, and DISU
+    discretizations"""
+
+    def __init__(self, grid, nlay, nrow, ncol):
+        self.grid = grid
+        self.nlay = nlay
+        self.nrow = nrow
+        self.ncol = ncol
+        self.botm = np.linspace(top - thickness / nlay, top - thickness, nlay)
+
+    @property
+    def ncells(self):
+        return self.nlay * self.nrow * self.ncol
+
+    def cellid(self, k, i, j):
+        """Get the cellid of layer k, row i, and column j"""
+        if self.grid == "dis":
+            return (k, i, j)
+        elif self.grid == "disv":
+            return (k, i * self.ncol + j)
+        return (k * self.nrow * self.ncol + i * self.ncol + j,)
+
+    def add_package(self, model):
+        """Add the discretization package to a flow or transport model"""
+        nlay, nrow, ncol = self.nlay, self.nrow, self.ncol
+        ftype = model.model_type[:3].capitalize()
+        cls = getattr(flopy.mf6, "Modflow{}{}".format(ftype, self.grid))
+        if self.grid == "dis":
+            return cls(
+                model,
+                nlay=nlay,
+                nrow=nrow,
+                ncol=ncol,
+                delr=cell_size,
+                delc=cell_size,
+                top=top,
+                botm=self.botm,
+            )
+        # the cell2d data of DISU grids are defined for every cell
+        if self.grid == "disv":
+            vertices, cell2d = self.get_vertices()
+        else:
+            vertices, cell2d = self.get_vertices(nlay)
+        if self.grid == "disv":
+            return cls(
+                model,
+                nlay=nlay,
+                ncpl=nrow * ncol,
+                nvert=len(vertices),
+                top=top,
+                botm=[np.full(nrow * ncol, b) for b in self.botm],
+                vertices=vertices,
+                cell2d=cell2d,
+            )
+        # the vertices are needed to calculate the specific discharge in
+        # transport models
+        kw = get_structured_disu_kwargs(
+            nlay, nrow, ncol, cell_size, cell_size, top, self.botm
+        )
+        kw["nvert"] = len(vertices)
+        kw["vertices"] = vertices
+        kw["cell2d"] = cell2d
+        return cls(model, **kw)
+
+    def get_vertices(self, nlay=1):
+        """
+        Get the vertices and the cell2d data of the cells in nlay layers
+        """
+        nrow, ncol = self.nrow, self.ncol
+        x = cell_size * np.arange(ncol + 1)
+        y = cell_size * np.arange(nrow, -1, -1)
+        xv, yv = np.meshgrid(x, y)
+        vertices = list(
+            zip(range(xv.size), xv.ravel().tolist(), yv.ravel().tolist())
+        )
+        ncells = nlay * nrow * ncol
+        i, j = np.divmod(np.arange(ncells) % (nrow * ncol), ncol)
+        iv = i * (ncol + 1) + j
+        cell2d = list(
+            zip(
+                range(ncells),
+                (cell_size * (j + 0.5)).tolist(),
+                (cell_size * (nrow - i - 0.5)).tolist(),
+                [4] * ncells,
+                iv.tolist(),
+                (iv + 1).tolist(),
+                (iv + ncol + 2).tolist(),
+                (iv + ncol + 1).tolist(),
+            )
+        )
+        return vertices, cell2d
+
+
+def select_cells(nrow, ncol, density, seed):
+    """Select a fraction (density) of the cells in a layer"""
+    ncpl = nrow * ncol
+    count = int(round(density * ncpl))
+    if density > 0.0:
+        count = max(1, count)
+    count = min(count, ncpl)
+    rng = np.random.RandomState(seed)
+    nodes = np.sort(rng.choice(ncpl, size=count, replace=False))
+    return np.divmod(nodes, ncol)
+
+
+def add_sfr(gwf, grid, density):
+    """
+    Add streams that flow along the rows of the first layer. The streams
+    are in evenly spaced rows and the number of reaches is the fraction
+    (density) of the cells in a layer.
+    """
+    nreaches = min(
+        grid.nrow * grid.ncol, int(round(density * grid.nrow * grid.ncol))
+    )
+    if nreaches < 1:
+        return None
+    nstreams = int(np.ceil(nreaches / float(grid.ncol)))
+    rows = np.linspace(0, grid.nrow - 1, nstreams).astype(int)
+    packagedata = []
+    connectiondata = []
+    perioddata = []
+    rtp = top - 2.0
+    for irow in rows:
+        nr = min(grid.ncol, nreaches - len(packagedata))
+        r0 = len(packagedata)
+        for j in range(nr):
+            rno = r0 + j
+            ic = []
+            if j > 0:
+                ic.append(rno - 1)
+            if j < nr - 1:
+                ic.append(-(rno + 1))
+            packagedata.append(
+                (
+                    rno,
+                    grid.cellid(0, irow, j),
+                    cell_size,
+                    5.0,
+                    0.001,
+                    rtp - 0.001 * cell_size * j,
+                    1.0,
+                    1.0,
+                    0.03,
+                    len(ic),
+                    1.0,
+                    0,
+                )
+            )
+            connectiondata.append([rno] + ic)
+        perioddata.append((r0, "inflow", sfr_inflow))
+    return flopy.mf6.ModflowGwfsfr(
+        gwf,
+        unit_conversion=86400.0,
+        nreaches=len(packagedata),
+        packagedata=packagedata,
+        connectiondata=connectiondata,
+        perioddata={0: perioddata},
+    )
+
+
+def add_maw(gwf, grid, density):
+    """Add multi-aquifer wells that are connected to all of the layers"""
+    rows, cols = select_cells(grid.nrow, grid.ncol, density, seed=4)
+    if rows.size < 1:
+        return None
+    packagedata = []
+    connectiondata = []
+    perioddata = []
+    for iwell, (i, j) in enumerate(zip(rows, cols)):
+        packagedata.append(
+            (iwell, 0.15, grid.botm[-1], top, "thiem", grid.nlay)
+        )
+        for k in range(grid.nlay):
+            connectiondata.append(
+                (iwell, k, grid.cellid(k, i, j), top, grid.botm[-1], 0.0, 0.0)
+            )
+        perioddata.append((iwell, "rate", maw_rate))
+    return flopy.mf6.ModflowGwfmaw(
+        gwf,
+        nmawwells=len(packagedata),
+        packagedata=packagedata,
+        connectiondata=connectiondata,
+        perioddata={0: perioddata},
+    )
+
+
+def build_model(ws, model, grid, nstp, density):
+    """
+    Build a synthetic model
+
+    Parameters
+    ----------
+    ws : str
+        simulation directory
+    model : str
+        model type ("gwf" or "gwf-gwt")
+    grid : Grid
+        grid of the model
+    nstp : int
+        number of time steps
+    density : dict
+        fraction of the cells in a layer with wells ("wel"), rivers
+        ("riv"), streamflow routing reaches ("sfr"), and multi-aquifer
+        wells ("maw")
+
+    """
+    sim = flopy.mf6.MFSimulation(
+        sim_name="mfsim", sim_ws=ws, exe_name="mf6", verbosity_level=0
+    )
+    flopy.mf6.ModflowTdis(sim, nper=1, perioddata=[(10.0 * nstp, nstp, 1.0)])
+    gwf = flopy.mf6.ModflowGwf(sim, modelname="gwf", save_flows=False)
+    ims = flopy.mf6.ModflowIms(
+        sim,
+        print_option="summary",
+        complexity="moderate",
+        outer_dvclose=1e-6,
+        outer_maximum=100,
+        inner_dvclose=1e-8,
+        rcloserecord=1e-3,
+        inner_maximum=300,
+        linear_acceleration="cg",
+        filename="gwf.ims",
+    )
+    sim.register_ims_package(ims, [gwf.name])
+
+    grid.add_package(gwf)
+    nlay, nrow, ncol = grid.nlay, grid.nrow, grid.ncol
+    flopy.mf6.ModflowGwfic(gwf, strt=top)
+    flopy.mf6.ModflowGwfnpf(gwf, icelltype=0, k=hk, k33=0.1 * hk)
+    flopy.mf6.ModflowGwfsto(gwf, ss=1e-5, sy=0.2, transient={0: True})
+
+    # constant heads in the first and last columns
+    chd = []
+    for k in range(nlay):
+        for i in range(nrow):
+            chd.append((grid.cellid(k, i, 0), top))
+            chd.append((grid.cellid(k, i, ncol - 1), top - 5.0))
+    flopy.mf6.ModflowGwfchd(gwf, stress_period_data={0: chd})
+
+    # wells in the last layer alternate between injection and extraction
+    rows, cols = select_cells(nrow, ncol, density["wel"], seed=1)
+    if rows.size > 0:
+        wel = []
+        for idx, (i, j) in enumerate(zip(rows, cols)):
+            q = well_rate if idx % 2 == 0 else -well_rate
+            c = well_concentration if q > 0.0 else 0.0
+            wel.append((grid.cellid(nlay - 1, i, j), q, c))
+        flopy.mf6.ModflowGwfwel(
+            gwf,
+            auxiliary=["CONCENTRATION"],
+            stress_period_data={0: wel},
+            pname="WEL-1",
+        )
+
+    rows, cols = select_cells(nrow, ncol, density["riv"], seed=2)
+    if rows.size > 0:
+        riv = [
+            (grid.cellid(0, i, j), top - 1.0, 100.0, top - 2.0)
+            for i, j in zip(rows, cols)
+        ]
+        flopy.mf6.ModflowGwfriv(gwf, stress_period_data={0: riv})
+
+    add_sfr(gwf, grid, density["sfr"])
+    add_maw(gwf, grid, density["maw"])
+
+    flopy.mf6.ModflowGwfoc(
+        gwf,
+        head_filerecord="gwf.hds",
+        saverecord=[("HEAD", "LAST")],
+        printrecord=[("BUDGET", "LAST")],
+    )
+
+    if model == "gwf-gwt":
+        gwt = flopy.mf6.ModflowGwt(sim, modelname="gwt", save_flows=False)
+        imsgwt = flopy.mf6.ModflowIms(
+            sim,
+            print_option="summary",
+            complexity="moderate",
+            outer_dvclose=1e-6,
+            outer_maximum=100,
+            inner_dvclose=1e-8,
+            rcloserecord=1e-6,
+            inner_maximum=300,
+            linear_acceleration="bicgstab",
+            filename="gwt.ims",
+        )
+        sim.register_ims_package(imsgwt, [gwt.name])
+        grid.add_package(gwt)
+        flopy.mf6.ModflowGwtic(gwt, strt=0.0)
+        flopy.mf6.ModflowGwtadv(gwt, scheme="tvd")
+        flopy.mf6.ModflowGwtdsp(gwt, alh=10.0, ath1=1.0, atv=0.1)
+        flopy.mf6.ModflowGwtmst(gwt, porosity=porosity)
+        sources = []
+        if density["wel"] > 0.0:
+            sources.append(("WEL-1", "AUX", "CONCENTRATION"))
+        flopy.mf6.ModflowGwtssm(gwt, sources=sources)
+        flopy.mf6.ModflowGwtoc(
+            gwt,
+            concentration_filerecord="gwt.ucn",
+            saverecord=[("CONCENTRATION", "LAST")],
+            printrecord=[("BUDGET", "LAST")],
+        )
+        flopy.mf6.ModflowGwfgwt(
+            sim, exgtype="GWF6-GWT6", exgmnamea="gwf", exgmnameb="gwt"
+        )
+
+    sim.write_simulation(silent=True)
+    return sim
+
+
+def setup_case(ws, model, grid, nstp, density):
+    """
+    Build a synthetic model if the model does not exist or the parameters
+    of the existing model are different
+    """
+    parameters = {
+        "model": model,
+        "grid": grid.grid,
+        "nlay": grid.nlay,
+        "nrow": grid.nrow,
+        "ncol": grid.ncol,
+        "nstp": nstp,
+        "density": density,
+    }
+    fpth = os.path.join(ws, parameter_file)
+    if os.path.isfile(fpth):
+        with open(fpth) as f:
+            if json.load(f) == parameters:
+                return False
+    if os.path.isdir(ws):
+        shutil.rmtree(ws)
+    build_model(ws, model, grid, nstp, density)
+    with open(fpth, "w") as f:
+        json.dump(parameters, f, indent=1)
+    return True
+
+
+def run_case(exe, ws):
+    """
+    Run a synthetic model
+
+    Returns
+    -------
+    success : bool
+        boolean indicating if the simulation ran successfully
+    wall : float
+        wall clock time in seconds
+    peak_memory : int
+        peak resident memory in bytes (None if it is not available)
+    iterations : int
+        total number of inner iterations
+
+    """
+    returncode, buff, usage = run_command([exe], cwd=ws)
+    success = returncode == 0 and any(
+        "normal termination" in line.lower() for line in buff
+    )
+    iterations = None
+    fpth = os.path.join(ws, "mfsim.lst")
+    if os.path.isfile(fpth):
+        iterations = get_total_iterations(fpth)
+    return success, usage.get("wall"), usage.get("maxrss"), iterations
+
+
+def fit_power_law(cells, values):
+    """
+    Fit values = a * cells**b using least squares on the logarithms
+
+    Returns
+    -------
+    a, b : float
+        coefficient and exponent of the fit (None if less than two values
+        are available)
+
+    """
+    pairs = [(c, v) for c, v in zip(cells, values) if v is not None and v > 0]
+    if len(pairs) < 2:
+        return None, None
+    x = np.log([c for c, v in pairs])
+    y = np.log([v for c, v in pairs])
+    b, loga = np.polyfit(x, y, 1)
+    return float(np.exp(loga)), float(b)
+
+
+def get_scaling_curves(records):
+    """
+    Get the power-law fits of the wall time and peak memory to the number
+    of cells for each model and grid type
+    """
+    curves = []
+    keys = []
+    for record in records:
+        key = (record["model"], record["grid"])
+        if key not in keys:
+            keys.append(key)
+    for model, grid in keys:
+        rr = [
+            r
+            for r in records
+            if r["model"] == model and r["grid"] == grid and r["success"]
+        ]
+        cells = [r["cells"] for r in rr]
+        a_t, b_t = fit_power_law(cells, [r["wall"] for r in rr])
+        a_m, b_m = fit_power_law(cells, [r["peak_memory"] for r in rr])
+        curve = {
+            "model": model,
+            "grid": grid,
+            "time_exponent": b_t,
+            "memory_exponent": b_m,
+            "time_per_million_cells": None,
+            "memory_per_million_cells": None,
+        }
+        if a_t is not None:
+            curve["time_per_million_cells"] = a_t * 1e6**b_t
+        if a_m is not None:
+            curve["memory_per_million_cells"] = a_m * 1e6**b_m
+        curves.append(curve)
+    return curves
+
+
+def _fmt(value, fmt):
+    if value is None:
+        return "--"
+    return fmt.format(value)
+
+
+def write_markdown(fpth, records, curves, options):
+    mb = 1024.0**2
+    density = options["density"]
+    line = "### Scaling of synthetic models\n\n"
+    line += (
+        "Wall time and peak memory of synthetic models with "
+        + "{} layers and {} time steps. ".format(
+            options["nlay"], options["nstp"]
+        )
+        + "Wells, rivers, streamflow routing reaches, and multi-aquifer "
+        + "wells are in {}, {}, {}, and {} ".format(
+            density["wel"], density["riv"], density["sfr"], density["maw"]
+        )
+        + "of the cells in a layer. Times are the median of "
+        + "{} runs.\n\n".format(options["repeat"])
+    )
+    line += (
+        "| Model | Grid | Cells | Wall time (s) "
+        + "| Time per cell and time step (us) | Peak memory (MB) "
+        + "| Memory per cell (bytes) | Iterations |\n"
+    )
+    line += "| :---------- |" + 7 * " :----------: |" + "\n"
+    for r in records:
+        time_per_cell = None
+        memory_per_cell = None
+        if r["success"]:
+            time_per_cell = 1e6 * r["wall"] / (r["cells"] * options["nstp"])
+            if r["peak_memory"] is not None:
+                memory_per_cell = r["peak_memory"] / float(r["cells"])
+        peak = r["peak_memory"]
+        line += "| {} | {} | {} | {} | {} | {} | {} | {} |\n".format(
+            r["model"],
+            r["grid"],
+            r["cells"],
+            _fmt(r["wall"] if r["success"] else None, "{:.3f}"),
+            _fmt(time_per_cell, "{:.3f}"),
+            _fmt(peak / mb if peak is not None else None, "{:.1f}"),
+            _fmt(memory_per_cell, "{:.0f}"),
+            _fmt(r["iterations"], "{}"),
+        )
+    line += "\n\n### Scaling curves\n\n"
+    line += (
+        "Exponents of the power-law fit of the wall time and peak memory "
+        + "to the number of cells, and the fitted wall time and peak "
+        + "memory for one million cells.\n\n"
+    )
+    line += (
+        "| Model | Grid | Time exponent | Memory exponent "
+        + "| Time per million cells (s) | Memory per million cells (MB) |\n"
+    )
+    line += "| :---------- |" + 5 * " :----------: |" + "\n"
+    for c in curves:
+        memory = c["memory_per_million_cells"]
+        line += "| {} | {} | {} | {} | {} | {} |\n".format(
+            c["model"],
+            c["grid"],
+            _fmt(c["time_exponent"], "{:.2f}"),
+            _fmt(c["memory_exponent"], "{:.2f}"),
+            _fmt(c["time_per_million_cells"], "{:.3f}"),
+            _fmt(memory / mb if memory is not None else None, "{:.1f}"),
+        )
+    with open(fpth, "w") as f:
+        f.write(line)
+
+
+def plot_scaling_curves(fpth, records):
+    """Plot the wall time and peak memory against the number of cells"""
+    import matplotlib
+
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    fig, axes = plt.subplots(1, 2, figsize=(10, 4.5))
+    keys = []
+    for record in records:
+        key = (record["model"], record["grid"])
+        if key not in keys:
+            keys.append(key)
+    for model, grid in keys:
+        rr = [
+            r
+            for r in records
+            if r["model"] == model and r["grid"] == grid and r["success"]
+        ]
+        label = "{} {}".format(model, grid)
+        cells = [r["cells"] for r in rr]
+        axes[0].loglog(cells, [r["wall"] for r in rr], "o-", label=label)
+        memory = [
+            r["peak_memory"] / 1024.0**2
+            for r in rr
+            if r["peak_memory"] is not None
+        ]
+        if len(memory) == len(cells):
+            axes[1].loglog(cells, memory, "o-", label=label)
+    axes[0].set_ylabel("Wall time, in seconds")
+    axes[1].set_ylabel("Peak memory, in megabytes")
+    for ax in axes:
+        ax.set_xlabel("Number of cells")
+        ax.grid(True, which="both", lw=0.25)
+    axes[0].legend(fontsize=8)
+    fig.tight_layout()
+    fig.savefig(fpth, dpi=150)
+    plt.close(fig)
+
+
+def store_history(records, exe):
+    """Add the runs to the benchmark history database"""
+    from evaluate_run_times import get_mf6_compiler, get_mf6_version
+
+    version = get_mf6_version(exe)
+    commit_id = get_git_commit("..")
+    if commit_id is None:
+        commit_id = version
+    rows = []
+    for record in records:
+        for irun, (success, wall, peak_memory, iterations) in enumerate(
+            record["runs"]
+        ):
+            rows.append(
+                {
+                    "commit_id": commit_id,
+                    "version": version,
+                    "compiler": get_mf6_compiler(exe),
+                    "binary": "scaling",
+                    "example": record["case"],
+                    "run": irun,
+                    "warmup": 0,
+                    "success": int(success),
+                    "wall_time": wall,
+                    "peak_memory": peak_memory,
+                    "iterations": iterations,
+                }
+            )
+    conn = connect()
+    add_runs(conn, rows)
+    conn.close()
+
+
+def main():
+    options = _get_options()
+    exe = options["exe"]
+    assert os.path.isfile(exe), "mf6 executable {} does not exist".format(exe)
+
+    records = []
+    for model in options["models"]:
+        for grid_type in options["grids"]:
+            for ncells in options["cells"]:
+                nrow, ncol = get_dimensions(ncells, options["nlay"])
+                grid = Grid(grid_type, options["nlay"], nrow, ncol)
+                case = get_case_name(model, grid_type, ncells)
+                ws = os.path.join(working_dir, case)
+                print("setting up {} ({} cells)".format(case, grid.ncells))
+                setup_case(
+                    ws, model, grid, options["nstp"], options["density"]
+                )
+
+                runs = []
+                for irun in range(options["repeat"]):
+                    runs.append(run_case(exe, ws))
+                    success, wall = runs[-1][:2]
+                    print(
+                        "  run {} of {}: {} ({})".format(
+                            irun + 1,
+                            options["repeat"],
+                            (
+                                "{:.3f} seconds".format(wall)
+                                if wall is not None
+                                else "--"
+                            ),
+                            "success" if success else "failed",
+                        )
+                    )
+                success = all(run[0] for run in runs)
+                walls = [run[1] for run in runs if run[1] is not None]
+                peaks = [run[2] for run in runs if run[2] is not None]
+                stats = get_statistics(walls)
+                records.append(
+                    {
+                        "case": case,
+                        "model": model,
+                        "grid": grid_type,
+                        "cells": grid.ncells,
+                        "success": success,
+                        "wall": stats["median"],
+                        "wall_iqr": stats["iqr"],
+                        "peak_memory": max(peaks) if peaks else None,
+                        "iterations": runs[-1][3],
+                        "runs": runs,
+                    }
+                )
+
+    curves = get_scaling_curves(records)
+    write_markdown(options["md"], records, curves, options)
+    with open(options["json"], "w") as f:
+        json.dump(
+            {"options": options, "records": records, "curves": curves},
+            f,
+            indent=1,
+        )
+    if options["plot"] is not None:
+        plot_scaling_curves(options["plot"], records)
+    if options["history"]:
+        store_history(records, exe)
+
+
+if __name__ == "__main__":
+    main()
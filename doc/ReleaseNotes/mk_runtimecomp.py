@@ -47,10 +47,63 @@ footer = r"""
 \normalsize
 """
 
+trend_header = r"""
+\subsection{{Run-Time Trend}}
+
+Median run times, in seconds, of the example models for the most recent
+builds in the benchmark history. Examples that were not run for a build are
+indicated by '--'.
+
+\small
+\begin{{longtable}}[!htbp]{{p{{5cm}} {}}}
+\caption{{Run time trend}}
+\label{{table:run-time-trend}}
+\tabularnewline
+
+\hline
+\hline
+{} \\
+\hline
+\endfirsthead
+
+\hline
+\hline
+{} \\
+\hline
+\endhead
+
+"""
+
+
+def write_trend_table(fname, ftex):
+    """Convert the run time trend markdown table into a latex table"""
+    rows = []
+    with open(fname) as fmd:
+        for line in fmd:
+            if not line.startswith("|"):
+                continue
+            ll = [item.strip() for item in line.strip().split("|")[1:-1]]
+            rows.append(ll)
+    if len(rows) < 3:
+        return
+    ncol = len(rows[0]) - 1
+    columns = " ".join(ncol * ["p{1.8cm}"])
+    labels = " & ".join(
+        ["\\textbf{{{}}}".format(item) for item in rows[0]]
+    )
+    ftex.write(trend_header.format(columns, labels, labels))
+    for ll in rows[2:]:
+        linetex = " & ".join(ll).replace("\\", "/").replace("_", "\\_")
+        ftex.write(linetex + "\\\\" + "\n")
+        ftex.write("\\hline\n")
+    ftex.write(footer)
+
+
 if __name__ == "__main__":
 
     fname = "../../distribution/run-time-comparison.md"
     fnametex = "run-time-comparison.tex"
+    fnametrend = "../../distribution/run-time-trend.md"
     if os.path.isfile(fnametex):
         os.remove(fnametex)
 
@@ -63,7 +116,7 @@ if __name__ == "__main__":
             for line in fmd:
                 if not skipline:
                     ll = line.strip().split('|')
-                    ll = ll[1:-1]
+                    ll = ll[1:5]
                     linetex = "& ".join(ll)
                     linetex = linetex.replace("\\", "/")
                     linetex += '\\\\' + '\n'
@@ -73,4 +126,8 @@ if __name__ == "__main__":
                 if ":-" in line:
                     skipline = False
         ftex.write(footer)
+
+        # add the run time trend from the benchmark history
+        if os.path.isfile(fnametrend):
+            write_trend_table(fnametrend, ftex)
         ftex.close()
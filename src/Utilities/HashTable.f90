@@ -49,25 +49,36 @@ module HashTableModule
   
   contains
   
-  subroutine hash_table_cr(ht)
+  subroutine hash_table_cr(ht, nhash)
 ! ******************************************************************************
-! hash_table_cr -- public subroutine to create the hash table object
+! hash_table_cr -- public subroutine to create the hash table object.
+!   The optional nhash is the number of hash lists, which should be a
+!   prime number of the order of the number of entries (default is
+!   HASH_SIZE).
 ! ******************************************************************************
 !
 !    SPECIFICATIONS:
 ! ------------------------------------------------------------------------------
     ! -- dummy
     type(HashTableType), pointer :: ht
+    integer(I4B), intent(in), optional :: nhash
     ! -- local
     integer(I4B) :: i
+    integer(I4B) :: n
 ! ------------------------------------------------------------------------------
+    !
+    ! -- number of hash lists
+    n = HASH_SIZE
+    if (present(nhash)) then
+      n = nhash
+    end if
     !
     ! -- allocate
     allocate(ht)
-    allocate(ht%table(HASH_SIZE))
+    allocate(ht%table(n))
     !
     ! -- nullify each list
-    do i = 1, HASH_SIZE
+    do i = 1, n
       ht%table(i)%list => null()
     enddo
     !
@@ -127,7 +138,7 @@ module HashTableModule
     if (associated(elem)) then
       elem%listdata%index = index
     else
-      ihash = hashfunc(trim(key))
+      ihash = hashfunc(trim(key), size(this%table))
       if (associated(this%table(ihash)%list)) then
         call this%table(ihash)%list%add(key, index)
       else
@@ -153,7 +164,7 @@ module HashTableModule
     type(ListType), pointer :: elem
     integer(I4B) :: ihash
 ! ------------------------------------------------------------------------------
-    ihash = hashfunc(trim(key))
+    ihash = hashfunc(trim(key), size(this%table))
     elem => this%table(ihash)%list
     do while (associated(elem))
       if (elem%listdata%key == key) then
@@ -263,24 +274,26 @@ module HashTableModule
     return
   end subroutine listtype_da
 
-  function hashfunc(key) result(ihash)
+  function hashfunc(key, nhash) result(ihash)
 ! ******************************************************************************
-! hashfunc -- function to convert key into an integer hash number
+! hashfunc -- function to convert key into an integer hash number between
+!   1 and nhash
 ! ******************************************************************************
 !
 !    SPECIFICATIONS:
 ! ------------------------------------------------------------------------------
     ! -- dummy
     character(len=*), intent(in) :: key
+    integer(I4B), intent(in) :: nhash
     ! -- local
     integer(I4B) :: ihash
     integer(I4B) :: i
 ! ------------------------------------------------------------------------------
     ihash = 0
     do i = 1,len(key)
-      ihash = modulo( MULTIPLIER * ihash + ichar(key(i:i)), HASH_SIZE)
+      ihash = modulo( MULTIPLIER * ihash + ichar(key(i:i)), nhash)
     enddo
-    ihash = 1 + modulo(ihash - 1, HASH_SIZE)
+    ihash = 1 + modulo(ihash - 1, nhash)
     !
     ! -- return
     return
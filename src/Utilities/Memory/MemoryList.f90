@@ -1,52 +1,119 @@
 module MemoryListModule
   use KindModule, only: DP, I4B
   use MemoryTypeModule, only: MemoryType
-  use ListModule, only: ListType
+  use MemoryHelperModule, only: memPathSeparator
+  use HashTableModule, only: HashTableType, hash_table_cr, hash_table_da
   private
   public :: MemoryListType
-  
+
+  integer(I4B), parameter :: NHASH = 65521  !< number of hash lists of the index
+
+  type :: MemoryContainerType
+    type(MemoryType), pointer :: mt => null()
+  end type MemoryContainerType
+
+  !> @brief List of the memory type entries
+  !!
+  !! The entries are stored in an array, so they can be retrieved by
+  !! position in constant time, and are indexed on their memory path and
+  !! variable name with a hash table, so the entry of a variable can be
+  !! found without scanning the list.
+  !<
   type :: MemoryListType
-    type(ListType), private :: list
+    type(MemoryContainerType), dimension(:), allocatable, private :: items
+    integer(I4B), private :: nitems = 0
+    type(HashTableType), pointer, private :: index => null()
   contains
     procedure :: add
     procedure :: get
+    procedure :: find
     procedure :: count
     procedure :: clear
   end type MemoryListType
-  
+
   contains
-  
+
   subroutine add(this, mt)
     class(MemoryListType) :: this
     type(MemoryType), pointer :: mt
-    class(*), pointer :: obj => null()
-    obj => mt
-    call this%list%add(obj)
+    type(MemoryContainerType), dimension(:), allocatable :: tmp
+    integer(I4B) :: i
+    character(len=:), allocatable :: key
+    !
+    ! -- expand the array
+    if (.not. allocated(this%items)) then
+      allocate(this%items(1000))
+      call hash_table_cr(this%index, NHASH)
+    else if (this%nitems == size(this%items)) then
+      allocate(tmp(2 * size(this%items)))
+      do i = 1, this%nitems
+        tmp(i)%mt => this%items(i)%mt
+      end do
+      call move_alloc(tmp, this%items)
+    end if
+    this%nitems = this%nitems + 1
+    this%items(this%nitems)%mt => mt
+    !
+    ! -- index the entry, the first entry with the same address is kept
+    !    so find returns the same entry as a scan of the list would
+    key = get_key(mt%name, mt%path)
+    if (this%index%get_index(key) == 0) then
+      call this%index%add_entry(key, this%nitems)
+    end if
   end subroutine add
-  
+
   function get(this, ipos) result(res)
     class(MemoryListType) :: this
     integer(I4B), intent(in) :: ipos
     type(MemoryType), pointer :: res
-    class(*), pointer :: obj => null()
-    obj => this%list%getitem(ipos)
-    select type (obj)
-    type is (MemoryType)
-      res => obj
-    end select
+    res => null()
+    if (ipos >= 1 .and. ipos <= this%nitems) then
+      res => this%items(ipos)%mt
+    end if
     return
   end function get
-  
+
+  !> @brief Return the entry of a variable, or null when it does not exist
+  !<
+  function find(this, name, mem_path) result(res)
+    class(MemoryListType) :: this
+    character(len=*), intent(in) :: name      !< variable name
+    character(len=*), intent(in) :: mem_path  !< path where the variable is stored
+    type(MemoryType), pointer :: res
+    integer(I4B) :: ipos
+    res => null()
+    if (this%nitems > 0) then
+      ipos = this%index%get_index(get_key(name, mem_path))
+      if (ipos > 0) then
+        res => this%items(ipos)%mt
+      end if
+    end if
+    return
+  end function find
+
   function count(this) result(nval)
     class(MemoryListType) :: this
     integer(I4B) :: nval
-    nval = this%list%count()
+    nval = this%nitems
     return
   end function count
 
   subroutine clear(this)
     class(MemoryListType) :: this
-    call this%list%Clear()
+    if (allocated(this%items)) then
+      deallocate(this%items)
+      call hash_table_da(this%index)
+    end if
+    this%nitems = 0
   end subroutine clear
-  
-end module MemoryListModule
\ No newline at end of file
+
+  !> @brief Key of a variable in the index
+  !<
+  function get_key(name, mem_path) result(key)
+    character(len=*), intent(in) :: name      !< variable name
+    character(len=*), intent(in) :: mem_path  !< path where the variable is stored
+    character(len=:), allocatable :: key
+    key = trim(mem_path) // memPathSeparator // trim(name)
+  end function get_key
+
+end module MemoryListModule
@@ -268,22 +268,12 @@ module MemoryManagerModule
     logical(LGP), intent(in), optional :: check     !< to suppress aborting the program when not found,
                                                     !! set check = .false.
     ! -- local
-    integer(I4B) :: ipos
     logical(LGP) check_opt
     ! -- code
     !
-    ! -- initialize
-    mt => null()
-    found = .false.
-    !
-    ! -- iterate over the memory list
-    do ipos = 1, memorylist%count()
-      mt => memorylist%Get(ipos)
-      if(mt%name == name .and. mt%path == mem_path) then
-        found = .true.
-        exit
-      end if
-    end do
+    ! -- look up the entry in the index of the memory list
+    mt => memorylist%find(name, mem_path)
+    found = associated(mt)
     check_opt = .true.
     if (present(check)) then
       check_opt = check
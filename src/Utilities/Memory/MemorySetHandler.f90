@@ -11,6 +11,7 @@ module MemorySetHandlerModule
   public :: set_handler_iface
   public :: mem_register_handler
   public :: on_memory_set
+  public :: on_memory_set_type
 
   type EventHandlerDataType
     procedure(set_handler_iface), nopass, pointer :: handler => null()
@@ -80,13 +81,26 @@ module MemorySetHandlerModule
     ! local
     type(MemoryType), pointer :: mt
     logical(LGP) :: found
-    class(*), pointer :: handler_data_genptr => null()
-    class(EventHandlerDataType), pointer :: evt_handler_data => null()
 
-    ! get the handler data and cast
+    ! get the memory item
     mt => null()
     found = .false.
     call get_from_memorylist(var_name, mem_path, mt, found)
+    call on_memory_set_type(mt, status)
+  end subroutine
+
+  !> @brief Triggers the calling of the side effect handler for a memory item
+  !!
+  !! Same as @p on_memory_set() for callers that have already looked up
+  !! the memory item, such as the batched access in the XMI.
+  !<
+  subroutine on_memory_set_type(mt, status)
+    type(MemoryType), pointer, intent(in) :: mt !< the memory item
+    integer(I4B), intent(out) :: status         !< status: 0 for success, -1 when failed
+    ! local
+    class(*), pointer :: handler_data_genptr => null()
+    class(EventHandlerDataType), pointer :: evt_handler_data => null()
+
     if (mt%set_handler_idx == 0) then
       ! nothing to be done
       status = 0
@@ -110,6 +110,7 @@ contains
     !DIR$ ATTRIBUTES DLLEXPORT :: bmi_finalize
     ! -- modules
     use SimVariablesModule, only: iforcestop
+    use mf6xmiBatch, only: clear_var_handles
     ! -- dummy variables
     integer(kind=c_int) :: bmi_status !< BMI status code
 
@@ -117,6 +118,9 @@ contains
     iforcestop = 0
     call Mf6Finalize()
 
+    ! the variable handles point to memory that is no longer allocated
+    call clear_var_handles()
+
     bmi_status = BMI_SUCCESS
 
   end function bmi_finalize
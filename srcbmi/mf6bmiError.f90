@@ -30,6 +30,16 @@ module mf6bmiError
                                  "('Fatal BMI Error, invalid access of memory for variable: ', a)"
   character(len=*), parameter :: fmt_fail_cvg_sol = &       !< Solution failed to converge, args: detail
                                  "('BMI Error, Numerical Solution ', i3, ' failed to converge')"
+  character(len=*), parameter :: fmt_invalid_handle = &     !< Invalid variable handle, args: handle
+                                 "('BMI Error, invalid variable handle: ', i0)"
+  character(len=*), parameter :: fmt_invalid_buffer_size = & !< Buffer size does not match the variables, args: buffer size, size of the variables
+                                 "('BMI Error, buffer of ', i0, ' elements does not match the size of the variables: ', i0)"
+  character(len=*), parameter :: fmt_unsupported_type = &   !< Unsupported type, args: variable name
+                                 "('BMI Error, unsupported type for variable: ', a)"
+  character(len=*), parameter :: fmt_invalid_checkpoint = & !< Checkpoint does not match the simulation, args: detail
+                                 "('BMI Error, checkpoint does not match the simulation: ', a)"
+  character(len=*), parameter :: fmt_checkpoint_input = &   !< Input not at the checkpoint, args: memory path
+                                 "('BMI Error, input of ', a, ' is not at the stress period of the checkpoint')"
 
 contains
 
@@ -10,6 +10,12 @@
 !! - Expose the concept of subcomponents, which in case of MODFLOW 6 are 'Numerical Solution'
 !!   objects, each of which represents a separate linear system to solve. An example here
 !!   would be a transport model (GWT) coupled to a groundwater model (GWF).
+!! - Batched access to the values of many variables through integer handles, which
+!!   avoids parsing the variable address in every call (see mf6xmiBatch).
+!! - Discovery of the variables under a memory path prefix, for example a single model,
+!!   in pages that include the type, rank and shape of each variable (see mf6xmiDiscovery).
+!! - Saving the state of the simulation to a buffer or file and restoring it later, in the
+!!   same or in a fresh process (see mf6xmiCheckpoint).
 !!
 !! The common BMI control flow is
 !!
@@ -0,0 +1,451 @@
+!> @brief This module contains the batched variable access of the XMI
+!!
+!! Every call to get_value_ptr(), get_value() and set_value() parses the
+!! variable address and searches the memory manager for the variable.
+!! Coupled model drivers that exchange many variables every time step
+!! can resolve the addresses once with get_var_handles() and use the
+!! returned integer handles to copy the values of all of the variables
+!! from and to a single contiguous buffer:
+!!
+!! ~~~{.py}
+!! initialize()
+!!
+!! handles = get_var_handles(addresses)
+!! buffer = zeros(get_handles_size(handles))
+!!
+!! while t < t_end:
+!!
+!!   prepare_time_step()
+!!
+!!   # set all of the variables in one call
+!!   set_value_handles_double(handles, buffer, size(buffer))
+!!
+!!   do_time_step()
+!!   finalize_time_step()
+!!
+!!   # and get them back
+!!   get_value_handles_double(handles, buffer, size(buffer))
+!!
+!! release_var_handles()
+!! finalize()
+!! ~~~
+!!
+!! The values are stored in the buffer in the order of the handles, with
+!! the memory layout of each variable (C-style for rank > 1, as returned
+!! by get_var_shape()). Handles are valid until release_var_handles() or
+!! finalize() is called. The number of elements in the buffer is passed
+!! with every call and has to be equal to the size returned by
+!! get_handles_size(): when a variable has been reallocated to a
+!! different size, BMI_FAILURE is returned without accessing the buffer
+!! and the buffer has to be resized before the values can be copied.
+!<
+module mf6xmiBatch
+  use mf6bmiUtil
+  use mf6bmiError
+  use iso_c_binding, only: c_int, c_char, c_double, c_ptr, c_f_pointer
+  use KindModule, only: DP, I4B, LGP
+  use ConstantsModule, only: LENMEMPATH, LENVARNAME
+  use MemoryManagerModule, only: get_from_memorylist
+  use MemoryTypeModule, only: MemoryType
+  implicit none
+
+  !> @brief A variable resolved by get_var_handles()
+  type VarHandleType
+    type(MemoryType), pointer :: mt => null() !< memory item of the variable
+  end type VarHandleType
+
+  type(VarHandleType), dimension(:), allocatable :: var_handles !< resolved variables, indexed by handle
+  integer(I4B) :: nr_var_handles = 0 !< number of handles in use
+
+contains
+
+  !> @brief Resolve an array of variable addresses into handles
+  !!
+  !! The addresses in @p c_var_addresses should be written contiguously
+  !! with stride equal to BMI_LENVARADDRESS and be nul-terminated, the
+  !! same layout as returned by get_input_var_names(). The handle of an
+  !! address that cannot be resolved is set to -1 and BMI_FAILURE is
+  !! returned after all of the addresses have been processed.
+  !<
+  function get_var_handles(c_var_addresses, c_count, c_handles) result(bmi_status) &
+    bind(C, name="get_var_handles")
+    !DIR$ ATTRIBUTES DLLEXPORT :: get_var_handles
+    ! -- dummy variables
+    character(kind=c_char), intent(in) :: c_var_addresses(*) !< memory address strings of the variables
+    integer(kind=c_int), intent(in) :: c_count                !< number of addresses
+    integer(kind=c_int), intent(out) :: c_handles(*)          !< handles of the variables
+    integer(kind=c_int) :: bmi_status                         !< BMI status code
+    ! -- local variables
+    character(len=LENMEMPATH) :: mem_path
+    character(len=LENVARNAME) :: var_name
+    logical(LGP) :: valid, found
+    type(MemoryType), pointer :: mt
+    type(VarHandleType), dimension(:), allocatable :: tmp_handles
+    integer(I4B) :: i, istart, nsize
+
+    bmi_status = BMI_SUCCESS
+
+    ! make room for the new handles
+    nsize = nr_var_handles + c_count
+    if (.not. allocated(var_handles)) then
+      allocate (var_handles(max(nsize, 64)))
+    else if (size(var_handles) < nsize) then
+      allocate (tmp_handles(max(nsize, 2*size(var_handles))))
+      do i = 1, nr_var_handles
+        tmp_handles(i)%mt => var_handles(i)%mt
+      end do
+      call move_alloc(tmp_handles, var_handles)
+    end if
+
+    do i = 1, c_count
+      c_handles(i) = -1
+      istart = (i - 1)*BMI_LENVARADDRESS + 1
+      call split_address(c_var_addresses(istart), mem_path, var_name, valid)
+      if (.not. valid) then
+        bmi_status = BMI_FAILURE
+        cycle
+      end if
+
+      mt => null()
+      call get_from_memorylist(var_name, mem_path, mt, found, check=.false.)
+      if (associated(mt%logicalsclr)) then
+        write (bmi_last_error, fmt_unsupported_type) trim(var_name)
+        call report_bmi_error(bmi_last_error)
+        bmi_status = BMI_FAILURE
+        cycle
+      end if
+
+      nr_var_handles = nr_var_handles + 1
+      var_handles(nr_var_handles)%mt => mt
+      c_handles(i) = nr_var_handles
+    end do
+
+  end function get_var_handles
+
+  !> @brief Release all of the variable handles
+  !!
+  !! The handles returned by earlier calls to get_var_handles() can
+  !! not be used after this call.
+  !<
+  function release_var_handles() result(bmi_status) bind(C, name="release_var_handles")
+    !DIR$ ATTRIBUTES DLLEXPORT :: release_var_handles
+    ! -- dummy variables
+    integer(kind=c_int) :: bmi_status !< BMI status code
+
+    call clear_var_handles()
+    bmi_status = BMI_SUCCESS
+
+  end function release_var_handles
+
+  !> @brief Get the total number of elements of the variables
+  !!
+  !! This is the size of the buffer that is needed to get or set the
+  !! values of the variables in @p c_handles.
+  !<
+  function get_handles_size(c_count, c_handles, c_size) result(bmi_status) &
+    bind(C, name="get_handles_size")
+    !DIR$ ATTRIBUTES DLLEXPORT :: get_handles_size
+    ! -- dummy variables
+    integer(kind=c_int), intent(in) :: c_count      !< number of handles
+    integer(kind=c_int), intent(in) :: c_handles(*) !< handles of the variables
+    integer(kind=c_int), intent(out) :: c_size      !< total number of elements
+    integer(kind=c_int) :: bmi_status               !< BMI status code
+    ! -- local variables
+    type(MemoryType), pointer :: mt
+    integer(I4B) :: i
+
+    bmi_status = BMI_SUCCESS
+
+    c_size = 0
+    do i = 1, c_count
+      mt => get_handle_item(c_handles(i))
+      if (.not. associated(mt)) then
+        bmi_status = BMI_FAILURE
+        return
+      end if
+      c_size = c_size + mt%isize
+    end do
+
+  end function get_handles_size
+
+  !> @brief Copy the values of double precision variables into the buffer
+  !<
+  function get_value_handles_double(c_count, c_handles, c_arr_ptr, c_size) &
+    result(bmi_status) bind(C, name="get_value_handles_double")
+    !DIR$ ATTRIBUTES DLLEXPORT :: get_value_handles_double
+    ! -- dummy variables
+    integer(kind=c_int), intent(in) :: c_count      !< number of handles
+    integer(kind=c_int), intent(in) :: c_handles(*) !< handles of the variables
+    type(c_ptr), intent(in) :: c_arr_ptr            !< pointer to the double precision buffer
+    integer(kind=c_int), intent(in) :: c_size       !< number of elements in the buffer
+    integer(kind=c_int) :: bmi_status               !< BMI status code
+
+    call copy_handles_double(c_count, c_handles, c_arr_ptr, c_size, .true., bmi_status)
+
+  end function get_value_handles_double
+
+  !> @brief Set the values of double precision variables from the buffer
+  !!
+  !! The side effect handlers of the variables are called, the same as
+  !! for set_value_double().
+  !<
+  function set_value_handles_double(c_count, c_handles, c_arr_ptr, c_size) &
+    result(bmi_status) bind(C, name="set_value_handles_double")
+    !DIR$ ATTRIBUTES DLLEXPORT :: set_value_handles_double
+    ! -- dummy variables
+    integer(kind=c_int), intent(in) :: c_count      !< number of handles
+    integer(kind=c_int), intent(in) :: c_handles(*) !< handles of the variables
+    type(c_ptr), intent(in) :: c_arr_ptr            !< pointer to the double precision buffer
+    integer(kind=c_int), intent(in) :: c_size       !< number of elements in the buffer
+    integer(kind=c_int) :: bmi_status               !< BMI status code
+
+    call copy_handles_double(c_count, c_handles, c_arr_ptr, c_size, .false., bmi_status)
+
+  end function set_value_handles_double
+
+  !> @brief Copy the values of integer variables into the buffer
+  !<
+  function get_value_handles_int(c_count, c_handles, c_arr_ptr, c_size) &
+    result(bmi_status) bind(C, name="get_value_handles_int")
+    !DIR$ ATTRIBUTES DLLEXPORT :: get_value_handles_int
+    ! -- dummy variables
+    integer(kind=c_int), intent(in) :: c_count      !< number of handles
+    integer(kind=c_int), intent(in) :: c_handles(*) !< handles of the variables
+    type(c_ptr), intent(in) :: c_arr_ptr            !< pointer to the integer buffer
+    integer(kind=c_int), intent(in) :: c_size       !< number of elements in the buffer
+    integer(kind=c_int) :: bmi_status               !< BMI status code
+
+    call copy_handles_int(c_count, c_handles, c_arr_ptr, c_size, .true., bmi_status)
+
+  end function get_value_handles_int
+
+  !> @brief Set the values of integer variables from the buffer
+  !!
+  !! The side effect handlers of the variables are called, the same as
+  !! for set_value_int().
+  !<
+  function set_value_handles_int(c_count, c_handles, c_arr_ptr, c_size) &
+    result(bmi_status) bind(C, name="set_value_handles_int")
+    !DIR$ ATTRIBUTES DLLEXPORT :: set_value_handles_int
+    ! -- dummy variables
+    integer(kind=c_int), intent(in) :: c_count      !< number of handles
+    integer(kind=c_int), intent(in) :: c_handles(*) !< handles of the variables
+    type(c_ptr), intent(in) :: c_arr_ptr            !< pointer to the integer buffer
+    integer(kind=c_int), intent(in) :: c_size       !< number of elements in the buffer
+    integer(kind=c_int) :: bmi_status               !< BMI status code
+
+    call copy_handles_int(c_count, c_handles, c_arr_ptr, c_size, .false., bmi_status)
+
+  end function set_value_handles_int
+
+  !> @brief Clear the handle table, called when the simulation is finalized
+  !<
+  subroutine clear_var_handles()
+    if (allocated(var_handles)) deallocate (var_handles)
+    nr_var_handles = 0
+  end subroutine clear_var_handles
+
+  !> @brief Get the memory item of a handle (null when the handle is invalid)
+  !<
+  function get_handle_item(handle) result(mt)
+    ! -- dummy variables
+    integer(kind=c_int), intent(in) :: handle !< variable handle
+    type(MemoryType), pointer :: mt           !< memory item of the variable
+
+    mt => null()
+    if (handle < 1 .or. handle > nr_var_handles) then
+      write (bmi_last_error, fmt_invalid_handle) handle
+      call report_bmi_error(bmi_last_error)
+      return
+    end if
+    mt => var_handles(handle)%mt
+
+  end function get_handle_item
+
+  !> @brief Copy double precision values between the variables and the buffer
+  !<
+  subroutine copy_handles_double(c_count, c_handles, c_arr_ptr, c_size, &
+                                 to_buffer, bmi_status)
+    ! -- modules
+    use MemorySetHandlerModule, only: on_memory_set_type
+    ! -- dummy variables
+    integer(kind=c_int), intent(in) :: c_count      !< number of handles
+    integer(kind=c_int), intent(in) :: c_handles(*) !< handles of the variables
+    type(c_ptr), intent(in) :: c_arr_ptr            !< pointer to the double precision buffer
+    integer(kind=c_int), intent(in) :: c_size       !< number of elements in the buffer
+    logical(LGP), intent(in) :: to_buffer           !< true: copy variables to the buffer, false: copy buffer to the variables
+    integer(kind=c_int), intent(out) :: bmi_status  !< BMI status code
+    ! -- local variables
+    type(MemoryType), pointer :: mt
+    real(DP), dimension(:), pointer, contiguous :: buffer
+    integer(I4B) :: n, i, j, k, ipos
+    integer(I4B) :: status
+
+    bmi_status = get_handles_size(c_count, c_handles, n)
+    if (bmi_status /= BMI_SUCCESS) return
+    if (n /= c_size) then
+      write (bmi_last_error, fmt_invalid_buffer_size) c_size, n
+      call report_bmi_error(bmi_last_error)
+      bmi_status = BMI_FAILURE
+      return
+    end if
+    call c_f_pointer(c_arr_ptr, buffer, [n])
+
+    ipos = 0
+    do n = 1, c_count
+      mt => var_handles(c_handles(n))%mt
+      if (associated(mt%dblsclr)) then
+        ipos = ipos + 1
+        if (to_buffer) then
+          buffer(ipos) = mt%dblsclr
+        else
+          mt%dblsclr = buffer(ipos)
+        end if
+      else if (associated(mt%adbl1d)) then
+        do i = 1, size(mt%adbl1d)
+          ipos = ipos + 1
+          if (to_buffer) then
+            buffer(ipos) = mt%adbl1d(i)
+          else
+            mt%adbl1d(i) = buffer(ipos)
+          end if
+        end do
+      else if (associated(mt%adbl2d)) then
+        do j = 1, size(mt%adbl2d, 2)
+          do i = 1, size(mt%adbl2d, 1)
+            ipos = ipos + 1
+            if (to_buffer) then
+              buffer(ipos) = mt%adbl2d(i, j)
+            else
+              mt%adbl2d(i, j) = buffer(ipos)
+            end if
+          end do
+        end do
+      else if (associated(mt%adbl3d)) then
+        do k = 1, size(mt%adbl3d, 3)
+          do j = 1, size(mt%adbl3d, 2)
+            do i = 1, size(mt%adbl3d, 1)
+              ipos = ipos + 1
+              if (to_buffer) then
+                buffer(ipos) = mt%adbl3d(i, j, k)
+              else
+                mt%adbl3d(i, j, k) = buffer(ipos)
+              end if
+            end do
+          end do
+        end do
+      else
+        write (bmi_last_error, fmt_unsupported_type) trim(mt%name)
+        call report_bmi_error(bmi_last_error)
+        bmi_status = BMI_FAILURE
+        return
+      end if
+
+      if (.not. to_buffer) then
+        ! trigger event:
+        call on_memory_set_type(mt, status)
+        if (status /= 0) then
+          write (bmi_last_error, fmt_invalid_mem_access) trim(mt%name)
+          call report_bmi_error(bmi_last_error)
+          bmi_status = BMI_FAILURE
+          return
+        end if
+      end if
+    end do
+
+  end subroutine copy_handles_double
+
+  !> @brief Copy integer values between the variables and the buffer
+  !<
+  subroutine copy_handles_int(c_count, c_handles, c_arr_ptr, c_size, &
+                              to_buffer, bmi_status)
+    ! -- modules
+    use MemorySetHandlerModule, only: on_memory_set_type
+    ! -- dummy variables
+    integer(kind=c_int), intent(in) :: c_count      !< number of handles
+    integer(kind=c_int), intent(in) :: c_handles(*) !< handles of the variables
+    type(c_ptr), intent(in) :: c_arr_ptr            !< pointer to the integer buffer
+    integer(kind=c_int), intent(in) :: c_size       !< number of elements in the buffer
+    logical(LGP), intent(in) :: to_buffer           !< true: copy variables to the buffer, false: copy buffer to the variables
+    integer(kind=c_int), intent(out) :: bmi_status  !< BMI status code
+    ! -- local variables
+    type(MemoryType), pointer :: mt
+    integer(I4B), dimension(:), pointer, contiguous :: buffer
+    integer(I4B) :: n, i, j, k, ipos
+    integer(I4B) :: status
+
+    bmi_status = get_handles_size(c_count, c_handles, n)
+    if (bmi_status /= BMI_SUCCESS) return
+    if (n /= c_size) then
+      write (bmi_last_error, fmt_invalid_buffer_size) c_size, n
+      call report_bmi_error(bmi_last_error)
+      bmi_status = BMI_FAILURE
+      return
+    end if
+    call c_f_pointer(c_arr_ptr, buffer, [n])
+
+    ipos = 0
+    do n = 1, c_count
+      mt => var_handles(c_handles(n))%mt
+      if (associated(mt%intsclr)) then
+        ipos = ipos + 1
+        if (to_buffer) then
+          buffer(ipos) = mt%intsclr
+        else
+          mt%intsclr = buffer(ipos)
+        end if
+      else if (associated(mt%aint1d)) then
+        do i = 1, size(mt%aint1d)
+          ipos = ipos + 1
+          if (to_buffer) then
+            buffer(ipos) = mt%aint1d(i)
+          else
+            mt%aint1d(i) = buffer(ipos)
+          end if
+        end do
+      else if (associated(mt%aint2d)) then
+        do j = 1, size(mt%aint2d, 2)
+          do i = 1, size(mt%aint2d, 1)
+            ipos = ipos + 1
+            if (to_buffer) then
+              buffer(ipos) = mt%aint2d(i, j)
+            else
+              mt%aint2d(i, j) = buffer(ipos)
+            end if
+          end do
+        end do
+      else if (associated(mt%aint3d)) then
+        do k = 1, size(mt%aint3d, 3)
+          do j = 1, size(mt%aint3d, 2)
+            do i = 1, size(mt%aint3d, 1)
+              ipos = ipos + 1
+              if (to_buffer) then
+                buffer(ipos) = mt%aint3d(i, j, k)
+              else
+                mt%aint3d(i, j, k) = buffer(ipos)
+              end if
+            end do
+          end do
+        end do
+      else
+        write (bmi_last_error, fmt_unsupported_type) trim(mt%name)
+        call report_bmi_error(bmi_last_error)
+        bmi_status = BMI_FAILURE
+        return
+      end if
+
+      if (.not. to_buffer) then
+        ! trigger event:
+        call on_memory_set_type(mt, status)
+        if (status /= 0) then
+          write (bmi_last_error, fmt_invalid_mem_access) trim(mt%name)
+          call report_bmi_error(bmi_last_error)
+          bmi_status = BMI_FAILURE
+          return
+        end if
+      end if
+    end do
+
+  end subroutine copy_handles_int
+
+end module mf6xmiBatch
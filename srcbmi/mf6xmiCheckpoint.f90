@@ -0,0 +1,548 @@
+!> @brief This module contains the checkpoint and restore of the XMI
+!!
+!! The state of a simulation can be saved to a buffer or a binary file and
+!! restored later in the same or in a fresh process, so a simulation does
+!! not have to be rerun from initialize() for every ensemble member or
+!! rollback:
+!!
+!! ~~~{.py}
+!! initialize()
+!!
+!! # run to the start of the assimilation window
+!! ...
+!! buffer = zeros(get_checkpoint_size())
+!! save_checkpoint(buffer)
+!!
+!! for member in ensemble:
+!!   restore_checkpoint(buffer)
+!!   # set the parameters of the member and run the window
+!!   ...
+!!
+!! finalize()
+!! ~~~
+!!
+!! The checkpoint contains the values of all of the integer, double
+!! precision and logical variables in the memory manager, which includes
+!! the dependent variables of the models, the state of the packages, the
+!! TDIS counters and times and the ATS state. Character variables and
+!! variables that point to the memory of another variable are not saved.
+!!
+!! The stress period input of the packages is read from file, so the
+!! checkpoint can only be restored when the input has been read up to the
+!! same stress period as when the checkpoint was saved. When the
+!! simulation is at an earlier stress period, for example in a fresh
+!! process after initialize(), the stress period input is read up to the
+!! stress period of the checkpoint before the values are restored. A
+!! simulation that has read input beyond the stress period of the
+!! checkpoint can not be restored to it. The budget accumulators of the
+!! models and the output files are not part of the checkpoint.
+!<
+module mf6xmiCheckpoint
+  use mf6bmiUtil
+  use mf6bmiError
+  use iso_c_binding, only: c_int, c_char, c_null_char, c_long_long, c_ptr, &
+                           c_f_pointer
+  use KindModule, only: I4B, I8B, LGP
+  use ConstantsModule, only: LENMEMPATH, LENVARNAME, MAXCHARLEN
+  use MemoryManagerModule, only: memorylist, get_from_memorylist
+  use MemoryTypeModule, only: MemoryType
+  implicit none
+
+  character(len=8), parameter :: CHECKPOINT_ID = 'MF6CHKP1' !< identifier at the start of a checkpoint
+  integer(I4B), parameter :: ITYPE_INT = 1 !< integer variable
+  integer(I4B), parameter :: ITYPE_DBL = 2 !< double precision variable
+  integer(I4B), parameter :: ITYPE_LOGICAL = 3 !< logical variable
+  integer(I4B), parameter :: LENHEADER = 12 !< bytes in the header: identifier and number of variables
+  integer(I4B), parameter :: LENRECORD = LENMEMPATH + LENVARNAME + 8 !< bytes in the header of a variable: path, name, type and size
+
+  character(len=LENVARNAME), dimension(2), parameter :: input_vars = & !< stress period of the input of the packages
+                                                        ['IONPER', 'IPEROC']
+
+contains
+
+  !> @brief Get the size of the checkpoint in bytes
+  !<
+  function get_checkpoint_size(c_size) result(bmi_status) &
+    bind(C, name="get_checkpoint_size")
+    !DIR$ ATTRIBUTES DLLEXPORT :: get_checkpoint_size
+    ! -- dummy variables
+    integer(kind=c_long_long), intent(out) :: c_size !< size of the checkpoint in bytes
+    integer(kind=c_int) :: bmi_status                !< BMI status code
+
+    c_size = checkpoint_size()
+    bmi_status = BMI_SUCCESS
+
+  end function get_checkpoint_size
+
+  !> @brief Save the state of the simulation to a buffer
+  !!
+  !! The buffer @p c_buf_ptr should have the size returned by
+  !! get_checkpoint_size().
+  !<
+  function save_checkpoint(c_buf_ptr, c_size) result(bmi_status) &
+    bind(C, name="save_checkpoint")
+    !DIR$ ATTRIBUTES DLLEXPORT :: save_checkpoint
+    ! -- dummy variables
+    type(c_ptr), intent(in) :: c_buf_ptr             !< pointer to the buffer
+    integer(kind=c_long_long), intent(in) :: c_size  !< size of the buffer in bytes
+    integer(kind=c_int) :: bmi_status                !< BMI status code
+    ! -- local variables
+    character(kind=c_char), dimension(:), pointer, contiguous :: buf
+
+    bmi_status = BMI_SUCCESS
+
+    if (c_size /= checkpoint_size()) then
+      write (bmi_last_error, fmt_general_err) 'invalid size of checkpoint buffer'
+      call report_bmi_error(bmi_last_error)
+      bmi_status = BMI_FAILURE
+      return
+    end if
+    call c_f_pointer(c_buf_ptr, buf, [c_size])
+    call write_checkpoint(buf)
+
+  end function save_checkpoint
+
+  !> @brief Restore the state of the simulation from a buffer
+  !<
+  function restore_checkpoint(c_buf_ptr, c_size) result(bmi_status) &
+    bind(C, name="restore_checkpoint")
+    !DIR$ ATTRIBUTES DLLEXPORT :: restore_checkpoint
+    ! -- dummy variables
+    type(c_ptr), intent(in) :: c_buf_ptr             !< pointer to the buffer
+    integer(kind=c_long_long), intent(in) :: c_size  !< size of the buffer in bytes
+    integer(kind=c_int) :: bmi_status                !< BMI status code
+    ! -- local variables
+    character(kind=c_char), dimension(:), pointer, contiguous :: buf
+
+    call c_f_pointer(c_buf_ptr, buf, [c_size])
+    if (read_checkpoint(buf)) then
+      bmi_status = BMI_SUCCESS
+    else
+      bmi_status = BMI_FAILURE
+    end if
+
+  end function restore_checkpoint
+
+  !> @brief Save the state of the simulation to a binary file
+  !<
+  function save_checkpoint_file(c_filename) result(bmi_status) &
+    bind(C, name="save_checkpoint_file")
+    !DIR$ ATTRIBUTES DLLEXPORT :: save_checkpoint_file
+    ! -- modules
+    use InputOutputModule, only: getunit
+    ! -- dummy variables
+    character(kind=c_char), intent(in) :: c_filename(*) !< name of the file
+    integer(kind=c_int) :: bmi_status                   !< BMI status code
+    ! -- local variables
+    character(len=MAXCHARLEN) :: filename
+    character(kind=c_char), dimension(:), allocatable :: buf
+    integer(I4B) :: iu, istat
+
+    bmi_status = BMI_SUCCESS
+
+    filename = get_filename(c_filename)
+    allocate (buf(checkpoint_size()))
+    call write_checkpoint(buf)
+
+    iu = getunit()
+    open (unit=iu, file=trim(filename), access='stream', &
+          form='unformatted', status='replace', action='write', iostat=istat)
+    if (istat == 0) then
+      write (iu, iostat=istat) buf
+      close (iu)
+    end if
+    if (istat /= 0) then
+      write (bmi_last_error, fmt_general_err) &
+        'could not write checkpoint file '//trim(filename)
+      call report_bmi_error(bmi_last_error)
+      bmi_status = BMI_FAILURE
+    end if
+
+  end function save_checkpoint_file
+
+  !> @brief Restore the state of the simulation from a binary file
+  !<
+  function restore_checkpoint_file(c_filename) result(bmi_status) &
+    bind(C, name="restore_checkpoint_file")
+    !DIR$ ATTRIBUTES DLLEXPORT :: restore_checkpoint_file
+    ! -- modules
+    use InputOutputModule, only: getunit
+    ! -- dummy variables
+    character(kind=c_char), intent(in) :: c_filename(*) !< name of the file
+    integer(kind=c_int) :: bmi_status                   !< BMI status code
+    ! -- local variables
+    character(len=MAXCHARLEN) :: filename
+    character(kind=c_char), dimension(:), allocatable :: buf
+    integer(I8B) :: nbytes
+    integer(I4B) :: iu, istat
+
+    bmi_status = BMI_FAILURE
+
+    filename = get_filename(c_filename)
+    iu = getunit()
+    open (unit=iu, file=trim(filename), access='stream', &
+          form='unformatted', status='old', action='read', iostat=istat)
+    if (istat == 0) then
+      inquire (unit=iu, size=nbytes)
+      allocate (buf(nbytes))
+      read (iu, iostat=istat) buf
+      close (iu)
+    end if
+    if (istat /= 0) then
+      write (bmi_last_error, fmt_general_err) &
+        'could not read checkpoint file '//trim(filename)
+      call report_bmi_error(bmi_last_error)
+      return
+    end if
+
+    if (read_checkpoint(buf)) then
+      bmi_status = BMI_SUCCESS
+    end if
+
+  end function restore_checkpoint_file
+
+  !> @brief Convert the C-style file name to a Fortran string
+  !<
+  function get_filename(c_filename) result(filename)
+    ! -- dummy variables
+    character(kind=c_char), intent(in) :: c_filename(*) !< C-style file name
+    character(len=MAXCHARLEN) :: filename               !< file name
+    ! -- local variables
+    integer(I4B) :: i
+
+    filename = ' '
+    do i = 1, MAXCHARLEN
+      if (c_filename(i) == c_null_char) exit
+      filename(i:i) = c_filename(i)
+    end do
+
+  end function get_filename
+
+  !> @brief Get the type of a variable in the checkpoint
+  !!
+  !! Returns 0 for variables that are not saved.
+  !<
+  function get_item_type(mt) result(itype)
+    ! -- dummy variables
+    type(MemoryType), pointer, intent(in) :: mt !< memory item
+    integer(I4B) :: itype                       !< type of the variable
+
+    itype = 0
+    if (.not. mt%master) return
+    if (associated(mt%intsclr) .or. associated(mt%aint1d) .or. &
+        associated(mt%aint2d) .or. associated(mt%aint3d)) then
+      itype = ITYPE_INT
+    else if (associated(mt%dblsclr) .or. associated(mt%adbl1d) .or. &
+             associated(mt%adbl2d) .or. associated(mt%adbl3d)) then
+      itype = ITYPE_DBL
+    else if (associated(mt%logicalsclr)) then
+      itype = ITYPE_LOGICAL
+    end if
+
+  end function get_item_type
+
+  !> @brief Get the number of bytes of the values of a variable
+  !<
+  function get_item_bytes(itype, isize) result(nbytes)
+    ! -- dummy variables
+    integer(I4B), intent(in) :: itype !< type of the variable
+    integer(I4B), intent(in) :: isize !< number of values
+    integer(I8B) :: nbytes            !< number of bytes
+
+    if (itype == ITYPE_DBL) then
+      nbytes = 8_I8B*isize
+    else
+      nbytes = 4_I8B*isize
+    end if
+
+  end function get_item_bytes
+
+  !> @brief Get the size of the checkpoint in bytes
+  !<
+  function checkpoint_size() result(nbytes)
+    ! -- dummy variables
+    integer(I8B) :: nbytes !< size of the checkpoint in bytes
+    ! -- local variables
+    type(MemoryType), pointer :: mt
+    integer(I4B) :: i, itype
+
+    nbytes = LENHEADER
+    do i = 1, memorylist%count()
+      mt => memorylist%get(i)
+      itype = get_item_type(mt)
+      if (itype == 0) cycle
+      nbytes = nbytes + LENRECORD + get_item_bytes(itype, mt%isize)
+    end do
+
+  end function checkpoint_size
+
+  !> @brief Write the checkpoint into the buffer
+  !<
+  subroutine write_checkpoint(buf)
+    ! -- dummy variables
+    character(kind=c_char), dimension(:), intent(inout) :: buf !< buffer with the size of the checkpoint
+    ! -- local variables
+    character(kind=c_char), dimension(1) :: mold
+    type(MemoryType), pointer :: mt
+    integer(I8B) :: ipos, nbytes
+    integer(I4B) :: i, itype, nvars
+
+    ipos = LENHEADER + 1
+    nvars = 0
+    do i = 1, memorylist%count()
+      mt => memorylist%get(i)
+      itype = get_item_type(mt)
+      if (itype == 0) cycle
+      nvars = nvars + 1
+
+      ! the header of the variable
+      buf(ipos:ipos + LENMEMPATH - 1) = transfer(mt%path, mold)
+      ipos = ipos + LENMEMPATH
+      buf(ipos:ipos + LENVARNAME - 1) = transfer(mt%name, mold)
+      ipos = ipos + LENVARNAME
+      buf(ipos:ipos + 3) = transfer(itype, mold)
+      buf(ipos + 4:ipos + 7) = transfer(mt%isize, mold)
+      ipos = ipos + 8
+
+      ! the values
+      nbytes = get_item_bytes(itype, mt%isize)
+      if (nbytes > 0) then
+        call pack_item(mt, buf(ipos:ipos + nbytes - 1))
+      end if
+      ipos = ipos + nbytes
+    end do
+
+    buf(1:8) = transfer(CHECKPOINT_ID, mold)
+    buf(9:12) = transfer(nvars, mold)
+
+  end subroutine write_checkpoint
+
+  !> @brief Copy the values of a variable into the buffer
+  !<
+  subroutine pack_item(mt, buf)
+    ! -- dummy variables
+    type(MemoryType), pointer, intent(in) :: mt                !< memory item
+    character(kind=c_char), dimension(:), intent(inout) :: buf !< buffer with the size of the values
+    ! -- local variables
+    character(kind=c_char), dimension(1) :: mold
+
+    if (associated(mt%logicalsclr)) buf = transfer(mt%logicalsclr, mold)
+    if (associated(mt%intsclr)) buf = transfer(mt%intsclr, mold)
+    if (associated(mt%dblsclr)) buf = transfer(mt%dblsclr, mold)
+    if (associated(mt%aint1d)) buf = transfer(mt%aint1d, mold)
+    if (associated(mt%aint2d)) buf = transfer(mt%aint2d, mold)
+    if (associated(mt%aint3d)) buf = transfer(mt%aint3d, mold)
+    if (associated(mt%adbl1d)) buf = transfer(mt%adbl1d, mold)
+    if (associated(mt%adbl2d)) buf = transfer(mt%adbl2d, mold)
+    if (associated(mt%adbl3d)) buf = transfer(mt%adbl3d, mold)
+
+  end subroutine pack_item
+
+  !> @brief Copy the values of a variable from the buffer
+  !<
+  subroutine unpack_item(mt, buf)
+    ! -- dummy variables
+    type(MemoryType), pointer, intent(in) :: mt             !< memory item
+    character(kind=c_char), dimension(:), intent(in) :: buf !< buffer with the values
+
+    if (associated(mt%logicalsclr)) then
+      mt%logicalsclr = transfer(buf, mt%logicalsclr)
+    end if
+    if (associated(mt%intsclr)) mt%intsclr = transfer(buf, mt%intsclr)
+    if (associated(mt%dblsclr)) mt%dblsclr = transfer(buf, mt%dblsclr)
+    if (associated(mt%aint1d)) mt%aint1d = transfer(buf, mt%aint1d)
+    if (associated(mt%aint2d)) then
+      mt%aint2d = reshape(transfer(buf, mt%aint2d), shape(mt%aint2d))
+    end if
+    if (associated(mt%aint3d)) then
+      mt%aint3d = reshape(transfer(buf, mt%aint3d), shape(mt%aint3d))
+    end if
+    if (associated(mt%adbl1d)) mt%adbl1d = transfer(buf, mt%adbl1d)
+    if (associated(mt%adbl2d)) then
+      mt%adbl2d = reshape(transfer(buf, mt%adbl2d), shape(mt%adbl2d))
+    end if
+    if (associated(mt%adbl3d)) then
+      mt%adbl3d = reshape(transfer(buf, mt%adbl3d), shape(mt%adbl3d))
+    end if
+
+  end subroutine unpack_item
+
+  !> @brief Read the header of the next variable in the checkpoint
+  !!
+  !! On return @p ipos points to the values of the variable and
+  !! @p nbytes is the number of bytes of the values. Returns false when
+  !! the checkpoint is truncated.
+  !<
+  function read_record(buf, ipos, mem_path, var_name, itype, isize, nbytes) &
+    result(success)
+    ! -- dummy variables
+    character(kind=c_char), dimension(:), intent(in) :: buf !< checkpoint
+    integer(I8B), intent(inout) :: ipos                     !< position of the variable, of its values on return
+    character(len=LENMEMPATH), intent(out) :: mem_path      !< memory path of the variable
+    character(len=LENVARNAME), intent(out) :: var_name      !< name of the variable
+    integer(I4B), intent(out) :: itype                      !< type of the variable
+    integer(I4B), intent(out) :: isize                      !< number of values
+    integer(I8B), intent(out) :: nbytes                     !< number of bytes of the values
+    logical(LGP) :: success                                 !< false when truncated
+
+    success = .false.
+    if (ipos + LENRECORD - 1 > size(buf, kind=I8B)) return
+    mem_path = transfer(buf(ipos:ipos + LENMEMPATH - 1), mem_path)
+    ipos = ipos + LENMEMPATH
+    var_name = transfer(buf(ipos:ipos + LENVARNAME - 1), var_name)
+    ipos = ipos + LENVARNAME
+    itype = transfer(buf(ipos:ipos + 3), itype)
+    isize = transfer(buf(ipos + 4:ipos + 7), isize)
+    ipos = ipos + 8
+    nbytes = get_item_bytes(itype, isize)
+    success = ipos + nbytes - 1 <= size(buf, kind=I8B)
+
+  end function read_record
+
+  !> @brief Restore the state of the simulation from the checkpoint
+  !!
+  !! The checkpoint is validated before any of the values are restored.
+  !! Returns false, with the BMI error set, when the checkpoint can not be
+  !! restored.
+  !<
+  function read_checkpoint(buf) result(success)
+    ! -- modules
+    use TdisModule, only: kper
+    ! -- dummy variables
+    character(kind=c_char), dimension(:), intent(in) :: buf !< checkpoint
+    logical(LGP) :: success                                 !< true when restored
+    ! -- local variables
+    character(len=8) :: id
+    character(len=LENMEMPATH) :: mem_path
+    character(len=LENVARNAME) :: var_name
+    type(MemoryType), pointer :: mt
+    logical(LGP) :: found
+    integer(I8B) :: ipos, nbytes
+    integer(I4B) :: ipass, i, itype, isize, ival, nvars, kper_checkpoint
+
+    success = .false.
+
+    ! the header
+    if (size(buf, kind=I8B) < LENHEADER) then
+      call report_invalid('the checkpoint is truncated')
+      return
+    end if
+    id = transfer(buf(1:8), id)
+    nvars = transfer(buf(9:12), nvars)
+    if (id /= CHECKPOINT_ID) then
+      call report_invalid('not a checkpoint')
+      return
+    end if
+
+    ! find the stress period of the checkpoint, validate the variables
+    ! and then restore them
+    kper_checkpoint = -1
+    do ipass = 1, 3
+      if (ipass == 2 .and. kper_checkpoint > kper) then
+        call read_input(kper_checkpoint)
+      end if
+      ipos = LENHEADER + 1
+      do i = 1, nvars
+        if (.not. read_record(buf, ipos, mem_path, var_name, itype, &
+                              isize, nbytes)) then
+          call report_invalid('the checkpoint is truncated')
+          return
+        end if
+
+        if (ipass == 1) then
+          if (mem_path == 'TDIS' .and. var_name == 'KPER') then
+            kper_checkpoint = transfer(buf(ipos:ipos + 3), kper_checkpoint)
+          end if
+        else
+          call get_from_memorylist(var_name, mem_path, mt, found, &
+                                   check=.false.)
+          if (ipass == 2) then
+            if (.not. found) then
+              call report_invalid('unknown variable '//trim(mem_path)// &
+                                  '/'//trim(var_name))
+              return
+            end if
+            if (get_item_type(mt) /= itype .or. mt%isize /= isize) then
+              call report_invalid('type or size of '//trim(mem_path)// &
+                                  '/'//trim(var_name))
+              return
+            end if
+            if (any(input_vars == var_name) .and. itype == ITYPE_INT) then
+              ! the input block of the period is read at the start of the
+              ! period, so a block after the checkpoint has been read when
+              ! the current period has reached it
+              ival = transfer(buf(ipos:ipos + 3), ival)
+              if (mt%intsclr /= ival .or. &
+                  (ival > kper_checkpoint .and. ival <= kper)) then
+                write (bmi_last_error, fmt_checkpoint_input) trim(mem_path)
+                call report_bmi_error(bmi_last_error)
+                return
+              end if
+            end if
+          else if (nbytes > 0) then
+            call unpack_item(mt, buf(ipos:ipos + nbytes - 1))
+          end if
+        end if
+        ipos = ipos + nbytes
+      end do
+    end do
+
+    success = .true.
+
+  end function read_checkpoint
+
+  !> @brief Report a checkpoint that does not match the simulation
+  !<
+  subroutine report_invalid(detail)
+    ! -- dummy variables
+    character(len=*), intent(in) :: detail !< reason
+
+    write (bmi_last_error, fmt_invalid_checkpoint) trim(detail)
+    call report_bmi_error(bmi_last_error)
+
+  end subroutine report_invalid
+
+  !> @brief Read the stress period input up to a stress period
+  !!
+  !! The stress period data of the models and exchanges are read for each
+  !! stress period after the current stress period, the same as at the
+  !! start of the first time step of the stress period.
+  !<
+  subroutine read_input(kper_target)
+    ! -- modules
+    use TdisModule, only: kper, kstp, readnewdata
+    use ListsModule, only: basemodellist, baseexchangelist, &
+                           baseconnectionlist
+    use BaseModelModule, only: BaseModelType, GetBaseModelFromList
+    use BaseExchangeModule, only: BaseExchangeType, GetBaseExchangeFromList
+    use SpatialModelConnectionModule, only: SpatialModelConnectionType, &
+                                            GetSpatialModelConnectionFromList
+    ! -- dummy variables
+    integer(I4B), intent(in) :: kper_target !< stress period of the checkpoint
+    ! -- local variables
+    class(BaseModelType), pointer :: mp
+    class(BaseExchangeType), pointer :: ep
+    class(SpatialModelConnectionType), pointer :: mc
+    integer(I4B) :: im, ie, ic
+
+    do while (kper < kper_target)
+      kper = kper + 1
+      kstp = 1
+      readnewdata = .true.
+      do im = 1, basemodellist%Count()
+        mp => GetBaseModelFromList(basemodellist, im)
+        call mp%model_rp()
+      end do
+      do ie = 1, baseexchangelist%Count()
+        ep => GetBaseExchangeFromList(baseexchangelist, ie)
+        call ep%exg_rp()
+      end do
+      do ic = 1, baseconnectionlist%Count()
+        mc => GetSpatialModelConnectionFromList(baseconnectionlist, ic)
+        call mc%exg_rp()
+      end do
+    end do
+
+  end subroutine read_input
+
+end module mf6xmiCheckpoint
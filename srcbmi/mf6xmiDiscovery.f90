@@ -0,0 +1,203 @@
+!> @brief This module contains the scoped variable discovery of the XMI
+!!
+!! The BMI functions get_input_var_names() and get_output_var_names()
+!! return the addresses of all of the variables in the simulation in a
+!! single buffer, after which the type, rank and shape of each variable
+!! have to be requested in separate calls. The functions in this module
+!! return the variables under a memory path prefix, for example a single
+!! model or package, in pages together with their type, rank and shape:
+!!
+!! ~~~{.py}
+!! initialize()
+!!
+!! cursor = 0
+!! while cursor >= 0:
+!!   count, cursor = get_var_names_prefix("GWF_1", cursor, max_count,
+!!                                        names, types, ranks, shapes)
+!!   # process the first count variables of the page
+!!
+!! finalize()
+!! ~~~
+!!
+!! A variable matches the prefix when its memory path is equal to the
+!! prefix or when the prefix is followed by a path separator, so the
+!! prefix 'GWF_1' does not match the variables of model 'GWF_10'. An
+!! empty prefix matches all of the variables.
+!<
+module mf6xmiDiscovery
+  use mf6bmiUtil
+  use mf6bmiError
+  use iso_c_binding, only: c_int, c_char, c_null_char
+  use KindModule, only: I4B, LGP
+  use ConstantsModule, only: LENMEMPATH, LENMEMTYPE, LENMEMADDRESS, &
+                             MAXMEMRANK
+  use MemoryManagerModule, only: memorylist, get_mem_type, get_mem_rank, &
+                                 get_mem_shape
+  use MemoryHelperModule, only: create_mem_address, memPathSeparator
+  use MemoryTypeModule, only: MemoryType
+  implicit none
+
+  integer(c_int), bind(C, name="BMI_MAXVARRANK") :: BMI_MAXVARRANK = MAXMEMRANK !< max. rank of a variable, the stride of the shapes in get_var_names_prefix()
+  !DIR$ ATTRIBUTES DLLEXPORT :: BMI_MAXVARRANK
+
+contains
+
+  !> @brief Get the number of variables under a memory path prefix
+  !<
+  function get_var_count_prefix(c_prefix, c_count) result(bmi_status) &
+    bind(C, name="get_var_count_prefix")
+    !DIR$ ATTRIBUTES DLLEXPORT :: get_var_count_prefix
+    ! -- dummy variables
+    character(kind=c_char), intent(in) :: c_prefix(*) !< memory path prefix
+    integer(kind=c_int), intent(out) :: c_count        !< number of variables
+    integer(kind=c_int) :: bmi_status                  !< BMI status code
+    ! -- local variables
+    character(len=LENMEMPATH) :: prefix
+    type(MemoryType), pointer :: mt
+    integer(I4B) :: i
+
+    bmi_status = BMI_SUCCESS
+
+    prefix = char_array_to_string(c_prefix, strlen(c_prefix))
+    c_count = 0
+    do i = 1, memorylist%count()
+      mt => memorylist%get(i)
+      if (has_prefix(mt%path, prefix)) then
+        c_count = c_count + 1
+      end if
+    end do
+
+  end function get_var_count_prefix
+
+  !> @brief Get a page of the variables under a memory path prefix
+  !!
+  !! The search starts at @p c_cursor, which is 0 for the first page, and
+  !! stops after @p c_max_count variables have been found. On return
+  !! @p c_cursor is set to the value to pass for the next page, or to -1
+  !! when all of the variables have been searched. The arrays are filled
+  !! with the first @p c_count variables of the page:
+  !!
+  !! - @p c_names: the addresses, with stride BMI_LENVARADDRESS and
+  !!   nul-terminated, as returned by get_input_var_names()
+  !! - @p c_types: the types, with stride BMI_LENVARTYPE and nul-terminated,
+  !!   as returned by get_var_type()
+  !! - @p c_ranks: the ranks, as returned by get_var_rank(), which is -1
+  !!   for character variables and arrays that have been deallocated
+  !! - @p c_shapes: the shapes, with stride BMI_MAXVARRANK, as returned by
+  !!   get_var_shape() (C-style) and padded with zeros
+  !<
+  function get_var_names_prefix(c_prefix, c_cursor, c_max_count, c_count, &
+                                c_names, c_types, c_ranks, c_shapes) &
+    result(bmi_status) bind(C, name="get_var_names_prefix")
+    !DIR$ ATTRIBUTES DLLEXPORT :: get_var_names_prefix
+    ! -- dummy variables
+    character(kind=c_char), intent(in) :: c_prefix(*)  !< memory path prefix
+    integer(kind=c_int), intent(inout) :: c_cursor      !< position to start the search, next position on return
+    integer(kind=c_int), intent(in) :: c_max_count      !< maximum number of variables in the page
+    integer(kind=c_int), intent(out) :: c_count         !< number of variables in the page
+    character(kind=c_char), intent(inout) :: c_names(*) !< addresses of the variables
+    character(kind=c_char), intent(inout) :: c_types(*) !< types of the variables
+    integer(kind=c_int), intent(inout) :: c_ranks(*)    !< ranks of the variables
+    integer(kind=c_int), intent(inout) :: c_shapes(*)   !< shapes of the variables
+    integer(kind=c_int) :: bmi_status                   !< BMI status code
+    ! -- local variables
+    character(len=LENMEMPATH) :: prefix
+    character(len=LENMEMADDRESS) :: var_address
+    character(len=LENMEMTYPE) :: mem_type
+    integer(I4B), dimension(MAXMEMRANK) :: var_shape
+    integer(I4B) :: var_rank
+    type(MemoryType), pointer :: mt
+    integer(I4B) :: ipos, istart
+
+    bmi_status = BMI_SUCCESS
+
+    c_count = 0
+    if (c_cursor < 0 .or. c_max_count < 0) then
+      write (bmi_last_error, fmt_general_err) 'invalid cursor or page size'
+      call report_bmi_error(bmi_last_error)
+      bmi_status = BMI_FAILURE
+      return
+    end if
+
+    prefix = char_array_to_string(c_prefix, strlen(c_prefix))
+    ipos = c_cursor + 1
+    do while (ipos <= memorylist%count() .and. c_count < c_max_count)
+      mt => memorylist%get(ipos)
+      ipos = ipos + 1
+      if (.not. has_prefix(mt%path, prefix)) cycle
+      c_count = c_count + 1
+
+      ! the address
+      var_address = create_mem_address(mt%path, mt%name)
+      istart = (c_count - 1)*BMI_LENVARADDRESS + 1
+      call copy_string(var_address, c_names(istart))
+
+      ! the type
+      call get_mem_type(mt%name, mt%path, mem_type)
+      istart = (c_count - 1)*BMI_LENVARTYPE + 1
+      call copy_string(mem_type, c_types(istart))
+
+      ! the rank and the C-style shape
+      var_shape = 0
+      call get_mem_rank(mt%name, mt%path, var_rank)
+      if (var_rank > 0) then
+        call get_mem_shape(mt%name, mt%path, var_shape)
+      end if
+      c_ranks(c_count) = var_rank
+      istart = (c_count - 1)*MAXMEMRANK
+      c_shapes(istart + 1:istart + MAXMEMRANK) = 0
+      if (var_rank > 0) then
+        c_shapes(istart + 1:istart + var_rank) = var_shape(var_rank:1:-1)
+      end if
+    end do
+
+    if (ipos > memorylist%count()) then
+      c_cursor = -1
+    else
+      c_cursor = ipos - 1
+    end if
+
+  end function get_var_names_prefix
+
+  !> @brief Check if a memory path is equal to or under the prefix
+  !<
+  function has_prefix(mem_path, prefix) result(match)
+    ! -- dummy variables
+    character(len=*), intent(in) :: mem_path !< memory path of a variable
+    character(len=*), intent(in) :: prefix   !< memory path prefix
+    logical(LGP) :: match                    !< true when the path is under the prefix
+    ! -- local variables
+    integer(I4B) :: n
+
+    n = len_trim(prefix)
+    if (n == 0) then
+      match = .true.
+    else if (len_trim(mem_path) < n) then
+      match = .false.
+    else if (mem_path(1:n) /= prefix(1:n)) then
+      match = .false.
+    else if (len_trim(mem_path) == n) then
+      match = .true.
+    else
+      match = mem_path(n + 1:n + 1) == memPathSeparator
+    end if
+
+  end function has_prefix
+
+  !> @brief Copy a string into a nul-terminated C-style character array
+  !<
+  subroutine copy_string(string, c_array)
+    ! -- dummy variables
+    character(len=*), intent(in) :: string              !< string to copy, trailing spaces are dropped
+    character(kind=c_char), intent(inout) :: c_array(*) !< C-style character string
+    ! -- local variables
+    integer(I4B) :: i
+
+    do i = 1, len_trim(string)
+      c_array(i) = string(i:i)
+    end do
+    c_array(len_trim(string) + 1) = c_null_char
+
+  end subroutine copy_string
+
+end module mf6xmiDiscovery